@@ -2,7 +2,7 @@
 
 from pydantic_settings import BaseSettings
 from pydantic import Field
-from typing import List
+from typing import List, Optional
 import os
 
 
@@ -49,6 +49,88 @@ class BackendSettings(BaseSettings):
     max_match_count: int = Field(default=50)
     default_text_weight: float = Field(default=0.3)
     
+    # Query Embedding Cache Settings
+    embedding_cache_enabled: bool = Field(default=True)
+    embedding_cache_max_entries: int = Field(default=10000)
+    embedding_cache_max_mb: float = Field(default=64.0)
+    embedding_cache_ttl_seconds: int = Field(default=3600)
+    embedding_cache_persist: bool = Field(default=False, description="Share cached embeddings via MongoDB")
+    embedding_cache_persist_ttl_seconds: int = Field(default=7 * 24 * 3600)
+    
+    # Vector Search Candidate Settings
+    vector_candidate_multiplier: float = Field(default=10.0)
+    vector_recall_target: Optional[float] = Field(default=None, ge=0.5, le=1.0)
+    vector_max_candidates: int = Field(default=10000)
+    vector_exact_threshold: int = Field(default=0)
+
+    # Vector Index Quantization Settings
+    vector_quantization: str = Field(default="none")
+    vector_rescore_oversample: Optional[float] = Field(default=None, ge=1.0)
+
+    # Chunk Storage Settings
+    embedding_storage_format: str = Field(default="array")
+
+    # Local Search Backend Settings
+    vector_search_backend: str = Field(default="atlas")
+    text_search_backend: str = Field(default="atlas")
+    local_index_path: str = Field(default="./data/local_indexes")
+    local_vector_workers: int = Field(default=1)
+
+    # Hybrid Search Settings
+    hybrid_search_mode: str = Field(default="auto", description="auto, rankfusion, unionwith or python")
+    
+    # Search Result Cache Settings
+    search_cache_enabled: bool = Field(default=True)
+    search_cache_max_mb: float = Field(default=32.0)
+    search_cache_ttl_seconds: float = Field(default=60.0)
+    search_cache_stale_seconds: float = Field(default=300.0, description="Serve stale results while refreshing")
+    
+    # Latency Histogram Settings (indexes dashboard)
+    latency_histograms_persist: bool = Field(default=True, description="Share per-minute histograms via MongoDB")
+    latency_flush_seconds: float = Field(default=30.0)
+    latency_retention_days: int = Field(default=7)
+    
+    # Prometheus Metrics
+    metrics_enabled: bool = Field(default=True, description="Expose /metrics")
+    metrics_multiprocess_dir: str = Field(default="", description="Directory where API workers share metrics (empty: per worker)")
+    metrics_write_seconds: float = Field(default=5.0, description="Interval between a worker's metrics snapshots")
+    
+    # Background Task Settings (title generation, session stats, usage rollups)
+    background_tasks_persist: bool = Field(default=True, description="Keep queued tasks in MongoDB across restarts")
+    background_task_workers: int = Field(default=2)
+    background_task_max_attempts: int = Field(default=3)
+    
+    # Prompt Context Budget (retrieved chunks + history)
+    context_max_tokens: int = Field(default=8000, description="Upper bound on prompt tokens for chunks and history")
+    context_model_window: int = Field(default=8192, description="Input window assumed for models LiteLLM does not know")
+    context_history_share: float = Field(default=0.3, description="Share of the budget reserved for history")
+    
+    # Conversation Store Settings (/chat history)
+    conversation_store_persist: bool = Field(default=True, description="Keep /chat conversations in MongoDB across restarts and workers")
+    conversation_cache_max_entries: int = Field(default=1000, description="Conversations kept in memory per worker")
+    conversation_cache_ttl_seconds: float = Field(default=1800.0)
+    conversation_max_messages: int = Field(default=50)
+    conversation_retention_days: int = Field(default=30)
+    conversation_flush_seconds: float = Field(default=1.0)
+    
+    # Batch Search Settings
+    search_batch_concurrency: int = Field(default=8, description="Searches of one batch request run at once")
+    corpus_generation_refresh_seconds: float = Field(default=2.0, description="How often other workers' ingests are picked up")
+    
+    # Query Embedding Batching Settings
+    embedding_batch_enabled: bool = Field(default=True)
+    embedding_batch_window_ms: float = Field(default=5.0)
+    embedding_batch_max_size: int = Field(default=64)
+    embedding_batch_max_concurrency: int = Field(default=4, description="Embedding calls of one batch request in flight at once")
+    embedding_batch_timeout_seconds: float = Field(default=30.0)
+    
+    # Provider HTTP Connection Pool Settings
+    http_max_connections: int = Field(default=100)
+    http_max_keepalive_connections: int = Field(default=20)
+    http_keepalive_expiry_seconds: float = Field(default=30.0)
+    http2_enabled: bool = Field(default=False, description="Requires the h2 package")
+    http_timeout_seconds: float = Field(default=60.0)
+    
     # Profile Settings
     profiles_path: str = Field(default="profiles.yaml")
     
@@ -0,0 +1,247 @@
+"""
+Token-budgeted assembly of the RAG prompt context.
+
+The retrieved chunks and the conversation history share a per-model token
+budget: the smaller of CONTEXT_MAX_TOKENS and the model's input window minus
+the completion and instruction tokens. History gets up to a share of it
+(newest messages first), chunks fill the rest in score order, and history
+takes back whatever the chunks left. Text that a chunk repeats from a kept
+chunk of the same document (the chunker's overlap) is cut before counting.
+
+Tokens are counted with tiktoken when its encoding can be loaded and
+estimated at ~4 characters per token otherwise; encodings and the counts of
+recurring texts (popular chunks, recent history) are cached.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.core.config import settings
+from src.metrics import CONTEXT_TOKENS_SAVED
+
+logger = logging.getLogger(__name__)
+
+# Tokens kept for the system instructions around the context
+PROMPT_OVERHEAD_TOKENS = 200
+
+# Per-message framing tokens of the chat format
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Overlap between consecutive chunks written by the ingestion chunker
+CHUNK_OVERLAP_CHARS = 200
+
+# Shorter repeats (a shared word or heading) are not treated as overlap
+MIN_OVERLAP_CHARS = 20
+
+CHUNK_SEPARATOR = "\n\n---\n\n"
+
+NO_CONTEXT = "No relevant documents found."
+
+
+# ============== Token counting ==============
+
+@lru_cache(maxsize=64)
+def _encoding(model: str):
+    """tiktoken encoding for a model, or None when unavailable (e.g. offline)."""
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(model.split("/")[-1])
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.info(f"No tokenizer for {model}, estimating tokens from length: {e}")
+        return None
+
+
+@lru_cache(maxsize=2048)
+def _count(encoding_name: Optional[str], text: str) -> int:
+    if encoding_name is None:
+        return (len(text) + 3) // 4
+    import tiktoken
+    return len(tiktoken.get_encoding(encoding_name).encode(text, disallowed_special=()))
+
+
+def count_tokens(text: str, model: str) -> int:
+    """Tokens of `text` for `model`."""
+    encoding = _encoding(model)
+    return _count(encoding.name if encoding is not None else None, text)
+
+
+async def setup_tokenizer(model: str) -> None:
+    """Load the tokenizer of the default model off the event loop (it may be downloaded)."""
+    await asyncio.to_thread(_encoding, model)
+
+
+@lru_cache(maxsize=64)
+def _model_input_window(model: str) -> Optional[int]:
+    try:
+        import litellm
+        return litellm.get_model_info(model).get("max_input_tokens")
+    except Exception:
+        return None
+
+
+def context_budget(model: str, max_output_tokens: int) -> int:
+    """Prompt tokens available for context, history and the user message."""
+    window = _model_input_window(model) or settings.context_model_window
+    return max(0, min(settings.context_max_tokens, window - max_output_tokens - PROMPT_OVERHEAD_TOKENS))
+
+
+# ============== Assembly ==============
+
+@dataclass
+class AssembledContext:
+    """Context string and history that fit the budget, with what was cut."""
+
+    context: str
+    results: List[Dict[str, Any]]
+    history: List[Dict[str, Any]]
+    budget: int
+    tokens: int
+    saved: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def tokens_saved(self) -> int:
+        return sum(self.saved.values())
+
+
+def _overlap(head: str, tail: str) -> int:
+    """Length of the longest end of `head` that starts `tail`."""
+    longest = min(len(head), len(tail), CHUNK_OVERLAP_CHARS)
+    for size in range(longest, MIN_OVERLAP_CHARS - 1, -1):
+        if head.endswith(tail[:size]):
+            return size
+    return 0
+
+
+def _dedupe(text: str, kept: List[str]) -> str:
+    """Cut what `text` repeats from chunks already kept for the same document."""
+    for other in kept:
+        if text in other:
+            return ""
+        cut = _overlap(other, text)
+        if cut:
+            text = text[cut:].lstrip()
+        cut = _overlap(text, other)
+        if cut:
+            text = text[:-cut].rstrip()
+    return text
+
+
+def _chunk_part(result: Dict[str, Any], text: str) -> str:
+    return f"[Source: {result['document_title']}]\n{text}"
+
+
+def _message_tokens(message: Dict[str, Any], model: str) -> int:
+    return count_tokens(str(message.get("content", "")), model) + MESSAGE_OVERHEAD_TOKENS
+
+
+def _fit_history(
+    history: List[Dict[str, Any]], budget: int, model: str
+) -> Tuple[List[Dict[str, Any]], int]:
+    """The most recent messages that fit `budget`, oldest first."""
+    used = 0
+    start = len(history)
+    for message in reversed(history):
+        tokens = _message_tokens(message, model)
+        if used + tokens > budget:
+            break
+        used += tokens
+        start -= 1
+    return history[start:], used
+
+
+def _fit_chunks(
+    results: List[Dict[str, Any]], budget: int, model: str
+) -> Tuple[List[Tuple[int, Dict[str, Any], str]], int, int, int]:
+    """Highest-scoring chunks that fit `budget`, with their overlap cut."""
+    separator_tokens = count_tokens(CHUNK_SEPARATOR, model)
+    kept: List[Tuple[int, Dict[str, Any], str]] = []
+    kept_by_document: Dict[str, List[str]] = {}
+    used = dropped = overlap = 0
+
+    by_score = sorted(range(len(results)), key=lambda i: -results[i].get("similarity", 0.0))
+    for i in by_score:
+        result = results[i]
+        full_tokens = count_tokens(_chunk_part(result, result["content"]), model) + separator_tokens
+        document_chunks = kept_by_document.setdefault(result.get("document_id") or result["document_title"], [])
+        text = _dedupe(result["content"], document_chunks)
+        if not text:
+            overlap += full_tokens
+            continue
+
+        tokens = count_tokens(_chunk_part(result, text), model) + separator_tokens
+        if used + tokens > budget:
+            dropped += full_tokens
+            continue
+
+        used += tokens
+        overlap += full_tokens - tokens
+        document_chunks.append(result["content"])
+        kept.append((i, result, text))
+
+    kept.sort(key=lambda item: item[0])
+    return kept, used, dropped, overlap
+
+
+def assemble_context(
+    model: str,
+    message: str,
+    results: List[Dict[str, Any]],
+    history: List[Dict[str, Any]],
+    max_output_tokens: int,
+    kind: str = "chat"
+) -> AssembledContext:
+    """
+    Fit retrieved chunks and history into the model's context budget.
+
+    Args:
+        model: Model the prompt is for
+        message: The new user message (always sent in full)
+        results: Search results, as dicts with content, similarity and document fields
+        history: Previous messages, oldest first
+        max_output_tokens: Completion tokens requested from the model
+        kind: Metrics label of the caller ("chat" or "session")
+
+    Returns:
+        Kept chunks (in rank order), their context string and the kept history
+    """
+    budget = context_budget(model, max_output_tokens)
+    available = max(0, budget - count_tokens(message, model))
+
+    _, history_share = _fit_history(history, int(available * settings.context_history_share), model)
+    kept, chunk_tokens, dropped_tokens, overlap_tokens = _fit_chunks(
+        results, available - history_share, model
+    )
+    # History takes back what the chunks left
+    kept_history, history_tokens = _fit_history(history, available - chunk_tokens, model)
+
+    all_history_tokens = sum(_message_tokens(m, model) for m in history)
+    saved = {
+        "chunks": dropped_tokens,
+        "overlap": overlap_tokens,
+        "history": all_history_tokens - history_tokens,
+    }
+    for reason, tokens in saved.items():
+        if tokens:
+            CONTEXT_TOKENS_SAVED.inc(tokens, kind=kind, reason=reason)
+
+    if len(kept) < len(results) or len(kept_history) < len(history):
+        logger.debug(
+            f"Context assembled: model={model}, budget={budget}, chunks={len(kept)}/{len(results)}, "
+            f"history={len(kept_history)}/{len(history)}, saved={saved}"
+        )
+
+    parts = [_chunk_part(result, text) for _, result, text in kept]
+    return AssembledContext(
+        context=CHUNK_SEPARATOR.join(parts) if parts else NO_CONTEXT,
+        results=[result for _, result, _ in kept],
+        history=kept_history,
+        budget=budget,
+        tokens=chunk_tokens + history_tokens,
+        saved=saved,
+    )
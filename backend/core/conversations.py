@@ -0,0 +1,267 @@
+"""
+Conversation history for the stateless /chat endpoint.
+
+Each worker keeps recent conversations in an LRU bounded by conversation
+count and idle TTL, with at most max_messages per conversation, so memory
+stays flat no matter how many conversation ids clients invent. With a
+MongoDB collection configured, appended messages are also buffered and
+written behind with $push/$slice, which merges appends from several workers
+into one capped history; conversations missing from memory (after a restart,
+an eviction or on another worker) are read back from it. A worker's memory
+copy only sees its own appends, so without sticky routing keep the TTL short.
+Reads from MongoDB and deletes wait for an in-flight flush, so a batch is
+never missed (nor counted twice) by a read racing its write.
+
+Without MongoDB the store is memory only and evicted conversations are lost.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from backend.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Collection holding the conversations of all workers
+CONVERSATION_COLLECTION = "chat_conversations"
+
+
+class ConversationStore:
+    """Bounded in-memory conversation LRU with write-behind to MongoDB."""
+
+    def __init__(
+        self,
+        max_conversations: int = 1000,
+        max_messages: int = 50,
+        ttl_seconds: float = 1800,
+        collection: Optional[Any] = None,
+        retention_days: int = 30,
+        flush_seconds: float = 1.0
+    ):
+        """
+        Initialize the store.
+
+        Args:
+            max_conversations: Conversations kept in memory
+            max_messages: Messages kept per conversation (oldest are dropped)
+            ttl_seconds: Idle time after which a conversation leaves memory
+            collection: Optional async collection shared by all workers
+            retention_days: Idle time after which MongoDB drops a conversation
+            flush_seconds: Interval between write-behind flushes
+        """
+        self.max_conversations = max_conversations
+        self.max_messages = max_messages
+        self.ttl_seconds = ttl_seconds
+        self.collection = collection
+        self.retention_days = retention_days
+        self.flush_seconds = flush_seconds
+
+        # conversation id -> (expires_at, messages)
+        self._entries: "OrderedDict[str, Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+        # conversation id -> messages appended since the last flush
+        self._pending: Dict[str, List[Dict[str, Any]]] = {}
+        self._flusher: Optional[asyncio.Task] = None
+        # Held while a batch is written; MongoDB reads and deletes wait for it
+        self._flush_lock = asyncio.Lock()
+
+        self.evictions = 0
+
+    # ============== Memory tier ==============
+
+    def _get_cached(self, conversation_id: str) -> Optional[List[Dict[str, Any]]]:
+        entry = self._entries.get(conversation_id)
+        if entry is None:
+            return None
+        expires_at, messages = entry
+        if expires_at < time.monotonic():
+            del self._entries[conversation_id]
+            return None
+        self._entries.move_to_end(conversation_id)
+        return messages
+
+    def _put_cached(self, conversation_id: str, messages: List[Dict[str, Any]]) -> None:
+        self._entries[conversation_id] = (time.monotonic() + self.ttl_seconds, messages)
+        self._entries.move_to_end(conversation_id)
+        while len(self._entries) > self.max_conversations:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    # ============== Public API ==============
+
+    async def get(self, conversation_id: str) -> List[Dict[str, Any]]:
+        """Messages of a conversation, oldest first (empty if unknown)."""
+        messages = self._get_cached(conversation_id)
+        if messages is not None:
+            return list(messages)
+
+        messages = []
+        if self.collection is not None:
+            async with self._flush_lock:
+                try:
+                    doc = await self.collection.find_one({"_id": conversation_id}, {"messages": 1})
+                    messages = doc.get("messages", []) if doc else []
+                except Exception as e:
+                    logger.warning(f"Failed to load conversation {conversation_id}: {e}")
+                # Appends not flushed yet (e.g. the entry was evicted meanwhile)
+                messages = messages + self._pending.get(conversation_id, [])
+        messages = messages[-self.max_messages:]
+
+        if messages:
+            self._put_cached(conversation_id, messages)
+        return list(messages)
+
+    async def append(self, conversation_id: str, messages: List[Dict[str, Any]]) -> None:
+        """Add messages to a conversation, keeping the last max_messages."""
+        history = await self.get(conversation_id)
+        self._put_cached(conversation_id, (history + messages)[-self.max_messages:])
+        if self.collection is not None:
+            self._pending.setdefault(conversation_id, []).extend(messages)
+
+    async def delete(self, conversation_id: str) -> None:
+        """Forget a conversation in memory and in MongoDB."""
+        self._entries.pop(conversation_id, None)
+        if self.collection is not None:
+            # After an in-flight batch lands, or it would recreate the document
+            async with self._flush_lock:
+                self._pending.pop(conversation_id, None)
+                await self.collection.delete_one({"_id": conversation_id})
+
+    async def list(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Most recently active conversations with their message counts."""
+        if self.collection is not None:
+            try:
+                await self.flush()
+                cursor = self.collection.aggregate([
+                    {"$sort": {"updated_at": -1}},
+                    {"$limit": limit},
+                    {"$project": {"message_count": {"$size": "$messages"}}},
+                ])
+                return [{"id": doc["_id"], "message_count": doc["message_count"]} async for doc in cursor]
+            except Exception as e:
+                logger.warning(f"Failed to list conversations, using this worker's: {e}")
+
+        now = time.monotonic()
+        recent = [
+            {"id": cid, "message_count": len(messages)}
+            for cid, (expires_at, messages) in reversed(self._entries.items())
+            if expires_at >= now
+        ]
+        return recent[:limit]
+
+    # ============== MongoDB tier ==============
+
+    async def ensure_indexes(self) -> None:
+        """Create the retention TTL index (also serves the recency sort of list())."""
+        if self.collection is None:
+            return
+        await self.collection.create_index(
+            "updated_at", expireAfterSeconds=self.retention_days * 24 * 3600
+        )
+
+    async def flush(self) -> None:
+        """$push buffered messages onto the shared conversation documents."""
+        if self.collection is None or not self._pending:
+            return
+
+        async with self._flush_lock:
+            pending, self._pending = self._pending, {}
+            if not pending:
+                return
+            now = datetime.now(timezone.utc)
+            operations = [
+                UpdateOne(
+                    {"_id": conversation_id},
+                    {
+                        "$push": {"messages": {"$each": messages, "$slice": -self.max_messages}},
+                        "$set": {"updated_at": now},
+                    },
+                    upsert=True
+                )
+                for conversation_id, messages in pending.items()
+            ]
+
+            try:
+                await self.collection.bulk_write(operations, ordered=False)
+            except Exception as e:
+                logger.warning(f"Failed to persist conversations: {e}")
+                # Keep the messages for the next flush, ahead of newer appends
+                for conversation_id, messages in pending.items():
+                    self._pending[conversation_id] = messages + self._pending.get(conversation_id, [])
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            await self.flush()
+
+    def start(self) -> None:
+        """Start the background flusher (no-op without a collection)."""
+        if self.collection is not None and self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_periodically())
+
+    async def stop(self) -> None:
+        """Stop the flusher and write what is left."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        """Memory usage and write-behind backlog."""
+        return {
+            "conversations": len(self._entries),
+            "max_conversations": self.max_conversations,
+            "max_messages": self.max_messages,
+            "ttl_seconds": self.ttl_seconds,
+            "pending_conversations": len(self._pending),
+            "evictions": self.evictions,
+            "persistent": self.collection is not None,
+        }
+
+
+# Global instance used by the chat router
+_conversation_store = ConversationStore()
+
+
+def get_conversation_store() -> ConversationStore:
+    """Get the process-wide conversation store."""
+    return _conversation_store
+
+
+def configure_conversation_store(store: ConversationStore) -> ConversationStore:
+    """Replace the process-wide conversation store (any ConversationStore implementation)."""
+    global _conversation_store
+    _conversation_store = store
+    return _conversation_store
+
+
+async def setup_conversation_store(db) -> None:
+    """
+    Configure the conversation store from backend settings and start the flusher.
+
+    Called once from the FastAPI lifespan; conversations are persisted in the
+    startup database when enabled.
+    """
+    collection = None
+    if settings.conversation_store_persist:
+        collection = db.client[settings.mongodb_database][CONVERSATION_COLLECTION]
+
+    store = configure_conversation_store(ConversationStore(
+        max_conversations=settings.conversation_cache_max_entries,
+        max_messages=settings.conversation_max_messages,
+        ttl_seconds=settings.conversation_cache_ttl_seconds,
+        collection=collection,
+        retention_days=settings.conversation_retention_days,
+        flush_seconds=settings.conversation_flush_seconds
+    ))
+    await store.ensure_indexes()
+    store.start()
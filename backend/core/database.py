@@ -9,6 +9,7 @@ from pymongo import MongoClient
 from typing import Optional
 
 from backend.core.config import settings
+from src.metrics import InstrumentedThreadPoolExecutor
 
 logger = logging.getLogger(__name__)
 
@@ -20,7 +21,9 @@ def get_db_executor() -> ThreadPoolExecutor:
     global _db_executor
     if _db_executor is None:
         # Use 4 workers for API DB operations, separate from ingestion
-        _db_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="db_api_")
+        _db_executor = InstrumentedThreadPoolExecutor(
+            max_workers=4, thread_name_prefix="db_api_", pool_name="db_api"
+        )
         logger.info("Created dedicated DB executor with 4 workers")
     return _db_executor
 
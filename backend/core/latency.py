@@ -0,0 +1,375 @@
+"""
+Streaming latency histograms for the indexes dashboard.
+
+Every search/chat latency lands in a log-bucketed histogram (DDSketch
+style: bucket i covers (γ^(i-1), γ^i], so a quantile read from it is within
+±1% of the true sample value) kept per minute and per series (kind, search
+type, profile). Histograms merge by adding bucket counts, so p50/p95/p99
+over any window cost O(buckets) no matter how much traffic there was.
+
+Each worker buffers its per-minute deltas and periodically $inc-s them into
+one MongoDB document per minute and series, which is the merge across
+workers and keeps history over restarts (a TTL index drops old minutes).
+Without MongoDB the histograms live in process memory only.
+"""
+
+import asyncio
+import logging
+import math
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from backend.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Collection holding the per-minute histograms of all workers
+LATENCY_HISTOGRAM_COLLECTION = "latency_histograms"
+
+# Quantiles are exact to within this relative error
+RELATIVE_ACCURACY = 0.01
+_GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(_GAMMA)
+_MIN_VALUE_MS = 0.001
+
+# (kind, search_type, profile)
+SeriesKey = Tuple[str, str, str]
+
+
+class LatencyHistogram:
+    """Mergeable log-bucketed histogram of millisecond values."""
+
+    __slots__ = ("count", "total", "buckets")
+
+    def __init__(self, count: int = 0, total: float = 0.0, buckets: Optional[Dict[int, int]] = None):
+        self.count = count
+        self.total = total
+        self.buckets: Dict[int, int] = buckets or {}
+
+    @staticmethod
+    def bucket_of(value_ms: float) -> int:
+        return math.ceil(math.log(max(value_ms, _MIN_VALUE_MS)) / _LOG_GAMMA)
+
+    @staticmethod
+    def bucket_value(index: int) -> float:
+        """Representative value of a bucket (within RELATIVE_ACCURACY of all its members)."""
+        return 2 * _GAMMA ** index / (_GAMMA + 1)
+
+    def add(self, value_ms: float, n: int = 1) -> None:
+        index = self.bucket_of(value_ms)
+        self.buckets[index] = self.buckets.get(index, 0) + n
+        self.count += n
+        self.total += value_ms * n
+
+    def merge(self, other: "LatencyHistogram") -> "LatencyHistogram":
+        """Add another histogram's counts into this one."""
+        for index, n in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + n
+        self.count += other.count
+        self.total += other.total
+        return self
+
+    def quantile(self, q: float) -> float:
+        """Value at quantile q (0-1); 0 when empty."""
+        if not self.count:
+            return 0.0
+
+        rank = q * (self.count - 1)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                return self.bucket_value(index)
+        return self.bucket_value(max(self.buckets))
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def min(self) -> float:
+        return self.bucket_value(min(self.buckets)) if self.buckets else 0.0
+
+    def max(self) -> float:
+        return self.bucket_value(max(self.buckets)) if self.buckets else 0.0
+
+    def to_doc(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "buckets": {str(index): n for index, n in self.buckets.items()},
+        }
+
+    @classmethod
+    def from_doc(cls, doc: Optional[Dict[str, Any]]) -> "LatencyHistogram":
+        doc = doc or {}
+        return cls(
+            count=doc.get("count", 0),
+            total=doc.get("sum", 0.0),
+            buckets={int(index): n for index, n in doc.get("buckets", {}).items()},
+        )
+
+
+class SeriesHistograms:
+    """End-to-end and per-stage histograms of one series."""
+
+    __slots__ = ("latency", "stages")
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.stages: Dict[str, LatencyHistogram] = {}
+
+    def add(self, latency_ms: float, stages: Optional[Dict[str, float]] = None) -> None:
+        self.latency.add(latency_ms)
+        for stage, ms in (stages or {}).items():
+            self.stages.setdefault(stage, LatencyHistogram()).add(ms)
+
+    def merge(self, other: "SeriesHistograms") -> "SeriesHistograms":
+        self.latency.merge(other.latency)
+        for stage, histogram in other.stages.items():
+            self.stages.setdefault(stage, LatencyHistogram()).merge(histogram)
+        return self
+
+    @classmethod
+    def from_doc(cls, doc: Dict[str, Any]) -> "SeriesHistograms":
+        series = cls()
+        series.latency = LatencyHistogram.from_doc(doc.get("latency"))
+        series.stages = {
+            stage: LatencyHistogram.from_doc(stage_doc)
+            for stage, stage_doc in doc.get("stages", {}).items()
+        }
+        return series
+
+
+def _inc_fields(prefix: str, histogram: LatencyHistogram) -> Dict[str, Any]:
+    fields: Dict[str, Any] = {f"{prefix}.count": histogram.count, f"{prefix}.sum": histogram.total}
+    for index, n in histogram.buckets.items():
+        fields[f"{prefix}.buckets.{index}"] = n
+    return fields
+
+
+def _minute_datetime(minute: int) -> datetime:
+    return datetime.fromtimestamp(minute * 60, tz=timezone.utc)
+
+
+class LatencyStore:
+    """Per-minute latency histograms with write-behind to MongoDB."""
+
+    def __init__(
+        self,
+        retention_minutes: int = 7 * 24 * 60,
+        collection: Optional[Any] = None,
+        flush_seconds: float = 30.0
+    ):
+        """
+        Initialize the store.
+
+        Args:
+            retention_minutes: History kept in memory and in MongoDB
+            collection: Optional async collection shared by all workers
+            flush_seconds: Interval between write-behind flushes
+        """
+        self.retention_minutes = retention_minutes
+        self.collection = collection
+        self.flush_seconds = flush_seconds
+
+        # minute -> series -> histograms (this process), and deltas not yet flushed
+        self._local: Dict[int, Dict[SeriesKey, SeriesHistograms]] = {}
+        self._pending: Dict[int, Dict[SeriesKey, SeriesHistograms]] = {}
+        self._flusher: Optional[asyncio.Task] = None
+
+    def record(
+        self,
+        latency_ms: float,
+        kind: str = "search",
+        search_type: str = "hybrid",
+        profile: str = "default",
+        stages: Optional[Dict[str, float]] = None,
+        at: Optional[float] = None
+    ) -> None:
+        """Add one sample to the current minute's histograms."""
+        minute = int((at if at is not None else time.time()) // 60)
+        key = (kind, search_type, profile)
+        for minutes in (self._local, self._pending):
+            minutes.setdefault(minute, {}).setdefault(key, SeriesHistograms()).add(latency_ms, stages)
+
+        horizon = minute - self.retention_minutes
+        for old in [m for m in self._local if m < horizon]:
+            del self._local[old]
+
+    # ============== MongoDB tier ==============
+
+    async def ensure_indexes(self) -> None:
+        """Create the TTL and lookup indexes."""
+        if self.collection is None:
+            return
+        await self.collection.create_index(
+            "minute", expireAfterSeconds=self.retention_minutes * 60
+        )
+        await self.collection.create_index([("kind", 1), ("minute", 1)])
+
+    async def flush(self) -> None:
+        """$inc buffered deltas into the shared per-minute documents."""
+        if self.collection is None or not self._pending:
+            return
+
+        pending, self._pending = self._pending, {}
+        operations = []
+        for minute, series in pending.items():
+            for (kind, search_type, profile), histograms in series.items():
+                inc = _inc_fields("latency", histograms.latency)
+                for stage, histogram in histograms.stages.items():
+                    inc.update(_inc_fields(f"stages.{stage}", histogram))
+                operations.append(UpdateOne(
+                    {"_id": f"{minute}|{kind}|{search_type}|{profile}"},
+                    {
+                        "$setOnInsert": {
+                            "minute": _minute_datetime(minute),
+                            "kind": kind,
+                            "search_type": search_type,
+                            "profile": profile,
+                        },
+                        "$inc": inc,
+                    },
+                    upsert=True
+                ))
+
+        try:
+            await self.collection.bulk_write(operations, ordered=False)
+        except Exception as e:
+            logger.warning(f"Failed to persist latency histograms: {e}")
+            # Keep the deltas for the next flush
+            for minute, series in pending.items():
+                for key, histograms in series.items():
+                    self._pending.setdefault(minute, {}).setdefault(key, SeriesHistograms()).merge(histograms)
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            await self.flush()
+
+    def start(self) -> None:
+        """Start the background flusher (no-op without a collection)."""
+        if self.collection is not None and self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_periodically())
+
+    async def stop(self) -> None:
+        """Stop the flusher and write what is left."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+
+    # ============== Queries ==============
+
+    @staticmethod
+    def _matches(key: SeriesKey, kind: str, search_type: Optional[str], profile: Optional[str]) -> bool:
+        return (
+            key[0] == kind
+            and (search_type is None or key[1] == search_type)
+            and (profile is None or key[2] == profile)
+        )
+
+    async def _load(self, since_minute: int, kind: str, search_type: Optional[str], profile: Optional[str]):
+        query: Dict[str, Any] = {"minute": {"$gte": _minute_datetime(since_minute)}, "kind": kind}
+        if search_type is not None:
+            query["search_type"] = search_type
+        if profile is not None:
+            query["profile"] = profile
+
+        async for doc in self.collection.find(query):
+            minute = int(doc["minute"].replace(tzinfo=timezone.utc).timestamp() // 60)
+            yield minute, SeriesHistograms.from_doc(doc)
+
+    async def minutes(
+        self,
+        window_minutes: int,
+        kind: str = "search",
+        search_type: Optional[str] = None,
+        profile: Optional[str] = None
+    ) -> Dict[int, SeriesHistograms]:
+        """
+        Matching series merged per minute over the last window_minutes.
+
+        Reads the shared MongoDB documents (all workers) after flushing this
+        worker's deltas; falls back to this process's histograms without
+        MongoDB or if the read fails.
+        """
+        since = int(time.time() // 60) - window_minutes + 1
+        merged: Dict[int, SeriesHistograms] = {}
+
+        if self.collection is not None:
+            try:
+                await self.flush()
+                async for minute, histograms in self._load(since, kind, search_type, profile):
+                    merged.setdefault(minute, SeriesHistograms()).merge(histograms)
+                return merged
+            except Exception as e:
+                logger.warning(f"Failed to load latency histograms, using this worker's: {e}")
+                merged = {}
+
+        for minute, series in self._local.items():
+            if minute < since:
+                continue
+            for key, histograms in series.items():
+                if self._matches(key, kind, search_type, profile):
+                    merged.setdefault(minute, SeriesHistograms()).merge(histograms)
+        return merged
+
+    def clear(self) -> None:
+        """Drop in-memory histograms (persisted history is left untouched)."""
+        self._local.clear()
+        self._pending.clear()
+
+
+def merge_series(histograms: Iterable[SeriesHistograms]) -> SeriesHistograms:
+    """Merge several series into one."""
+    merged = SeriesHistograms()
+    for series in histograms:
+        merged.merge(series)
+    return merged
+
+
+# Global instance used by the dashboard
+_latency_store = LatencyStore()
+
+
+def get_latency_store() -> LatencyStore:
+    """Get the process-wide latency store."""
+    return _latency_store
+
+
+def configure_latency_store(
+    retention_minutes: int = 7 * 24 * 60,
+    collection: Optional[Any] = None,
+    flush_seconds: float = 30.0
+) -> LatencyStore:
+    """Replace the process-wide latency store."""
+    global _latency_store
+    _latency_store = LatencyStore(retention_minutes, collection, flush_seconds)
+    return _latency_store
+
+
+async def setup_latency_store(db) -> None:
+    """
+    Configure latency histograms from backend settings and start the flusher.
+
+    Called once from the FastAPI lifespan; histograms are persisted in the
+    startup database when enabled.
+    """
+    collection = None
+    if settings.latency_histograms_persist:
+        collection = db.client[settings.mongodb_database][LATENCY_HISTOGRAM_COLLECTION]
+
+    store = configure_latency_store(
+        retention_minutes=settings.latency_retention_days * 24 * 60,
+        collection=collection,
+        flush_seconds=settings.latency_flush_seconds
+    )
+    await store.ensure_indexes()
+    store.start()
@@ -0,0 +1,123 @@
+"""Streaming LLM completions shared by the chat routers."""
+
+import json
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from src.metrics import LLM_FIRST_TOKEN_SECONDS, LLM_REQUESTS, LLM_SECONDS, record_usage
+from src.retrieval.timings import current_timings
+
+logger = logging.getLogger(__name__)
+
+# Headers that keep proxies from buffering an event stream
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no"
+}
+
+
+def sse_event(event_type: str, **data: Any) -> str:
+    """Format one Server-Sent Event carrying a JSON payload with a "type" field."""
+    return f"data: {json.dumps({'type': event_type, **data}, default=str)}\n\n"
+
+
+class CompletionStream:
+    """
+    Token stream of a litellm completion.
+
+    Iterating tokens() yields text deltas as the provider sends them. Time
+    to first token is observed (and marked as the llm_first_token stage of
+    the request timings), and usage is taken from the final chunk or
+    estimated when the provider does not report it.
+    """
+
+    def __init__(self, response: Any, model: str, messages: List[Dict[str, Any]], started: float):
+        self._response = response
+        self.model = model
+        self.messages = messages
+        self.started = started
+        self.parts: List[str] = []
+        self.usage: Optional[Any] = None
+        self.first_token_seconds: Optional[float] = None
+        self.duration_seconds = 0.0
+        # Captured here: the response body may be iterated in another task
+        self.timings = current_timings()
+
+    @property
+    def text(self) -> str:
+        return "".join(self.parts)
+
+    async def tokens(self) -> AsyncIterator[str]:
+        outcome = "error"
+        try:
+            async for chunk in self._response:
+                if getattr(chunk, "usage", None):
+                    self.usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                if self.first_token_seconds is None:
+                    self.first_token_seconds = time.perf_counter() - self.started
+                    LLM_FIRST_TOKEN_SECONDS.observe(self.first_token_seconds, model=self.model)
+                    if self.timings is not None:
+                        self.timings.mark("llm_first_token")
+                self.parts.append(delta)
+                yield delta
+            outcome = "success"
+        finally:
+            self.duration_seconds = time.perf_counter() - self.started
+            LLM_SECONDS.observe(self.duration_seconds, model=self.model)
+            LLM_REQUESTS.inc(outcome=outcome, model=self.model)
+            if self.usage is not None:
+                record_usage(self.usage, model=self.model)
+
+    def token_counts(self) -> Dict[str, int]:
+        """Prompt/completion/total tokens, estimated if the provider sent no usage."""
+        if self.usage is not None:
+            return {
+                "input_tokens": self.usage.prompt_tokens or 0,
+                "output_tokens": self.usage.completion_tokens or 0,
+                "total_tokens": self.usage.total_tokens or 0,
+            }
+
+        try:
+            import litellm
+            input_tokens = litellm.token_counter(model=self.model, messages=self.messages)
+            output_tokens = litellm.token_counter(model=self.model, text=self.text)
+        except Exception:
+            # Rough estimate: ~4 characters per token
+            input_tokens = sum(len(str(m.get("content", ""))) for m in self.messages) // 4
+            output_tokens = len(self.text) // 4
+        return {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+
+
+async def open_completion_stream(model: str, messages: List[Dict[str, Any]], **params: Any) -> CompletionStream:
+    """
+    Start a streaming completion.
+
+    Provider errors (auth, rate limit, unknown model) are raised here, before
+    any event has been sent, so callers can still answer with an HTTP error.
+    """
+    import litellm
+
+    started = time.perf_counter()
+    try:
+        response = await litellm.acompletion(
+            model=model,
+            messages=messages,
+            stream=True,
+            stream_options={"include_usage": True},
+            **params
+        )
+    except Exception:
+        LLM_REQUESTS.inc(outcome="error", model=model)
+        raise
+    return CompletionStream(response, model, messages, started)
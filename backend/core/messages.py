@@ -0,0 +1,223 @@
+"""
+Per-message storage for chat sessions.
+
+Messages live in their own collection, one document per message keyed by
+(session_id, seq), instead of an ever-growing array on the session document
+(which carried base64 image attachments toward the 16 MB document limit and
+was re-read in full on every message). The session keeps a message_seq
+counter that is $inc-ed to allocate sequence numbers, so concurrent appends
+never collide, and every read is a bounded range scan of the compound index:
+the LLM context is the last N messages, the UI pages backwards by seq.
+
+Sessions written before this store still carry an embedded messages array.
+They are moved over by ``python -m src.migrate session-messages`` or lazily
+the first time they are used.
+"""
+
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import ReturnDocument, UpdateOne
+
+logger = logging.getLogger(__name__)
+
+SESSIONS_COLLECTION = "chat_sessions"
+MESSAGES_COLLECTION = "chat_messages"
+
+# Keyset order of the session list (newest first, _id breaks ties)
+SESSION_LIST_INDEX = [("user_id", 1), ("updated_at", -1), ("_id", -1)]
+SESSION_FOLDER_LIST_INDEX = [("user_id", 1), ("folder_id", 1), ("updated_at", -1), ("_id", -1)]
+
+# Fields needed to rebuild the LLM prompt (no sources, stats or attachment payloads)
+CONTEXT_PROJECTION = {"_id": 0, "seq": 1, "role": 1, "content": 1}
+
+
+def _to_doc(session_id: str, seq: int, message: Dict[str, Any]) -> Dict[str, Any]:
+    doc = {k: v for k, v in message.items() if k not in ("id", "seq")}
+    doc["_id"] = message.get("id") or f"{session_id}:{seq}"
+    doc["session_id"] = session_id
+    doc["seq"] = seq
+    return doc
+
+
+def _from_doc(doc: Dict[str, Any]) -> Dict[str, Any]:
+    doc = dict(doc)
+    doc["id"] = str(doc.pop("_id"))
+    doc.pop("session_id", None)
+    return doc
+
+
+class MessageStore:
+    """Chat messages of the sessions in one database."""
+
+    def __init__(self, sessions: Any, messages: Any, db: Optional[Any] = None):
+        """
+        Initialize the store.
+
+        Args:
+            sessions: Async chat sessions collection (holds message_seq)
+            messages: Async collection with one document per message
+            db: Database both collections belong to
+        """
+        self.sessions = sessions
+        self.messages = messages
+        self.db = db
+
+    async def ensure_indexes(self) -> None:
+        """Create the message (session_id, seq) index and the session list indexes."""
+        await self.messages.create_index([("session_id", 1), ("seq", 1)], unique=True)
+        await self.sessions.create_index(SESSION_LIST_INDEX)
+        await self.sessions.create_index(SESSION_FOLDER_LIST_INDEX)
+
+    async def append(
+        self,
+        session_id: str,
+        messages: List[Dict[str, Any]],
+        session_update: Optional[Dict[str, Any]] = None
+    ) -> Optional[int]:
+        """
+        Append messages to a session.
+
+        Sequence numbers are allocated with one $inc on the session document,
+        which also applies session_update (stats, title, updated_at).
+
+        Returns:
+            Sequence number of the first appended message, None if the session is gone
+        """
+        update = {op: dict(fields) for op, fields in (session_update or {}).items()}
+        update.setdefault("$inc", {})["message_seq"] = len(messages)
+
+        session = await self.sessions.find_one_and_update(
+            {"_id": session_id},
+            update,
+            projection={"message_seq": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if session is None:
+            return None
+
+        first_seq = session["message_seq"] - len(messages)
+        await self.messages.insert_many(
+            [_to_doc(session_id, first_seq + i, message) for i, message in enumerate(messages)],
+            ordered=True
+        )
+        return first_seq
+
+    async def tail(self, session_id: str, limit: int) -> List[Dict[str, Any]]:
+        """Role and content of the last `limit` messages, oldest first."""
+        if limit <= 0:
+            return []
+        cursor = self.messages.find(
+            {"session_id": session_id}, CONTEXT_PROJECTION
+        ).sort("seq", -1).limit(limit)
+        docs = [doc async for doc in cursor]
+        docs.reverse()
+        return docs
+
+    async def page(
+        self,
+        session_id: str,
+        before: Optional[int] = None,
+        limit: int = 50
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        Messages preceding seq `before` (the latest ones when None), oldest first.
+
+        Returns:
+            Tuple of (messages, cursor); pass the cursor as `before` to get the
+            next older page. The cursor is None once the start is reached.
+        """
+        query: Dict[str, Any] = {"session_id": session_id}
+        if before is not None:
+            query["seq"] = {"$lt": before}
+
+        cursor = self.messages.find(query).sort("seq", -1).limit(limit + 1)
+        docs = [doc async for doc in cursor]
+        has_more = len(docs) > limit
+        docs = docs[:limit]
+        docs.reverse()
+
+        next_before = docs[0]["seq"] if has_more and docs else None
+        return [_from_doc(doc) for doc in docs], next_before
+
+    async def clear(self, session_id: str) -> int:
+        """Delete all messages of a session."""
+        result = await self.messages.delete_many({"session_id": session_id})
+        return result.deleted_count
+
+    # ============== Embedded-array migration ==============
+
+    async def migrate_session(self, session_id: str) -> int:
+        """
+        Move a session's embedded messages array into the messages collection.
+
+        Safe to run concurrently and to re-run: messages are upserted by id,
+        and the array is only removed by the writer that sets message_seq.
+
+        Returns:
+            Number of messages the session has
+        """
+        doc = await self.sessions.find_one(
+            {"_id": session_id, "message_seq": {"$exists": False}},
+            {"messages": 1}
+        )
+        if doc is None:
+            return 0
+        return await self._migrate_doc(doc)
+
+    async def _migrate_doc(self, doc: Dict[str, Any]) -> int:
+        session_id = doc["_id"]
+        embedded = doc.get("messages") or []
+
+        if embedded:
+            operations = []
+            for seq, message in enumerate(embedded):
+                message_doc = _to_doc(session_id, seq, message)
+                operations.append(UpdateOne(
+                    {"_id": message_doc.pop("_id")},
+                    {"$setOnInsert": message_doc},
+                    upsert=True
+                ))
+            await self.messages.bulk_write(operations, ordered=False)
+
+        await self.sessions.update_one(
+            {"_id": session_id, "message_seq": {"$exists": False}},
+            {"$set": {"message_seq": len(embedded)}, "$unset": {"messages": ""}}
+        )
+        return len(embedded)
+
+    async def migrate_all(self, batch_size: int = 100, limit: Optional[int] = None) -> Dict[str, int]:
+        """
+        Migrate every session that still has an embedded messages array.
+
+        Returns:
+            Counts of sessions and messages migrated
+        """
+        stats = {"sessions": 0, "messages": 0}
+        cursor = self.sessions.find(
+            {"message_seq": {"$exists": False}}, {"messages": 1}
+        ).batch_size(batch_size)
+        if limit:
+            cursor = cursor.limit(limit)
+
+        async for doc in cursor:
+            stats["messages"] += await self._migrate_doc(doc)
+            stats["sessions"] += 1
+        return stats
+
+
+# Databases whose session/message indexes have been created by this process
+_indexed_databases: set = set()
+
+
+async def message_store_for(db: Any) -> MessageStore:
+    """Message store of a database, creating its indexes on first use."""
+    store = MessageStore(db[SESSIONS_COLLECTION], db[MESSAGES_COLLECTION], db)
+    name = getattr(db, "name", None)
+    if name not in _indexed_databases:
+        try:
+            await store.ensure_indexes()
+            _indexed_databases.add(name)
+        except Exception as e:
+            logger.warning(f"Failed to create chat session indexes: {e}")
+    return store
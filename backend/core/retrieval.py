@@ -0,0 +1,222 @@
+"""Retrieval engine wiring for the API routers."""
+
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from src.clients import get_client_registry
+from src.metrics import EMBEDDING_INPUTS, EMBEDDING_REQUESTS, EMBEDDING_SECONDS, observe_call, record_usage
+from src.retrieval.capabilities import detect_hybrid_mode, hybrid_mode_for
+from src.retrieval.candidates import configure_candidate_planner, get_candidate_planner
+from src.retrieval.engine import RetrievalEngine, SearchResult
+from src.retrieval.local_text import local_text_index_for
+from src.retrieval.local_vector import local_vector_index_for
+from src.retrieval.rescore import rescore_oversample_for
+from src.retrieval.result_cache import (
+    CORPUS_GENERATION_COLLECTION, SearchResultCache, configure_search_result_cache,
+    corpus_namespace, get_corpus_generations, get_search_result_cache
+)
+from src.retrieval.embedding_batcher import configure_embedding_batcher, get_embedding_batcher
+from src.retrieval.embedding_cache import (
+    EMBEDDING_CACHE_COLLECTION, compute_in_batches, configure_embedding_cache, get_embedding_cache
+)
+from src.retrieval.embedding_dimensions import embedding_request_options
+from src.profile import get_profile_manager
+from backend.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def embedding_dimension() -> int:
+    """Embedding dimension of the active profile (its override or the configured one)."""
+    return get_profile_manager().active_profile.embedding_dimension or settings.embedding_dimension
+
+
+async def _create_embeddings(texts: list) -> list:
+    """Call the embeddings API for a batch of texts using the pooled client."""
+    EMBEDDING_INPUTS.inc(len(texts), source="query")
+    with observe_call(EMBEDDING_REQUESTS, EMBEDDING_SECONDS, source="query"):
+        response = await get_client_registry().embedding_client.embeddings.create(
+            model=settings.embedding_model,
+            input=texts,
+            **embedding_request_options(settings.embedding_model, embedding_dimension())
+        )
+    record_usage(getattr(response, "usage", None), source="query")
+
+    # Provider returns items with an index; keep them aligned with the input
+    return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+
+
+async def _create_embedding(text: str) -> list:
+    """Embed a single query, coalesced with concurrent queries when batching is on."""
+    batcher = get_embedding_batcher()
+    if settings.embedding_batch_enabled and batcher is not None:
+        return await batcher.embed(text)
+
+    return (await _create_embeddings([text]))[0]
+
+
+async def get_embedding(text: str) -> list:
+    """Generate embedding for text, served from the query embedding cache when possible."""
+    if not settings.embedding_cache_enabled:
+        return await _create_embedding(text)
+
+    return await get_embedding_cache().get_or_compute(
+        settings.embedding_model,
+        embedding_dimension(),
+        text,
+        _create_embedding
+    )
+
+
+async def embed_queries(texts: List[str]) -> Dict[str, list]:
+    """
+    Embed many queries with as few embeddings API calls as possible.
+
+    Vectors are looked up in the embedding cache (memory, then MongoDB when
+    persisted); the remaining distinct texts are sent in chunks of
+    embedding_batch_max_size, at most embedding_batch_max_concurrency calls
+    at a time, and written back to the cache.
+
+    Returns:
+        Mapping of query text to embedding
+    """
+    distinct = list(dict.fromkeys(texts))
+    batch_size = settings.embedding_batch_max_size
+    max_concurrency = settings.embedding_batch_max_concurrency
+
+    if settings.embedding_cache_enabled:
+        vectors = await get_embedding_cache().get_or_compute_many(
+            settings.embedding_model, embedding_dimension(), distinct,
+            _create_embeddings, batch_size, max_concurrency
+        )
+    else:
+        embeddings = await compute_in_batches(distinct, _create_embeddings, batch_size, max_concurrency)
+        vectors = dict(zip(distinct, embeddings))
+
+    logger.info(f"embed_queries: {len(vectors)} distinct queries")
+    return vectors
+
+
+async def setup_embedding_cache(db) -> None:
+    """
+    Configure the process-wide embedding cache from backend settings.
+
+    Called once from the FastAPI lifespan. When persistence is enabled the
+    cache reads through to a MongoDB collection in the startup database.
+    """
+    collection = None
+    if settings.embedding_cache_persist:
+        collection = db.client[settings.mongodb_database][EMBEDDING_CACHE_COLLECTION]
+
+    cache = configure_embedding_cache(
+        max_entries=settings.embedding_cache_max_entries,
+        max_mb=settings.embedding_cache_max_mb,
+        ttl_seconds=settings.embedding_cache_ttl_seconds,
+        collection=collection,
+        persist_ttl_seconds=settings.embedding_cache_persist_ttl_seconds
+    )
+    await cache.ensure_indexes()
+
+
+def setup_embedding_batcher() -> None:
+    """Configure the process-wide query embedding coalescer from backend settings."""
+    configure_embedding_batcher(
+        _create_embeddings,
+        window_ms=settings.embedding_batch_window_ms,
+        max_batch=settings.embedding_batch_max_size,
+        timeout_seconds=settings.embedding_batch_timeout_seconds
+    )
+
+
+def setup_candidate_planner() -> None:
+    """Configure adaptive numCandidates from backend settings."""
+    configure_candidate_planner(
+        multiplier=settings.vector_candidate_multiplier,
+        recall_target=settings.vector_recall_target,
+        max_candidates=settings.vector_max_candidates,
+        exact_threshold=settings.vector_exact_threshold
+    )
+
+
+def setup_search_result_cache() -> None:
+    """Configure the process-wide search result cache from backend settings."""
+    configure_search_result_cache(
+        max_mb=settings.search_cache_max_mb,
+        ttl_seconds=settings.search_cache_ttl_seconds,
+        stale_seconds=settings.search_cache_stale_seconds,
+        generation_refresh_seconds=settings.corpus_generation_refresh_seconds
+    )
+
+
+async def setup_hybrid_mode(db) -> None:
+    """Detect server-side hybrid search support once, from the lifespan."""
+    await detect_hybrid_mode(db.chunks_collection, settings.hybrid_search_mode)
+
+
+async def cached_search(
+    db,
+    query: str,
+    search_type: str,
+    match_count: int,
+    engine: Optional[RetrievalEngine] = None
+) -> Tuple[List[SearchResult], bool]:
+    """
+    Run a search through the result cache.
+
+    The key includes the profile's corpus generation, so results computed
+    before an ingest or delete are never returned afterwards.
+
+    Args:
+        engine: Engine to search with (default: get_retrieval_engine(db))
+
+    Returns:
+        (results, served_from_cache)
+    """
+    engine = engine or get_retrieval_engine(db)
+    if not settings.search_cache_enabled:
+        return await engine.search(query, search_type, match_count), False
+
+    namespace = corpus_namespace(db.current_database_name, db.chunks_collection.name)
+    generation = await get_corpus_generations().current(
+        namespace, db.db[CORPUS_GENERATION_COLLECTION]
+    )
+    key = SearchResultCache.make_key(namespace, generation, query, search_type, match_count)
+
+    return await get_search_result_cache().get_or_compute(
+        key, lambda: engine.search(query, search_type, match_count)
+    )
+
+
+def get_retrieval_engine(
+    db,
+    embed: Callable[[str], Awaitable[list]] = get_embedding
+) -> RetrievalEngine:
+    """
+    Build a retrieval engine for the database manager's active profile.
+
+    Args:
+        db: DatabaseManager from app.state
+        embed: Query embedding function (default: cached, coalesced get_embedding)
+
+    Returns:
+        RetrievalEngine bound to the current chunks/documents collections
+    """
+    return RetrievalEngine(
+        chunks_collection=db.chunks_collection,
+        documents_collection=db.documents_collection,
+        embed=embed,
+        vector_index=settings.mongodb_vector_index,
+        text_index=settings.mongodb_text_index,
+        candidate_planner=get_candidate_planner(),
+        local_vector_index=local_vector_index_for(
+            settings, db.current_database_name, db.chunks_collection.name, embedding_dimension()
+        ),
+        local_text_index=local_text_index_for(
+            settings, db.current_database_name, db.chunks_collection.name
+        ),
+        embedding_format=settings.embedding_storage_format,
+        rescore_oversample=rescore_oversample_for(
+            settings.vector_quantization, settings.vector_rescore_oversample
+        ),
+        hybrid_mode=hybrid_mode_for(db.chunks_collection),
+    )
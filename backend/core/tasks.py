@@ -0,0 +1,321 @@
+"""
+Background task queue for work that follows a chat response.
+
+Title generation, session stats aggregation and usage rollups run here so
+the user-facing response never waits on them. Tasks are handed to in-process
+workers through an asyncio queue; with MongoDB persistence on, each task is
+also written to a collection first and deleted once done, so tasks left
+behind by a crash or restart (or by another worker) are picked up again by
+polling. A task is claimed with an atomic status change and a lease, retried
+with backoff on failure and kept as "failed" after max_attempts.
+
+Handlers are registered by kind with @task_handler and receive the database
+the task was enqueued for, its payload (which must be BSON-serializable) and
+the task id. Delivery is at least once - a worker can die after the handler's
+write but before the task is deleted - so handlers whose writes are not
+naturally idempotent use the id to apply them once.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from pymongo import ReturnDocument
+
+from backend.core.config import settings
+from src.metrics import BACKGROUND_TASK_SECONDS, BACKGROUND_TASKS, REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Collection holding pending and failed tasks of all workers
+BACKGROUND_TASK_COLLECTION = "background_tasks"
+
+# Failed tasks are kept this long for inspection
+FAILED_TASK_RETENTION_SECONDS = 7 * 24 * 3600
+
+TaskHandler = Callable[[Any, Dict[str, Any], str], Awaitable[None]]
+
+_handlers: Dict[str, TaskHandler] = {}
+
+
+def task_handler(kind: str) -> Callable[[TaskHandler], TaskHandler]:
+    """Register the coroutine that runs tasks of `kind`."""
+    def register(handler: TaskHandler) -> TaskHandler:
+        _handlers[kind] = handler
+        return handler
+    return register
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class TaskQueue:
+    """In-process task workers with optional MongoDB durability."""
+
+    def __init__(
+        self,
+        client: Optional[Any] = None,
+        collection: Optional[Any] = None,
+        workers: int = 2,
+        max_attempts: int = 3,
+        poll_seconds: float = 10.0,
+        lease_seconds: float = 120.0
+    ):
+        """
+        Initialize the queue.
+
+        Args:
+            client: Async MongoDB client used to resolve task databases
+            collection: Optional async collection that makes tasks durable
+            workers: Number of concurrent worker coroutines
+            max_attempts: Runs before a task is marked failed
+            poll_seconds: Interval between scans for persisted tasks
+            lease_seconds: Time after which a running task is considered abandoned
+        """
+        self.client = client
+        self.collection = collection
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    async def ensure_indexes(self) -> None:
+        """Create the due-task and failed-task TTL indexes."""
+        if self.collection is None:
+            return
+        await self.collection.create_index([("status", 1), ("available_at", 1)])
+        await self.collection.create_index("expire_at", expireAfterSeconds=0)
+
+    async def enqueue(self, kind: str, db: Any, payload: Dict[str, Any]) -> str:
+        """
+        Queue a task for `db` and return its id.
+
+        Never raises: if the task cannot be persisted it still runs in process.
+        """
+        task = {
+            "_id": str(uuid.uuid4()),
+            "kind": kind,
+            "database": getattr(db, "name", None),
+            "payload": payload,
+            "status": "pending",
+            "attempts": 0,
+            "created_at": _now(),
+            "available_at": _now(),
+        }
+        if self.collection is not None:
+            try:
+                await self.collection.insert_one(task)
+            except Exception as e:
+                logger.warning(f"Failed to persist background task {kind}, running it in memory only: {e}")
+                task["memory_only"] = True
+        else:
+            task["memory_only"] = True
+
+        self._queue.put_nowait((task, db))
+        return task["_id"]
+
+    # ============== Execution ==============
+
+    def _due(self, now: datetime) -> Dict[str, Any]:
+        """Filter of tasks to run: due ones and abandoned ones with attempts left."""
+        return {"$or": [
+            {"status": "pending", "available_at": {"$lte": now}},
+            {"status": "running", "lease_until": {"$lt": now}, "attempts": {"$lt": self.max_attempts}},
+        ]}
+
+    async def _claim(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Atomically mark a due (or abandoned) persisted task as running."""
+        now = _now()
+        return await self.collection.find_one_and_update(
+            {"_id": task_id, **self._due(now)},
+            {
+                "$set": {"status": "running", "lease_until": now + timedelta(seconds=self.lease_seconds)},
+                "$inc": {"attempts": 1},
+            },
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _finish(self, task: Dict[str, Any], error: Optional[Exception]) -> None:
+        if task.get("memory_only"):
+            if error is not None and task["attempts"] < self.max_attempts:
+                asyncio.get_running_loop().call_later(
+                    self._backoff(task["attempts"]), self._queue.put_nowait, (task, task["db"])
+                )
+            return
+
+        if error is None:
+            await self.collection.delete_one({"_id": task["_id"]})
+        elif task["attempts"] < self.max_attempts:
+            await self.collection.update_one({"_id": task["_id"]}, {"$set": {
+                "status": "pending",
+                "error": str(error),
+                "available_at": _now() + timedelta(seconds=self._backoff(task["attempts"])),
+            }})
+        else:
+            await self.collection.update_one({"_id": task["_id"]}, {"$set": {
+                "status": "failed",
+                "error": str(error),
+                "expire_at": _now() + timedelta(seconds=FAILED_TASK_RETENTION_SECONDS),
+            }})
+
+    @staticmethod
+    def _backoff(attempts: int) -> float:
+        return min(2 ** attempts, 300)
+
+    async def run(self, task: Dict[str, Any], db: Any = None) -> None:
+        """Claim and run one task, recording the outcome."""
+        if task.get("memory_only"):
+            task["attempts"] += 1
+            task["db"] = db
+        else:
+            task = await self._claim(task["_id"])
+            if task is None:
+                # Done, claimed by another worker or not due yet
+                return
+
+        handler = _handlers.get(task["kind"])
+        if db is None:
+            db = self.client[task["database"]]
+
+        start_time = time.perf_counter()
+        error: Optional[Exception] = None
+        try:
+            if handler is None:
+                raise LookupError(f"No handler registered for task kind {task['kind']!r}")
+            await handler(db, task["payload"], task["_id"])
+        except Exception as e:
+            error = e
+            logger.warning(f"Background task {task['kind']} failed (attempt {task['attempts']}): {e}")
+
+        BACKGROUND_TASK_SECONDS.observe(time.perf_counter() - start_time, kind=task["kind"])
+        BACKGROUND_TASKS.inc(kind=task["kind"], outcome="success" if error is None else "error")
+
+        try:
+            await self._finish(task, error)
+        except Exception as e:
+            logger.warning(f"Failed to record background task outcome: {e}")
+
+    async def _work(self) -> None:
+        while True:
+            task, db = await self._queue.get()
+            try:
+                await self.run(task, db)
+            except Exception as e:
+                logger.warning(f"Background task worker error: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _poll(self) -> None:
+        """Re-queue persisted tasks that are due: retries and tasks of crashed workers."""
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            now = _now()
+            try:
+                # Abandoned during its last attempt: give up like a failed last run
+                await self.collection.update_many(
+                    {"status": "running", "lease_until": {"$lt": now}, "attempts": {"$gte": self.max_attempts}},
+                    {"$set": {
+                        "status": "failed",
+                        "error": "Lease expired on the last attempt",
+                        "expire_at": now + timedelta(seconds=FAILED_TASK_RETENTION_SECONDS),
+                    }}
+                )
+                cursor = self.collection.find(
+                    self._due(now), {"_id": 1, "kind": 1, "database": 1}
+                ).limit(100)
+                async for task in cursor:
+                    self._queue.put_nowait((task, None))
+            except Exception as e:
+                logger.warning(f"Failed to poll background tasks: {e}")
+
+    def start(self) -> None:
+        """Start the workers (and the poller when tasks are persisted)."""
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        if self.collection is not None:
+            self._tasks.append(asyncio.create_task(self._poll()))
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Give queued tasks a moment to finish, then stop the workers."""
+        if self._tasks:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Stopping with {self.depth} background tasks queued")
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+
+# Global instance used by the routers
+_task_queue: Optional[TaskQueue] = None
+
+
+def get_task_queue() -> TaskQueue:
+    """Get the process-wide task queue (in memory until setup_task_queue runs)."""
+    global _task_queue
+    if _task_queue is None:
+        _task_queue = TaskQueue()
+    return _task_queue
+
+
+def configure_task_queue(
+    client: Optional[Any] = None,
+    collection: Optional[Any] = None,
+    workers: int = 2,
+    max_attempts: int = 3
+) -> TaskQueue:
+    """Replace the process-wide task queue."""
+    global _task_queue
+    _task_queue = TaskQueue(client, collection, workers, max_attempts)
+    return _task_queue
+
+
+async def setup_task_queue(db) -> None:
+    """
+    Configure the task queue from backend settings and start its workers.
+
+    Called once from the FastAPI lifespan; tasks are persisted in the
+    startup database when enabled.
+    """
+    collection = None
+    if settings.background_tasks_persist:
+        collection = db.client[settings.mongodb_database][BACKGROUND_TASK_COLLECTION]
+
+    queue = configure_task_queue(
+        client=db.client,
+        collection=collection,
+        workers=settings.background_task_workers,
+        max_attempts=settings.background_task_max_attempts
+    )
+    await queue.ensure_indexes()
+    queue.start()
+
+
+def _collect_task_metrics():
+    """Queued background tasks of this worker for /metrics."""
+    depth = _task_queue.depth if _task_queue is not None else 0
+    return [(
+        "rag_background_tasks_queued", "gauge", "Background tasks waiting for a worker",
+        [("", {}, depth)]
+    )]
+
+
+REGISTRY.register_collector(_collect_task_metrics)
@@ -26,11 +26,21 @@ from starlette.middleware.base import BaseHTTPMiddleware
 from fastapi.exceptions import RequestValidationError
 
 from backend.routers import chat, search, profiles, ingestion, system, sessions, auth
-from backend.routers import status, indexes, ingestion_queue, local_llm
+from backend.routers import status, indexes, ingestion_queue, local_llm, metrics
 from backend.routers.system import load_config_from_db
 from backend.routers.ingestion import check_and_resume_interrupted_jobs, graceful_shutdown_handler
 from backend.core.config import settings
 from backend.core.database import DatabaseManager
+from backend.core.latency import get_latency_store, setup_latency_store
+from backend.core.tasks import get_task_queue, setup_task_queue
+from backend.core.conversations import get_conversation_store, setup_conversation_store
+from backend.core.context import setup_tokenizer
+from backend.core.retrieval import (
+    setup_candidate_planner, setup_embedding_batcher, setup_embedding_cache,
+    setup_hybrid_mode, setup_search_result_cache
+)
+from src.clients import close_client_registry, configure_client_registry
+from src.metrics import HTTP_REQUEST_SECONDS, HTTP_REQUESTS, clear_multiprocess_directory
 
 # Configure logging
 logging.basicConfig(
@@ -117,6 +127,25 @@ class RequestTimeoutMiddleware(BaseHTTPMiddleware):
             )
 
 
+class MetricsMiddleware(BaseHTTPMiddleware):
+    """Count requests and observe their latency per route template and status."""
+    
+    async def dispatch(self, request: Request, call_next):
+        start_time = time.perf_counter()
+        status_code = 500
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+            return response
+        finally:
+            # Route templates keep label cardinality bounded (no raw IDs in paths)
+            route = getattr(request.scope.get("route"), "path", "unmatched")
+            HTTP_REQUESTS.inc(method=request.method, route=route, status=str(status_code))
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start_time, method=request.method, route=route
+            )
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator:
     """Application lifespan manager - startup and shutdown."""
@@ -130,6 +159,52 @@ async def lifespan(app: FastAPI) -> AsyncGenerator:
     
     logger.info(f"Connected to database: {settings.mongodb_database}")
     
+    # Share this worker's metrics with the other API workers
+    try:
+        metrics.setup_metrics()
+    except Exception as e:
+        logger.warning(f"Failed to enable multiprocess metrics, reporting this worker only: {e}")
+    
+    # Create the pooled embedding/LLM HTTP clients shared by all routers
+    configure_client_registry(settings).install_litellm_session()
+    setup_embedding_batcher()
+    setup_search_result_cache()
+    setup_candidate_planner()
+    
+    # Configure the query embedding cache
+    try:
+        await setup_embedding_cache(db_manager)
+    except Exception as e:
+        logger.warning(f"Failed to configure embedding cache: {e}")
+    
+    # Per-minute latency histograms for the indexes dashboard
+    try:
+        await setup_latency_store(db_manager)
+    except Exception as e:
+        logger.warning(f"Failed to configure latency histograms: {e}")
+    
+    # Workers for post-response chat work (titles, stats, usage rollups)
+    try:
+        await setup_task_queue(db_manager)
+    except Exception as e:
+        logger.warning(f"Failed to configure durable background tasks, using in-memory queue: {e}")
+        get_task_queue().start()
+    
+    # Bounded /chat conversation history shared through MongoDB
+    try:
+        await setup_conversation_store(db_manager)
+    except Exception as e:
+        logger.warning(f"Failed to configure conversation store, keeping conversations in memory: {e}")
+    
+    # Tokenizer for the prompt context budget
+    await setup_tokenizer(settings.llm_model)
+    
+    # Detect server-side hybrid search ($rankFusion / $unionWith)
+    try:
+        await setup_hybrid_mode(db_manager)
+    except Exception as e:
+        logger.warning(f"Hybrid search mode detection failed, using Python RRF: {e}")
+    
     # Load persisted configuration from database
     try:
         config_loaded = await load_config_from_db(db_manager)
@@ -160,6 +235,12 @@ async def lifespan(app: FastAPI) -> AsyncGenerator:
     except Exception as e:
         logger.warning(f"Error during graceful shutdown: {e}")
     
+    await get_task_queue().stop()
+    await get_conversation_store().stop()
+    await get_latency_store().stop()
+    await close_client_registry()
+    metrics.stop_metrics()
+    
     await db_manager.disconnect()
     logger.info("Database connection closed")
 
@@ -196,6 +277,9 @@ app.add_middleware(
 # Add request timeout middleware (after CORS)
 app.add_middleware(RequestTimeoutMiddleware)
 
+# Outermost: per-route request metrics (includes timeouts)
+app.add_middleware(MetricsMiddleware)
+
 
 # ============== Exception Handlers ==============
 
@@ -406,6 +490,12 @@ app.include_router(
 )
 
 
+app.include_router(
+    metrics.router,
+    tags=["Metrics"]
+)
+
+
 # Root endpoint
 @app.get("/", tags=["Root"])
 async def root():
@@ -428,6 +518,8 @@ async def health():
 
 if __name__ == "__main__":
     import uvicorn
+    if settings.metrics_multiprocess_dir:
+        clear_multiprocess_directory(settings.metrics_multiprocess_dir)
     uvicorn.run(
         "backend.main:app",
         host="0.0.0.0",
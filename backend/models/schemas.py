@@ -43,6 +43,7 @@ class ChatRequest(BaseModel):
     match_count: int = Field(default=10, ge=1, le=50, description="Number of search results")
     include_sources: bool = Field(default=True, description="Include source documents")
     stream: bool = Field(default=False, description="Stream response")
+    debug_timings: bool = Field(default=False, description="Return per-stage timings")
 
 
 class ChatResponse(BaseModel):
@@ -54,6 +55,8 @@ class ChatResponse(BaseModel):
     model: str = Field(..., description="Model used for response")
     tokens_used: Optional[int] = Field(None, description="Tokens used")
     processing_time_ms: float = Field(..., description="Processing time in milliseconds")
+    context_tokens_saved: Optional[int] = Field(None, description="Prompt tokens cut to fit the context budget")
+    timings: Optional[Dict[str, float]] = Field(None, description="Per-stage timings in ms (debug_timings)")
 
 
 # ============== Search Models ==============
@@ -64,6 +67,13 @@ class SearchRequest(BaseModel):
     search_type: SearchType = Field(default=SearchType.HYBRID)
     match_count: int = Field(default=10, ge=1, le=50)
     text_weight: Optional[float] = Field(default=0.3, ge=0, le=1)
+    debug_timings: bool = Field(default=False, description="Return per-stage timings")
+
+
+class BatchSearchRequest(BaseModel):
+    """Batch search request; results are streamed back as NDJSON."""
+    queries: List[SearchRequest] = Field(..., min_length=1, max_length=1000)
+    concurrency: Optional[int] = Field(default=None, ge=1, le=64, description="Searches run at once")
 
 
 class SearchResultItem(BaseModel):
@@ -84,6 +94,7 @@ class SearchResponse(BaseModel):
     results: List[SearchResultItem] = Field(default_factory=list)
     total_results: int = Field(..., description="Number of results")
     processing_time_ms: float = Field(..., description="Processing time")
+    timings: Optional[Dict[str, float]] = Field(None, description="Per-stage timings in ms (debug_timings)")
 
 
 # ============== Profile Models ==============
@@ -99,6 +110,7 @@ class ProfileConfig(BaseModel):
     vector_index: str = Field(default="vector_index")
     text_index: str = Field(default="text_index")
     embedding_model: Optional[str] = None
+    embedding_dimension: Optional[int] = None
     llm_model: Optional[str] = None
 
 
@@ -120,6 +132,7 @@ class ProfileCreateRequest(BaseModel):
     description: Optional[str] = None
     documents_folders: List[str] = Field(..., min_length=1)
     database: Optional[str] = None
+    embedding_dimension: Optional[int] = Field(None, gt=0, description="Reduced embedding dimension")
 
 
 class ProfileUpdateRequest(BaseModel):
@@ -128,6 +141,7 @@ class ProfileUpdateRequest(BaseModel):
     description: Optional[str] = None
     documents_folders: Optional[List[str]] = Field(None, min_length=1)
     database: Optional[str] = None
+    embedding_dimension: Optional[int] = Field(None, gt=0, description="Reduced embedding dimension")
 
 
 # ============== Ingestion Models ==============
@@ -206,6 +220,12 @@ class DocumentInfo(BaseModel):
     metadata: Dict[str, Any] = Field(default_factory=dict)
 
 
+class DocumentUpdateRequest(BaseModel):
+    """Rename or relocate a document."""
+    title: Optional[str] = Field(None, min_length=1)
+    source: Optional[str] = Field(None, min_length=1)
+
+
 class DocumentListResponse(BaseModel):
     """List of documents response."""
     documents: List[DocumentInfo]
@@ -1,7 +1,6 @@
 """Chat router - Conversational AI with RAG."""
 
 import logging
-import time
 import uuid
 from typing import Optional
 from fastapi import APIRouter, HTTPException, Request
@@ -9,150 +8,39 @@ from fastapi.responses import StreamingResponse
 
 from backend.models.schemas import ChatRequest, ChatResponse, SearchType
 from backend.core.config import settings
+from backend.core.context import assemble_context
+from backend.core.conversations import get_conversation_store
+from backend.core.llm import SSE_HEADERS, CompletionStream, open_completion_stream, sse_event
+from backend.core.retrieval import get_retrieval_engine
+from backend.routers.indexes import record_search_latency
+from src.metrics import LLM_REQUESTS, LLM_SECONDS, observe_call, record_usage
+from src.retrieval.timings import StageTimings, start_timings, track_stage
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# Simple in-memory conversation store (use Redis in production)
-_conversations: dict = {}
+# Completion tokens requested per answer (also reserved in the context budget)
+MAX_OUTPUT_TOKENS = 2000
 
-
-async def get_embedding(text: str) -> list:
-    """Generate embedding for text."""
-    from openai import AsyncOpenAI
-    
-    client = AsyncOpenAI(
-        api_key=settings.embedding_api_key,
-        base_url=settings.embedding_base_url
-    )
-    
-    response = await client.embeddings.create(
-        model=settings.embedding_model,
-        input=text
-    )
-    
-    return response.data[0].embedding
+# Most recent messages considered as conversation history
+CONTEXT_HISTORY_MESSAGES = 10
 
 
 async def perform_search(db, query: str, search_type: SearchType, match_count: int) -> list:
     """Perform search on the knowledge base."""
-    collection = db.chunks_collection
-    
-    results = []
-    
     try:
-        if search_type in [SearchType.SEMANTIC, SearchType.HYBRID]:
-            # Vector search
-            query_embedding = await get_embedding(query)
-            
-            vector_pipeline = [
-                {
-                    "$vectorSearch": {
-                        "index": settings.mongodb_vector_index,
-                        "queryVector": query_embedding,
-                        "path": "embedding",
-                        "numCandidates": 100,
-                        "limit": match_count * 2
-                    }
-                },
-                {
-                    "$lookup": {
-                        "from": settings.mongodb_collection_documents,
-                        "localField": "document_id",
-                        "foreignField": "_id",
-                        "as": "doc_info"
-                    }
-                },
-                {"$unwind": "$doc_info"},
-                {
-                    "$project": {
-                        "chunk_id": "$_id",
-                        "document_id": 1,
-                        "content": 1,
-                        "similarity": {"$meta": "vectorSearchScore"},
-                        "document_title": "$doc_info.title",
-                        "document_source": "$doc_info.source"
-                    }
-                }
-            ]
-            
-            cursor = collection.aggregate(vector_pipeline)
-            async for doc in cursor:
-                results.append({
-                    "chunk_id": str(doc["chunk_id"]),
-                    "document_id": str(doc["document_id"]),
-                    "content": doc["content"],
-                    "similarity": doc["similarity"],
-                    "document_title": doc["document_title"],
-                    "document_source": doc["document_source"]
-                })
-        
-        if search_type == SearchType.TEXT:
-            # Text search only
-            text_pipeline = [
-                {
-                    "$search": {
-                        "index": settings.mongodb_text_index,
-                        "text": {
-                            "query": query,
-                            "path": "content",
-                            "fuzzy": {"maxEdits": 2, "prefixLength": 3}
-                        }
-                    }
-                },
-                {"$limit": match_count * 2},
-                {
-                    "$lookup": {
-                        "from": settings.mongodb_collection_documents,
-                        "localField": "document_id",
-                        "foreignField": "_id",
-                        "as": "doc_info"
-                    }
-                },
-                {"$unwind": "$doc_info"},
-                {
-                    "$project": {
-                        "chunk_id": "$_id",
-                        "document_id": 1,
-                        "content": 1,
-                        "similarity": {"$meta": "searchScore"},
-                        "document_title": "$doc_info.title",
-                        "document_source": "$doc_info.source"
-                    }
-                }
-            ]
-            
-            cursor = collection.aggregate(text_pipeline)
-            async for doc in cursor:
-                results.append({
-                    "chunk_id": str(doc["chunk_id"]),
-                    "document_id": str(doc["document_id"]),
-                    "content": doc["content"],
-                    "similarity": doc["similarity"],
-                    "document_title": doc["document_title"],
-                    "document_source": doc["document_source"]
-                })
-        
-        # Deduplicate and limit results
-        seen = set()
-        unique_results = []
-        for r in results:
-            if r["chunk_id"] not in seen:
-                seen.add(r["chunk_id"])
-                unique_results.append(r)
-        
-        return unique_results[:match_count]
-        
+        engine = get_retrieval_engine(db)
+        results = await engine.search(query, search_type.value, match_count)
+        return [r.model_dump() for r in results]
+
     except Exception as e:
         logger.error(f"Search failed: {e}")
         return []
 
 
-async def generate_response(message: str, context: str, conversation_history: list) -> tuple:
-    """Generate LLM response using LiteLLM for unified model handling."""
-    import litellm
-    
+def build_messages(message: str, context: str, conversation_history: list) -> list:
+    """Build the LLM prompt from retrieved context, history and the new message."""
     # Build messages
     messages = [
         {
@@ -168,22 +56,32 @@ Always cite the document source when referencing information from the context.""
         }
     ]
     
-    # Add conversation history
-    for msg in conversation_history[-10:]:  # Last 10 messages
+    # Add conversation history (already fitted to the context budget)
+    for msg in conversation_history:
         messages.append({"role": msg["role"], "content": msg["content"]})
     
     # Add current message
     messages.append({"role": "user", "content": message})
+    return messages
+
+
+async def generate_response(message: str, context: str, conversation_history: list) -> tuple:
+    """Generate LLM response using LiteLLM for unified model handling."""
+    import litellm
+    
+    messages = build_messages(message, context, conversation_history)
     
     # Use LiteLLM - automatically handles max_tokens vs max_completion_tokens
-    response = await litellm.acompletion(
-        model=settings.llm_model,
-        messages=messages,
-        temperature=0.7,
-        max_tokens=2000,
-        api_key=settings.llm_api_key,
-        api_base=settings.llm_base_url if settings.llm_base_url else None,
-    )
+    with observe_call(LLM_REQUESTS, LLM_SECONDS, model=settings.llm_model):
+        response = await litellm.acompletion(
+            model=settings.llm_model,
+            messages=messages,
+            temperature=0.7,
+            max_tokens=MAX_OUTPUT_TOKENS,
+            api_key=settings.llm_api_key,
+            api_base=settings.llm_base_url if settings.llm_base_url else None,
+        )
+    record_usage(response.usage, model=settings.llm_model)
     
     return (
         response.choices[0].message.content,
@@ -191,6 +89,59 @@ Always cite the document source when referencing information from the context.""
     )
 
 
+async def _remember_exchange(conversation_id: str, message: str, response_text: str) -> None:
+    """Append an exchange to the conversation history (capped by the conversation store)."""
+    await get_conversation_store().append(conversation_id, [
+        {"role": "user", "content": message},
+        {"role": "assistant", "content": response_text},
+    ])
+
+
+async def _stream_chat(
+    chat_request: ChatRequest,
+    conversation_id: str,
+    sources: list,
+    search_performed: bool,
+    stream: CompletionStream,
+    timings: StageTimings,
+    context_tokens_saved: int
+):
+    """SSE events: sources first, then tokens, then usage and timings once the LLM is done."""
+    yield sse_event(
+        "sources",
+        conversation_id=conversation_id,
+        sources=sources if chat_request.include_sources else None,
+        search_performed=search_performed
+    )
+    
+    try:
+        async for token in stream.tokens():
+            yield sse_event("token", content=token)
+    except Exception as e:
+        logger.error(f"Chat stream failed: {e}")
+        yield sse_event("error", error="The response stream was interrupted. Please try again.")
+        return
+    
+    timings.record("llm_total", stream.duration_seconds * 1000)
+    await _remember_exchange(conversation_id, chat_request.message, stream.text)
+    
+    processing_time = timings.total_ms()
+    record_search_latency(processing_time, chat_request.search_type.value, stages=timings.stages, kind="chat")
+    
+    yield sse_event(
+        "done",
+        conversation_id=conversation_id,
+        model=settings.llm_model,
+        tokens_used=stream.token_counts()["total_tokens"],
+        time_to_first_token_ms=(
+            round(stream.first_token_seconds * 1000, 2) if stream.first_token_seconds is not None else None
+        ),
+        processing_time_ms=processing_time,
+        context_tokens_saved=context_tokens_saved,
+        timings=timings.as_dict() if chat_request.debug_timings else None
+    )
+
+
 @router.post("", response_model=ChatResponse)
 @router.post("/", response_model=ChatResponse)
 async def chat(request: Request, chat_request: ChatRequest):
@@ -198,18 +149,17 @@ async def chat(request: Request, chat_request: ChatRequest):
     Chat with the RAG agent.
     
     Sends a message to the AI assistant which will search the knowledge base
-    and generate a contextual response.
+    and generate a contextual response. With stream=true the answer is sent
+    as Server-Sent Events: a "sources" event, "token" events as the model
+    produces them, then a "done" event with token usage and timings.
     """
-    start_time = time.time()
+    timings = start_timings()
     
     db = request.app.state.db
     
     # Get or create conversation
     conversation_id = chat_request.conversation_id or str(uuid.uuid4())
-    if conversation_id not in _conversations:
-        _conversations[conversation_id] = []
-    
-    conversation_history = _conversations[conversation_id]
+    conversation_history = await get_conversation_store().get(conversation_id)
     
     # Perform search
     search_results = await perform_search(
@@ -219,15 +169,20 @@ async def chat(request: Request, chat_request: ChatRequest):
         chat_request.match_count
     )
     
-    # Build context from search results
-    context_parts = []
-    sources = []
+    # Fit the best chunks and the recent history into the model's token budget
+    assembled = assemble_context(
+        settings.llm_model,
+        chat_request.message,
+        search_results,
+        conversation_history[-CONTEXT_HISTORY_MESSAGES:],
+        MAX_OUTPUT_TOKENS,
+        kind="chat"
+    )
+    context = assembled.context
     
-    for result in search_results:
-        context_parts.append(
-            f"[Source: {result['document_title']}]\n{result['content']}"
-        )
-        if chat_request.include_sources:
+    sources = []
+    if chat_request.include_sources:
+        for result in assembled.results:
             sources.append({
                 "title": result["document_title"],
                 "source": result["document_source"],
@@ -235,24 +190,37 @@ async def chat(request: Request, chat_request: ChatRequest):
                 "excerpt": result["content"][:200] + "..." if len(result["content"]) > 200 else result["content"]
             })
     
-    context = "\n\n---\n\n".join(context_parts) if context_parts else "No relevant documents found."
+    if chat_request.stream:
+        # Opened before responding so provider errors still surface as HTTP errors
+        stream = await open_completion_stream(
+            settings.llm_model,
+            build_messages(chat_request.message, context, assembled.history),
+            temperature=0.7,
+            max_tokens=MAX_OUTPUT_TOKENS,
+            api_key=settings.llm_api_key,
+            api_base=settings.llm_base_url if settings.llm_base_url else None,
+        )
+        return StreamingResponse(
+            _stream_chat(
+                chat_request, conversation_id, sources, len(search_results) > 0, stream, timings,
+                assembled.tokens_saved
+            ),
+            media_type="text/event-stream",
+            headers=SSE_HEADERS
+        )
     
     # Generate response
-    response_text, tokens_used = await generate_response(
-        chat_request.message,
-        context,
-        conversation_history
-    )
-    
-    # Update conversation history
-    conversation_history.append({"role": "user", "content": chat_request.message})
-    conversation_history.append({"role": "assistant", "content": response_text})
+    with track_stage("llm_total"):
+        response_text, tokens_used = await generate_response(
+            chat_request.message,
+            context,
+            assembled.history
+        )
     
-    # Keep conversation history manageable
-    if len(conversation_history) > 50:
-        _conversations[conversation_id] = conversation_history[-50:]
+    await _remember_exchange(conversation_id, chat_request.message, response_text)
     
-    processing_time = (time.time() - start_time) * 1000
+    processing_time = timings.total_ms()
+    record_search_latency(processing_time, chat_request.search_type.value, stages=timings.stages, kind="chat")
     
     return ChatResponse(
         message=response_text,
@@ -261,40 +229,36 @@ async def chat(request: Request, chat_request: ChatRequest):
         search_performed=len(search_results) > 0,
         model=settings.llm_model,
         tokens_used=tokens_used,
-        processing_time_ms=processing_time
+        processing_time_ms=processing_time,
+        context_tokens_saved=assembled.tokens_saved,
+        timings=timings.as_dict() if chat_request.debug_timings else None
     )
 
 
 @router.get("/conversations/{conversation_id}")
 async def get_conversation(conversation_id: str):
     """Get conversation history."""
-    if conversation_id not in _conversations:
+    messages = await get_conversation_store().get(conversation_id)
+    if not messages:
         raise HTTPException(status_code=404, detail="Conversation not found")
     
     return {
         "conversation_id": conversation_id,
-        "messages": _conversations[conversation_id]
+        "messages": messages
     }
 
 
 @router.delete("/conversations/{conversation_id}")
 async def delete_conversation(conversation_id: str):
     """Delete a conversation."""
-    if conversation_id in _conversations:
-        del _conversations[conversation_id]
+    await get_conversation_store().delete(conversation_id)
     
     return {"success": True, "message": "Conversation deleted"}
 
 
 @router.get("/conversations")
-async def list_conversations():
-    """List all active conversations."""
+async def list_conversations(limit: int = 100):
+    """List the most recently active conversations."""
     return {
-        "conversations": [
-            {
-                "id": cid,
-                "message_count": len(msgs)
-            }
-            for cid, msgs in _conversations.items()
-        ]
+        "conversations": await get_conversation_store().list(limit)
     }
@@ -3,24 +3,22 @@
 import logging
 import asyncio
 import time
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Dict, List, Optional, Any
-from collections import deque
 from fastapi import APIRouter, Request, HTTPException, Depends
 from pydantic import BaseModel
 
 from backend.core.config import settings
+from backend.core.latency import get_latency_store, merge_series
+from src.metrics import SEARCH_SECONDS, SEARCH_STAGE_SECONDS
+from backend.core.retrieval import embedding_dimension
+from src.retrieval.index_definitions import text_index_definition, vector_index_definition
 from backend.routers.auth import require_admin, UserResponse
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# Track search response times
-MAX_SAMPLES = 1000
-_search_latencies: deque = deque(maxlen=MAX_SAMPLES)
-
-
 class IndexMetrics(BaseModel):
     """Metrics for a search index."""
     name: str
@@ -40,6 +38,8 @@ class SearchPerformance(BaseModel):
     total_searches: int
     searches_last_hour: int
     searches_last_24h: int
+    stage_avg_ms: Dict[str, float] = {}
+    stage_p95_ms: Dict[str, float] = {}
 
 
 class OptimizationSuggestion(BaseModel):
@@ -60,13 +60,35 @@ class IndexDashboard(BaseModel):
     resource_allocation: Dict[str, Any]
 
 
-def record_search_latency(latency_ms: float, search_type: str = "hybrid"):
-    """Record a search latency sample."""
-    _search_latencies.append({
-        "latency_ms": latency_ms,
-        "search_type": search_type,
-        "timestamp": datetime.now()
-    })
+def record_search_latency(
+    latency_ms: float,
+    search_type: str = "hybrid",
+    profile: Optional[str] = None,
+    stages: Optional[Dict[str, float]] = None,
+    kind: str = "search"
+):
+    """
+    Record a search or chat latency sample into the per-minute histograms.
+
+    Args:
+        latency_ms: End-to-end latency
+        search_type: Search type used
+        profile: Profile key (default: the active profile)
+        stages: Per-stage breakdown in ms (embedding, vector_query, ...)
+        kind: "search" or "chat"; the dashboard percentiles use searches only
+    """
+    if profile is None:
+        try:
+            profile = get_profile_manager().active_profile_key
+        except Exception:
+            profile = "default"
+
+    get_latency_store().record(
+        latency_ms, kind=kind, search_type=search_type, profile=profile, stages=stages
+    )
+    SEARCH_SECONDS.observe(latency_ms / 1000, kind=kind, search_type=search_type, profile=profile)
+    for stage, ms in (stages or {}).items():
+        SEARCH_STAGE_SECONDS.observe(ms / 1000, kind=kind, stage=stage)
 
 
 def get_profile_manager():
@@ -91,7 +113,7 @@ async def get_index_dashboard(
     indexes = await _get_index_metrics(db)
     
     # Get performance metrics
-    performance = _calculate_performance_metrics()
+    performance = await _calculate_performance_metrics()
     
     # Generate optimization suggestions
     suggestions = await _generate_optimization_suggestions(db, indexes, performance)
@@ -158,39 +180,26 @@ async def _get_index_metrics(db) -> List[IndexMetrics]:
     return [IndexMetrics(**idx) for idx in indexes_data]
 
 
-def _calculate_performance_metrics() -> SearchPerformance:
-    """Calculate search performance metrics from collected samples."""
-    if not _search_latencies:
-        return SearchPerformance(
-            avg_response_time_ms=0,
-            p50_response_time_ms=0,
-            p95_response_time_ms=0,
-            p99_response_time_ms=0,
-            total_searches=0,
-            searches_last_hour=0,
-            searches_last_24h=0
-        )
-    
-    samples = list(_search_latencies)
-    latencies = sorted([s["latency_ms"] for s in samples])
+async def _calculate_performance_metrics(window_hours: int = 24) -> SearchPerformance:
+    """Calculate search performance metrics from the per-minute latency histograms."""
+    minutes = await get_latency_store().minutes(window_hours * 60, kind="search")
     
-    now = datetime.now()
-    hour_ago = now - timedelta(hours=1)
-    day_ago = now - timedelta(hours=24)
+    now_minute = int(time.time() // 60)
+    window = merge_series(minutes.values())
+    last_hour = merge_series(h for m, h in minutes.items() if m > now_minute - 60)
     
-    searches_hour = sum(1 for s in samples if s["timestamp"] > hour_ago)
-    searches_day = sum(1 for s in samples if s["timestamp"] > day_ago)
-    
-    n = len(latencies)
+    latency = window.latency
     
     return SearchPerformance(
-        avg_response_time_ms=round(sum(latencies) / n, 2),
-        p50_response_time_ms=round(latencies[n // 2], 2),
-        p95_response_time_ms=round(latencies[int(n * 0.95)], 2) if n > 20 else round(latencies[-1], 2),
-        p99_response_time_ms=round(latencies[int(n * 0.99)], 2) if n > 100 else round(latencies[-1], 2),
-        total_searches=n,
-        searches_last_hour=searches_hour,
-        searches_last_24h=searches_day
+        avg_response_time_ms=round(latency.mean(), 2),
+        p50_response_time_ms=round(latency.quantile(0.50), 2),
+        p95_response_time_ms=round(latency.quantile(0.95), 2),
+        p99_response_time_ms=round(latency.quantile(0.99), 2),
+        total_searches=latency.count,
+        searches_last_hour=last_hour.latency.count,
+        searches_last_24h=latency.count,
+        stage_avg_ms={stage: round(h.mean(), 2) for stage, h in window.stages.items()},
+        stage_p95_ms={stage: round(h.quantile(0.95), 2) for stage, h in window.stages.items()}
     )
 
 
@@ -342,18 +351,11 @@ async def create_search_indexes(
             results["documents_to_index"] = doc_count
             
             # Vector Search Index
-            vector_index_def = {
-                "name": settings.mongodb_vector_index,
-                "type": "vectorSearch",
-                "definition": {
-                    "fields": [{
-                        "type": "vector",
-                        "path": "embedding",
-                        "numDimensions": settings.embedding_dimension,
-                        "similarity": "cosine"
-                    }]
-                }
-            }
+            vector_index_def = vector_index_definition(
+                settings.mongodb_vector_index, embedding_dimension(),
+                storage_format=settings.embedding_storage_format,
+                quantization=settings.vector_quantization
+            )
             
             try:
                 try:
@@ -371,26 +373,13 @@ async def create_search_indexes(
                 results["vector_index"] = {
                     "name": settings.mongodb_vector_index,
                     "status": "created",
-                    "dimensions": settings.embedding_dimension
+                    "dimensions": embedding_dimension()
                 }
             except Exception as e:
                 results["errors"].append(f"Vector index: {str(e)}")
             
             # Text Search Index
-            text_index_def = {
-                "name": settings.mongodb_text_index,
-                "definition": {
-                    "mappings": {
-                        "dynamic": False,
-                        "fields": {
-                            "content": {
-                                "type": "string",
-                                "analyzer": "lucene.standard"
-                            }
-                        }
-                    }
-                }
-            }
+            text_index_def = text_index_definition(settings.mongodb_text_index)
             
             try:
                 try:
@@ -428,31 +417,36 @@ async def create_search_indexes(
 async def get_performance_history(
     request: Request,
     hours: int = 24,
+    kind: str = "search",
+    search_type: Optional[str] = None,
+    profile: Optional[str] = None,
     admin: UserResponse = Depends(require_admin)
 ):
-    """Get historical performance data."""
-    cutoff = datetime.now() - timedelta(hours=hours)
-    
-    samples = [s for s in _search_latencies if s["timestamp"] > cutoff]
+    """Get historical performance data, optionally filtered by kind, search type and profile."""
+    minutes = await get_latency_store().minutes(
+        hours * 60, kind=kind, search_type=search_type, profile=profile
+    )
     
-    # Group by hour
+    # Merge the per-minute histograms by hour
     hourly_data = {}
-    for s in samples:
-        hour_key = s["timestamp"].strftime("%Y-%m-%d %H:00")
-        if hour_key not in hourly_data:
-            hourly_data[hour_key] = {"latencies": [], "count": 0}
-        hourly_data[hour_key]["latencies"].append(s["latency_ms"])
-        hourly_data[hour_key]["count"] += 1
+    for minute, histograms in minutes.items():
+        hour_key = datetime.fromtimestamp(minute * 60).strftime("%Y-%m-%d %H:00")
+        hourly_data.setdefault(hour_key, []).append(histograms)
     
     history = []
-    for hour, data in sorted(hourly_data.items()):
-        latencies = data["latencies"]
+    total_samples = 0
+    for hour, series in sorted(hourly_data.items()):
+        latency = merge_series(series).latency
+        total_samples += latency.count
         history.append({
             "hour": hour,
-            "count": data["count"],
-            "avg_ms": round(sum(latencies) / len(latencies), 2),
-            "max_ms": round(max(latencies), 2),
-            "min_ms": round(min(latencies), 2)
+            "count": latency.count,
+            "avg_ms": round(latency.mean(), 2),
+            "p50_ms": round(latency.quantile(0.50), 2),
+            "p95_ms": round(latency.quantile(0.95), 2),
+            "p99_ms": round(latency.quantile(0.99), 2),
+            "max_ms": round(latency.max(), 2),
+            "min_ms": round(latency.min(), 2)
         })
     
-    return {"history": history, "total_samples": len(samples)}
+    return {"history": history, "total_samples": total_samples}
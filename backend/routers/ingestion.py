@@ -11,13 +11,22 @@ from typing import Dict, Optional, List
 from fastapi import APIRouter, HTTPException, Request, BackgroundTasks
 from fastapi.responses import StreamingResponse
 from bson import ObjectId
+from pymongo import ReturnDocument
 
 from backend.models.schemas import (
     IngestionStartRequest, IngestionStatusResponse, IngestionStatus,
-    DocumentInfo, DocumentListResponse, SuccessResponse,
+    DocumentInfo, DocumentListResponse, DocumentUpdateRequest, SuccessResponse,
     IngestionRunSummary, IngestionRunsResponse
 )
 from backend.core.config import settings
+from backend.core.retrieval import embedding_dimension
+from src.metrics import REGISTRY
+from src.retrieval.chunk_fields import propagate_document_fields
+from src.retrieval.document_metadata import get_document_metadata_cache
+from src.retrieval.local_text import local_text_index_for
+from src.retrieval.local_vector import local_vector_index_for
+from src.retrieval.result_cache import bump_corpus_generation
+from src.retrieval.vector_storage import decode_embedding
 from backend.routers.auth import require_admin, UserResponse
 from fastapi import Depends
 
@@ -914,6 +923,19 @@ _pending_files_queue: List[dict] = []
 _pending_files_lock = asyncio.Lock()
 
 
+def _collect_ingestion_metrics():
+    """Pending files and job state for /metrics (in-memory only)."""
+    return [
+        ("rag_ingestion_pending_files", "gauge", "Files waiting in the running ingestion job",
+         [("", {}, len(_pending_files_queue))]),
+        ("rag_ingestion_running", "gauge", "1 while an ingestion job is running",
+         [("", {}, 1 if _current_job_id is not None else 0)]),
+    ]
+
+
+REGISTRY.register_collector(_collect_ingestion_metrics)
+
+
 @router.get("/pending-files")
 async def get_pending_files(
     request: Request,
@@ -1326,7 +1348,10 @@ async def get_document(request: Request, document_id: str):
         raise HTTPException(status_code=404, detail="Document not found")
     
     # Get chunks
-    chunks_cursor = db.chunks_collection.find({"document_id": ObjectId(document_id)})
+    chunks_cursor = db.chunks_collection.find(
+        {"document_id": ObjectId(document_id)},
+        {"embedding": 0}
+    )
     chunks = []
     async for chunk in chunks_cursor:
         chunks.append({
@@ -1348,6 +1373,45 @@ async def get_document(request: Request, document_id: str):
     }
 
 
+@router.patch("/documents/{document_id}", response_model=SuccessResponse)
+async def update_document(request: Request, document_id: str, update: DocumentUpdateRequest):
+    """
+    Rename a document (title and/or source).
+    
+    Denormalized title/source/file type on its chunks are kept in sync.
+    """
+    db = request.app.state.db
+    
+    try:
+        obj_id = ObjectId(document_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid document ID format")
+    
+    changes = update.model_dump(exclude_none=True)
+    if not changes:
+        raise HTTPException(status_code=400, detail="No fields to update")
+    
+    doc = await db.documents_collection.find_one_and_update(
+        {"_id": obj_id},
+        {"$set": changes},
+        projection={"title": 1, "source": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if not doc:
+        raise HTTPException(status_code=404, detail="Document not found")
+    
+    get_document_metadata_cache().invalidate([obj_id])
+    chunks_updated = await propagate_document_fields(
+        db.chunks_collection, obj_id, doc.get("title", ""), doc.get("source", "")
+    )
+    await bump_corpus_generation(db.db, db.chunks_collection.name)
+    
+    return SuccessResponse(
+        success=True,
+        message=f"Updated document and {chunks_updated} denormalized chunks"
+    )
+
+
 @router.delete("/documents/{document_id}", response_model=SuccessResponse)
 async def delete_document(request: Request, document_id: str):
     """Delete a document and its chunks."""
@@ -1368,6 +1432,17 @@ async def delete_document(request: Request, document_id: str):
     
     # Delete document
     doc_result = await db.documents_collection.delete_one({"_id": obj_id})
+    get_document_metadata_cache().invalidate([obj_id])
+    for local_index in (
+        local_vector_index_for(
+            settings, db.current_database_name, db.chunks_collection.name, embedding_dimension()
+        ),
+        local_text_index_for(settings, db.current_database_name, db.chunks_collection.name),
+    ):
+        if local_index is not None:
+            # May compact the whole index
+            await asyncio.to_thread(local_index.delete_documents, [obj_id])
+    await bump_corpus_generation(db.db, db.chunks_collection.name)
     
     return SuccessResponse(
         success=True,
@@ -1537,7 +1612,7 @@ async def get_document_full_info(request: Request, document_id: str):
             "metadata": chunk.get("metadata", {}),
             "created_at": chunk.get("created_at"),
             "has_embedding": "embedding" in chunk and chunk["embedding"] is not None,
-            "embedding_dimensions": len(chunk["embedding"]) if chunk.get("embedding") else None
+            "embedding_dimensions": len(decode_embedding(chunk["embedding"])) if chunk.get("embedding") else None
         }
         chunks.append(chunk_data)
     
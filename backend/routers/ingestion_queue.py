@@ -11,6 +11,7 @@ from pydantic import BaseModel, Field
 
 from backend.core.config import settings
 from backend.routers.auth import require_admin, UserResponse
+from src.metrics import REGISTRY
 
 logger = logging.getLogger(__name__)
 
@@ -644,3 +645,17 @@ async def check_scheduled_jobs(db):
             await _save_schedule_to_db(db, schedule)
             
             logger.info(f"Scheduled job {schedule['id']} added to queue")
+
+
+def _collect_queue_metrics():
+    """Queue depth by job status for /metrics."""
+    statuses: Dict[str, int] = {}
+    for job in _ingestion_queue:
+        statuses[job["status"]] = statuses.get(job["status"], 0) + 1
+    return [(
+        "rag_ingestion_queue_jobs", "gauge", "Ingestion queue jobs by status",
+        [("", {"status": status}, count) for status, count in statuses.items()]
+    )]
+
+
+REGISTRY.register_collector(_collect_queue_metrics)
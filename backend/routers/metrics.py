@@ -0,0 +1,93 @@
+"""Metrics router - Prometheus scrape endpoint."""
+
+import logging
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from backend.core.config import settings
+from src.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _collect_cache_metrics():
+    """Hit/miss counters and sizes of the in-process caches."""
+    from src.retrieval.document_metadata import get_document_metadata_cache
+    from src.retrieval.embedding_batcher import get_embedding_batcher
+    from src.retrieval.embedding_cache import get_embedding_cache
+    from src.retrieval.result_cache import get_search_result_cache
+
+    caches = {
+        "embedding": get_embedding_cache().stats(),
+        "search_results": get_search_result_cache().stats(),
+        "document_metadata": get_document_metadata_cache().stats(),
+    }
+    families = [
+        ("rag_cache_hits_total", "counter", "Cache hits (including persistent and stale hits)", [
+            ("", {"cache": name}, stats["hits"] + stats.get("persistent_hits", 0) + stats.get("stale_hits", 0))
+            for name, stats in caches.items()
+        ]),
+        ("rag_cache_misses_total", "counter", "Cache misses", [
+            ("", {"cache": name}, stats["misses"]) for name, stats in caches.items()
+        ]),
+        ("rag_cache_hit_ratio", "gauge", "Cache hit ratio since start", [
+            ("", {"cache": name}, stats["hit_ratio"]) for name, stats in caches.items()
+        ]),
+        ("rag_cache_entries", "gauge", "Entries held by the cache", [
+            ("", {"cache": name}, stats["entries"]) for name, stats in caches.items()
+        ]),
+    ]
+
+    batcher = get_embedding_batcher()
+    if batcher is not None:
+        stats = batcher.stats()
+        families.append(("rag_embedding_batcher_requests_total", "counter", "Query embeddings coalesced", [
+            ("", {}, stats["requests"])
+        ]))
+        families.append(("rag_embedding_batcher_batches_total", "counter", "Embedding batches sent", [
+            ("", {}, stats["batches"])
+        ]))
+    return families
+
+
+REGISTRY.register_collector(_collect_cache_metrics)
+
+
+def setup_metrics() -> None:
+    """
+    Share this worker's metrics with the other API workers when configured.
+
+    Called once per worker from the FastAPI lifespan; the directory is
+    cleared by the process that starts the workers.
+    """
+    if settings.metrics_multiprocess_dir:
+        REGISTRY.enable_multiprocess(settings.metrics_multiprocess_dir, settings.metrics_write_seconds)
+    elif settings.api_workers > 1:
+        logger.info(
+            "METRICS_MULTIPROCESS_DIR is not set: /metrics reports only the worker serving the scrape"
+        )
+
+
+def stop_metrics() -> None:
+    """Write this worker's final snapshot so its counters outlive it."""
+    REGISTRY.disable_multiprocess()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Prometheus metrics.
+
+    Everything is pre-aggregated in process memory; a scrape never queries
+    MongoDB. With METRICS_MULTIPROCESS_DIR set the snapshots of all API
+    workers are merged, otherwise only the serving worker is reported.
+    """
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
@@ -54,6 +54,7 @@ async def list_profiles(
                     vector_index=profile.vector_index,
                     text_index=profile.text_index,
                     embedding_model=profile.embedding_model,
+                    embedding_dimension=profile.embedding_dimension,
                     llm_model=profile.llm_model
                 )
         
@@ -86,6 +87,7 @@ async def get_active_profile(user: UserResponse = Depends(require_auth)):
                 vector_index=profile.vector_index,
                 text_index=profile.text_index,
                 embedding_model=profile.embedding_model,
+                embedding_dimension=profile.embedding_dimension,
                 llm_model=profile.llm_model
             )
         }
@@ -184,7 +186,8 @@ async def create_profile(
             name=request.name,
             description=request.description,
             documents_folders=request.documents_folders,
-            database=request.database
+            database=request.database,
+            embedding_dimension=request.embedding_dimension
         )
         
         if success:
@@ -283,7 +286,8 @@ async def update_profile(
             name=request.name,
             description=request.description,
             documents_folders=request.documents_folders,
-            database=request.database
+            database=request.database,
+            embedding_dimension=request.embedding_dimension
         )
         
         if success:
@@ -343,6 +347,7 @@ async def get_profile(
                 vector_index=profile.vector_index,
                 text_index=profile.text_index,
                 embedding_model=profile.embedding_model,
+                embedding_dimension=profile.embedding_dimension,
                 llm_model=profile.llm_model
             ),
             "is_active": profile_key == pm.active_profile_key
@@ -1,333 +1,120 @@
 """Search router - Direct search endpoints."""
 
+import asyncio
+import json
 import logging
 import time
 from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
 
 from backend.models.schemas import (
-    SearchRequest, SearchResponse, SearchResultItem, SearchType
+    BatchSearchRequest, SearchRequest, SearchResponse, SearchResultItem, SearchType
 )
 from backend.core.config import settings
+from backend.core.retrieval import cached_search, embed_queries, get_embedding, get_retrieval_engine
+from backend.routers.indexes import record_search_latency
+from src.retrieval.timings import start_timings
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
-async def get_embedding(text: str) -> list:
-    """Generate embedding for text."""
-    from openai import AsyncOpenAI
-    
-    client = AsyncOpenAI(
-        api_key=settings.embedding_api_key,
-        base_url=settings.embedding_base_url
-    )
-    
-    response = await client.embeddings.create(
-        model=settings.embedding_model,
-        input=text
+async def _run_search(request: Request, search_request: SearchRequest, search_type: SearchType) -> SearchResponse:
+    """Run a search through the shared retrieval engine and build the response."""
+    timings = start_timings()
+
+    try:
+        results, _ = await cached_search(
+            request.app.state.db,
+            search_request.query,
+            search_type.value,
+            search_request.match_count
+        )
+    except Exception as e:
+        logger.error(f"{search_type.value.capitalize()} search failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+
+    processing_time = timings.total_ms()
+    record_search_latency(processing_time, search_type.value, stages=timings.stages)
+
+    return SearchResponse(
+        query=search_request.query,
+        search_type=search_type.value,
+        results=[SearchResultItem(**r.model_dump()) for r in results],
+        total_results=len(results),
+        processing_time_ms=processing_time,
+        timings=timings.as_dict() if search_request.debug_timings else None
     )
-    
-    return response.data[0].embedding
 
 
 @router.post("/semantic", response_model=SearchResponse)
 async def semantic_search(request: Request, search_request: SearchRequest):
     """
     Perform semantic (vector) search.
-    
+
     Uses embedding similarity to find conceptually related content.
     """
-    start_time = time.time()
-    
-    db = request.app.state.db
-    collection = db.chunks_collection
-    
-    try:
-        # Generate query embedding
-        query_embedding = await get_embedding(search_request.query)
-        
-        # Vector search pipeline
-        pipeline = [
-            {
-                "$vectorSearch": {
-                    "index": settings.mongodb_vector_index,
-                    "queryVector": query_embedding,
-                    "path": "embedding",
-                    "numCandidates": 100,
-                    "limit": search_request.match_count
-                }
-            },
-            {
-                "$lookup": {
-                    "from": settings.mongodb_collection_documents,
-                    "localField": "document_id",
-                    "foreignField": "_id",
-                    "as": "doc_info"
-                }
-            },
-            {"$unwind": "$doc_info"},
-            {
-                "$project": {
-                    "chunk_id": "$_id",
-                    "document_id": 1,
-                    "content": 1,
-                    "similarity": {"$meta": "vectorSearchScore"},
-                    "metadata": 1,
-                    "document_title": "$doc_info.title",
-                    "document_source": "$doc_info.source"
-                }
-            }
-        ]
-        
-        results = []
-        cursor = collection.aggregate(pipeline)
-        async for doc in cursor:
-            results.append(SearchResultItem(
-                chunk_id=str(doc["chunk_id"]),
-                document_id=str(doc["document_id"]),
-                document_title=doc["document_title"],
-                document_source=doc["document_source"],
-                content=doc["content"],
-                similarity=doc["similarity"],
-                metadata=doc.get("metadata", {})
-            ))
-        
-        processing_time = (time.time() - start_time) * 1000
-        
-        return SearchResponse(
-            query=search_request.query,
-            search_type="semantic",
-            results=results,
-            total_results=len(results),
-            processing_time_ms=processing_time
-        )
-        
-    except Exception as e:
-        logger.error(f"Semantic search failed: {e}")
-        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+    return await _run_search(request, search_request, SearchType.SEMANTIC)
 
 
 @router.post("/text", response_model=SearchResponse)
 async def text_search(request: Request, search_request: SearchRequest):
     """
     Perform full-text search.
-    
+
     Uses keyword and fuzzy matching to find content.
     """
-    start_time = time.time()
-    
-    db = request.app.state.db
-    collection = db.chunks_collection
-    
-    try:
-        # Text search pipeline
-        pipeline = [
-            {
-                "$search": {
-                    "index": settings.mongodb_text_index,
-                    "text": {
-                        "query": search_request.query,
-                        "path": "content",
-                        "fuzzy": {
-                            "maxEdits": 2,
-                            "prefixLength": 3
-                        }
-                    }
-                }
-            },
-            {"$limit": search_request.match_count},
-            {
-                "$lookup": {
-                    "from": settings.mongodb_collection_documents,
-                    "localField": "document_id",
-                    "foreignField": "_id",
-                    "as": "doc_info"
-                }
-            },
-            {"$unwind": "$doc_info"},
-            {
-                "$project": {
-                    "chunk_id": "$_id",
-                    "document_id": 1,
-                    "content": 1,
-                    "similarity": {"$meta": "searchScore"},
-                    "metadata": 1,
-                    "document_title": "$doc_info.title",
-                    "document_source": "$doc_info.source"
-                }
-            }
-        ]
-        
-        results = []
-        cursor = collection.aggregate(pipeline)
-        async for doc in cursor:
-            results.append(SearchResultItem(
-                chunk_id=str(doc["chunk_id"]),
-                document_id=str(doc["document_id"]),
-                document_title=doc["document_title"],
-                document_source=doc["document_source"],
-                content=doc["content"],
-                similarity=doc["similarity"],
-                metadata=doc.get("metadata", {})
-            ))
-        
-        processing_time = (time.time() - start_time) * 1000
-        
-        return SearchResponse(
-            query=search_request.query,
-            search_type="text",
-            results=results,
-            total_results=len(results),
-            processing_time_ms=processing_time
-        )
-        
-    except Exception as e:
-        logger.error(f"Text search failed: {e}")
-        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+    return await _run_search(request, search_request, SearchType.TEXT)
 
 
 @router.post("/hybrid", response_model=SearchResponse)
 async def hybrid_search(request: Request, search_request: SearchRequest):
     """
     Perform hybrid search combining semantic and text search.
-    
-    Uses Reciprocal Rank Fusion (RRF) to merge results from both methods.
+
+    Both searches run concurrently and are merged with Reciprocal Rank Fusion (RRF).
     """
-    start_time = time.time()
-    
-    db = request.app.state.db
-    collection = db.chunks_collection
-    
-    try:
-        # Fetch more results for RRF
-        fetch_count = search_request.match_count * 2
-        
-        # Run semantic search
-        query_embedding = await get_embedding(search_request.query)
-        
-        vector_pipeline = [
-            {
-                "$vectorSearch": {
-                    "index": settings.mongodb_vector_index,
-                    "queryVector": query_embedding,
-                    "path": "embedding",
-                    "numCandidates": 100,
-                    "limit": fetch_count
-                }
-            },
-            {
-                "$lookup": {
-                    "from": settings.mongodb_collection_documents,
-                    "localField": "document_id",
-                    "foreignField": "_id",
-                    "as": "doc_info"
-                }
-            },
-            {"$unwind": "$doc_info"},
-            {
-                "$project": {
-                    "chunk_id": "$_id",
-                    "document_id": 1,
-                    "content": 1,
-                    "similarity": {"$meta": "vectorSearchScore"},
-                    "metadata": 1,
-                    "document_title": "$doc_info.title",
-                    "document_source": "$doc_info.source"
-                }
-            }
-        ]
-        
-        semantic_results = []
-        cursor = collection.aggregate(vector_pipeline)
-        async for doc in cursor:
-            semantic_results.append(doc)
-        
-        # Run text search
-        text_pipeline = [
-            {
-                "$search": {
-                    "index": settings.mongodb_text_index,
-                    "text": {
-                        "query": search_request.query,
-                        "path": "content",
-                        "fuzzy": {"maxEdits": 2, "prefixLength": 3}
-                    }
-                }
-            },
-            {"$limit": fetch_count},
-            {
-                "$lookup": {
-                    "from": settings.mongodb_collection_documents,
-                    "localField": "document_id",
-                    "foreignField": "_id",
-                    "as": "doc_info"
-                }
-            },
-            {"$unwind": "$doc_info"},
-            {
-                "$project": {
-                    "chunk_id": "$_id",
-                    "document_id": 1,
-                    "content": 1,
-                    "similarity": {"$meta": "searchScore"},
-                    "metadata": 1,
-                    "document_title": "$doc_info.title",
-                    "document_source": "$doc_info.source"
+    return await _run_search(request, search_request, SearchType.HYBRID)
+
+
+@router.post("/hybrid/stream")
+async def hybrid_search_stream(request: Request, search_request: SearchRequest):
+    """
+    Perform hybrid search, streaming results as NDJSON while they arrive.
+
+    Emits one line per stage: "text" hits as soon as keyword search answers
+    (no embedding needed), then "semantic" hits, then the "hybrid" RRF
+    ranking, which is the final result. Each line carries the elapsed time;
+    a failure after the response started is reported as an "error" line.
+    """
+    engine = get_retrieval_engine(request.app.state.db)
+
+    async def stream():
+        timings = start_timings()
+        try:
+            async for stage, results in engine.hybrid_search_stream(
+                search_request.query, search_request.match_count
+            ):
+                timings.mark("first_results")
+                line = {
+                    "stage": stage,
+                    "query": search_request.query,
+                    "results": [SearchResultItem(**r.model_dump()).model_dump() for r in results],
+                    "total_results": len(results),
+                    "final": stage == "hybrid",
+                    "elapsed_ms": timings.total_ms(),
                 }
-            }
-        ]
-        
-        text_results = []
-        cursor = collection.aggregate(text_pipeline)
-        async for doc in cursor:
-            text_results.append(doc)
-        
-        # Apply Reciprocal Rank Fusion
-        k = 60  # RRF constant
-        rrf_scores = {}
-        result_map = {}
-        
-        for rank, doc in enumerate(semantic_results):
-            chunk_id = str(doc["chunk_id"])
-            rrf_scores[chunk_id] = rrf_scores.get(chunk_id, 0) + 1.0 / (k + rank)
-            result_map[chunk_id] = doc
-        
-        for rank, doc in enumerate(text_results):
-            chunk_id = str(doc["chunk_id"])
-            rrf_scores[chunk_id] = rrf_scores.get(chunk_id, 0) + 1.0 / (k + rank)
-            if chunk_id not in result_map:
-                result_map[chunk_id] = doc
-        
-        # Sort by RRF score
-        sorted_results = sorted(rrf_scores.items(), key=lambda x: x[1], reverse=True)
-        
-        results = []
-        for chunk_id, score in sorted_results[:search_request.match_count]:
-            doc = result_map[chunk_id]
-            results.append(SearchResultItem(
-                chunk_id=chunk_id,
-                document_id=str(doc["document_id"]),
-                document_title=doc["document_title"],
-                document_source=doc["document_source"],
-                content=doc["content"],
-                similarity=score,
-                metadata=doc.get("metadata", {})
-            ))
-        
-        processing_time = (time.time() - start_time) * 1000
-        
-        return SearchResponse(
-            query=search_request.query,
-            search_type="hybrid",
-            results=results,
-            total_results=len(results),
-            processing_time_ms=processing_time
-        )
-        
-    except Exception as e:
-        logger.error(f"Hybrid search failed: {e}")
-        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+                if line["final"]:
+                    record_search_latency(timings.total_ms(), SearchType.HYBRID.value, stages=timings.stages)
+                    if search_request.debug_timings:
+                        line["timings"] = timings.as_dict()
+                yield json.dumps(line) + "\n"
+        except Exception as e:
+            logger.error(f"Streaming hybrid search failed: {e}")
+            yield json.dumps({"stage": "error", "error": f"Search failed: {str(e)}", "final": True}) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
 
 
 @router.post("", response_model=SearchResponse)
@@ -335,12 +122,97 @@ async def hybrid_search(request: Request, search_request: SearchRequest):
 async def search(request: Request, search_request: SearchRequest):
     """
     Perform search with specified type.
-    
+
     Unified search endpoint that routes to appropriate search method.
     """
-    if search_request.search_type == SearchType.SEMANTIC:
-        return await semantic_search(request, search_request)
-    elif search_request.search_type == SearchType.TEXT:
-        return await text_search(request, search_request)
-    else:
-        return await hybrid_search(request, search_request)
+    return await _run_search(request, search_request, search_request.search_type)
+
+
+@router.post("/batch")
+async def batch_search(request: Request, batch_request: BatchSearchRequest):
+    """
+    Run many searches in one call, streaming results as NDJSON.
+
+    Query embeddings for all semantic and hybrid queries are created up
+    front in as few embeddings API calls as possible, then the searches run
+    with bounded concurrency. Each line is one query's result (or error) in
+    completion order, tagged with its position in the request and timings;
+    the last line is a summary.
+    """
+    start_time = time.perf_counter()
+    db = request.app.state.db
+
+    try:
+        vectors = await embed_queries([
+            q.query for q in batch_request.queries if q.search_type != SearchType.TEXT
+        ])
+    except Exception as e:
+        # Fall back to per-query embedding; failures then surface per line
+        logger.warning(f"Batch query embedding failed: {e}")
+        vectors = {}
+    embedding_ms = (time.perf_counter() - start_time) * 1000
+
+    async def embed(text: str) -> list:
+        vector = vectors.get(text)
+        return vector if vector is not None else await get_embedding(text)
+
+    engine = get_retrieval_engine(db, embed=embed)
+    semaphore = asyncio.Semaphore(batch_request.concurrency or settings.search_batch_concurrency)
+
+    async def run(index: int, search_request: SearchRequest) -> dict:
+        queued_at = time.perf_counter()
+        async with semaphore:
+            started_at = time.perf_counter()
+            timings = start_timings()
+            line = {
+                "index": index,
+                "query": search_request.query,
+                "search_type": search_request.search_type.value,
+            }
+            try:
+                results, cached = await cached_search(
+                    db,
+                    search_request.query,
+                    search_request.search_type.value,
+                    search_request.match_count,
+                    engine=engine
+                )
+                line.update(
+                    results=[SearchResultItem(**r.model_dump()).model_dump() for r in results],
+                    total_results=len(results),
+                    cached=cached
+                )
+            except Exception as e:
+                logger.error(f"Batch search {index} failed: {e}")
+                line["error"] = str(e)
+            search_ms = timings.total_ms()
+            if "error" not in line:
+                record_search_latency(search_ms, search_request.search_type.value, stages=timings.stages)
+            line["timings"] = {
+                "queue_ms": (started_at - queued_at) * 1000,
+                "search_ms": search_ms,
+                "stages": timings.as_dict(),
+            }
+            return line
+
+    async def stream():
+        tasks = [asyncio.ensure_future(run(i, q)) for i, q in enumerate(batch_request.queries)]
+        failed = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                line = await next_done
+                failed += "error" in line
+                yield json.dumps(line) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        yield json.dumps({
+            "done": True,
+            "total_queries": len(tasks),
+            "failed": failed,
+            "embedding_ms": embedding_ms,
+            "processing_time_ms": (time.perf_counter() - start_time) * 1000,
+        }) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
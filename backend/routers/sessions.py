@@ -1,21 +1,48 @@
 """Chat sessions router - Manage chat sessions, folders, and message history."""
 
+import asyncio
 import logging
 import time
 import uuid
 import traceback
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Optional, List, Dict, Any
 from fastapi import APIRouter, HTTPException, Request, Depends
-from pydantic import BaseModel, Field
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, model_validator
+from pymongo.errors import DuplicateKeyError
 
 from backend.core.config import settings
+from backend.core.context import assemble_context
+from backend.core.llm import SSE_HEADERS, CompletionStream, open_completion_stream, sse_event
+from backend.core.messages import SESSIONS_COLLECTION, MessageStore, message_store_for
+from backend.core.tasks import get_task_queue, task_handler
 from backend.routers.auth import get_current_user, UserResponse
+from src.metrics import LLM_REQUESTS, LLM_SECONDS, observe_call, record_usage
+from src.retrieval.timings import StageTimings, start_timings
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Most recent messages considered as conversation history (then fitted to the token budget)
+CONTEXT_HISTORY_MESSAGES = 20
+
+# Completion tokens requested per answer (also reserved in the context budget)
+MAX_OUTPUT_TOKENS = 4000
+
+# Messages returned with a session and per page of GET /{session_id}/messages
+MESSAGES_PAGE_SIZE = 50
+
+# Sessions per page of the session list
+SESSIONS_PAGE_SIZE = 50
+
+# Summary fields of the session list (never the embedded messages of legacy sessions)
+SESSION_SUMMARY_PROJECTION = {
+    "title": 1, "folder_id": 1, "user_id": 1, "model": 1, "created_at": 1,
+    "updated_at": 1, "stats": 1, "is_pinned": 1, "profile": 1,
+}
+
 
 # ============== Model Pricing Data (per 1M tokens) ==============
 
@@ -152,11 +179,14 @@ class MessageStats(BaseModel):
     cost_usd: float = 0.0
     tokens_per_second: float = 0.0
     latency_ms: float = 0.0
+    time_to_first_token_ms: Optional[float] = None  # Streamed responses only
+    context_tokens_saved: Optional[int] = None  # Prompt tokens cut to fit the context budget
 
 
 class Message(BaseModel):
     """Chat message with stats."""
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    seq: Optional[int] = None  # Position in the session, assigned when stored
     role: str
     content: str
     timestamp: datetime = Field(default_factory=datetime.now)
@@ -175,6 +205,17 @@ class SessionStats(BaseModel):
     total_cost_usd: float = 0.0
     avg_tokens_per_second: float = 0.0
     avg_latency_ms: float = 0.0
+    # $inc-ed by the session_stats task; the averages are derived from them
+    exchanges: int = 0
+    tokens_per_second_sum: float = 0.0
+    latency_ms_sum: float = 0.0
+    
+    @model_validator(mode="after")
+    def _derive_averages(self) -> "SessionStats":
+        if self.exchanges > 0:
+            self.avg_tokens_per_second = round(self.tokens_per_second_sum / self.exchanges, 1)
+            self.avg_latency_ms = round(self.latency_ms_sum / self.exchanges, 0)
+        return self
 
 
 class ChatSession(BaseModel):
@@ -186,7 +227,8 @@ class ChatSession(BaseModel):
     model: str = Field(default_factory=lambda: settings.llm_model)
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: datetime = Field(default_factory=datetime.now)
-    messages: List[Message] = Field(default_factory=list)
+    messages: List[Message] = Field(default_factory=list)  # Latest page only, see messages_before
+    messages_before: Optional[int] = None  # Cursor for older messages, None if all are loaded
     stats: SessionStats = Field(default_factory=SessionStats)
     is_pinned: bool = False
     profile: Optional[str] = None
@@ -232,6 +274,8 @@ class SendMessageRequest(BaseModel):
     match_count: int = 10
     include_sources: bool = True
     attachments: Optional[List[AttachmentInfo]] = None  # File attachments for multimodal
+    debug_timings: bool = False  # Return per-stage timings with the response
+    stream: bool = False  # Stream the answer as Server-Sent Events
 
 
 class CreateFolderRequest(BaseModel):
@@ -252,14 +296,25 @@ class ModelInfo(BaseModel):
 
 class SessionListResponse(BaseModel):
     sessions: List[ChatSession]
-    folders: List[Folder]
+    folders: List[Folder]  # First page only
+    cursor: Optional[str] = None  # Pass as ?cursor= for the next page, None on the last
+
+
+class MessagePage(BaseModel):
+    messages: List[Message]
+    before: Optional[int] = None  # Pass as ?before= for the next older page
 
 
 # ============== Database Helpers ==============
 
 async def get_sessions_collection(request: Request):
     """Get chat sessions collection."""
-    return request.app.state.db.db["chat_sessions"]
+    return request.app.state.db.db[SESSIONS_COLLECTION]
+
+
+async def get_message_store(request: Request) -> MessageStore:
+    """Get the message store of the current database."""
+    return await message_store_for(request.app.state.db.db)
 
 
 async def get_folders_collection(request: Request):
@@ -267,6 +322,15 @@ async def get_folders_collection(request: Request):
     return request.app.state.db.db["chat_folders"]
 
 
+async def _list_folders(folders_collection, user_id: Optional[str]) -> List[Folder]:
+    folders = []
+    async for doc in folders_collection.find({"user_id": user_id}).sort("created_at", 1):
+        doc["id"] = str(doc["_id"])
+        del doc["_id"]
+        folders.append(Folder(**doc))
+    return folders
+
+
 # ============== Folder Endpoints ==============
 
 @router.get("/folders")
@@ -277,19 +341,8 @@ async def list_folders(
     """List all folders for the current user."""
     collection = await get_folders_collection(request)
     
-    # Filter by user if authenticated
-    query = {}
-    if user:
-        query["user_id"] = user.id
-    else:
-        query["user_id"] = None  # Only show folders without owner if not logged in
-    
-    folders = []
-    async for doc in collection.find(query).sort("created_at", 1):
-        doc["id"] = str(doc["_id"])
-        del doc["_id"]
-        folders.append(Folder(**doc))
-    return {"folders": folders}
+    # Filter by user; folders without owner are shown when not logged in
+    return {"folders": await _list_folders(collection, user.id if user else None)}
 
 
 @router.post("/folders")
@@ -375,49 +428,91 @@ async def delete_folder(
 
 # ============== Session Endpoints ==============
 
+def _encode_session_cursor(doc: Dict[str, Any]) -> str:
+    return f"{doc['updated_at'].isoformat()}|{doc['_id']}"
+
+
+def _decode_session_cursor(cursor: str) -> Dict[str, Any]:
+    """Keyset filter for sessions after the cursor in (updated_at, _id) descending order."""
+    try:
+        updated_at, session_id = cursor.split("|", 1)
+        updated_at = datetime.fromisoformat(updated_at)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {
+        "$or": [
+            {"updated_at": {"$lt": updated_at}},
+            {"updated_at": updated_at, "_id": {"$lt": session_id}},
+        ]
+    }
+
+
+async def _migrated_message_seq(sessions_collection, store: MessageStore, session_id: str) -> int:
+    """
+    Migrate a legacy session's embedded messages and return its message_seq.
+
+    The seq is read back from the session: migrate_session returns 0 when a
+    concurrent request migrated the session first.
+    """
+    await store.migrate_session(session_id)
+    doc = await sessions_collection.find_one({"_id": session_id}, {"message_seq": 1})
+    return (doc or {}).get("message_seq", 0)
+
+
+async def _list_session_page(sessions_collection, query: Dict[str, Any], limit: int) -> List[Dict[str, Any]]:
+    cursor = sessions_collection.find(query, SESSION_SUMMARY_PROJECTION).sort(
+        [("updated_at", -1), ("_id", -1)]
+    ).limit(limit + 1)
+    return [doc async for doc in cursor]
+
+
 @router.get("")
 @router.get("/")
 async def list_sessions(
     request: Request,
     folder_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = SESSIONS_PAGE_SIZE,
     user: Optional[UserResponse] = Depends(get_current_user)
 ):
-    """List all chat sessions for the current user, optionally filtered by folder."""
+    """
+    List chat sessions for the current user, newest first, optionally filtered by folder.
+    
+    Returns one page of session summaries (no messages). Folders are included
+    with the first page; pass the returned cursor to get the next page.
+    """
     sessions_collection = await get_sessions_collection(request)
     folders_collection = await get_folders_collection(request)
+    # Creates the (user_id, updated_at) list indexes on first use
+    await get_message_store(request)
     
-    # Get sessions - filter by user
-    query = {}
-    if user:
-        query["user_id"] = user.id
-    else:
-        query["user_id"] = None  # Only show sessions without owner if not logged in
+    limit = max(1, min(limit, 200))
     
+    # Filter by user; sessions without owner are shown when not logged in
+    user_id = user.id if user else None
+    query: Dict[str, Any] = {"user_id": user_id}
     if folder_id is not None:
         query["folder_id"] = folder_id if folder_id != "none" else None
+    if cursor:
+        query.update(_decode_session_cursor(cursor))
     
-    sessions = []
-    async for doc in sessions_collection.find(query).sort("updated_at", -1):
-        doc["id"] = str(doc["_id"])
-        del doc["_id"]
-        # Don't return full messages in list view
-        doc["messages"] = []
-        sessions.append(ChatSession(**doc))
-    
-    # Get folders - filter by user
-    folder_query = {}
-    if user:
-        folder_query["user_id"] = user.id
+    if cursor:
+        docs, folders = await _list_session_page(sessions_collection, query, limit), []
     else:
-        folder_query["user_id"] = None
+        # Sessions and folders are two queries; run them concurrently
+        docs, folders = await asyncio.gather(
+            _list_session_page(sessions_collection, query, limit),
+            _list_folders(folders_collection, user_id)
+        )
     
-    folders = []
-    async for doc in folders_collection.find(folder_query).sort("created_at", 1):
-        doc["id"] = str(doc["_id"])
-        del doc["_id"]
-        folders.append(Folder(**doc))
+    next_cursor = _encode_session_cursor(docs[limit - 1]) if len(docs) > limit else None
     
-    return SessionListResponse(sessions=sessions, folders=folders)
+    sessions = []
+    for doc in docs[:limit]:
+        doc["id"] = str(doc.pop("_id"))
+        sessions.append(ChatSession(**doc))
+    
+    return SessionListResponse(sessions=sessions, folders=folders, cursor=next_cursor)
 
 
 @router.post("")
@@ -446,8 +541,9 @@ async def create_session(
         profile=profile
     )
     
-    doc = session.model_dump()
+    doc = session.model_dump(exclude={"messages", "messages_before"})
     doc["_id"] = doc.pop("id")
+    doc["message_seq"] = 0  # Messages are kept in the message store
     
     await collection.insert_one(doc)
     return session
@@ -459,18 +555,27 @@ async def get_session(
     session_id: str,
     user: Optional[UserResponse] = Depends(get_current_user)
 ):
-    """Get a chat session with full message history."""
+    """
+    Get a chat session with its latest messages.
+    
+    Older messages are paged with GET /{session_id}/messages?before=<messages_before>.
+    """
     collection = await get_sessions_collection(request)
+    store = await get_message_store(request)
     
     # Check ownership
     query = {"_id": session_id}
     if user:
         query["user_id"] = user.id
     
-    doc = await collection.find_one(query)
+    doc = await collection.find_one(query, {"messages": 0})
     if not doc:
         raise HTTPException(status_code=404, detail="Session not found")
     
+    if "message_seq" not in doc:
+        await store.migrate_session(session_id)
+    
+    doc["messages"], doc["messages_before"] = await store.page(session_id, limit=MESSAGES_PAGE_SIZE)
     doc["id"] = str(doc["_id"])
     del doc["_id"]
     
@@ -512,8 +617,9 @@ async def delete_session(
     session_id: str,
     user: Optional[UserResponse] = Depends(get_current_user)
 ):
-    """Delete a chat session."""
+    """Delete a chat session and its messages."""
     collection = await get_sessions_collection(request)
+    store = await get_message_store(request)
     
     # Check ownership
     query = {"_id": session_id}
@@ -525,11 +631,45 @@ async def delete_session(
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Session not found")
     
+    await store.clear(session_id)
     return {"success": True}
 
 
 # ============== Message Endpoints ==============
 
+@router.get("/{session_id}/messages", response_model=MessagePage)
+async def list_messages(
+    request: Request,
+    session_id: str,
+    before: Optional[int] = None,
+    limit: int = MESSAGES_PAGE_SIZE,
+    user: Optional[UserResponse] = Depends(get_current_user)
+):
+    """
+    Page backwards through a session's messages.
+    
+    Returns up to `limit` messages preceding seq `before` (the latest ones
+    when omitted), oldest first, and the cursor for the next older page.
+    """
+    collection = await get_sessions_collection(request)
+    store = await get_message_store(request)
+    
+    # Check ownership
+    query = {"_id": session_id}
+    if user:
+        query["user_id"] = user.id
+    
+    doc = await collection.find_one(query, {"message_seq": 1})
+    if not doc:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    if "message_seq" not in doc:
+        await store.migrate_session(session_id)
+    
+    messages, next_before = await store.page(session_id, before, max(1, min(limit, 200)))
+    return MessagePage(messages=messages, before=next_before)
+
+
 @router.post("/{session_id}/messages")
 async def send_message(
     request: Request,
@@ -544,13 +684,19 @@ async def send_message(
     2. Performs semantic search on knowledge base
     3. Generates LLM response with context
     4. Updates session with messages and stats
+    
+    With stream=true the answer is sent as Server-Sent Events (sources,
+    tokens, then the stored message with usage and cost) and the session
+    is updated once the stream completes.
     """
-    from backend.routers.chat import get_embedding, perform_search
+    from backend.routers.chat import perform_search
     from backend.models.schemas import SearchType
     
     start_time = time.time()
+    timings = start_timings()
     db = request.app.state.db
     collection = await get_sessions_collection(request)
+    store = await get_message_store(request)
     
     # Log the incoming request
     logger.info(
@@ -564,7 +710,10 @@ async def send_message(
         query["user_id"] = user.id
     
     try:
-        doc = await collection.find_one(query)
+        # Messages are read from the message store, never with the session
+        doc = await collection.find_one(query, {"messages": 0})
+        if doc and "message_seq" not in doc:
+            doc["message_seq"] = await _migrated_message_seq(collection, store, session_id)
     except Exception as e:
         logger.error(
             f"Database error finding session: session_id={session_id}, "
@@ -623,12 +772,25 @@ async def send_message(
         search_results = []
         logger.warning(f"Continuing without search results for session {session_id}")
     
-    # Build context
-    context_parts = []
+    # Build messages for LLM
+    try:
+        history = await store.tail(session_id, CONTEXT_HISTORY_MESSAGES)
+    except Exception as e:
+        logger.error(
+            f"Failed to load message history: session_id={session_id}, "
+            f"error={type(e).__name__}: {str(e)}"
+        )
+        history = []
+    
+    # Fit the best chunks and the recent history into the model's token budget
+    assembled = assemble_context(
+        session_model, msg_request.content, search_results, history, MAX_OUTPUT_TOKENS, kind="session"
+    )
+    context = assembled.context
+    
     sources = []
-    for result in search_results:
-        context_parts.append(f"[Source: {result['document_title']}]\n{result['content']}")
-        if msg_request.include_sources:
+    if msg_request.include_sources:
+        for result in assembled.results:
             sources.append({
                 "title": result["document_title"],
                 "source": result["document_source"],
@@ -636,10 +798,6 @@ async def send_message(
                 "excerpt": result["content"][:200] + "..." if len(result["content"]) > 200 else result["content"]
             })
     
-    context = "\n\n---\n\n".join(context_parts) if context_parts else "No relevant documents found."
-    
-    # Build messages for LLM
-    messages = doc.get("messages", [])
     llm_messages = [
         {
             "role": "system",
@@ -655,8 +813,8 @@ Just answer the question directly using the information from the context."""
         }
     ]
     
-    # Add conversation history (last 20 messages)
-    for msg in messages[-20:]:
+    # Add conversation history (the recent messages that fit the budget)
+    for msg in assembled.history:
         llm_messages.append({"role": msg["role"], "content": msg["content"]})
     
     llm_messages.append({"role": "user", "content": msg_request.content})
@@ -681,42 +839,98 @@ Just answer the question directly using the information from the context."""
         if len(multimodal_content) > 1:  # Has at least one image
             llm_messages[-1] = {"role": "user", "content": multimodal_content}
     
+    llm_params = {
+        "temperature": 0.7,
+        "max_tokens": MAX_OUTPUT_TOKENS,  # LiteLLM translates this to max_completion_tokens if needed
+        "api_key": settings.llm_api_key,
+        "api_base": settings.llm_base_url if settings.llm_base_url else None,
+    }
+    
     # Generate response with comprehensive error handling
     generation_start = time.time()
     
+    if msg_request.stream:
+        try:
+            # Opened before responding so provider errors still map to HTTP errors
+            stream = await open_completion_stream(session_model, llm_messages, **llm_params)
+        except Exception as e:
+            raise _llm_http_error(e, session_id, session_model)
+        
+        return StreamingResponse(
+            _stream_message(
+                store, doc, history, session_id, session_model, msg_request,
+                user_message, sources, stream, start_time, timings,
+                context_tokens_saved=assembled.tokens_saved
+            ),
+            media_type="text/event-stream",
+            headers=SSE_HEADERS
+        )
+    
     try:
         # Use LiteLLM for unified LLM interface - handles model-specific parameters automatically
         import litellm
         
         # LiteLLM automatically handles max_tokens vs max_completion_tokens based on model
-        response = await litellm.acompletion(
-            model=session_model,
-            messages=llm_messages,
-            temperature=0.7,
-            max_tokens=4000,  # LiteLLM translates this to max_completion_tokens if needed
-            api_key=settings.llm_api_key,
-            api_base=settings.llm_base_url if settings.llm_base_url else None,
-        )
-        
-    except litellm.RateLimitError as e:
+        with observe_call(LLM_REQUESTS, LLM_SECONDS, model=session_model):
+            response = await litellm.acompletion(
+                model=session_model,
+                messages=llm_messages,
+                **llm_params
+            )
+    except Exception as e:
+        raise _llm_http_error(e, session_id, session_model)
+    
+    generation_time = time.time() - generation_start
+    
+    # Extract token info
+    usage = response.usage
+    record_usage(usage, model=session_model)
+    token_counts = {
+        "input_tokens": usage.prompt_tokens if usage else 0,
+        "output_tokens": usage.completion_tokens if usage else 0,
+        "total_tokens": usage.total_tokens if usage else 0,
+    }
+    
+    assistant_message, new_stats = await _complete_exchange(
+        store, doc, history, session_id, session_model, msg_request, user_message,
+        response.choices[0].message.content, sources, token_counts,
+        generation_time, start_time, timings,
+        context_tokens_saved=assembled.tokens_saved
+    )
+    
+    response_body = {
+        "user_message": user_message,
+        "assistant_message": assistant_message,
+        "session_stats": SessionStats(**new_stats)
+    }
+    if msg_request.debug_timings:
+        response_body["timings"] = timings.as_dict()
+    return response_body
+
+
+def _llm_http_error(e: Exception, session_id: str, session_model: str) -> HTTPException:
+    """Log an LLM failure and map it to the HTTP error shown to the user."""
+    import litellm
+    
+    if isinstance(e, litellm.RateLimitError):
         logger.error(
             f"LLM rate limit exceeded: session={session_id}, model={session_model}, "
             f"error={str(e)}\n{traceback.format_exc()}"
         )
-        raise HTTPException(
+        return HTTPException(
             status_code=429,
             detail="The AI service is currently busy. Please wait a moment and try again."
         )
-    except litellm.APIConnectionError as e:
+    if isinstance(e, litellm.APIConnectionError):
         logger.error(
             f"LLM connection failed: session={session_id}, model={session_model}, "
             f"base_url={settings.llm_base_url}, error={str(e)}\n{traceback.format_exc()}"
         )
-        raise HTTPException(
+        return HTTPException(
             status_code=503,
             detail="Unable to connect to the AI service. Please try again later."
         )
-    except litellm.APIError as e:
+    if isinstance(e, litellm.APIError):
         logger.error(
             f"LLM API error: session={session_id}, model={session_model}, "
             f"status_code={getattr(e, 'status_code', 'unknown')}, "
@@ -734,25 +948,143 @@ Just answer the question directly using the information from the context."""
         else:
             detail = "An error occurred while generating the response. Please try again."
         
-        raise HTTPException(status_code=503, detail=detail)
+        return HTTPException(status_code=503, detail=detail)
+    
+    logger.error(
+        f"Unexpected LLM error: session={session_id}, model={session_model}, "
+        f"error_type={type(e).__name__}, error={str(e)}\n{traceback.format_exc()}"
+    )
+    return HTTPException(
+        status_code=500,
+        detail="An unexpected error occurred while generating the response. Please try again."
+    )
+
+
+async def _stream_message(
+    store: MessageStore,
+    doc: Dict[str, Any],
+    history: List[Dict[str, Any]],
+    session_id: str,
+    session_model: str,
+    msg_request: SendMessageRequest,
+    user_message: Message,
+    sources: List[Dict[str, Any]],
+    stream: CompletionStream,
+    start_time: float,
+    timings: StageTimings,
+    context_tokens_saved: int = 0
+):
+    """
+    SSE events for a streamed answer.
+    
+    "sources" goes out before the first token, "token" events follow as the
+    model produces them, and "done" carries the persisted assistant message
+    with usage, cost and time to first token. The session is only written
+    once the stream has completed.
+    """
+    yield sse_event(
+        "sources",
+        user_message=user_message.model_dump(mode="json"),
+        sources=sources or None
+    )
+    
+    try:
+        async for token in stream.tokens():
+            yield sse_event("token", content=token)
     except Exception as e:
         logger.error(
-            f"Unexpected LLM error: session={session_id}, model={session_model}, "
+            f"LLM stream failed: session={session_id}, model={session_model}, "
             f"error_type={type(e).__name__}, error={str(e)}\n{traceback.format_exc()}"
         )
-        raise HTTPException(
-            status_code=500,
-            detail="An unexpected error occurred while generating the response. Please try again."
-        )
+        yield sse_event("error", error="The response stream was interrupted. Please try again.")
+        return
+    
+    assistant_message, new_stats = await _complete_exchange(
+        store, doc, history, session_id, session_model, msg_request, user_message,
+        stream.text, sources, stream.token_counts(),
+        stream.duration_seconds, start_time, timings,
+        first_token_seconds=stream.first_token_seconds,
+        context_tokens_saved=context_tokens_saved
+    )
+    
+    done = {
+        "assistant_message": assistant_message.model_dump(mode="json"),
+        "session_stats": new_stats,
+    }
+    if msg_request.debug_timings:
+        done["timings"] = timings.as_dict()
+    yield sse_event("done", **done)
+
+
+def _seeded_stats(stats: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Session stats with rollup sums.
+    
+    Stats written before the session_stats task only have averages; sums
+    that reproduce them are derived so further exchanges can be $inc-ed.
+    """
+    stats = dict(stats)
+    if "exchanges" not in stats:
+        exchanges = stats.get("total_messages", 0) // 2
+        stats["exchanges"] = exchanges
+        stats["tokens_per_second_sum"] = stats.get("avg_tokens_per_second", 0) * exchanges
+        stats["latency_ms_sum"] = stats.get("avg_latency_ms", 0) * exchanges
+    return stats
+
+
+async def _enqueue_followups(
+    db,
+    doc: Dict[str, Any],
+    session_id: str,
+    session_model: str,
+    increments: Dict[str, Any],
+    title_conversation: Optional[List[str]]
+) -> None:
+    """Queue the work that does not need to delay the response."""
+    queue = get_task_queue()
+    await queue.enqueue("session_stats", db, {"session_id": session_id, "increments": increments})
+    await queue.enqueue("usage_rollup", db, {
+        "user_id": doc.get("user_id"),
+        "model": session_model,
+        "day": datetime.now().strftime("%Y-%m-%d"),
+        "input_tokens": increments["total_input_tokens"],
+        "output_tokens": increments["total_output_tokens"],
+        "cost_usd": increments["total_cost_usd"],
+    })
+    if title_conversation:
+        await queue.enqueue("session_title", db, {
+            "session_id": session_id,
+            "model": session_model,
+            "conversation": title_conversation,
+        })
+
+
+async def _complete_exchange(
+    store: MessageStore,
+    doc: Dict[str, Any],
+    history: List[Dict[str, Any]],
+    session_id: str,
+    session_model: str,
+    msg_request: SendMessageRequest,
+    user_message: Message,
+    content: str,
+    sources: List[Dict[str, Any]],
+    token_counts: Dict[str, int],
+    generation_time: float,
+    start_time: float,
+    timings: StageTimings,
+    first_token_seconds: Optional[float] = None,
+    context_tokens_saved: int = 0
+):
+    """Compute stats, update the title, append both messages and record latency."""
+    from backend.routers.indexes import record_search_latency
     
-    generation_time = time.time() - generation_start
     total_time = time.time() - start_time
+    timings.record("llm_total", generation_time * 1000)
     
-    # Extract token info
-    usage = response.usage
-    input_tokens = usage.prompt_tokens if usage else 0
-    output_tokens = usage.completion_tokens if usage else 0
-    total_tokens = usage.total_tokens if usage else 0
+    input_tokens = token_counts["input_tokens"]
+    output_tokens = token_counts["output_tokens"]
+    total_tokens = token_counts["total_tokens"]
     
     logger.info(
         f"LLM response generated: session={session_id}, model={session_model}, "
@@ -766,7 +1098,7 @@ Just answer the question directly using the information from the context."""
     
     assistant_message = Message(
         role="assistant",
-        content=response.choices[0].message.content,
+        content=content,
         model=session_model,
         sources=sources if sources else None,
         stats=MessageStats(
@@ -775,36 +1107,39 @@ Just answer the question directly using the information from the context."""
             total_tokens=total_tokens,
             cost_usd=cost,
             tokens_per_second=round(tokens_per_second, 1),
-            latency_ms=round(total_time * 1000, 0)
+            latency_ms=round(total_time * 1000, 0),
+            time_to_first_token_ms=(
+                round(first_token_seconds * 1000, 0) if first_token_seconds is not None else None
+            ),
+            context_tokens_saved=context_tokens_saved
         )
     )
     
-    # Update session stats
-    current_stats = doc.get("stats", {})
-    new_stats = {
-        "total_messages": current_stats.get("total_messages", 0) + 2,
-        "total_input_tokens": current_stats.get("total_input_tokens", 0) + input_tokens,
-        "total_output_tokens": current_stats.get("total_output_tokens", 0) + output_tokens,
-        "total_tokens": current_stats.get("total_tokens", 0) + total_tokens,
-        "total_cost_usd": current_stats.get("total_cost_usd", 0) + cost,
+    # Session stats are $inc-ed by a background task; the response shows them
+    # as of the session read at the start of this request plus this exchange
+    increments = {
+        "total_messages": 2,
+        "exchanges": 1,
+        "total_input_tokens": input_tokens,
+        "total_output_tokens": output_tokens,
+        "total_tokens": total_tokens,
+        "total_cost_usd": cost,
+        "tokens_per_second_sum": tokens_per_second,
+        "latency_ms_sum": total_time * 1000,
     }
+    new_stats = _seeded_stats(doc.get("stats") or {})
+    for field, amount in increments.items():
+        new_stats[field] = new_stats.get(field, 0) + amount
+    new_stats = SessionStats(**new_stats).model_dump()
     
-    # Calculate averages
-    msg_count = new_stats["total_messages"] // 2  # Number of exchanges
-    if msg_count > 0:
-        new_stats["avg_tokens_per_second"] = round(
-            (current_stats.get("avg_tokens_per_second", 0) * (msg_count - 1) + tokens_per_second) / msg_count, 1
-        )
-        new_stats["avg_latency_ms"] = round(
-            (current_stats.get("avg_latency_ms", 0) * (msg_count - 1) + total_time * 1000) / msg_count, 0
-        )
-    
-    # Auto-generate title using LLM after 3 exchanges (6 messages)
+    # Title on the first message (inline, cheap) or after 3 exchanges (LLM, in the background)
+    message_count = doc.get("message_seq", 0)
     title_update = {}
-    message_count_after_this = len(messages) + 2  # +2 for user and assistant messages being added
+    title_conversation = None
+    message_count_after_this = message_count + 2  # +2 for user and assistant messages being added
     
     # Generate title on first message (simple) or after 3 exchanges (LLM-based)
-    if len(messages) == 0:
+    if message_count == 0:
         # First message - use first few words as placeholder
         first_words = msg_request.content.split()[:6]
         title = " ".join(first_words)
@@ -812,67 +1147,31 @@ Just answer the question directly using the information from the context."""
             title = title[:40] + "..."
         title_update["title"] = title
     elif message_count_after_this == 6:  # After 3 exchanges (3 user + 3 assistant = 6)
-        # Generate a better title using LLM
-        try:
-            import litellm
-            
-            # Build conversation summary for title generation
-            conversation_summary = []
-            for msg in messages[-6:]:  # Last 6 messages
-                role = "User" if msg["role"] == "user" else "Assistant"
-                content_preview = msg["content"][:200] if len(msg["content"]) > 200 else msg["content"]
-                conversation_summary.append(f"{role}: {content_preview}")
-            conversation_summary.append(f"User: {msg_request.content[:200]}")
-            
-            title_prompt = [
-                {
-                    "role": "system",
-                    "content": "Generate a short, descriptive title (max 8 words) for this conversation. Return ONLY the title, nothing else."
-                },
-                {
-                    "role": "user",
-                    "content": "\n".join(conversation_summary)
-                }
-            ]
-            
-            title_response = await litellm.acompletion(
-                model=session_model,
-                messages=title_prompt,
-                temperature=0.7,
-                max_tokens=30,
-                api_key=settings.llm_api_key,
-                api_base=settings.llm_base_url if settings.llm_base_url else None,
-            )
-            
-            generated_title = title_response.choices[0].message.content.strip()
-            # Clean up the title - remove quotes if present, limit length
-            generated_title = generated_title.strip('"\'')
-            words = generated_title.split()[:8]  # Max 8 words
-            generated_title = " ".join(words)
-            if generated_title:
-                title_update["title"] = generated_title
-                logger.info(f"Generated title for session {session_id}: {generated_title}")
-        except Exception as e:
-            logger.warning(f"Failed to generate title for session {session_id}: {e}")
-            # Keep existing title if generation fails
-    
-    # Update session in database
+        # Build conversation summary for title generation
+        title_conversation = []
+        for msg in history[-6:]:  # Last 6 messages
+            role = "User" if msg["role"] == "user" else "Assistant"
+            title_conversation.append(f"{role}: {msg['content'][:200]}")
+        title_conversation.append(f"User: {msg_request.content[:200]}")
+    
+    # Append both messages; the session update allocates their sequence numbers
     try:
-        await collection.update_one(
-            {"_id": session_id},
+        first_seq = await store.append(
+            session_id,
+            [user_message.model_dump(), assistant_message.model_dump()],
             {
-                "$push": {
-                    "messages": {
-                        "$each": [user_message.model_dump(), assistant_message.model_dump()]
-                    }
-                },
                 "$set": {
                     "updated_at": datetime.now(),
-                    "stats": new_stats,
                     **title_update
                 }
             }
         )
+        if first_seq is not None:
+            user_message.seq = first_seq
+            assistant_message.seq = first_seq + 1
+            await _enqueue_followups(
+                store.db, doc, session_id, session_model, increments, title_conversation
+            )
         logger.debug(f"Session updated successfully: session_id={session_id}")
     except Exception as e:
         logger.error(
@@ -883,11 +1182,10 @@ Just answer the question directly using the information from the context."""
         # This avoids losing the response entirely
         logger.warning(f"Returning response despite DB update failure for session {session_id}")
     
-    return {
-        "user_message": user_message,
-        "assistant_message": assistant_message,
-        "session_stats": SessionStats(**new_stats)
-    }
+    record_search_latency(
+        total_time * 1000, msg_request.search_type, stages=timings.stages, kind="chat"
+    )
+    return assistant_message, new_stats
 
 
 @router.delete("/{session_id}/messages")
@@ -898,6 +1196,7 @@ async def clear_messages(
 ):
     """Clear all messages in a session."""
     collection = await get_sessions_collection(request)
+    store = await get_message_store(request)
     
     # Check ownership
     query = {"_id": session_id}
@@ -908,19 +1207,127 @@ async def clear_messages(
         query,
         {
             "$set": {
-                "messages": [],
+                "message_seq": 0,
                 "stats": SessionStats().model_dump(),
                 "updated_at": datetime.now()
-            }
+            },
+            "$unset": {"messages": ""}
         }
     )
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Session not found")
     
+    await store.clear(session_id)
     return {"success": True}
 
 
+# ============== Background Tasks ==============
+
+USAGE_ROLLUP_COLLECTION = "usage_rollups"
+
+# Task ids remembered per rolled-up document, so a redelivered task is not counted twice
+APPLIED_TASKS_KEPT = 500
+
+
+def _not_applied(doc_id: str, task_id: str) -> Dict[str, Any]:
+    return {"_id": doc_id, "applied_tasks": {"$ne": task_id}}
+
+
+def _mark_applied(task_id: str) -> Dict[str, Any]:
+    return {"applied_tasks": {"$each": [task_id], "$slice": -APPLIED_TASKS_KEPT}}
+
+
+@task_handler("session_stats")
+async def _roll_up_session_stats(db, payload: Dict[str, Any], task_id: str) -> None:
+    """Add one exchange to the session stats with an atomic $inc, once per task."""
+    sessions = db[SESSIONS_COLLECTION]
+    session_id = payload["session_id"]
+    inc = {f"stats.{field}": amount for field, amount in payload["increments"].items()}
+    update = {"$inc": inc, "$push": _mark_applied(task_id)}
+    
+    result = await sessions.update_one(
+        {**_not_applied(session_id, task_id), "stats.exchanges": {"$exists": True}}, update
+    )
+    if result.matched_count:
+        return
+    
+    # Already applied, deleted, or stats from before rollups
+    doc = await sessions.find_one({"_id": session_id}, {"stats": 1, "applied_tasks": 1})
+    if doc is None or task_id in doc.get("applied_tasks", []):
+        return
+    # Seed the sums once, then apply the exchange
+    stats = doc.get("stats") or {}
+    seeded = _seeded_stats(stats)
+    await sessions.update_one(
+        {"_id": session_id, "stats.exchanges": {"$exists": False}},
+        {"$set": {f"stats.{field}": seeded[field] for field in ("exchanges", "tokens_per_second_sum", "latency_ms_sum")}}
+    )
+    await sessions.update_one(_not_applied(session_id, task_id), update)
+
+
+@task_handler("usage_rollup")
+async def _roll_up_usage(db, payload: Dict[str, Any], task_id: str) -> None:
+    """Add an exchange's tokens and cost to the per-day usage of its user and model, once per task."""
+    rollups = db[USAGE_ROLLUP_COLLECTION]
+    query = _not_applied(f"{payload['day']}|{payload['user_id']}|{payload['model']}", task_id)
+    update = {
+        "$setOnInsert": {"day": payload["day"], "user_id": payload["user_id"], "model": payload["model"]},
+        "$inc": {
+            "messages": 1,
+            "input_tokens": payload["input_tokens"],
+            "output_tokens": payload["output_tokens"],
+            "cost_usd": payload["cost_usd"],
+        },
+        "$push": _mark_applied(task_id),
+    }
+    try:
+        await rollups.update_one(query, update, upsert=True)
+    except DuplicateKeyError:
+        # The day's document exists: another task created it concurrently, or
+        # it already holds this task. Apply to it; a replay matches nothing.
+        await rollups.update_one(query, update)
+
+
+@task_handler("session_title")
+async def _generate_session_title(db, payload: Dict[str, Any], task_id: str) -> None:
+    """Replace the placeholder title with an LLM-generated one."""
+    import litellm
+    
+    session_id = payload["session_id"]
+    model = payload["model"]
+    title_prompt = [
+        {
+            "role": "system",
+            "content": "Generate a short, descriptive title (max 8 words) for this conversation. Return ONLY the title, nothing else."
+        },
+        {
+            "role": "user",
+            "content": "\n".join(payload["conversation"])
+        }
+    ]
+    
+    with observe_call(LLM_REQUESTS, LLM_SECONDS, model=model):
+        title_response = await litellm.acompletion(
+            model=model,
+            messages=title_prompt,
+            temperature=0.7,
+            max_tokens=30,
+            api_key=settings.llm_api_key,
+            api_base=settings.llm_base_url if settings.llm_base_url else None,
+        )
+    record_usage(title_response.usage, model=model)
+    
+    generated_title = title_response.choices[0].message.content.strip()
+    # Clean up the title - remove quotes if present, limit length
+    generated_title = generated_title.strip('"\'')
+    words = generated_title.split()[:8]  # Max 8 words
+    generated_title = " ".join(words)
+    if generated_title:
+        await db[SESSIONS_COLLECTION].update_one({"_id": session_id}, {"$set": {"title": generated_title}})
+        logger.info(f"Generated title for session {session_id}: {generated_title}")
+
+
 # ============== Utility Endpoints ==============
 # NOTE: These endpoints use "meta/" prefix to avoid conflict with /{session_id}
 
@@ -948,6 +1355,29 @@ async def get_model_pricing_info():
     }
 
 
+@router.get("/meta/usage")
+async def get_usage(
+    request: Request,
+    days: int = 30,
+    user: Optional[UserResponse] = Depends(get_current_user)
+):
+    """Daily token usage and cost per model for the current user, from the usage rollups."""
+    collection = request.app.state.db.db[USAGE_ROLLUP_COLLECTION]
+    since = (datetime.now() - timedelta(days=max(1, min(days, 366)) - 1)).strftime("%Y-%m-%d")
+    
+    usage = []
+    async for doc in collection.find(
+        {"user_id": user.id if user else None, "day": {"$gte": since}}, {"_id": 0, "user_id": 0}
+    ).sort("day", 1):
+        usage.append(doc)
+    
+    return {
+        "days": usage,
+        "total_cost_usd": sum(d.get("cost_usd", 0) for d in usage),
+        "total_tokens": sum(d.get("input_tokens", 0) + d.get("output_tokens", 0) for d in usage),
+    }
+
+
 @router.post("/meta/estimate-tokens")
 async def estimate_tokens_endpoint(
     attachments: List[AttachmentInfo]
@@ -12,6 +12,9 @@ from backend.models.schemas import (
     HealthResponse, SystemStatsResponse, ConfigResponse
 )
 from backend.core.config import settings
+from src.clients import get_client_registry
+from backend.core.retrieval import embedding_dimension
+from src.retrieval.index_definitions import text_index_definition, vector_index_definition
 
 logger = logging.getLogger(__name__)
 
@@ -47,6 +50,10 @@ class ConfigUpdateRequest(BaseModel):
     embedding_model: Optional[str] = None
     embedding_dimension: Optional[int] = None
     default_match_count: Optional[int] = None
+    llm_base_url: Optional[str] = None
+    llm_api_key: Optional[str] = None
+    embedding_base_url: Optional[str] = None
+    embedding_api_key: Optional[str] = None
 
 
 # Collection name for persisted config
@@ -239,20 +246,11 @@ async def create_search_indexes(request: Request):
                 results["warning"] = "No documents found in chunks collection"
             
             # Vector Search Index
-            vector_index_def = {
-                "name": settings.mongodb_vector_index,
-                "type": "vectorSearch",
-                "definition": {
-                    "fields": [
-                        {
-                            "type": "vector",
-                            "path": "embedding",
-                            "numDimensions": settings.embedding_dimension,
-                            "similarity": "cosine"
-                        }
-                    ]
-                }
-            }
+            vector_index_def = vector_index_definition(
+                settings.mongodb_vector_index, embedding_dimension(),
+                storage_format=settings.embedding_storage_format,
+                quantization=settings.vector_quantization
+            )
             
             try:
                 # Drop existing index if exists
@@ -272,7 +270,7 @@ async def create_search_indexes(request: Request):
                 results["vector_index"] = {
                     "name": settings.mongodb_vector_index,
                     "status": "created",
-                    "dimensions": settings.embedding_dimension
+                    "dimensions": embedding_dimension()
                 }
                 logger.info(f"Created vector index: {settings.mongodb_vector_index}")
             except Exception as e:
@@ -281,20 +279,7 @@ async def create_search_indexes(request: Request):
                 logger.error(error_msg)
             
             # Text Search Index
-            text_index_def = {
-                "name": settings.mongodb_text_index,
-                "definition": {
-                    "mappings": {
-                        "dynamic": False,
-                        "fields": {
-                            "content": {
-                                "type": "string",
-                                "analyzer": "lucene.standard"
-                            }
-                        }
-                    }
-                }
-            }
+            text_index_def = text_index_definition(settings.mongodb_text_index)
             
             try:
                 # Drop existing index if exists
@@ -338,6 +323,31 @@ async def create_search_indexes(request: Request):
     return await loop.run_in_executor(get_db_executor(), create_indexes_sync)
 
 
+@router.get("/caches")
+async def get_cache_stats():
+    """
+    Get cache statistics.
+    
+    Returns hit/miss counters and memory usage for the in-process caches,
+    plus batch size metrics for the query embedding coalescer.
+    """
+    from src.retrieval.capabilities import get_hybrid_mode
+    from src.retrieval.document_metadata import get_document_metadata_cache
+    from src.retrieval.embedding_batcher import get_embedding_batcher
+    from src.retrieval.embedding_cache import get_embedding_cache
+    from src.retrieval.result_cache import get_search_result_cache
+    
+    batcher = get_embedding_batcher()
+    
+    return {
+        "embedding_cache": get_embedding_cache().stats(),
+        "embedding_batcher": batcher.stats() if batcher else None,
+        "document_metadata": get_document_metadata_cache().stats(),
+        "search_results": get_search_result_cache().stats(),
+        "hybrid_mode": get_hybrid_mode()
+    }
+
+
 @router.get("/info")
 async def get_info():
     """Get API information."""
@@ -703,9 +713,34 @@ async def update_config(update: ConfigUpdateRequest):
         settings.default_match_count = update.default_match_count
         updated["default_match_count"] = update.default_match_count
     
+    if update.llm_base_url is not None:
+        settings.llm_base_url = update.llm_base_url
+        updated["llm_base_url"] = update.llm_base_url
+    
+    if update.embedding_base_url is not None:
+        settings.embedding_base_url = update.embedding_base_url
+        updated["embedding_base_url"] = update.embedding_base_url
+    
+    # Keys are applied but never echoed back
+    if update.llm_api_key is not None:
+        settings.llm_api_key = update.llm_api_key
+        updated["llm_api_key"] = "***"
+    
+    if update.embedding_api_key is not None:
+        settings.embedding_api_key = update.embedding_api_key
+        updated["embedding_api_key"] = "***"
+    
     if not updated:
         return {"success": False, "message": "No fields to update"}
     
+    # Rebuild pooled provider clients if the endpoint or key changed
+    await get_client_registry().reconfigure(
+        embedding_api_key=update.embedding_api_key,
+        embedding_base_url=update.embedding_base_url,
+        llm_api_key=update.llm_api_key,
+        llm_base_url=update.llm_base_url
+    )
+    
     logger.info(f"Configuration updated (runtime): {updated}")
     
     return {
@@ -717,6 +752,8 @@ async def update_config(update: ConfigUpdateRequest):
             "embedding_model": settings.embedding_model,
             "embedding_dimension": settings.embedding_dimension,
             "default_match_count": settings.default_match_count,
+            "llm_base_url": settings.llm_base_url,
+            "embedding_base_url": settings.embedding_base_url,
         }
     }
 
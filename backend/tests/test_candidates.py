@@ -0,0 +1,116 @@
+"""
+Unit tests for adaptive numCandidates.
+
+Tests candidate sizing, planner decisions and recall calibration.
+"""
+
+from src.retrieval.candidates import (
+    CandidatePlanner, calibrate_multiplier, compute_num_candidates, multiplier_for_recall
+)
+from src.retrieval.engine import RetrievalEngine
+
+
+class FakeDatabase:
+    def __init__(self, calibration=None):
+        self.calibration = calibration
+
+    def __getitem__(self, name):
+        return self
+
+    async def find_one(self, query, projection=None):
+        return self.calibration
+
+
+class FakeChunks:
+    """Chunks collection with a size and an optional calibration record."""
+
+    name = "chunks"
+    full_name = "rag_db.chunks"
+
+    def __init__(self, size, calibration=None):
+        self.size = size
+        self.count_calls = 0
+        self.database = FakeDatabase(calibration)
+
+    async def estimated_document_count(self):
+        self.count_calls += 1
+        return self.size
+
+
+class TestComputeNumCandidates:
+    """Test candidate sizing."""
+
+    def test_scales_with_limit_and_is_capped(self):
+        assert compute_num_candidates(10, 10) == 100
+        assert compute_num_candidates(100, 10, corpus_size=500) == 500
+        assert compute_num_candidates(5000, 10) == 10000
+
+    def test_never_below_limit(self):
+        assert compute_num_candidates(50, 1, corpus_size=20) == 50
+
+    def test_recall_target_raises_multiplier(self):
+        assert multiplier_for_recall(0.99) > multiplier_for_recall(0.9)
+
+
+class TestCandidatePlanner:
+    """Test planner decisions."""
+
+    async def test_corpus_size_is_cached(self):
+        planner = CandidatePlanner(multiplier=10)
+        chunks = FakeChunks(size=50)
+
+        assert await planner.plan(chunks, 10) == (50, False)
+        await planner.plan(chunks, 10)
+        assert chunks.count_calls == 1
+
+    async def test_calibration_overrides_default(self):
+        planner = CandidatePlanner(multiplier=10)
+        chunks = FakeChunks(size=100000, calibration={"multiplier": 3})
+        assert await planner.plan(chunks, 10) == (30, False)
+
+    async def test_small_corpus_uses_exact_search(self):
+        planner = CandidatePlanner(exact_threshold=1000)
+        assert await planner.plan(FakeChunks(size=200), 10) == (10, True)
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+
+class RecallCollection:
+    """Approximate search finds more of the exact top-k as numCandidates grows."""
+
+    name = "chunks"
+
+    def aggregate(self, pipeline):
+        stage = pipeline[0]["$vectorSearch"]
+        limit = stage["limit"]
+        if stage.get("exact"):
+            ids = range(limit)
+        else:
+            found = min(limit, stage["numCandidates"] // 10)
+            ids = list(range(found)) + [f"miss{i}" for i in range(limit - found)]
+        return FakeCursor([{"chunk_id": i} for i in ids])
+
+
+async def test_calibration_picks_smallest_multiplier_meeting_target():
+    engine = RetrievalEngine(
+        chunks_collection=RecallCollection(),
+        documents_collection=RecallCollection(),
+        embed=None,
+    )
+
+    record = await calibrate_multiplier(
+        engine, [[0.1], [0.2]], k=10, recall_target=0.8, multipliers=[2, 8, 10, 20]
+    )
+
+    assert record["multiplier"] == 8
+    assert record["recall_by_multiplier"] == {"2": 0.2, "8": 0.8}
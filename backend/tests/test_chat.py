@@ -117,3 +117,71 @@ class TestChatValidation:
         })
         # Should return validation error
         assert response.status_code in [200, 422, 500]
+
+
+def _chunk(content=None, usage=None):
+    from types import SimpleNamespace
+    choices = [] if content is None else [SimpleNamespace(delta=SimpleNamespace(content=content))]
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+async def _chunks(*items):
+    for item in items:
+        yield item
+
+
+class TestChatStreaming:
+    """Test SSE token streaming."""
+
+    def test_stream_sends_sources_tokens_then_done(self, client: TestClient):
+        import asyncio
+        import json
+        import time
+        from types import SimpleNamespace
+        from backend.core.llm import CompletionStream
+        from backend.core.conversations import get_conversation_store
+
+        usage = SimpleNamespace(prompt_tokens=12, completion_tokens=2, total_tokens=14)
+        stream = CompletionStream(
+            _chunks(_chunk("Hel"), _chunk("lo"), _chunk(usage=usage)), "test-model", [], time.perf_counter()
+        )
+        with patch("backend.routers.chat.perform_search", AsyncMock(return_value=[])), \
+                patch("backend.routers.chat.open_completion_stream", AsyncMock(return_value=stream)):
+            response = client.post("/api/v1/chat", json={
+                "message": "Hi", "stream": True, "conversation_id": "stream_conv"
+            })
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = [
+            json.loads(line[len("data: "):])
+            for line in response.text.split("\n\n") if line.startswith("data: ")
+        ]
+        assert [e["type"] for e in events] == ["sources", "token", "token", "done"]
+        assert "".join(e["content"] for e in events if e["type"] == "token") == "Hello"
+        assert events[-1]["tokens_used"] == 14
+        assert events[-1]["time_to_first_token_ms"] is not None
+        store = get_conversation_store()
+        assert asyncio.run(store.get("stream_conv"))[-1] == {"role": "assistant", "content": "Hello"}
+        asyncio.run(store.delete("stream_conv"))
+
+
+async def test_completion_stream_marks_first_token_and_estimates_usage():
+    import time
+    from backend.core.llm import CompletionStream
+    from src.retrieval.timings import start_timings
+
+    timings = start_timings()
+    stream = CompletionStream(
+        _chunks(_chunk(""), _chunk("abcd" * 10)), "test-model",
+        [{"role": "user", "content": "x" * 40}], time.perf_counter()
+    )
+    tokens = [token async for token in stream.tokens()]
+    counts = stream.token_counts()
+
+    assert tokens == ["abcd" * 10]
+    assert "llm_first_token" in timings.stages
+    assert stream.first_token_seconds is not None
+    # No usage chunk from the provider: counts are estimated
+    assert counts["input_tokens"] > 0 and counts["output_tokens"] > 0
+    assert counts["total_tokens"] == counts["input_tokens"] + counts["output_tokens"]
@@ -0,0 +1,96 @@
+"""
+Unit tests for denormalized chunk fields.
+
+Tests field construction, rename propagation and the backfill migration.
+"""
+
+from pymongo import UpdateMany
+
+from src.retrieval.chunk_fields import (
+    backfill_chunk_fields, denormalized_fields, file_type_for, propagate_document_fields
+)
+
+
+class FakeResult:
+    def __init__(self, modified_count):
+        self.modified_count = modified_count
+
+
+class FakeDocuments:
+    """Documents collection stub supporting find()."""
+
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query, projection=None):
+        return FakeCursor(self.docs)
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def limit(self, n):
+        return FakeCursor(self.docs[:n])
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+
+class FakeChunks:
+    """Chunks collection stub recording writes."""
+
+    def __init__(self):
+        self.bulk_batches = []
+        self.updates = []
+
+    async def bulk_write(self, operations, ordered=True):
+        self.bulk_batches.append(list(operations))
+        return FakeResult(len(operations) * 2)
+
+    async def update_many(self, query, update):
+        self.updates.append((query, update))
+        return FakeResult(3)
+
+
+class TestChunkFields:
+    """Test denormalized field helpers."""
+
+    def test_file_type_from_source(self):
+        assert file_type_for("reports/Q1.PDF") == "pdf"
+        assert file_type_for("README") == "unknown"
+
+    def test_denormalized_fields(self):
+        assert denormalized_fields("Title", "a/b.md") == {
+            "document_title": "Title",
+            "document_source": "a/b.md",
+            "file_type": "md",
+        }
+
+    async def test_rename_only_touches_denormalized_chunks(self):
+        chunks = FakeChunks()
+        modified = await propagate_document_fields(chunks, "doc", "New", "new.txt")
+
+        query, update = chunks.updates[0]
+        assert modified == 3
+        assert query == {"document_id": "doc", "document_title": {"$exists": True}}
+        assert update["$set"]["file_type"] == "txt"
+
+    async def test_backfill_batches_per_document_updates(self):
+        documents = FakeDocuments([
+            {"_id": i, "title": f"T{i}", "source": f"s{i}.md"} for i in range(5)
+        ])
+        chunks = FakeChunks()
+
+        stats = await backfill_chunk_fields(documents, chunks, batch_size=2)
+
+        assert stats == {"documents": 5, "chunks_modified": 10}
+        assert [len(batch) for batch in chunks.bulk_batches] == [2, 2, 1]
+        assert chunks.bulk_batches[0][0] == UpdateMany(
+            {"document_id": 0, "document_title": {"$exists": False}},
+            {"$set": denormalized_fields("T0", "s0.md")}
+        )
@@ -0,0 +1,64 @@
+"""
+Unit tests for the pooled provider client registry.
+
+Tests client reuse, pool configuration and rebuild on provider changes.
+"""
+
+from src.clients import ClientRegistry
+
+
+def _registry(**kwargs):
+    return ClientRegistry(
+        embedding_api_key="key",
+        embedding_base_url="https://embeddings.example/v1",
+        llm_api_key="key",
+        llm_base_url="https://llm.example/v1",
+        **kwargs
+    )
+
+
+class TestClientRegistry:
+    """Test pooled client lifecycle."""
+
+    async def test_embedding_client_is_reused(self):
+        registry = _registry()
+        assert registry.embedding_client is registry.embedding_client
+        await registry.aclose()
+
+    def test_pool_settings_are_reported(self):
+        stats = _registry(max_connections=7, max_keepalive_connections=3).stats()
+        assert stats["max_connections"] == 7
+        assert stats["max_keepalive_connections"] == 3
+        assert stats["llm_client_open"] is False
+
+    async def test_unchanged_config_does_not_rebuild(self):
+        registry = _registry()
+        client = registry.embedding_client
+        assert not await registry.reconfigure(embedding_api_key="key")
+        assert registry.embedding_client is client
+        await registry.aclose()
+
+    async def test_key_change_rebuilds_embedding_client(self):
+        registry = _registry()
+        old = registry.embedding_client
+        assert await registry.reconfigure(embedding_base_url="https://other.example/v1")
+
+        new = registry.embedding_client
+        assert new is not old
+        assert str(new.base_url).startswith("https://other.example/v1")
+        assert registry.stats()["rebuilds"] == 1
+        await registry.aclose()
+        assert old.is_closed()
+
+    async def test_llm_change_swaps_litellm_session(self):
+        import litellm
+
+        registry = _registry()
+        registry.install_litellm_session()
+        old = registry.llm_http_client
+        await registry.reconfigure(llm_api_key="new-key")
+
+        assert litellm.aclient_session is registry.llm_http_client
+        assert litellm.aclient_session is not old
+        await registry.aclose()
+        litellm.aclient_session = None
@@ -0,0 +1,107 @@
+"""
+Unit tests for token-budgeted context assembly.
+
+Tests chunk selection by score, overlap removal and history truncation.
+"""
+
+import pytest
+
+from backend.core import context as context_module
+from backend.core.context import CHUNK_SEPARATOR, _chunk_part, assemble_context, count_tokens
+
+MODEL = "test-local-model"
+TEXT = " ".join(f"sentence number {i} of the handbook." for i in range(200))
+
+
+def _result(content, similarity, document_id="d1", title="Handbook"):
+    return {
+        "content": content, "similarity": similarity, "document_id": document_id,
+        "document_title": title, "document_source": f"{title}.pdf",
+    }
+
+
+def _tokens(result):
+    return count_tokens(_chunk_part(result, result["content"]), MODEL) + count_tokens(CHUNK_SEPARATOR, MODEL)
+
+
+@pytest.fixture
+def budget(monkeypatch):
+    """Set the tokens left for chunks and history once the user message is counted."""
+    monkeypatch.setattr(context_module.settings, "context_model_window", 1_000_000)
+    monkeypatch.setattr(context_module.settings, "context_history_share", 0.3)
+
+    def set_available(tokens):
+        monkeypatch.setattr(context_module.settings, "context_max_tokens", tokens + count_tokens("question", MODEL))
+    set_available(100_000)
+    return set_available
+
+
+class TestChunkSelection:
+    """Test which chunks fit the budget."""
+
+    def test_lowest_scoring_chunks_are_dropped(self, budget):
+        results = [
+            _result(TEXT[:400], 0.9, "a", "A"),
+            _result(TEXT[1000:1400], 0.5, "b", "B"),
+            _result(TEXT[2000:2400], 0.7, "c", "C"),
+        ]
+        budget(_tokens(results[0]) + _tokens(results[2]))
+
+        assembled = assemble_context(MODEL, "question", results, [], max_output_tokens=0)
+
+        assert [r["document_title"] for r in assembled.results] == ["A", "C"]
+        assert assembled.saved["chunks"] == _tokens(results[1])
+        assert "[Source: B]" not in assembled.context
+
+    def test_chunker_overlap_is_sent_once(self, budget):
+        first, second = _result(TEXT[:600], 0.9), _result(TEXT[400:1000], 0.8)
+
+        assembled = assemble_context(MODEL, "question", [first, second], [], max_output_tokens=0)
+
+        assert len(assembled.results) == 2
+        assert assembled.context.count(TEXT[400:600].strip()) == 1
+        assert TEXT[600:1000].strip() in assembled.context
+        assert assembled.saved["overlap"] > 0
+
+    def test_duplicate_chunk_is_dropped(self, budget):
+        results = [_result(TEXT[:600], 0.9), _result(TEXT[100:500], 0.8)]
+
+        assembled = assemble_context(MODEL, "question", results, [], max_output_tokens=0)
+
+        assert len(assembled.results) == 1
+        assert assembled.saved["overlap"] == _tokens(results[1])
+
+    def test_no_results_uses_placeholder(self, budget):
+        assembled = assemble_context(MODEL, "question", [], [], max_output_tokens=0)
+        assert assembled.context == "No relevant documents found."
+        assert assembled.tokens_saved == 0
+
+
+class TestHistory:
+    """Test history truncation."""
+
+    def test_oldest_messages_are_dropped_first(self, budget):
+        history = [{"role": "user", "content": TEXT[i * 100:(i + 1) * 100]} for i in range(6)]
+        per_message = count_tokens(history[-1]["content"], MODEL) + context_module.MESSAGE_OVERHEAD_TOKENS
+        budget(per_message * 2)
+
+        assembled = assemble_context(MODEL, "question", [], history, max_output_tokens=0)
+
+        assert assembled.history == history[-len(assembled.history):]
+        assert 1 <= len(assembled.history) < len(history)
+        assert assembled.saved["history"] > 0
+
+    def test_history_gets_what_chunks_leave(self, budget):
+        history = [{"role": "user", "content": TEXT[i * 100:(i + 1) * 100]} for i in range(4)]
+        chunk = _result(TEXT[:200], 0.9)
+        history_tokens = sum(
+            count_tokens(m["content"], MODEL) + context_module.MESSAGE_OVERHEAD_TOKENS for m in history
+        )
+        # More than the history share, but exactly what the chunk leaves
+        budget(_tokens(chunk) + history_tokens)
+
+        assembled = assemble_context(MODEL, "question", [chunk], history, max_output_tokens=0)
+
+        assert assembled.results == [chunk]
+        assert assembled.history == history
+        assert assembled.tokens_saved == 0
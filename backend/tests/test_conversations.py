@@ -0,0 +1,115 @@
+"""
+Unit tests for the /chat conversation store.
+
+Tests the memory bounds, write-behind to MongoDB and read-through after a restart.
+"""
+
+import asyncio
+
+from backend.core.conversations import ConversationStore
+from backend.tests.test_message_store import FakeCollection
+
+
+def _exchange(i):
+    return [{"role": "user", "content": f"q{i}"}, {"role": "assistant", "content": f"a{i}"}]
+
+
+class TestMemoryBounds:
+    """Test the in-memory LRU."""
+
+    async def test_history_is_capped_per_conversation(self):
+        store = ConversationStore(max_messages=4)
+        for i in range(3):
+            await store.append("c1", _exchange(i))
+
+        assert [m["content"] for m in await store.get("c1")] == ["q1", "a1", "q2", "a2"]
+
+    async def test_least_recently_used_conversation_is_evicted(self):
+        store = ConversationStore(max_conversations=2)
+        await store.append("c1", _exchange(1))
+        await store.append("c2", _exchange(2))
+        await store.get("c1")
+        await store.append("c3", _exchange(3))
+
+        assert await store.get("c2") == []
+        assert await store.get("c1") != []
+        assert store.evictions == 1
+
+    async def test_expired_conversation_is_dropped(self):
+        store = ConversationStore(ttl_seconds=-1)
+        await store.append("c1", _exchange(1))
+        assert await store.get("c1") == []
+        assert await store.list() == []
+
+
+class TestWriteBehind:
+    """Test persistence through MongoDB."""
+
+    async def test_flush_pushes_capped_history(self):
+        collection = FakeCollection()
+        store = ConversationStore(max_messages=4, collection=collection)
+        await store.append("c1", _exchange(1))
+        await store.flush()
+        await store.append("c1", _exchange(2))
+        await store.append("c1", _exchange(3))
+        await store.flush()
+
+        doc = collection.docs["c1"]
+        assert [m["content"] for m in doc["messages"]] == ["q2", "a2", "q3", "a3"]
+        assert "updated_at" in doc
+        assert store._pending == {}
+
+    async def test_new_worker_reads_flushed_history(self):
+        collection = FakeCollection()
+        first = ConversationStore(collection=collection)
+        await first.append("c1", _exchange(1))
+        await first.stop()
+
+        second = ConversationStore(collection=collection)
+        assert [m["content"] for m in await second.get("c1")] == ["q1", "a1"]
+
+    async def test_evicted_conversation_keeps_unflushed_messages(self):
+        store = ConversationStore(max_conversations=1, collection=FakeCollection())
+        await store.append("c1", _exchange(1))
+        await store.append("c2", _exchange(2))
+
+        assert [m["content"] for m in await store.get("c1")] == ["q1", "a1"]
+
+    async def test_miss_during_flush_sees_the_batch_being_written(self):
+        class SlowCollection(FakeCollection):
+            async def bulk_write(self, operations, ordered=True):
+                await asyncio.sleep(0.01)
+                await super().bulk_write(operations, ordered)
+
+        store = ConversationStore(collection=SlowCollection())
+        await store.append("c1", _exchange(1))
+        flushing = asyncio.create_task(store.flush())
+        await asyncio.sleep(0)
+        store._entries.clear()
+
+        assert [m["content"] for m in await store.get("c1")] == ["q1", "a1"]
+        await flushing
+        store._entries.clear()
+        assert [m["content"] for m in await store.get("c1")] == ["q1", "a1"]
+
+    async def test_failed_flush_is_retried(self):
+        class BrokenCollection(FakeCollection):
+            async def bulk_write(self, operations, ordered=True):
+                raise ConnectionError("mongo down")
+
+        store = ConversationStore(collection=BrokenCollection())
+        await store.append("c1", _exchange(1))
+        await store.flush()
+        await store.append("c1", _exchange(2))
+
+        assert [m["content"] for m in store._pending["c1"]] == ["q1", "a1", "q2", "a2"]
+
+    async def test_delete_removes_persisted_conversation(self):
+        collection = FakeCollection()
+        store = ConversationStore(collection=collection)
+        await store.append("c1", _exchange(1))
+        await store.flush()
+        await store.delete("c1")
+
+        assert collection.docs == {}
+        assert await store.get("c1") == []
@@ -0,0 +1,79 @@
+"""
+Unit tests for the query embedding coalescer.
+
+Tests batching of concurrent callers, fan-out, timeouts and failures.
+"""
+
+import asyncio
+
+import pytest
+
+from src.retrieval.embedding_batcher import EmbeddingBatcher
+
+
+class BatchEmbedder:
+    """Batch embedding stub that records each request."""
+
+    def __init__(self, delay=0.0, fail=False):
+        self.batches = []
+        self.delay = delay
+        self.fail = fail
+
+    async def __call__(self, texts):
+        self.batches.append(list(texts))
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("provider down")
+        return [[float(len(t))] for t in texts]
+
+
+class TestEmbeddingBatcher:
+    """Test coalescing behaviour."""
+
+    async def test_concurrent_calls_share_one_request(self):
+        embed = BatchEmbedder()
+        batcher = EmbeddingBatcher(embed, window_ms=20)
+
+        results = await asyncio.gather(*[batcher.embed("x" * i) for i in range(1, 6)])
+
+        assert len(embed.batches) == 1
+        assert results == [[1.0], [2.0], [3.0], [4.0], [5.0]]
+        assert batcher.stats()["batch_sizes"] == {"5": 1}
+
+    async def test_max_batch_flushes_early(self):
+        embed = BatchEmbedder()
+        batcher = EmbeddingBatcher(embed, window_ms=10000, max_batch=2)
+
+        results = await asyncio.wait_for(
+            asyncio.gather(batcher.embed("a"), batcher.embed("bb")), timeout=1
+        )
+
+        assert results == [[1.0], [2.0]]
+        assert embed.batches == [["a", "bb"]]
+
+    async def test_duplicate_texts_are_sent_once(self):
+        embed = BatchEmbedder()
+        batcher = EmbeddingBatcher(embed, window_ms=20)
+
+        await asyncio.gather(batcher.embed("same"), batcher.embed("same"))
+
+        assert embed.batches == [["same"]]
+        assert batcher.stats()["requests"] == 2
+
+    async def test_caller_timeout(self):
+        batcher = EmbeddingBatcher(BatchEmbedder(delay=0.5), window_ms=1, timeout_seconds=0.05)
+
+        with pytest.raises(asyncio.TimeoutError):
+            await batcher.embed("slow")
+        assert batcher.stats()["timeouts"] == 1
+
+    async def test_failure_propagates_to_every_caller(self):
+        batcher = EmbeddingBatcher(BatchEmbedder(fail=True), window_ms=5)
+
+        results = await asyncio.gather(
+            batcher.embed("a"), batcher.embed("b"), return_exceptions=True
+        )
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert batcher.stats()["failures"] == 1
@@ -0,0 +1,213 @@
+"""
+Unit tests for the query embedding cache.
+
+Tests LRU/TTL/memory eviction, hit/miss accounting and the MongoDB tier.
+"""
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.retrieval.embedding_cache import EmbeddingCache, make_cache_key
+
+
+class CountingEmbedder:
+    """Embedding stub that records how often it was called."""
+
+    def __init__(self, delay=0.0):
+        self.calls = []
+        self.delay = delay
+
+    async def __call__(self, text):
+        self.calls.append(text)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return [float(len(text)), 1.0, 2.0]
+
+
+class FakePersistentCollection:
+    """Minimal async collection for the MongoDB tier."""
+
+    def __init__(self):
+        self.docs = {}
+
+    async def find_one(self, query, projection=None):
+        return self.docs.get(query["_id"])
+
+    def find(self, query, projection=None):
+        async def iterate():
+            for key in query["_id"]["$in"]:
+                if key in self.docs:
+                    yield {"_id": key, **self.docs[key]}
+        return iterate()
+
+    async def update_one(self, query, update, upsert=False):
+        self.docs[query["_id"]] = dict(update["$set"])
+
+    async def create_index(self, *args, **kwargs):
+        return "embedding_cache_ttl"
+
+
+class TestCacheKeys:
+    """Test cache key construction."""
+
+    def test_whitespace_is_normalized(self):
+        assert make_cache_key("m", 1536, "  hello   world ") == make_cache_key("m", 1536, "hello world")
+
+    def test_model_and_dimension_are_part_of_key(self):
+        key = make_cache_key("m", 1536, "q")
+        assert key != make_cache_key("other", 1536, "q")
+        assert key != make_cache_key("m", 512, "q")
+
+
+class TestEmbeddingCache:
+    """Test cache behaviour."""
+
+    async def test_repeated_query_hits_cache(self):
+        cache = EmbeddingCache()
+        embed = CountingEmbedder()
+
+        first = await cache.get_or_compute("m", 3, "query", embed)
+        second = await cache.get_or_compute("m", 3, "query ", embed)
+
+        assert first == second
+        assert len(embed.calls) == 1
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    async def test_concurrent_misses_share_one_call(self):
+        cache = EmbeddingCache()
+        embed = CountingEmbedder(delay=0.05)
+
+        results = await asyncio.gather(*[
+            cache.get_or_compute("m", 3, "same", embed) for _ in range(5)
+        ])
+
+        assert len(embed.calls) == 1
+        assert all(r == results[0] for r in results)
+
+    def test_lru_eviction_by_entry_count(self):
+        cache = EmbeddingCache(max_entries=2)
+        cache.put("a", [1.0])
+        cache.put("b", [2.0])
+        cache.get("a")  # a is now most recently used
+        cache.put("c", [3.0])
+
+        assert cache.get("b") is None
+        assert cache.get("a") == [1.0]
+        assert cache.stats()["evictions"] == 1
+
+    def test_memory_budget_eviction(self):
+        cache = EmbeddingCache(max_bytes=20000)
+        for i in range(10):
+            cache.put(str(i), [0.0] * 1536)
+
+        assert cache.stats()["bytes"] <= 20000
+        assert cache.stats()["entries"] == 1
+
+    def test_ttl_expiry(self):
+        cache = EmbeddingCache(ttl_seconds=-1)
+        cache.put("a", [1.0])
+        assert cache.get("a") is None
+        assert cache.stats()["entries"] == 0
+
+    async def test_failed_compute_is_not_cached(self):
+        cache = EmbeddingCache()
+
+        async def failing(text):
+            raise RuntimeError("provider down")
+
+        with pytest.raises(RuntimeError):
+            await cache.get_or_compute("m", 3, "q", failing)
+
+        embed = CountingEmbedder()
+        await cache.get_or_compute("m", 3, "q", embed)
+        assert len(embed.calls) == 1
+
+    async def test_persistent_tier_survives_memory_reset(self):
+        collection = FakePersistentCollection()
+        embed = CountingEmbedder()
+
+        cache = EmbeddingCache(collection=collection)
+        await cache.get_or_compute("m", 3, "query", embed)
+        await asyncio.sleep(0)  # let the write-behind task run
+
+        restarted = EmbeddingCache(collection=collection)
+        vector = await restarted.get_or_compute("m", 3, "query", embed)
+
+        assert len(embed.calls) == 1
+        assert vector == [5.0, 1.0, 2.0]
+        assert restarted.stats()["persistent_hits"] == 1
+
+
+class TestCacheEndpoint:
+    """Test cache statistics endpoint."""
+
+    def test_cache_stats_endpoint(self, client: TestClient):
+        response = client.get("/api/v1/system/caches")
+        assert response.status_code == 200
+        assert "hits" in response.json()["embedding_cache"]
+
+
+class TestBatchLookup:
+    """Test get_or_compute_many."""
+
+    async def test_misses_are_batched_with_bounded_concurrency(self):
+        running, peak, batches = 0, 0, []
+
+        async def embed_batch(texts):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            batches.append(list(texts))
+            await asyncio.sleep(0.01)
+            running -= 1
+            return [[float(len(t))] for t in texts]
+
+        cache = EmbeddingCache()
+        cache.put(make_cache_key("m", 1, "cached"), [0.0])
+        texts = ["cached"] + [f"q{i}" for i in range(10)] + ["q1"]
+
+        vectors = await cache.get_or_compute_many("m", 1, texts, embed_batch, batch_size=2, max_concurrency=2)
+
+        assert vectors["cached"] == [0.0]
+        assert vectors["q9"] == [2.0]
+        assert len(vectors) == 11
+        assert sorted(t for batch in batches for t in batch) == sorted(f"q{i}" for i in range(10))
+        assert max(len(batch) for batch in batches) == 2
+        assert peak == 2
+        assert cache.stats()["misses"] == 10
+
+    async def test_persistent_tier_is_read_before_computing(self):
+        collection = FakePersistentCollection()
+        embed = CountingEmbedder()
+        first = EmbeddingCache(collection=collection)
+        await first.get_or_compute("m", 3, "stored", embed)
+        await asyncio.sleep(0)
+
+        computed = []
+
+        async def embed_batch(texts):
+            computed.extend(texts)
+            return [[1.0, 1.0, 1.0] for _ in texts]
+
+        restarted = EmbeddingCache(collection=collection)
+        vectors = await restarted.get_or_compute_many("m", 3, ["stored", "new"], embed_batch)
+
+        assert computed == ["new"]
+        assert vectors["stored"] == [6.0, 1.0, 2.0]
+        assert restarted.stats()["persistent_hits"] == 1
+
+    async def test_short_batch_fails_instead_of_leaving_waiters_hanging(self):
+        async def short_batch(texts):
+            return [[1.0]] * (len(texts) - 1)
+
+        cache = EmbeddingCache()
+        with pytest.raises(ValueError):
+            await cache.get_or_compute_many("m", 1, ["a", "b"], short_batch)
+
+        embed = CountingEmbedder()
+        vector = await asyncio.wait_for(cache.get_or_compute("m", 1, "b", embed), 1)
+        assert vector == [1.0, 1.0, 2.0]
+        assert cache._inflight == {}
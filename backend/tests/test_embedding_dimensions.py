@@ -0,0 +1,100 @@
+"""
+Unit tests for reduced (Matryoshka) embedding dimensions.
+
+Tests request options per model and the re-embedding migration.
+"""
+
+import pytest
+from pymongo import UpdateOne
+
+from src.profile import ProfileConfig
+from src.retrieval.embedding_dimensions import embedding_request_options, reembed_chunks
+from src.retrieval.vector_storage import encode_embedding
+
+
+class FakeResult:
+    def __init__(self, modified_count):
+        self.modified_count = modified_count
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def limit(self, n):
+        return FakeCursor(self.docs[:n])
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+
+class FakeChunks:
+    """Chunks collection stub recording bulk writes."""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.operations = []
+
+    def find(self, query, projection=None):
+        return FakeCursor(self.docs)
+
+    async def bulk_write(self, operations, ordered=True):
+        self.operations.extend(operations)
+        return FakeResult(len(operations))
+
+
+class TestRequestOptions:
+    """Test when `dimensions` is sent to the provider."""
+
+    def test_reduced_dimension_for_matryoshka_model(self):
+        assert embedding_request_options("text-embedding-3-small", 512) == {"dimensions": 512}
+        assert embedding_request_options("openai/text-embedding-3-large", 1024) == {"dimensions": 1024}
+
+    def test_native_dimension_sends_nothing(self):
+        assert embedding_request_options("text-embedding-3-small", 1536) == {}
+
+    def test_other_models_unchanged(self):
+        assert embedding_request_options("nomic-embed-text", 256) == {}
+        assert embedding_request_options("text-embedding-ada-002", 512) == {}
+
+
+def test_profile_accepts_dimension_override():
+    assert ProfileConfig(name="Small", embedding_dimension=256).embedding_dimension == 256
+    assert ProfileConfig(name="Default").embedding_dimension is None
+
+
+class TestReembed:
+    """Test the re-embedding migration."""
+
+    async def test_only_chunks_at_other_dimensions_are_reembedded(self):
+        chunks = FakeChunks([
+            {"_id": 1, "content": "old", "embedding": [0.1] * 4},
+            {"_id": 2, "content": "done", "embedding": encode_embedding([0.1, 0.2], "float32")},
+        ])
+        requests = []
+
+        async def embed_batch(texts):
+            requests.append(texts)
+            return [[0.6, 0.8] for _ in texts]
+
+        stats = await reembed_chunks(chunks, embed_batch, 2, storage_format="float32")
+
+        assert stats == {"examined": 2, "reembedded": 1, "skipped": 1}
+        assert requests == [["old"]]
+        assert chunks.operations == [UpdateOne(
+            {"_id": 1},
+            {"$set": {"embedding": encode_embedding([0.6, 0.8], "float32"), "metadata.embedding_dimension": 2}}
+        )]
+
+    async def test_wrong_provider_dimension_aborts(self):
+        chunks = FakeChunks([{"_id": 1, "content": "old", "embedding": [0.1] * 4}])
+
+        async def embed_batch(texts):
+            return [[0.1] * 4 for _ in texts]
+
+        with pytest.raises(ValueError):
+            await reembed_chunks(chunks, embed_batch, 2)
@@ -0,0 +1,157 @@
+"""
+Unit tests for the dashboard latency histograms.
+
+Tests quantile accuracy, merging, per-minute windows and write-behind
+persistence.
+"""
+
+import random
+from datetime import datetime, timezone
+
+import pytest
+from pymongo import UpdateOne
+
+from backend.core.latency import LatencyHistogram, LatencyStore, RELATIVE_ACCURACY, merge_series
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+
+class FakeHistogramCollection:
+    """Collection stub recording bulk writes and serving stored documents."""
+
+    def __init__(self, docs=(), fail=False):
+        self.docs = list(docs)
+        self.fail = fail
+        self.operations = []
+
+    async def bulk_write(self, operations, ordered=True):
+        if self.fail:
+            raise RuntimeError("write failed")
+        self.operations.extend(operations)
+
+    def find(self, query):
+        since = query["minute"]["$gte"]
+        return FakeCursor([
+            doc for doc in self.docs
+            if doc["minute"] >= since and doc["kind"] == query["kind"]
+        ])
+
+
+def _exact_quantile(values, q):
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+class TestLatencyHistogram:
+    """Test the log-bucketed histogram."""
+
+    @pytest.mark.parametrize("q", [0.5, 0.95, 0.99])
+    def test_quantiles_within_relative_accuracy(self, q):
+        rng = random.Random(7)
+        values = [rng.lognormvariate(4, 1) for _ in range(20000)]
+        histogram = LatencyHistogram()
+        for value in values:
+            histogram.add(value)
+
+        exact = _exact_quantile(values, q)
+        assert abs(histogram.quantile(q) - exact) <= exact * RELATIVE_ACCURACY * 1.01
+
+    def test_merge_equals_single_histogram(self):
+        values = [float(v) for v in range(1, 2001)]
+        whole, first, second = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+        for i, value in enumerate(values):
+            whole.add(value)
+            (first if i % 2 else second).add(value)
+
+        merged = first.merge(second)
+
+        assert merged.buckets == whole.buckets
+        assert merged.count == 2000
+        assert merged.quantile(0.99) == whole.quantile(0.99)
+
+    def test_doc_round_trip_and_empty(self):
+        histogram = LatencyHistogram()
+        assert histogram.quantile(0.5) == 0.0
+        histogram.add(12.5)
+        restored = LatencyHistogram.from_doc(histogram.to_doc())
+        assert restored.buckets == histogram.buckets and restored.total == 12.5
+
+
+class TestLatencyStore:
+    """Test per-minute windows and persistence."""
+
+    async def test_window_selects_recent_minutes(self):
+        store = LatencyStore()
+        store.record(100.0, at=0)  # long ago
+        store.record(10.0, search_type="text", stages={"text_query": 8.0})
+        store.record(20.0, search_type="hybrid")
+        store.record(5000.0, kind="chat")
+
+        recent = merge_series((await store.minutes(60)).values())
+        text_only = merge_series((await store.minutes(60, search_type="text")).values())
+
+        assert recent.latency.count == 2
+        assert text_only.latency.count == 1
+        assert "text_query" in text_only.stages
+
+    async def test_flush_increments_shared_minute_document(self):
+        collection = FakeHistogramCollection()
+        store = LatencyStore(collection=collection)
+        store.record(10.0, profile="docs", stages={"embedding": 2.0}, at=600)
+
+        await store.flush()
+        await store.flush()  # nothing pending
+
+        bucket, embedding_bucket = LatencyHistogram.bucket_of(10.0), LatencyHistogram.bucket_of(2.0)
+        assert collection.operations == [UpdateOne(
+            {"_id": "10|search|hybrid|docs"},
+            {
+                "$setOnInsert": {
+                    "minute": datetime.fromtimestamp(600, tz=timezone.utc),
+                    "kind": "search",
+                    "search_type": "hybrid",
+                    "profile": "docs",
+                },
+                "$inc": {
+                    "latency.count": 1, "latency.sum": 10.0, f"latency.buckets.{bucket}": 1,
+                    "stages.embedding.count": 1, "stages.embedding.sum": 2.0,
+                    f"stages.embedding.buckets.{embedding_bucket}": 1,
+                },
+            },
+            upsert=True
+        )]
+
+    async def test_window_merges_documents_of_all_workers(self):
+        minute = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+        docs = []
+        for value in (10.0, 30.0):
+            histogram = LatencyHistogram()
+            histogram.add(value)
+            docs.append({"minute": minute, "kind": "search", "latency": histogram.to_doc()})
+
+        # A fresh worker (e.g. after a restart) sees the history of both
+        merged = merge_series((await LatencyStore(collection=FakeHistogramCollection(docs)).minutes(5)).values())
+
+        assert merged.latency.count == 2
+        assert merged.latency.max() == pytest.approx(30.0, rel=RELATIVE_ACCURACY)
+
+    async def test_failed_flush_keeps_deltas(self):
+        collection = FakeHistogramCollection(fail=True)
+        store = LatencyStore(collection=collection)
+        store.record(10.0)
+
+        await store.flush()
+        collection.fail = False
+        await store.flush()
+
+        assert len(collection.operations) == 1
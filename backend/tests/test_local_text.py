@@ -0,0 +1,162 @@
+"""
+Unit tests for the local BM25 text backend.
+
+Tests ranking, fuzzy prefix matching, incremental updates and persistence.
+"""
+
+import numpy as np
+from bson import ObjectId
+
+from src.retrieval import local_text
+from src.retrieval.document_metadata import DocumentMetadataCache
+from src.retrieval.engine import RetrievalEngine
+from src.retrieval.local_text import LocalBM25Index, tokenize
+
+CONTENTS = [
+    "MongoDB Atlas supports vector search and full-text search",
+    "Reciprocal rank fusion merges ranked lists",
+    "The ingestion pipeline chunks documents with Docling",
+    "Vector embeddings are stored on each chunk",
+]
+
+
+def _fill(index, contents=CONTENTS, document_id=None):
+    chunk_ids = [ObjectId() for _ in contents]
+    index.add(chunk_ids, [document_id or ObjectId() for _ in contents], contents)
+    return [str(c) for c in chunk_ids]
+
+
+class TestLocalBM25Index:
+    """Test index maintenance and search."""
+
+    def test_ranks_matching_chunk_first(self, tmp_path):
+        index = LocalBM25Index(str(tmp_path))
+        chunk_ids = _fill(index)
+
+        hits = index.search("rank fusion", 3)
+
+        assert hits[0][0] == chunk_ids[1]
+        assert len(hits) == 1
+
+    def test_fuzzy_and_prefix_matching(self, tmp_path):
+        index = LocalBM25Index(str(tmp_path))
+        chunk_ids = _fill(index)
+
+        assert index.search("ingest", 1)[0][0] == chunk_ids[2]      # prefix
+        assert index.search("embedingss", 1)[0][0] == chunk_ids[3]  # two edits
+
+    def test_exact_match_outranks_expansions(self, tmp_path):
+        index = LocalBM25Index(str(tmp_path))
+        chunk_ids = _fill(index, ["search search", "searching searching"])
+
+        assert [c for c, _ in index.search("search", 2)] == chunk_ids
+
+    def test_delete_by_document(self, tmp_path):
+        index = LocalBM25Index(str(tmp_path))
+        kept = _fill(index, CONTENTS[:2])
+        doc_id = ObjectId()
+        _fill(index, CONTENTS[2:], document_id=doc_id)
+
+        assert index.delete_documents([doc_id]) == 2
+
+        assert index.search("docling embeddings", 5) == []
+        assert index.search("fusion", 1)[0][0] == kept[1]
+
+    def test_persists_and_refreshes_across_instances(self, tmp_path):
+        writer = LocalBM25Index(str(tmp_path))
+        reader = LocalBM25Index(str(tmp_path))
+        chunk_ids = _fill(writer)
+
+        assert reader.search("docling", 1)[0][0] == chunk_ids[2]
+        assert LocalBM25Index(str(tmp_path)).stats()["live_chunks"] == len(CONTENTS)
+
+    def test_deferred_persist_saves_once(self, tmp_path):
+        writer = LocalBM25Index(str(tmp_path))
+        for content in CONTENTS:
+            writer.add([ObjectId()], [ObjectId()], [content], persist=False)
+        writer.delete_documents([ObjectId()], persist=False)
+
+        assert writer.dirty
+        assert LocalBM25Index(str(tmp_path)).stats()["chunks"] == 0
+        assert writer.save_if_dirty()
+        assert not writer.save_if_dirty()
+        assert LocalBM25Index(str(tmp_path)).stats()["live_chunks"] == len(CONTENTS)
+
+    def test_delete_after_compaction_uses_remapped_rows(self, tmp_path):
+        index = LocalBM25Index(str(tmp_path))
+        first, second = ObjectId(), ObjectId()
+        _fill(index, CONTENTS[:2], document_id=first)
+        kept = _fill(index, CONTENTS[2:], document_id=second)
+
+        # Tombstones half the rows, which compacts and renumbers the rest
+        assert index.delete_documents([first], persist=False) == 2
+        assert index.stats()["chunks"] == 2
+        assert index.search("docling", 1)[0][0] == kept[0]
+        assert index.delete_documents([second], persist=False) == 2
+        assert index.search("docling", 1) == []
+
+    def test_changes_during_compaction_are_kept(self, tmp_path, monkeypatch):
+        index = LocalBM25Index(str(tmp_path))
+        first, second = ObjectId(), ObjectId()
+        _fill(index, CONTENTS[:2], document_id=first)
+        kept = _fill(index, CONTENTS[2:], document_id=second)
+        late = ObjectId()
+        added = []
+
+        repeat = np.repeat
+
+        def update_mid_rebuild(*args, **kwargs):
+            # Runs while the rebuild works on its snapshot, outside the lock
+            if not added:
+                added.extend(_fill(index, ["Late fusion chunk about docling"], document_id=late))
+                index.delete_documents([second], persist=False)
+            return repeat(*args, **kwargs)
+
+        monkeypatch.setattr(local_text.np, "repeat", update_mid_rebuild)
+        index.delete_documents([first], persist=False)
+        monkeypatch.undo()
+
+        assert index.stats()["chunks"] == 3
+        assert index.stats()["live_chunks"] == 1
+        assert [chunk_id for chunk_id, _ in index.search("docling fusion", 5)] == added
+        assert not {chunk_id for chunk_id, _ in index.search("vector docling", 5)} & set(kept)
+        assert index.delete_documents([late], persist=False) == 1
+        assert index.search("docling fusion", 5) == []
+
+    def test_tokenize_lowercases(self):
+        assert tokenize("Hello, World_2!") == ["hello", "world_2"]
+
+
+async def test_engine_text_search_uses_local_index(tmp_path):
+    index = LocalBM25Index(str(tmp_path))
+    chunk_ids = [ObjectId() for _ in CONTENTS]
+    index.add(chunk_ids, ["doc"] * len(CONTENTS), CONTENTS)
+    chunks = {
+        c: {"_id": c, "document_id": "doc", "content": text, "metadata": {},
+            "document_title": "Title", "document_source": "source.md"}
+        for c, text in zip(chunk_ids, CONTENTS)
+    }
+
+    class ChunkCollection:
+        name = "chunks"
+
+        def find(self, query, projection=None):
+            async def iterate():
+                for i in query["_id"]["$in"]:
+                    yield chunks[i]
+            return iterate()
+
+        def aggregate(self, pipeline):
+            raise AssertionError("$search must not be used with the local backend")
+
+    engine = RetrievalEngine(
+        chunks_collection=ChunkCollection(),
+        documents_collection=None,
+        embed=None,
+        metadata_cache=DocumentMetadataCache(),
+        local_text_index=index,
+    )
+    results = await engine.text_search("docling pipeline", 5)
+
+    assert results[0].chunk_id == str(chunk_ids[2])
+    assert results[0].document_title == "Title"
@@ -0,0 +1,157 @@
+"""
+Unit tests for the local memory-mapped vector backend.
+
+Tests exact top-k, incremental updates, persistence and engine integration.
+"""
+
+import numpy as np
+import pytest
+from bson import ObjectId
+
+from src.retrieval.document_metadata import DocumentMetadataCache
+from src.retrieval.engine import RetrievalEngine
+from src.retrieval.local_vector import LocalVectorIndex
+
+DIMENSION = 8
+
+
+def _vectors(count, seed=0):
+    return np.random.default_rng(seed).normal(size=(count, DIMENSION)).astype(np.float32)
+
+
+def _fill(index, vectors, document_id=None):
+    chunk_ids = [ObjectId() for _ in vectors]
+    document_ids = [document_id or ObjectId() for _ in vectors]
+    index.add(chunk_ids, document_ids, vectors.tolist())
+    return [str(c) for c in chunk_ids], document_ids
+
+
+def _brute_force(vectors, query, k):
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = normalized @ (query / np.linalg.norm(query))
+    return list(np.argsort(-scores)[:k])
+
+
+class TestLocalVectorIndex:
+    """Test index maintenance and search."""
+
+    def test_top_k_matches_brute_force(self, tmp_path):
+        index = LocalVectorIndex(str(tmp_path), DIMENSION, shard_rows=16)
+        vectors = _vectors(100)
+        chunk_ids, _ = _fill(index, vectors)
+        query = _vectors(1, seed=1)[0]
+
+        hits = index.search(query.tolist(), 5)
+
+        assert [chunk_id for chunk_id, _ in hits] == [chunk_ids[i] for i in _brute_force(vectors, query, 5)]
+        assert all(0.0 <= score <= 1.0 for _, score in hits)
+
+    def test_parallel_shards_give_same_results(self, tmp_path):
+        serial = LocalVectorIndex(str(tmp_path / "serial"), DIMENSION, shard_rows=10)
+        parallel = LocalVectorIndex(str(tmp_path / "parallel"), DIMENSION, shard_rows=10, workers=4)
+        vectors = _vectors(95)
+        chunk_ids = [ObjectId() for _ in vectors]
+        for index in (serial, parallel):
+            index.add(chunk_ids, [ObjectId()] * len(vectors), vectors.tolist())
+
+        queries = _vectors(3, seed=2).tolist()
+
+        assert serial.search_batch(queries, 7) == parallel.search_batch(queries, 7)
+
+    def test_incremental_add_and_delete(self, tmp_path):
+        index = LocalVectorIndex(str(tmp_path), DIMENSION)
+        vectors = _vectors(10)
+        first_ids, _ = _fill(index, vectors[:5], document_id=ObjectId())
+        doc_id = ObjectId()
+        second_ids, _ = _fill(index, vectors[5:], document_id=doc_id)
+
+        assert index.delete_documents([doc_id]) == 5
+
+        found = {chunk_id for chunk_id, _ in index.search(vectors[7].tolist(), 10)}
+        assert found == set(first_ids)
+        assert not found & set(second_ids)
+
+    def test_compaction_leaves_existing_mappings_readable(self, tmp_path):
+        index = LocalVectorIndex(str(tmp_path), DIMENSION)
+        vectors = _vectors(2000)
+        documents = [ObjectId() for _ in range(10)]
+        for i, document_id in enumerate(documents):
+            _fill(index, vectors[i * 200:(i + 1) * 200], document_id=document_id)
+        snapshot = index._matrix
+
+        index.delete_documents(documents[:3])
+
+        assert index.count == 1400
+        # Would die with SIGBUS if the mapped file had been truncated
+        np.testing.assert_allclose(
+            snapshot[1999], vectors[1999] / np.linalg.norm(vectors[1999]), rtol=1e-6
+        )
+        hits = index.search(vectors[1999].tolist(), 1)
+        assert hits[0][1] == pytest.approx(1.0)
+
+    def test_reopen_and_cross_process_refresh(self, tmp_path):
+        writer = LocalVectorIndex(str(tmp_path), DIMENSION)
+        reader = LocalVectorIndex(str(tmp_path), DIMENSION)
+        vectors = _vectors(4)
+
+        chunk_ids, _ = _fill(writer, vectors)
+
+        assert reader.search(vectors[2].tolist(), 1)[0][0] == chunk_ids[2]
+        assert LocalVectorIndex(str(tmp_path), DIMENSION).count == 4
+
+    def test_rejects_wrong_dimension(self, tmp_path):
+        index = LocalVectorIndex(str(tmp_path), DIMENSION)
+
+        with pytest.raises(ValueError):
+            index.add([ObjectId()], [ObjectId()], [[0.1, 0.2]])
+
+    def test_empty_index_returns_no_hits(self, tmp_path):
+        assert LocalVectorIndex(str(tmp_path), DIMENSION).search([1.0] * DIMENSION, 3) == []
+
+
+class ChunkCollection:
+    """Chunks collection stub answering `_id $in` finds."""
+
+    def __init__(self, chunks):
+        self.name = "chunks"
+        self.chunks = {c["_id"]: c for c in chunks}
+
+    def find(self, query, projection=None):
+        docs = [self.chunks[i] for i in query["_id"]["$in"] if i in self.chunks]
+
+        async def iterate():
+            for doc in docs:
+                yield doc
+        return iterate()
+
+    def aggregate(self, pipeline):
+        raise AssertionError("$vectorSearch must not be used with the local backend")
+
+
+async def test_engine_semantic_search_uses_local_index(tmp_path):
+    index = LocalVectorIndex(str(tmp_path), DIMENSION)
+    vectors = _vectors(6)
+    chunk_ids = [ObjectId() for _ in vectors]
+    index.add(chunk_ids, [ObjectId()] * len(vectors), vectors.tolist())
+
+    chunks = ChunkCollection([
+        {"_id": c, "document_id": "doc", "content": f"chunk {i}", "metadata": {},
+         "document_title": "Title", "document_source": "source.md"}
+        for i, c in enumerate(chunk_ids) if i != 1  # chunk 1 deleted from MongoDB
+    ])
+
+    async def embed(text):
+        return vectors[3].tolist()
+
+    engine = RetrievalEngine(
+        chunks_collection=chunks,
+        documents_collection=None,
+        embed=embed,
+        metadata_cache=DocumentMetadataCache(),
+        local_vector_index=index,
+    )
+    results = await engine.semantic_search("query", 6)
+
+    assert results[0].chunk_id == str(chunk_ids[3])
+    assert str(chunk_ids[1]) not in {r.chunk_id for r in results}
+    assert len(results) == 5
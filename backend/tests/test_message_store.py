@@ -0,0 +1,250 @@
+"""
+Unit tests for the chat message store.
+
+Tests seq allocation, tail/page reads and the embedded-array migration.
+"""
+
+from pymongo.errors import DuplicateKeyError
+
+from backend.core.messages import MessageStore
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, key, direction=None):
+        keys = key if isinstance(key, list) else [(key, direction)]
+        docs = list(self.docs)
+        for field, order in reversed(keys):
+            docs.sort(key=lambda d: d[field], reverse=order < 0)
+        return FakeCursor(docs)
+
+    def limit(self, n):
+        return FakeCursor(self.docs[:n])
+
+    def batch_size(self, n):
+        return self
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+
+def _project(doc, projection):
+    if not projection:
+        return dict(doc)
+    if any(v == 0 for k, v in projection.items() if k != "_id"):
+        return {k: v for k, v in doc.items() if projection.get(k, 1) != 0}
+    fields = {k for k, v in projection.items() if v} | ({"_id"} if projection.get("_id", 1) else set())
+    return {k: v for k, v in doc.items() if k in fields}
+
+
+_MISSING = object()
+
+
+def _get(doc, path):
+    for part in path.split("."):
+        if not isinstance(doc, dict) or part not in doc:
+            return _MISSING
+        doc = doc[part]
+    return doc
+
+
+def _set(doc, path, value):
+    *parents, last = path.split(".")
+    for part in parents:
+        doc = doc.setdefault(part, {})
+    doc[last] = value
+
+
+def _matches(doc, query):
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(_matches(doc, option) for option in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = _get(doc, key)
+            if "$exists" in condition and (value is not _MISSING) != condition["$exists"]:
+                return False
+            if "$lt" in condition and (value is _MISSING or not value < condition["$lt"]):
+                return False
+            if "$lte" in condition and (value is _MISSING or not value <= condition["$lte"]):
+                return False
+            if "$gte" in condition and (value is _MISSING or not value >= condition["$gte"]):
+                return False
+            if "$ne" in condition and (
+                value == condition["$ne"] or (isinstance(value, list) and condition["$ne"] in value)
+            ):
+                return False
+        else:
+            value = _get(doc, key)
+            # Like MongoDB, {field: None} also matches a missing field
+            if (None if value is _MISSING else value) != condition:
+                return False
+    return True
+
+
+class FakeResult:
+    def __init__(self, deleted_count=0, matched_count=0):
+        self.deleted_count = deleted_count
+        self.matched_count = matched_count
+
+
+class FakeCollection:
+    """In-memory collection supporting the operations the store uses."""
+
+    def __init__(self, docs=None):
+        self.docs = {doc["_id"]: doc for doc in docs or []}
+        self.indexes = []
+
+    async def create_index(self, keys, **kwargs):
+        self.indexes.append(keys)
+
+    def find(self, query, projection=None):
+        return FakeCursor([_project(d, projection) for d in self.docs.values() if _matches(d, query)])
+
+    async def find_one(self, query, projection=None):
+        for doc in self.docs.values():
+            if _matches(doc, query):
+                return _project(doc, projection)
+        return None
+
+    def _apply(self, doc, update):
+        for key, value in update.get("$set", {}).items():
+            _set(doc, key, value)
+        for key, value in update.get("$inc", {}).items():
+            current = _get(doc, key)
+            _set(doc, key, (0 if current is _MISSING else current) + value)
+        for key in update.get("$unset", {}):
+            doc.pop(key, None)
+        for key, value in update.get("$push", {}).items():
+            items = doc.get(key, []) + value["$each"]
+            doc[key] = items[value["$slice"]:] if "$slice" in value else items
+
+    async def find_one_and_update(self, query, update, projection=None, return_document=None):
+        for doc in self.docs.values():
+            if _matches(doc, query):
+                self._apply(doc, update)
+                return _project(doc, projection)
+        return None
+
+    async def update_one(self, query, update, upsert=False):
+        for doc in self.docs.values():
+            if _matches(doc, query):
+                self._apply(doc, update)
+                return FakeResult(matched_count=1)
+        if upsert:
+            if query["_id"] in self.docs:
+                raise DuplicateKeyError("E11000 duplicate key error")
+            doc = self.docs[query["_id"]] = {"_id": query["_id"], **update.get("$setOnInsert", {})}
+            self._apply(doc, update)
+        return FakeResult()
+
+    async def update_many(self, query, update):
+        matched = [d for d in self.docs.values() if _matches(d, query)]
+        for doc in matched:
+            self._apply(doc, update)
+        return FakeResult(matched_count=len(matched))
+
+    async def insert_many(self, docs, ordered=True):
+        for doc in docs:
+            assert doc["_id"] not in self.docs
+            self.docs[doc["_id"]] = doc
+
+    async def bulk_write(self, operations, ordered=True):
+        for op in operations:
+            doc_id = op._filter["_id"]
+            if doc_id not in self.docs:
+                self.docs[doc_id] = {"_id": doc_id, **op._doc.get("$setOnInsert", {})}
+            self._apply(self.docs[doc_id], op._doc)
+
+    async def delete_one(self, query):
+        for key, doc in list(self.docs.items()):
+            if _matches(doc, query):
+                del self.docs[key]
+                return FakeResult(1)
+        return FakeResult()
+
+    async def delete_many(self, query):
+        matched = [k for k, d in self.docs.items() if _matches(d, query)]
+        for key in matched:
+            del self.docs[key]
+        return FakeResult(len(matched))
+
+
+def _message(i, role="user"):
+    return {"id": f"m{i}", "role": role, "content": f"message {i}", "attachments": None}
+
+
+class TestMessageStore:
+    """Test appends and bounded reads."""
+
+    async def test_append_allocates_consecutive_seqs_and_updates_session(self):
+        sessions = FakeCollection([{"_id": "s1", "message_seq": 0}])
+        store = MessageStore(sessions, FakeCollection())
+
+        assert await store.append("s1", [_message(0), _message(1)], {"$set": {"title": "t"}}) == 0
+        assert await store.append("s1", [_message(2), _message(3)]) == 2
+        assert sessions.docs["s1"]["message_seq"] == 4
+        assert sessions.docs["s1"]["title"] == "t"
+        assert sorted(d["seq"] for d in store.messages.docs.values()) == [0, 1, 2, 3]
+
+    async def test_append_to_missing_session_writes_nothing(self):
+        store = MessageStore(FakeCollection(), FakeCollection())
+        assert await store.append("gone", [_message(0)]) is None
+        assert store.messages.docs == {}
+
+    async def test_tail_returns_last_messages_oldest_first(self):
+        sessions = FakeCollection([{"_id": "s1", "message_seq": 0}])
+        store = MessageStore(sessions, FakeCollection())
+        await store.append("s1", [_message(i) for i in range(10)])
+
+        tail = await store.tail("s1", 3)
+        assert [m["content"] for m in tail] == ["message 7", "message 8", "message 9"]
+        assert "attachments" not in tail[0]
+
+    async def test_page_walks_backwards_with_cursor(self):
+        sessions = FakeCollection([{"_id": "s1", "message_seq": 0}])
+        store = MessageStore(sessions, FakeCollection())
+        await store.append("s1", [_message(i) for i in range(5)])
+
+        latest, before = await store.page("s1", limit=2)
+        assert [m["id"] for m in latest] == ["m3", "m4"]
+        older, before = await store.page("s1", before=before, limit=2)
+        assert [m["id"] for m in older] == ["m1", "m2"]
+        oldest, before = await store.page("s1", before=before, limit=2)
+        assert [m["id"] for m in oldest] == ["m0"]
+        assert before is None
+
+
+class TestMigration:
+    """Test moving embedded message arrays into the collection."""
+
+    async def test_migrate_session_moves_array_and_is_idempotent(self):
+        sessions = FakeCollection([{"_id": "s1", "messages": [_message(0), _message(1, "assistant")]}])
+        store = MessageStore(sessions, FakeCollection())
+
+        assert await store.migrate_session("s1") == 2
+        assert await store.migrate_session("s1") == 0
+        assert "messages" not in sessions.docs["s1"]
+        assert sessions.docs["s1"]["message_seq"] == 2
+
+        # New messages continue after the migrated ones
+        assert await store.append("s1", [_message(2)]) == 2
+        page, _ = await store.page("s1")
+        assert [m["seq"] for m in page] == [0, 1, 2]
+
+    async def test_migrate_all_skips_migrated_sessions(self):
+        sessions = FakeCollection([
+            {"_id": "old", "messages": [_message(0)]},
+            {"_id": "empty", "messages": []},
+            {"_id": "new", "message_seq": 0},
+        ])
+        store = MessageStore(sessions, FakeCollection())
+
+        assert await store.migrate_all() == {"sessions": 2, "messages": 1}
+        assert all("message_seq" in doc for doc in sessions.docs.values())
@@ -0,0 +1,161 @@
+"""
+Unit tests for Prometheus metrics.
+
+Tests the exposition format, multiprocess merging, thread pool saturation
+tracking and the /metrics endpoint.
+"""
+
+import os
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from src.metrics import (
+    Counter, Histogram, InstrumentedThreadPoolExecutor, MetricsRegistry, MultiprocessDirectory,
+    clear_multiprocess_directory, observe_call
+)
+
+
+class TestRegistry:
+    """Test metric types and rendering."""
+
+    def test_counter_and_histogram_exposition(self):
+        registry = MetricsRegistry()
+        requests = registry.counter("app_requests_total", "Requests", ("route",))
+        latency = registry.histogram("app_latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+
+        requests.inc(route="/a")
+        requests.inc(2, route="/a")
+        latency.observe(0.05, route="/a")
+        latency.observe(0.5, route="/a")
+        latency.observe(5.0, route="/a")
+
+        text = registry.render()
+
+        assert "# TYPE app_requests_total counter" in text
+        assert 'app_requests_total{route="/a"} 3' in text
+        assert 'app_latency_seconds_bucket{route="/a",le="0.1"} 1' in text
+        assert 'app_latency_seconds_bucket{route="/a",le="1"} 2' in text
+        assert 'app_latency_seconds_bucket{route="/a",le="+Inf"} 3' in text
+        assert 'app_latency_seconds_count{route="/a"} 3' in text
+
+    def test_label_values_are_escaped(self):
+        registry = MetricsRegistry()
+        registry.counter("escaped_total", "Escaping", ("name",)).inc(name='say "hi"\n')
+        assert 'escaped_total{name="say \\"hi\\"\\n"} 1' in registry.render()
+
+    def test_observe_call_counts_errors(self):
+        calls = Counter("calls_total", "Calls", ("outcome", "model"))
+        seconds = Histogram("calls_seconds", "Latency", ("model",))
+
+        with observe_call(calls, seconds, model="m"):
+            pass
+        try:
+            with observe_call(calls, seconds, model="m"):
+                raise RuntimeError("provider down")
+        except RuntimeError:
+            pass
+
+        assert calls.value(outcome="success", model="m") == 1
+        assert calls.value(outcome="error", model="m") == 1
+        assert seconds.count(model="m") == 2
+
+
+class TestMultiprocess:
+    """Test merging the snapshots of several workers."""
+
+    @staticmethod
+    def _worker(directory, name):
+        registry = MetricsRegistry()
+        shared = MultiprocessDirectory(str(directory), registry, write_seconds=60)
+        shared.worker = name
+        shared.path = os.path.join(str(directory), f"worker-{name}-0.json")
+        return registry, shared
+
+    def test_counters_and_histograms_are_summed(self, tmp_path):
+        first, first_dir = self._worker(tmp_path, "1")
+        second, second_dir = self._worker(tmp_path, "2")
+        for registry, amount, latency in ((first, 1, 0.05), (second, 2, 5.0)):
+            registry.counter("app_requests_total", "Requests", ("route",)).inc(amount, route="/a")
+            registry.histogram("app_latency_seconds", "Latency", buckets=(0.1,)).observe(latency)
+        second_dir.write()
+
+        first._multiprocess = first_dir
+        text = first.render()
+
+        assert 'app_requests_total{route="/a"} 3' in text
+        assert 'app_latency_seconds_bucket{le="0.1"} 1' in text
+        assert 'app_latency_seconds_bucket{le="+Inf"} 2' in text
+        assert "app_latency_seconds_count 2" in text
+
+    def test_gauges_are_per_live_worker(self, tmp_path):
+        first, first_dir = self._worker(tmp_path, "1")
+        second, second_dir = self._worker(tmp_path, "2")
+        exited, exited_dir = self._worker(tmp_path, "3")
+        for registry, value in ((first, 4), (second, 7), (exited, 9)):
+            registry.gauge("app_queue_depth", "Queue depth").set(value)
+            registry.counter("app_jobs_total", "Jobs").inc(value)
+        second_dir.write()
+        exited_dir.write()
+        stale = time.time() - 3600
+        os.utime(exited_dir.path, (stale, stale))
+
+        families = {name: samples for name, _, _, samples in first_dir.collect()}
+
+        gauges = {labels["worker"]: value for _, labels, value in families["app_queue_depth"]}
+        assert gauges == {"1": 4, "2": 7}
+        # An exited worker's totals still count, so the sum never goes down
+        assert [value for _, _, value in families["app_jobs_total"]] == [20]
+
+    def test_registry_renders_all_workers_once_enabled(self, tmp_path):
+        other, other_dir = self._worker(tmp_path, "other")
+        other.counter("app_requests_total", "Requests").inc(5)
+        other_dir.write()
+
+        registry = MetricsRegistry()
+        registry.counter("app_requests_total", "Requests").inc(1)
+        registry.enable_multiprocess(str(tmp_path), write_seconds=60)
+        try:
+            assert "app_requests_total 6" in registry.render()
+        finally:
+            registry.disable_multiprocess()
+        assert "app_requests_total 1" in registry.render()
+
+        clear_multiprocess_directory(str(tmp_path))
+        assert os.listdir(tmp_path) == []
+
+
+def test_executor_tracks_active_and_queued_tasks():
+    release = threading.Event()
+    started = threading.Event()
+    executor = InstrumentedThreadPoolExecutor(max_workers=1, pool_name="test_pool")
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    first = executor.submit(block)
+    started.wait(5)
+    second = executor.submit(lambda: None)
+
+    assert (executor.active, executor.queued) == (1, 1)
+
+    release.set()
+    first.result(5)
+    second.result(5)
+    executor.shutdown()
+
+    assert (executor.active, executor.queued, executor.completed) == (0, 0, 2)
+
+
+def test_metrics_endpoint(client: TestClient):
+    client.get("/health")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'rag_http_requests_total{method="GET",route="/health",status="200"}' in response.text
+    assert 'rag_cache_hit_ratio{cache="embedding"}' in response.text
+    assert "rag_executor_active_tasks" in response.text
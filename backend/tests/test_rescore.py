@@ -0,0 +1,113 @@
+"""
+Unit tests for quantized vector search rescoring.
+
+Tests exact re-ranking, stored embedding decoding, engine oversampling and
+quantized index definitions.
+"""
+
+import numpy as np
+import pytest
+
+from src.retrieval.engine import RetrievalEngine
+from src.retrieval.index_definitions import vector_index_definition
+from src.retrieval.rescore import embedding_array, rescore_hits, rescore_oversample_for
+from src.retrieval.vector_storage import encode_embedding
+
+
+def _hit(chunk_id, embedding, score=0.9):
+    return {"chunk_id": chunk_id, "document_id": "doc", "content": chunk_id, "metadata": {},
+            "document_title": "Title", "document_source": "source.md",
+            "similarity": score, "embedding": embedding}
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+
+class QuantizedChunks:
+    """Chunks stub returning hits in approximate (wrong) order."""
+
+    def __init__(self, hits):
+        self.hits = hits
+        self.pipelines = []
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        return FakeCursor(self.hits[:pipeline[0]["$vectorSearch"]["limit"]])
+
+
+class TestRescore:
+    """Test exact re-ranking."""
+
+    def test_reranks_by_exact_cosine(self):
+        hits = [
+            _hit("far", [0.0, 1.0]),
+            _hit("near", [1.0, 0.1]),
+            _hit("exact", encode_embedding([2.0, 0.0], "float32")),
+        ]
+
+        rescored = rescore_hits([1.0, 0.0], hits, 2)
+
+        assert [h["chunk_id"] for h in rescored] == ["exact", "near"]
+        assert rescored[0]["similarity"] == pytest.approx(1.0)
+        assert "embedding" not in rescored[0]
+
+    def test_embedding_array_decodes_all_formats(self):
+        vector = [0.5, -1.0, 0.25]
+
+        for storage_format in ("array", "float32"):
+            assert embedding_array(encode_embedding(vector, storage_format)).tolist() == vector
+        assert embedding_array(encode_embedding(vector, "int8")).tolist() == [64.0, -127.0, 32.0]
+
+    def test_default_oversample_per_quantization(self):
+        assert rescore_oversample_for("none") == 1.0
+        assert rescore_oversample_for("binary") == 4.0
+        assert rescore_oversample_for("scalar", 3) == 3.0
+
+
+async def test_engine_oversamples_and_rescores():
+    hits = [_hit(f"c{i}", [float(np.cos(i / 4)), float(np.sin(i / 4))]) for i in range(8)][::-1]
+    chunks = QuantizedChunks(hits)
+
+    async def embed(text):
+        return [1.0, 0.0]
+
+    engine = RetrievalEngine(
+        chunks_collection=chunks, documents_collection=None, embed=embed, rescore_oversample=4.0
+    )
+    results = await engine._semantic_hits("query", 2)
+
+    vector_search = chunks.pipelines[0][0]["$vectorSearch"]
+    assert vector_search["limit"] == 8
+    assert chunks.pipelines[0][1]["$project"]["embedding"] == 1
+    assert [h["chunk_id"] for h in results] == ["c0", "c1"]
+
+
+class TestQuantizedIndexDefinition:
+    """Test quantization options in the vector index definition."""
+
+    def test_quantization_added_to_vector_field(self):
+        definition = vector_index_definition("vector_index", 1536, quantization="binary")
+
+        assert definition["definition"]["fields"][0]["quantization"] == "binary"
+
+    def test_no_quantization_by_default(self):
+        definition = vector_index_definition("vector_index", 1536)
+
+        assert "quantization" not in definition["definition"]["fields"][0]
+
+    def test_quantization_rejected_for_int8_storage(self):
+        with pytest.raises(ValueError):
+            vector_index_definition("vector_index", 1536, storage_format="int8", quantization="scalar")
+
+    def test_unknown_quantization_rejected(self):
+        with pytest.raises(ValueError):
+            vector_index_definition("vector_index", 1536, quantization="pq")
@@ -0,0 +1,113 @@
+"""
+Unit tests for the search result cache and corpus generations.
+
+Tests generation-based invalidation, stale-while-revalidate and the memory cap.
+"""
+
+import asyncio
+
+from src.retrieval.result_cache import CorpusGenerations, SearchResultCache
+
+
+class CountingSearch:
+    """Search stub returning a new result list per call."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        return [f"result-{self.calls}"]
+
+
+class FakeGenerationCollection:
+    """Shared counter collection as seen by several workers."""
+
+    def __init__(self):
+        self.docs = {}
+
+    async def find_one_and_update(self, query, update, upsert=False, return_document=False):
+        doc = self.docs.setdefault(query["_id"], {"_id": query["_id"], "generation": 0})
+        doc["generation"] += update["$inc"]["generation"]
+        return dict(doc)
+
+    async def find_one(self, query, projection=None):
+        return self.docs.get(query["_id"])
+
+
+def _key(generation=0, query="query"):
+    return SearchResultCache.make_key("rag_db.chunks", generation, query, "hybrid", 10)
+
+
+class TestSearchResultCache:
+    """Test cache behaviour."""
+
+    async def test_repeat_search_is_served_from_cache(self):
+        cache = SearchResultCache()
+        search = CountingSearch()
+
+        first, cached_first = await cache.get_or_compute(_key(), search)
+        second, cached_second = await cache.get_or_compute(_key(query=" query "), search)
+
+        assert first == second
+        assert (cached_first, cached_second) == (False, True)
+        assert search.calls == 1
+
+    async def test_new_generation_misses(self):
+        cache = SearchResultCache()
+        search = CountingSearch()
+
+        await cache.get_or_compute(_key(generation=0), search)
+        results, cached = await cache.get_or_compute(_key(generation=1), search)
+
+        assert not cached
+        assert results == ["result-2"]
+
+    async def test_stale_entry_served_while_revalidating(self):
+        cache = SearchResultCache(ttl_seconds=0, stale_seconds=60)
+        search = CountingSearch()
+
+        await cache.get_or_compute(_key(), search)
+        stale, cached = await cache.get_or_compute(_key(), search)
+        await asyncio.sleep(0.01)  # let the background refresh finish
+
+        assert cached and stale == ["result-1"]
+        assert search.calls == 2
+        assert cache.stats()["stale_hits"] == 1
+
+    async def test_memory_cap_evicts_oldest(self):
+        cache = SearchResultCache(max_bytes=1500)
+
+        for i in range(5):
+            await cache.get_or_compute(_key(query=f"q{i}"), CountingSearch())
+
+        assert cache.stats()["bytes"] <= 1500
+        assert cache.stats()["evictions"] > 0
+
+    async def test_purge_older_generations(self):
+        cache = SearchResultCache()
+        await cache.get_or_compute(_key(generation=0), CountingSearch())
+        await cache.get_or_compute(_key(generation=1), CountingSearch())
+
+        cache.purge_namespace("rag_db.chunks", below_generation=1)
+
+        assert cache.stats()["entries"] == 1
+
+
+class TestCorpusGenerations:
+    """Test generation counters."""
+
+    async def test_bump_is_seen_by_other_workers(self):
+        shared = FakeGenerationCollection()
+        ingester = CorpusGenerations()
+        api_worker = CorpusGenerations(refresh_seconds=0)
+
+        assert await api_worker.current("ns", shared) == 0
+        await ingester.bump("ns", shared)
+
+        assert await api_worker.current("ns", shared) == 1
+
+    async def test_local_bump_without_collection(self):
+        generations = CorpusGenerations()
+        assert await generations.bump("ns") == 1
+        assert await generations.current("ns") == 1
@@ -0,0 +1,380 @@
+"""
+Unit tests for the shared retrieval engine.
+
+Tests pipeline construction, RRF fusion, concurrent hybrid execution and
+server-side hybrid modes.
+"""
+
+import asyncio
+import time
+
+import pytest
+from pymongo.errors import OperationFailure
+
+from src.retrieval.capabilities import detect_hybrid_mode, get_hybrid_mode, hybrid_mode_for, set_hybrid_mode
+from src.retrieval.document_metadata import DocumentMetadataCache
+from src.retrieval.engine import RetrievalEngine, SearchResult, reciprocal_rank_fusion
+from src.retrieval.timings import current_timings, start_timings
+
+
+class FakeCursor:
+    """Async cursor over a fixed list of documents."""
+
+    def __init__(self, docs, delay=0.0):
+        self._docs = list(docs)
+        self._delay = delay
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        if self._delay:
+            await asyncio.sleep(self._delay)
+        for doc in self._docs:
+            yield doc
+
+
+class FakeCollection:
+    """Collection stub that answers $vectorSearch/$search pipelines and $in finds."""
+
+    def __init__(self, name="chunks", vector_docs=None, text_docs=None, delay=0.0, fail=(), documents=None):
+        self.name = name
+        self.vector_docs = vector_docs or []
+        self.text_docs = text_docs or []
+        self.delay = delay
+        self.fail = set(fail)
+        self.documents = documents if documents is not None else {"doc": {"title": "Title", "source": "source.md"}}
+        self.pipelines = []
+        self.finds = []
+
+    def find(self, query, projection=None):
+        ids = query["_id"]["$in"]
+        self.finds.append(ids)
+        return FakeCursor([{"_id": i, **self.documents[i]} for i in ids if i in self.documents])
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        stage = next(iter(pipeline[0]))
+        if stage in self.fail:
+            raise RuntimeError(f"{stage} unavailable")
+        docs = self.vector_docs if stage == "$vectorSearch" else self.text_docs
+        return FakeCursor(docs, self.delay)
+
+
+def _doc(chunk_id, score=0.5, document_id="doc"):
+    return {
+        "chunk_id": chunk_id,
+        "document_id": document_id,
+        "content": f"content {chunk_id}",
+        "similarity": score,
+        "metadata": {},
+    }
+
+
+def _result(chunk_id):
+    return SearchResult(**_doc(chunk_id), document_title="Title", document_source="source.md")
+
+
+async def _embed(text):
+    return [0.1, 0.2, 0.3]
+
+
+def _engine(chunks, documents=None, **kwargs):
+    return RetrievalEngine(
+        chunks_collection=chunks,
+        documents_collection=documents or FakeCollection(name="documents"),
+        embed=_embed,
+        metadata_cache=DocumentMetadataCache(),
+        **kwargs
+    )
+
+
+class TestReciprocalRankFusion:
+    """Test the single RRF implementation."""
+
+    def test_overlapping_results_rank_first(self):
+        fused = reciprocal_rank_fusion([
+            [_result("a"), _result("b")],
+            [_result("b"), _result("c")],
+        ])
+        assert [r.chunk_id for r in fused] == ["b", "a", "c"]
+        assert fused[0].similarity == pytest.approx(1 / 61 + 1 / 60)
+
+    def test_empty_lists(self):
+        assert reciprocal_rank_fusion([[], []]) == []
+
+
+class TestRetrievalEngine:
+    """Test search execution through the engine."""
+
+    def test_pipelines_do_not_join_documents(self):
+        engine = _engine(FakeCollection())
+        pipeline = engine.vector_pipeline([0.1], limit=5)
+        assert pipeline[0]["$vectorSearch"]["limit"] == 5
+        stages = [next(iter(stage)) for stage in pipeline + engine.text_pipeline("q", 5)]
+        assert "$lookup" not in stages
+
+    def test_num_candidates_scale_with_limit(self):
+        engine = _engine(FakeCollection(), candidate_multiplier=4)
+        assert engine.vector_pipeline([0.1], limit=5)[0]["$vectorSearch"]["numCandidates"] == 20
+        assert engine.vector_pipeline([0.1], limit=100)[0]["$vectorSearch"]["numCandidates"] == 400
+
+    def test_num_candidates_never_below_limit(self):
+        engine = _engine(FakeCollection(), num_candidates=100)
+        pipeline = engine.vector_pipeline([0.1], limit=150, num_candidates=100)
+        assert pipeline[0]["$vectorSearch"]["numCandidates"] == 150
+
+    def test_exact_pipeline_omits_num_candidates(self):
+        stage = _engine(FakeCollection()).vector_pipeline([0.1], limit=5, exact=True)[0]["$vectorSearch"]
+        assert stage["exact"] is True
+        assert "numCandidates" not in stage
+
+    async def test_hybrid_runs_both_legs_concurrently(self):
+        chunks = FakeCollection(
+            vector_docs=[_doc("a"), _doc("b")],
+            text_docs=[_doc("b"), _doc("c")],
+            delay=0.2,
+        )
+        engine = _engine(chunks)
+
+        start = time.perf_counter()
+        results = await engine.hybrid_search("query", match_count=2)
+        elapsed = time.perf_counter() - start
+
+        assert [r.chunk_id for r in results] == ["b", "a"]
+        assert elapsed < 0.35  # max(vector, text), not the sum
+        assert {next(iter(p[0])) for p in chunks.pipelines} == {"$vectorSearch", "$search"}
+
+    async def test_hybrid_over_fetches_each_leg(self):
+        chunks = FakeCollection()
+        await _engine(chunks).hybrid_search("query", match_count=5)
+        limits = {next(iter(p[0])): p for p in chunks.pipelines}
+        assert limits["$vectorSearch"][0]["$vectorSearch"]["limit"] == 10
+        assert limits["$search"][1]["$limit"] == 10
+
+    async def test_hybrid_degrades_to_single_leg(self):
+        chunks = FakeCollection(text_docs=[_doc("t")], fail={"$vectorSearch"})
+        results = await _engine(chunks).hybrid_search("query", match_count=3)
+        assert [r.chunk_id for r in results] == ["t"]
+
+    async def test_hybrid_raises_when_both_legs_fail(self):
+        chunks = FakeCollection(fail={"$vectorSearch", "$search"})
+        with pytest.raises(RuntimeError):
+            await _engine(chunks).hybrid_search("query", match_count=3)
+
+    async def test_search_dispatches_by_type(self):
+        chunks = FakeCollection(text_docs=[_doc("t")])
+        results = await _engine(chunks).search("query", "text", 3)
+        assert [r.chunk_id for r in results] == ["t"]
+        assert len(chunks.pipelines) == 1
+
+    async def test_metadata_resolved_once_for_fused_hits(self):
+        chunks = FakeCollection(
+            vector_docs=[_doc("a"), _doc("b", document_id="other")],
+            text_docs=[_doc("a"), _doc("c")],
+        )
+        documents = FakeCollection(
+            name="documents",
+            documents={"doc": {"title": "Doc", "source": "doc.md"}, "other": {"title": "Other", "source": "o.md"}},
+        )
+        engine = _engine(chunks, documents)
+
+        results = await engine.hybrid_search("query", match_count=2)
+
+        assert [r.chunk_id for r in results] == ["a", "b"]
+        assert results[1].document_title == "Other"
+        # Only the top match_count hits are resolved, with a single $in query
+        assert len(documents.finds) == 1
+        assert set(documents.finds[0]) == {"doc", "other"}
+
+    async def test_metadata_cache_and_invalidation(self):
+        chunks = FakeCollection(text_docs=[_doc("t")])
+        documents = FakeCollection(name="documents")
+        engine = _engine(chunks, documents)
+
+        await engine.text_search("query", 3)
+        await engine.text_search("query", 3)
+        assert len(documents.finds) == 1
+
+        engine.metadata_cache.invalidate(["doc"])
+        documents.documents = {}
+        assert await engine.text_search("query", 3) == []  # orphaned chunk is dropped
+
+    async def test_denormalized_hits_skip_document_query(self):
+        hit = {**_doc("d"), "document_title": "Inline", "document_source": "inline.pdf"}
+        documents = FakeCollection(name="documents")
+        results = await _engine(FakeCollection(text_docs=[hit]), documents).text_search("query", 3)
+
+        assert results[0].document_title == "Inline"
+        assert documents.finds == []
+
+
+class FakeDatabase:
+    """Database stub answering buildInfo."""
+
+    def __init__(self, version):
+        self.version = version
+
+    async def command(self, name):
+        return {"versionArray": list(self.version)}
+
+
+class TestServerHybrid:
+    """Test $rankFusion / $unionWith hybrid search and the Python fallback."""
+
+    def test_union_pipeline_scores_ranks_in_pipeline(self):
+        pipeline = _engine(FakeCollection()).union_rrf_pipeline("query", [0.1], 10, 5)
+
+        assert next(iter(pipeline[0])) == "$vectorSearch"
+        union = next(stage["$unionWith"] for stage in pipeline if "$unionWith" in stage)
+        assert union["coll"] == "chunks"
+        assert next(iter(union["pipeline"][0])) == "$search"
+        assert union["pipeline"][1] == {"$limit": 10}
+        assert pipeline[-1] == {"$limit": 5}
+
+    def test_rank_fusion_pipeline_has_both_legs(self):
+        pipeline = _engine(FakeCollection()).rank_fusion_pipeline("query", [0.1], 10, 5)
+
+        legs = pipeline[0]["$rankFusion"]["input"]["pipelines"]
+        assert next(iter(legs["vector"][0])) == "$vectorSearch"
+        assert next(iter(legs["text"][0])) == "$search"
+        assert pipeline[1] == {"$limit": 5}
+
+    async def test_server_mode_uses_one_aggregation(self):
+        fused = {**_doc("a", 0.03), "document_title": None, "document_source": None}
+        chunks = FakeCollection(vector_docs=[fused])
+
+        results = await _engine(chunks, hybrid_mode="unionwith").hybrid_search("query", match_count=3)
+
+        assert [r.chunk_id for r in results] == ["a"]
+        assert results[0].document_title == "Title"  # null $first values are resolved
+        assert len(chunks.pipelines) == 1
+
+    async def test_rejected_pipeline_falls_back_to_python_rrf(self):
+        class RejectingCollection(FakeCollection):
+            def aggregate(self, pipeline):
+                if "$rankFusion" in pipeline[0]:
+                    raise OperationFailure("Unrecognized pipeline stage name: '$rankFusion'", code=40324)
+                return super().aggregate(pipeline)
+
+        chunks = RejectingCollection(name="rejecting_chunks", vector_docs=[_doc("a")], text_docs=[_doc("b")])
+        engine = _engine(chunks, hybrid_mode="rankfusion")
+
+        results = await engine.hybrid_search("query", match_count=2)
+
+        assert {r.chunk_id for r in results} == {"a", "b"}
+        assert engine.hybrid_mode == "python"
+        # Only this collection is switched; the process-wide mode is untouched
+        assert hybrid_mode_for(chunks, "rankfusion") == "python"
+        assert hybrid_mode_for(FakeCollection(name="other_chunks"), "rankfusion") == "rankfusion"
+
+    async def test_other_server_errors_fall_back_for_one_query_only(self):
+        class FlakyCollection(FakeCollection):
+            def aggregate(self, pipeline):
+                if "$unionWith" in str(pipeline) and "$vectorSearch" in pipeline[0]:
+                    raise OperationFailure("index not found", code=27)
+                return super().aggregate(pipeline)
+
+        chunks = FlakyCollection(name="flaky_chunks", vector_docs=[_doc("a")], text_docs=[_doc("b")])
+        engine = _engine(chunks, hybrid_mode="unionwith")
+
+        results = await engine.hybrid_search("query", match_count=2)
+
+        assert {r.chunk_id for r in results} == {"a", "b"}
+        assert engine.hybrid_mode == "unionwith"
+        assert hybrid_mode_for(chunks, "unionwith") == "unionwith"
+
+    async def test_rescoring_keeps_python_fusion(self):
+        chunks = FakeCollection(vector_docs=[_doc("a")])
+        await _engine(chunks, hybrid_mode="unionwith", rescore_oversample=2.0).hybrid_search("query", 1)
+        assert {next(iter(p[0])) for p in chunks.pipelines} == {"$vectorSearch", "$search"}
+
+    @pytest.mark.parametrize("version,expected", [((8, 2), "rankfusion"), ((7, 0), "unionwith"), ((5, 0), "python")])
+    async def test_detect_mode_from_server_version(self, version, expected):
+        class ProbedCollection(FakeCollection):
+            database = FakeDatabase(version)
+
+        try:
+            assert await detect_hybrid_mode(ProbedCollection()) == expected
+            assert get_hybrid_mode() == expected
+        finally:
+            set_hybrid_mode("python")
+
+    async def test_detect_mode_requires_search_probe(self):
+        class PlainMongodCollection(FakeCollection):
+            database = FakeDatabase((7, 0))
+
+            def aggregate(self, pipeline):
+                if any("$unionWith" in stage for stage in pipeline):
+                    raise OperationFailure("$search is not enabled", code=31082)
+                return super().aggregate(pipeline)
+
+        try:
+            assert await detect_hybrid_mode(PlainMongodCollection()) == "python"
+        finally:
+            set_hybrid_mode("python")
+
+    async def test_configured_mode_skips_detection(self):
+        try:
+            assert await detect_hybrid_mode(None, "unionwith") == "unionwith"
+            with pytest.raises(ValueError):
+                await detect_hybrid_mode(None, "fastest")
+        finally:
+            set_hybrid_mode("python")
+
+
+class TestProgressiveHybrid:
+    """Test streaming hybrid search stages."""
+
+    async def test_text_hits_arrive_before_vector_hits(self):
+        class SlowVectorCollection(FakeCollection):
+            def aggregate(self, pipeline):
+                cursor = super().aggregate(pipeline)
+                if "$vectorSearch" in pipeline[0]:
+                    cursor._delay = 0.1
+                return cursor
+
+        chunks = SlowVectorCollection(vector_docs=[_doc("a"), _doc("b")], text_docs=[_doc("b"), _doc("c")])
+
+        stages = [
+            (stage, [r.chunk_id for r in results])
+            async for stage, results in _engine(chunks).hybrid_search_stream("query", match_count=2)
+        ]
+
+        assert stages == [("text", ["b", "c"]), ("semantic", ["a", "b"]), ("hybrid", ["b", "a"])]
+
+    async def test_failed_leg_is_skipped(self):
+        chunks = FakeCollection(text_docs=[_doc("t")], fail={"$vectorSearch"})
+
+        stages = [stage async for stage, _ in _engine(chunks).hybrid_search_stream("query", 3)]
+
+        assert stages == ["text", "hybrid"]
+
+    async def test_both_legs_failing_raises(self):
+        chunks = FakeCollection(fail={"$vectorSearch", "$search"})
+        with pytest.raises(RuntimeError):
+            async for _ in _engine(chunks).hybrid_search_stream("query", 3):
+                pass
+
+
+class TestStageTimings:
+    """Test per-stage timing of engine searches."""
+
+    async def test_hybrid_records_each_stage(self):
+        chunks = FakeCollection(vector_docs=[_doc("a")], text_docs=[_doc("b")])
+
+        async def run():
+            timings = start_timings()
+            await _engine(chunks).hybrid_search("query", match_count=2)
+            return timings
+
+        # A separate task keeps the timer out of the test's own context
+        timings = await asyncio.create_task(run())
+
+        assert {"embedding", "vector_query", "text_query", "fusion", "join"} <= set(timings.stages)
+        assert timings.as_dict()["total"] >= max(timings.stages.values())
+
+    async def test_no_timer_records_nothing(self):
+        chunks = FakeCollection(text_docs=[_doc("t")])
+        await _engine(chunks).text_search("query", 3)
+        assert current_timings() is None
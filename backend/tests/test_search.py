@@ -95,3 +95,101 @@ class TestSearchValidation:
         })
         # Should return validation error or empty results
         assert response.status_code in [200, 422, 500]
+
+
+class TestSearchTimings:
+    """Test latency recording and the debug_timings flag."""
+
+    async def test_debug_timings_returned_and_recorded(self, client: TestClient):
+        """Test the stage breakdown is returned on request and fed to the dashboard."""
+        from backend.core.latency import configure_latency_store, merge_series
+
+        store = configure_latency_store()
+        with patch("backend.routers.search.cached_search", AsyncMock(return_value=([], False))):
+            response = client.post("/api/v1/search/text", json={"query": "timed", "debug_timings": True})
+            untimed = client.post("/api/v1/search/text", json={"query": "timed"})
+
+        assert "total" in response.json()["timings"]
+        assert untimed.json()["timings"] is None
+        minutes = await store.minutes(5, kind="search", search_type="text")
+        assert merge_series(minutes.values()).latency.count == 2
+        assert await store.minutes(5, kind="chat") == {}
+
+
+class TestStreamingSearch:
+    """Test the progressive hybrid search endpoint."""
+
+    def test_stream_emits_stages_then_final(self, client: TestClient):
+        """Test each stage is one NDJSON line and the fused ranking comes last."""
+        import json
+
+        async def stages(query, match_count):
+            yield "text", []
+            yield "semantic", []
+            yield "hybrid", []
+
+        engine = MagicMock(hybrid_search_stream=stages)
+        with patch("backend.routers.search.get_retrieval_engine", return_value=engine):
+            response = client.post("/api/v1/search/hybrid/stream", json={"query": "stream test"})
+
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["stage"] for line in lines] == ["text", "semantic", "hybrid"]
+        assert [line["final"] for line in lines] == [False, False, True]
+
+
+class TestBatchSearch:
+    """Test the NDJSON batch search endpoint."""
+
+    def test_batch_streams_one_line_per_query(self, client: TestClient):
+        """Test results stream as NDJSON with a trailing summary."""
+        import json
+
+        async def fake_search(db, query, search_type, match_count, engine=None):
+            if query == "bad":
+                raise RuntimeError("index missing")
+            return [], False
+
+        with patch("backend.routers.search.embed_queries", AsyncMock(return_value={})) as embed, \
+                patch("backend.routers.search.cached_search", side_effect=fake_search):
+            response = client.post("/api/v1/search/batch", json={"queries": [
+                {"query": "one", "search_type": "semantic"},
+                {"query": "bad", "search_type": "hybrid"},
+                {"query": "two", "search_type": "text", "match_count": 3},
+            ]})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        by_index = {line["index"]: line for line in lines[:-1]}
+        assert sorted(by_index) == [0, 1, 2]
+        assert by_index[1]["error"] == "index missing"
+        assert by_index[2]["total_results"] == 0
+        assert "search_ms" in by_index[0]["timings"]
+        assert lines[-1]["done"] is True and lines[-1]["failed"] == 1
+        # Text queries need no embedding
+        embed.assert_awaited_once_with(["one", "bad"])
+
+    def test_batch_requires_queries(self, client: TestClient):
+        """Test an empty batch is rejected."""
+        response = client.post("/api/v1/search/batch", json={"queries": []})
+        assert response.status_code == 422
+
+
+async def test_embed_queries_batches_misses():
+    """Test distinct uncached queries are embedded in chunks of embedding_batch_max_size."""
+    from backend.core import retrieval
+
+    calls = []
+
+    async def fake_create(texts):
+        calls.append(list(texts))
+        return [[float(len(t))] for t in texts]
+
+    with patch.object(retrieval, "_create_embeddings", side_effect=fake_create), \
+            patch.object(retrieval.settings, "embedding_batch_max_size", 2), \
+            patch.object(retrieval.settings, "embedding_cache_enabled", False), \
+            patch.object(retrieval, "embedding_dimension", return_value=1536):
+        vectors = await retrieval.embed_queries(["a", "bb", "a", "ccc"])
+
+    assert calls == [["a", "bb"], ["ccc"]]
+    assert vectors == {"a": [1.0], "bb": [2.0], "ccc": [3.0]}
@@ -0,0 +1,101 @@
+"""
+Unit tests for the chat sessions router.
+
+Tests keyset pagination and projection of the session list.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from backend.core.messages import MessageStore
+from backend.routers.sessions import _decode_session_cursor, _encode_session_cursor, _migrated_message_seq
+from backend.tests.test_message_store import FakeCollection
+
+
+class FakeDatabase(dict):
+    name = "test_sessions_db"
+
+
+def _session(i, **fields):
+    return {
+        "_id": f"s{i:02d}",
+        "title": f"Chat {i}",
+        "user_id": None,
+        "model": "gpt-4.1-mini",
+        "created_at": datetime(2026, 1, 1),
+        # Two sessions per timestamp so ties are broken by _id
+        "updated_at": datetime(2026, 1, 1) + timedelta(minutes=i // 2),
+        "messages": [{"role": "user", "content": "x" * 1000}],
+        "message_seq": 1,
+        **fields,
+    }
+
+
+@pytest.fixture
+def sessions_db(mock_db):
+    db = FakeDatabase(
+        chat_sessions=FakeCollection([_session(i) for i in range(7)]),
+        chat_folders=FakeCollection([{"_id": "f1", "name": "Work", "user_id": None, "created_at": datetime(2026, 1, 1)}]),
+        chat_messages=FakeCollection(),
+    )
+    mock_db.db = db
+    return db
+
+
+class TestSessionCursor:
+    """Test the (updated_at, _id) keyset cursor."""
+
+    def test_cursor_round_trips(self):
+        doc = {"_id": "abc|def", "updated_at": datetime(2026, 3, 4, 5, 6, 7, 123000)}
+        query = _decode_session_cursor(_encode_session_cursor(doc))
+        assert query["$or"][0] == {"updated_at": {"$lt": doc["updated_at"]}}
+        assert query["$or"][1] == {"updated_at": doc["updated_at"], "_id": {"$lt": "abc|def"}}
+
+    def test_invalid_cursor_is_rejected(self):
+        with pytest.raises(HTTPException) as exc:
+            _decode_session_cursor("not-a-cursor")
+        assert exc.value.status_code == 400
+
+
+class TestListSessions:
+    """Test paginated session listing."""
+
+    def test_pages_cover_all_sessions_once(self, client: TestClient, sessions_db):
+        seen = []
+        cursor = None
+        pages = 0
+        while True:
+            params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+            body = client.get("/api/v1/sessions", params=params).json()
+            seen.extend(s["id"] for s in body["sessions"])
+            # Folders come with the first page only
+            assert len(body["folders"]) == (1 if pages == 0 else 0)
+            pages += 1
+            cursor = body["cursor"]
+            if cursor is None:
+                break
+
+        assert pages == 3
+        assert seen == [f"s{i:02d}" for i in reversed(range(7))]
+
+    def test_list_never_returns_messages(self, client: TestClient, sessions_db):
+        body = client.get("/api/v1/sessions").json()
+        assert all(s["messages"] == [] for s in body["sessions"])
+        assert body["cursor"] is None
+
+
+async def test_message_seq_after_concurrent_migration_is_not_rewound():
+    """Test a request that finds the session already migrated reads the stored seq."""
+    sessions = FakeCollection([{"_id": "s1", "messages": [
+        {"id": "m0", "role": "user", "content": "hi"},
+        {"id": "m1", "role": "assistant", "content": "hello"},
+    ]}])
+    store = MessageStore(sessions, FakeCollection())
+
+    # Another request migrated the session first
+    await store.migrate_session("s1")
+
+    assert await _migrated_message_seq(sessions, store, "s1") == 2
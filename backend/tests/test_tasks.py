@@ -0,0 +1,198 @@
+"""
+Unit tests for background tasks.
+
+Tests the in-process queue, retries, lease recovery and the idempotent
+session stats and usage rollups.
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from pymongo.errors import DuplicateKeyError
+
+from backend.core.tasks import TaskQueue, task_handler
+from backend.tests.test_message_store import FakeCollection
+
+
+class FakeDatabase(dict):
+    name = "test_tasks_db"
+
+
+async def _drain(queue: TaskQueue):
+    await asyncio.wait_for(queue._queue.join(), 2)
+
+
+class TestTaskQueue:
+    """Test in-memory execution."""
+
+    async def test_runs_handler_with_database_and_payload(self):
+        seen = []
+
+        @task_handler("test_record")
+        async def record(db, payload, task_id):
+            seen.append((db.name, payload, task_id))
+
+        queue = TaskQueue(workers=1)
+        queue.start()
+        try:
+            task_id = await queue.enqueue("test_record", FakeDatabase(), {"n": 1})
+            await _drain(queue)
+        finally:
+            await queue.stop()
+
+        assert seen == [("test_tasks_db", {"n": 1}, task_id)]
+
+    async def test_failed_task_is_retried_up_to_max_attempts(self, monkeypatch):
+        attempts = []
+
+        @task_handler("test_flaky")
+        async def flaky(db, payload, task_id):
+            attempts.append(1)
+            raise RuntimeError("boom")
+
+        monkeypatch.setattr(TaskQueue, "_backoff", staticmethod(lambda attempts: 0))
+        queue = TaskQueue(workers=1, max_attempts=3)
+        queue.start()
+        try:
+            await queue.enqueue("test_flaky", FakeDatabase(), {})
+            for _ in range(20):
+                await asyncio.sleep(0.01)
+        finally:
+            await queue.stop()
+
+        assert len(attempts) == 3
+
+    async def test_enqueue_falls_back_to_memory_when_persisting_fails(self):
+        class BrokenCollection:
+            async def insert_one(self, doc):
+                raise ConnectionError("mongo down")
+
+        ran = []
+
+        @task_handler("test_fallback")
+        async def fallback(db, payload, task_id):
+            ran.append(payload)
+
+        queue = TaskQueue(collection=BrokenCollection(), workers=1)
+        queue._tasks = [asyncio.create_task(queue._work())]
+        try:
+            await queue.enqueue("test_fallback", FakeDatabase(), {"ok": True})
+            await _drain(queue)
+        finally:
+            await queue.stop()
+
+        assert ran == [{"ok": True}]
+
+
+class TestLeases:
+    """Test recovery of tasks abandoned by a crashed worker."""
+
+    @staticmethod
+    def _abandoned(attempts):
+        return {
+            "_id": "t1", "kind": "test_lease", "status": "running", "attempts": attempts,
+            "lease_until": datetime.now(timezone.utc) - timedelta(seconds=1),
+        }
+
+    async def test_abandoned_task_with_attempts_left_is_reclaimed(self):
+        queue = TaskQueue(collection=FakeCollection([self._abandoned(1)]), max_attempts=3)
+
+        task = await queue._claim("t1")
+
+        assert task["attempts"] == 2
+
+    async def test_abandoned_task_on_its_last_attempt_is_not_reclaimed(self):
+        tasks = FakeCollection([self._abandoned(3)])
+        queue = TaskQueue(collection=tasks, max_attempts=3, poll_seconds=0)
+
+        assert await queue._claim("t1") is None
+
+        poller = asyncio.create_task(queue._poll())
+        await asyncio.sleep(0.01)
+        poller.cancel()
+        assert tasks.docs["t1"]["status"] == "failed"
+        assert queue.depth == 0
+
+
+class TestSessionStatsRollup:
+    """Test atomic stats aggregation."""
+
+    async def test_legacy_averages_are_seeded_before_increment(self):
+        from backend.routers.sessions import SessionStats, _roll_up_session_stats
+
+        sessions = FakeCollection([{"_id": "s1", "stats": {
+            "total_messages": 4, "avg_tokens_per_second": 10.0, "avg_latency_ms": 100.0
+        }}])
+        db = FakeDatabase(chat_sessions=sessions)
+        increments = {
+            "total_messages": 2, "exchanges": 1, "total_tokens": 5,
+            "tokens_per_second_sum": 40.0, "latency_ms_sum": 400.0,
+        }
+
+        await _roll_up_session_stats(db, {"session_id": "s1", "increments": increments}, "t1")
+        await _roll_up_session_stats(db, {"session_id": "s1", "increments": increments}, "t2")
+
+        stats = SessionStats(**sessions.docs["s1"]["stats"])
+        assert stats.total_messages == 8
+        assert stats.exchanges == 4
+        assert stats.avg_tokens_per_second == 25.0
+        assert stats.avg_latency_ms == 250.0
+
+    async def test_redelivered_task_is_counted_once(self):
+        from backend.routers.sessions import _roll_up_session_stats
+
+        sessions = FakeCollection([{"_id": "s1", "stats": {"total_messages": 0, "exchanges": 0}}])
+        db = FakeDatabase(chat_sessions=sessions)
+        payload = {"session_id": "s1", "increments": {"total_messages": 2, "exchanges": 1}}
+
+        await _roll_up_session_stats(db, payload, "t1")
+        await _roll_up_session_stats(db, payload, "t1")
+
+        assert sessions.docs["s1"]["stats"] == {"total_messages": 2, "exchanges": 1}
+
+    async def test_usage_rollup_counts_each_task_once(self):
+        from backend.routers.sessions import _roll_up_usage
+
+        rollups = FakeCollection()
+        db = FakeDatabase(usage_rollups=rollups)
+        payload = {
+            "user_id": "u1", "model": "gpt-4o", "day": "2026-01-01",
+            "input_tokens": 10, "output_tokens": 5, "cost_usd": 0.5,
+        }
+
+        await _roll_up_usage(db, payload, "t1")
+        await _roll_up_usage(db, payload, "t1")
+        await _roll_up_usage(db, payload, "t2")
+
+        usage = rollups.docs["2026-01-01|u1|gpt-4o"]
+        assert usage["messages"] == 2
+        assert usage["input_tokens"] == 20
+        assert usage["applied_tasks"] == ["t1", "t2"]
+
+    async def test_usage_rollup_keeps_the_loser_of_a_create_race(self):
+        from backend.routers.sessions import _roll_up_usage
+
+        class RacingCollection(FakeCollection):
+            """Another task's upsert creates the document between our filter and our insert."""
+
+            async def update_one(self, query, update, upsert=False):
+                if upsert and not self.docs:
+                    await super().update_one({**query, "applied_tasks": {"$ne": "t1"}}, {
+                        **update, "$push": {"applied_tasks": {"$each": ["t1"]}}
+                    }, upsert=True)
+                    raise DuplicateKeyError("E11000 duplicate key error")
+                return await super().update_one(query, update, upsert)
+
+        rollups = RacingCollection()
+        db = FakeDatabase(usage_rollups=rollups)
+        payload = {
+            "user_id": "u1", "model": "gpt-4o", "day": "2026-01-01",
+            "input_tokens": 10, "output_tokens": 5, "cost_usd": 0.5,
+        }
+
+        await _roll_up_usage(db, payload, "t2")
+
+        usage = rollups.docs["2026-01-01|u1|gpt-4o"]
+        assert usage["messages"] == 2
+        assert usage["input_tokens"] == 20
+        assert usage["applied_tasks"] == ["t1", "t2"]
@@ -0,0 +1,126 @@
+"""
+Unit tests for binary embedding storage.
+
+Tests encoding, int8 quantization, the conversion migration and the
+matching query/index handling.
+"""
+
+import math
+
+import pytest
+from bson import BSON
+from bson.binary import Binary
+from pymongo import UpdateOne
+
+from src.retrieval.engine import RetrievalEngine
+from src.retrieval.index_definitions import vector_index_definition
+from src.retrieval.vector_storage import (
+    convert_embeddings, decode_embedding, encode_embedding, quantize_int8, stored_format
+)
+
+VECTOR = [0.25, -0.5, 0.125, 1.0]
+
+
+def _cosine(a, b):
+    dot = sum(x * y for x, y in zip(a, b))
+    return dot / (math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b)))
+
+
+class FakeResult:
+    def __init__(self, modified_count):
+        self.modified_count = modified_count
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def limit(self, n):
+        return FakeCursor(self.docs[:n])
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+
+class FakeChunks:
+    """Chunks collection stub recording bulk writes."""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.operations = []
+
+    def find(self, query, projection=None):
+        return FakeCursor(self.docs)
+
+    async def bulk_write(self, operations, ordered=True):
+        self.operations.extend(operations)
+        return FakeResult(len(operations))
+
+
+class TestEncoding:
+    """Test storage encodings."""
+
+    def test_float32_round_trip(self):
+        encoded = encode_embedding(VECTOR, "float32")
+
+        assert isinstance(encoded, Binary) and encoded.subtype == 9
+        assert decode_embedding(encoded) == VECTOR
+        assert stored_format(encoded) == "float32"
+
+    def test_binary_is_smaller_than_array(self):
+        vector = [0.1] * 1536
+        array_size = len(BSON.encode({"embedding": encode_embedding(vector, "array")}))
+        float32_size = len(BSON.encode({"embedding": encode_embedding(vector, "float32")}))
+        int8_size = len(BSON.encode({"embedding": encode_embedding(vector, "int8")}))
+
+        assert float32_size * 3 < array_size
+        assert int8_size * 10 < array_size
+
+    def test_int8_preserves_cosine(self):
+        other = [0.3, -0.4, 0.2, 0.9]
+
+        quantized = decode_embedding(encode_embedding(VECTOR, "int8"))
+
+        assert max(abs(v) for v in quantized) == 127
+        assert abs(_cosine(quantized, other) - _cosine(VECTOR, other)) < 0.01
+        assert stored_format(encode_embedding(VECTOR, "int8")) == "int8"
+
+    def test_quantize_zero_vector(self):
+        assert quantize_int8([0.0, 0.0]) == [0, 0]
+
+    def test_unknown_format_rejected(self):
+        with pytest.raises(ValueError):
+            encode_embedding(VECTOR, "float16")
+
+
+async def test_convert_embeddings_skips_converted_chunks():
+    chunks = FakeChunks([
+        {"_id": 1, "embedding": list(VECTOR)},
+        {"_id": 2, "embedding": encode_embedding(VECTOR, "float32")},
+    ])
+
+    stats = await convert_embeddings(chunks, "float32", batch_size=1)
+
+    assert stats == {"examined": 2, "converted": 1, "skipped": 1}
+    assert chunks.operations == [
+        UpdateOne({"_id": 1}, {"$set": {"embedding": encode_embedding(VECTOR, "float32")}})
+    ]
+
+
+def test_query_vector_matches_storage_format():
+    engine = RetrievalEngine(
+        chunks_collection=None, documents_collection=None, embed=None, embedding_format="int8"
+    )
+
+    query = engine.vector_pipeline(VECTOR, 5)[0]["$vectorSearch"]["queryVector"]
+
+    assert stored_format(query) == "int8"
+
+
+def test_int8_index_rejects_dot_product():
+    with pytest.raises(ValueError):
+        vector_index_definition("vector_index", 4, similarity="dotProduct", storage_format="int8")
@@ -500,6 +500,7 @@ export interface MessageStats {
 
 export interface SessionMessage {
   id: string
+  seq?: number
   role: 'user' | 'assistant'
   content: string
   timestamp: string
@@ -540,6 +541,7 @@ export interface ChatSession {
   created_at: string
   updated_at: string
   messages: SessionMessage[]
+  messages_before?: number | null
   stats: SessionStats
   is_pinned: boolean
   profile?: string
@@ -556,6 +558,7 @@ export interface ChatFolder {
 export interface SessionListResponse {
   sessions: ChatSession[]
   folders: ChatFolder[]
+  cursor: string | null
 }
 
 export interface ModelPricing {
@@ -568,6 +571,11 @@ export interface ModelPricingInfo {
   pricing: ModelPricing
 }
 
+export interface MessagePage {
+  messages: SessionMessage[]
+  before: number | null
+}
+
 export interface SendMessageResponse {
   user_message: SessionMessage
   assistant_message: SessionMessage
@@ -858,8 +866,11 @@ export const systemApi = {
 
 export const sessionsApi = {
   // Sessions
-  list: async (folderId?: string): Promise<SessionListResponse> => {
-    const params = folderId !== undefined ? { folder_id: folderId } : {}
+  list: async (folderId?: string, cursor?: string): Promise<SessionListResponse> => {
+    const params = {
+      ...(folderId !== undefined ? { folder_id: folderId } : {}),
+      ...(cursor ? { cursor } : {}),
+    }
     const response = await api.get('/sessions', { params })
     return response.data
   },
@@ -885,6 +896,11 @@ export const sessionsApi = {
   },
 
   // Messages
+  listMessages: async (sessionId: string, before?: number, limit?: number): Promise<MessagePage> => {
+    const response = await api.get(`/sessions/${sessionId}/messages`, { params: { before, limit } })
+    return response.data
+  },
+
   sendMessage: async (
     sessionId: string,
     content: string,
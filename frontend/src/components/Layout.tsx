@@ -58,6 +58,7 @@ export default function Layout() {
   const {
     sessions,
     folders,
+    hasMoreSessions,
     currentSession,
     isSidebarLoading,
     collapsedFolders,
@@ -66,6 +67,7 @@ export default function Layout() {
     showNewFolder,
     newFolderName,
     contextMenu,
+    loadMoreSessions,
     handleNewChat,
     handleSelectSession,
     handleDeleteSession,
@@ -312,6 +314,15 @@ export default function Layout() {
               </div>
             )}
 
+            {hasMoreSessions && (
+              <button
+                onClick={loadMoreSessions}
+                className="w-full py-2 text-xs text-secondary dark:text-gray-400 hover:text-primary-600 dark:hover:text-primary-400"
+              >
+                Load more chats
+              </button>
+            )}
+
             {sessions.length === 0 && !isSidebarLoading && (
               <div className="text-center py-8 text-secondary dark:text-gray-500 text-sm">
                 No chats yet
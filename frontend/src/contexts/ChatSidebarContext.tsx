@@ -21,6 +21,7 @@ interface ChatSidebarContextType {
   // State
   sessions: ChatSession[]
   folders: ChatFolder[]
+  hasMoreSessions: boolean
   currentSession: ChatSession | null
   isSidebarLoading: boolean
   models: LLMModel[]
@@ -34,6 +35,7 @@ interface ChatSidebarContextType {
 
   // Actions
   loadSessions: () => Promise<void>
+  loadMoreSessions: () => Promise<void>
   handleNewChat: (folderId?: string) => Promise<void>
   handleSelectSession: (sessionId: string) => Promise<void>
   handleDeleteSession: (sessionId: string) => Promise<void>
@@ -70,6 +72,7 @@ export function ChatSidebarProvider({ children }: { children: ReactNode }) {
   // State
   const [sessions, setSessions] = useState<ChatSession[]>([])
   const [folders, setFolders] = useState<ChatFolder[]>([])
+  const [sessionsCursor, setSessionsCursor] = useState<string | null>(null)
   const [currentSession, setCurrentSession] = useState<ChatSession | null>(null)
   const [isSidebarLoading, setIsSidebarLoading] = useState(true)
   const [models, setModels] = useState<LLMModel[]>([])
@@ -101,6 +104,7 @@ export function ChatSidebarProvider({ children }: { children: ReactNode }) {
       const response = await sessionsApi.list()
       setSessions(response.sessions)
       setFolders(response.folders)
+      setSessionsCursor(response.cursor)
     } catch (err) {
       // Log error details for debugging
       if (err instanceof ApiError) {
@@ -117,6 +121,21 @@ export function ChatSidebarProvider({ children }: { children: ReactNode }) {
     }
   }, [user?.is_admin])
 
+  // Append the next page of older sessions
+  const loadMoreSessions = useCallback(async () => {
+    if (!sessionsCursor) return
+    try {
+      const response = await sessionsApi.list(undefined, sessionsCursor)
+      setSessions(prev => {
+        const known = new Set(prev.map(s => s.id))
+        return [...prev, ...response.sessions.filter(s => !known.has(s.id))]
+      })
+      setSessionsCursor(response.cursor)
+    } catch (err) {
+      console.error('Failed to load more sessions:', err)
+    }
+  }, [sessionsCursor])
+
   // Load models and pricing
   const loadModels = useCallback(async () => {
     try {
@@ -272,6 +291,7 @@ export function ChatSidebarProvider({ children }: { children: ReactNode }) {
   const value: ChatSidebarContextType = {
     sessions,
     folders,
+    hasMoreSessions: sessionsCursor !== null,
     currentSession,
     isSidebarLoading,
     models,
@@ -283,6 +303,7 @@ export function ChatSidebarProvider({ children }: { children: ReactNode }) {
     newFolderName,
     contextMenu,
     loadSessions,
+    loadMoreSessions,
     handleNewChat,
     handleSelectSession,
     handleDeleteSession,
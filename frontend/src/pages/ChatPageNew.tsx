@@ -105,6 +105,21 @@ export default function ChatPage() {
     }
   }, [currentSession?.id])
 
+  // Prepend the next page of older messages
+  const handleLoadEarlier = async () => {
+    if (!currentSession || currentSession.messages_before == null) return
+    try {
+      const page = await sessionsApi.listMessages(currentSession.id, currentSession.messages_before)
+      setCurrentSession(prev => prev && prev.id === currentSession.id ? {
+        ...prev,
+        messages: [...page.messages, ...prev.messages],
+        messages_before: page.before,
+      } : prev)
+    } catch (err) {
+      console.error('Failed to load earlier messages:', err)
+    }
+  }
+
   // Change model for current session
   const handleChangeModel = async (modelId: string) => {
     if (!currentSession) return
@@ -361,6 +376,16 @@ export default function ChatPage() {
           {/* Messages */}
           <div className="flex-1 overflow-y-auto px-6 py-4">
             <div className="max-w-3xl mx-auto space-y-6">
+              {currentSession.messages_before != null && (
+                <div className="flex justify-center">
+                  <button
+                    onClick={handleLoadEarlier}
+                    className="text-sm text-primary-600 dark:text-primary-400 hover:underline"
+                  >
+                    Load earlier messages
+                  </button>
+                </div>
+              )}
               {currentSession.messages.map((message) => (
                 <MessageBubble
                   key={message.id}
@@ -0,0 +1,118 @@
+"""
+Calibrate $vectorSearch numCandidates for a profile.
+
+Samples stored chunk embeddings as queries, compares approximate search at
+increasing candidate multipliers against exact search, and stores the
+smallest multiplier reaching the recall target. The API and CLI agent pick
+it up automatically for that profile.
+
+Usage:
+    python -m src.calibrate [--profile NAME] [--sample-size 50] [--k 10] [--recall-target 0.95]
+"""
+
+import argparse
+import asyncio
+import logging
+
+from pymongo import AsyncMongoClient
+
+from src.profile import get_profile_manager
+from src.retrieval.candidates import (
+    CALIBRATION_COLLECTION, DEFAULT_CALIBRATION_MULTIPLIERS, calibrate_multiplier
+)
+from src.retrieval.engine import RetrievalEngine, aggregate_to_list
+from src.retrieval.vector_storage import decode_embedding
+from src.settings import load_settings
+
+logger = logging.getLogger(__name__)
+
+
+async def main() -> None:
+    """Main function for running calibration."""
+    parser = argparse.ArgumentParser(
+        description="Calibrate vector search numCandidates against exact search"
+    )
+    parser.add_argument("--profile", "-p", default=None, help="Profile to calibrate")
+    parser.add_argument("--sample-size", type=int, default=50, help="Number of sample queries")
+    parser.add_argument("--k", type=int, default=10, help="Results compared per query (recall@k)")
+    parser.add_argument(
+        "--recall-target",
+        type=float,
+        default=None,
+        help="Target mean recall@k (default: VECTOR_RECALL_TARGET or 0.95)"
+    )
+    parser.add_argument(
+        "--multipliers",
+        default=",".join(str(m) for m in DEFAULT_CALIBRATION_MULTIPLIERS),
+        help="Comma-separated candidate multipliers to try"
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Measure only, don't store")
+    parser.add_argument("--verbose", "-v", action="store_true", help="Enable verbose logging")
+
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+
+    if args.profile:
+        profile_manager = get_profile_manager()
+        if not profile_manager.switch_profile(args.profile):
+            print(f"Error: Profile '{args.profile}' not found")
+            print(f"Available profiles: {list(profile_manager.list_profiles().keys())}")
+            return
+        print(f"Using profile: {args.profile}")
+
+    settings = load_settings()
+    recall_target = args.recall_target or settings.vector_recall_target or 0.95
+    multipliers = [float(m) for m in args.multipliers.split(",") if m.strip()]
+
+    client = AsyncMongoClient(settings.mongodb_uri, serverSelectionTimeoutMS=5000)
+    db = client[settings.mongodb_database]
+    chunks = db[settings.mongodb_collection_chunks]
+
+    try:
+        sample = await aggregate_to_list(chunks, [
+            {"$match": {"embedding": {"$exists": True}}},
+            {"$sample": {"size": args.sample_size}},
+            {"$project": {"embedding": 1}}
+        ])
+        query_vectors = [decode_embedding(doc["embedding"]) for doc in sample]
+        if not query_vectors:
+            print("No embedded chunks found - run ingestion first.")
+            return
+
+        print(f"Calibrating {chunks.full_name} with {len(query_vectors)} queries, "
+              f"k={args.k}, recall target={recall_target}")
+
+        engine = RetrievalEngine(
+            chunks_collection=chunks,
+            documents_collection=db[settings.mongodb_collection_documents],
+            embed=None,
+            vector_index=settings.mongodb_vector_index,
+            text_index=settings.mongodb_text_index,
+            embedding_format=settings.embedding_storage_format,
+        )
+        record = await calibrate_multiplier(
+            engine, query_vectors, k=args.k, recall_target=recall_target, multipliers=multipliers
+        )
+
+        for multiplier, recall in record["recall_by_multiplier"].items():
+            print(f"  multiplier {multiplier:>5}: recall@{args.k} = {recall:.4f}")
+        print(f"Chosen multiplier: {record['multiplier']} (recall {record['recall']})")
+
+        if args.dry_run:
+            print("Dry run - calibration not stored.")
+            return
+
+        await db[CALIBRATION_COLLECTION].replace_one(
+            {"_id": chunks.full_name}, record, upsert=True
+        )
+        print(f"Stored calibration in {CALIBRATION_COLLECTION}.")
+    finally:
+        await client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
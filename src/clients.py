@@ -0,0 +1,285 @@
+"""
+Long-lived HTTP clients for the embedding and LLM providers.
+
+Creating an AsyncOpenAI client per request throws away the connection pool,
+so every query paid a fresh TCP/TLS handshake. ClientRegistry owns one pooled
+httpx client per provider and hands the same instances to search, chat,
+sessions and ingestion. When the provider base URL or API key changes, the
+clients are rebuilt and the old pools are closed once in-flight requests
+have had time to finish.
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+import httpx
+import openai
+
+logger = logging.getLogger(__name__)
+
+# Seconds to keep a replaced client open so in-flight requests can complete
+_RETIRE_GRACE_SECONDS = 60.0
+
+
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional h2 package."""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+async def _close_client(client: Any) -> None:
+    if isinstance(client, openai.AsyncOpenAI):
+        await client.close()
+    else:
+        await client.aclose()
+
+
+class ClientRegistry:
+    """Pooled embedding and LLM clients shared across the process."""
+
+    def __init__(
+        self,
+        embedding_api_key: str = "",
+        embedding_base_url: Optional[str] = None,
+        llm_api_key: str = "",
+        llm_base_url: Optional[str] = None,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        http2: bool = False,
+        timeout: float = 60.0
+    ):
+        """
+        Initialize client registry.
+
+        Args:
+            embedding_api_key: API key for the embedding provider
+            embedding_base_url: Base URL for the embedding provider
+            llm_api_key: API key for the LLM provider
+            llm_base_url: Base URL for the LLM provider
+            max_connections: Maximum concurrent connections per client
+            max_keepalive_connections: Idle connections kept open per client
+            keepalive_expiry: Seconds an idle connection stays in the pool
+            http2: Negotiate HTTP/2 when the provider supports it
+            timeout: Request timeout in seconds
+        """
+        self.embedding_api_key = embedding_api_key
+        self.embedding_base_url = embedding_base_url
+        self.llm_api_key = llm_api_key
+        self.llm_base_url = llm_base_url
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+
+        if http2 and not _http2_available():
+            logger.warning("HTTP/2 requested but the h2 package is not installed, using HTTP/1.1")
+            http2 = False
+        self.http2 = http2
+
+        self._embedding_client: Optional[openai.AsyncOpenAI] = None
+        self._llm_http_client: Optional[httpx.AsyncClient] = None
+        self._retiring: Dict[asyncio.Task, Any] = {}
+        self.rebuilds = 0
+
+    def _new_http_client(self) -> httpx.AsyncClient:
+        return openai.DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry
+            ),
+            timeout=httpx.Timeout(self.timeout, connect=10.0),
+            http2=self.http2
+        )
+
+    @property
+    def embedding_client(self) -> openai.AsyncOpenAI:
+        """Shared AsyncOpenAI client for the embeddings API."""
+        if self._embedding_client is None:
+            self._embedding_client = openai.AsyncOpenAI(
+                api_key=self.embedding_api_key or "not-set",
+                base_url=self.embedding_base_url or None,
+                http_client=self._new_http_client()
+            )
+        return self._embedding_client
+
+    @property
+    def llm_http_client(self) -> httpx.AsyncClient:
+        """
+        Shared httpx client for LLM completions.
+
+        Installed as litellm's async session so chat and session completions
+        reuse pooled connections instead of opening new ones per call.
+        """
+        if self._llm_http_client is None:
+            self._llm_http_client = self._new_http_client()
+            self._install_litellm_session()
+        return self._llm_http_client
+
+    def install_litellm_session(self) -> None:
+        """Route litellm's async OpenAI-compatible calls through the shared LLM pool."""
+        _ = self.llm_http_client
+
+    def _install_litellm_session(self) -> None:
+        try:
+            import litellm
+        except ImportError:
+            return
+        litellm.aclient_session = self._llm_http_client
+
+    async def reconfigure(
+        self,
+        embedding_api_key: Optional[str] = None,
+        embedding_base_url: Optional[str] = None,
+        llm_api_key: Optional[str] = None,
+        llm_base_url: Optional[str] = None
+    ) -> bool:
+        """
+        Apply new provider endpoints/keys, rebuilding only what changed.
+
+        Args:
+            embedding_api_key: New embedding API key (None keeps current)
+            embedding_base_url: New embedding base URL (None keeps current)
+            llm_api_key: New LLM API key (None keeps current)
+            llm_base_url: New LLM base URL (None keeps current)
+
+        Returns:
+            True if any client was rebuilt
+        """
+        rebuilt = False
+
+        embedding_changed = (
+            (embedding_api_key is not None and embedding_api_key != self.embedding_api_key)
+            or (embedding_base_url is not None and embedding_base_url != self.embedding_base_url)
+        )
+        if embedding_changed:
+            if embedding_api_key is not None:
+                self.embedding_api_key = embedding_api_key
+            if embedding_base_url is not None:
+                self.embedding_base_url = embedding_base_url
+            old = self._embedding_client
+            self._embedding_client = None
+            if old is not None:
+                self._retire(old)
+            rebuilt = True
+
+        llm_changed = (
+            (llm_api_key is not None and llm_api_key != self.llm_api_key)
+            or (llm_base_url is not None and llm_base_url != self.llm_base_url)
+        )
+        if llm_changed:
+            if llm_api_key is not None:
+                self.llm_api_key = llm_api_key
+            if llm_base_url is not None:
+                self.llm_base_url = llm_base_url
+            old = self._llm_http_client
+            if old is not None:
+                self._llm_http_client = self._new_http_client()
+                self._install_litellm_session()
+                self._retire(old)
+            rebuilt = True
+
+        if rebuilt:
+            self.rebuilds += 1
+            logger.info(
+                f"HTTP clients rebuilt (embedding={embedding_changed}, llm={llm_changed})"
+            )
+        return rebuilt
+
+    def _retire(self, client: Any, grace: float = _RETIRE_GRACE_SECONDS) -> None:
+        """Close a replaced client after in-flight requests have drained."""
+        async def _close_later():
+            await asyncio.sleep(grace)
+            await _close_client(client)
+
+        try:
+            task = asyncio.get_running_loop().create_task(_close_later())
+        except RuntimeError:
+            return
+        self._retiring[task] = client
+        task.add_done_callback(lambda t: self._retiring.pop(t, None))
+
+    async def aclose(self) -> None:
+        """Close every pooled client, including ones still being retired."""
+        for task, client in list(self._retiring.items()):
+            task.cancel()
+            await _close_client(client)
+        self._retiring.clear()
+
+        if self._embedding_client is not None:
+            await self._embedding_client.close()
+            self._embedding_client = None
+        if self._llm_http_client is not None:
+            await self._llm_http_client.aclose()
+            self._llm_http_client = None
+
+    def stats(self) -> dict:
+        """Pool configuration and lifecycle counters."""
+        return {
+            "max_connections": self.max_connections,
+            "max_keepalive_connections": self.max_keepalive_connections,
+            "keepalive_expiry": self.keepalive_expiry,
+            "http2": self.http2,
+            "embedding_client_open": self._embedding_client is not None,
+            "llm_client_open": self._llm_http_client is not None,
+            "rebuilds": self.rebuilds,
+        }
+
+
+# Global registry shared by every provider call in the process
+_client_registry: Optional[ClientRegistry] = None
+
+
+def configure_client_registry(settings: Any) -> ClientRegistry:
+    """
+    Replace the process-wide client registry with one built from settings.
+
+    Args:
+        settings: Settings object exposing provider keys/URLs and http_* pool options
+
+    Returns:
+        The new ClientRegistry
+    """
+    global _client_registry
+
+    _client_registry = ClientRegistry(
+        embedding_api_key=settings.embedding_api_key,
+        embedding_base_url=settings.embedding_base_url,
+        llm_api_key=settings.llm_api_key,
+        llm_base_url=settings.llm_base_url,
+        max_connections=settings.http_max_connections,
+        max_keepalive_connections=settings.http_max_keepalive_connections,
+        keepalive_expiry=settings.http_keepalive_expiry_seconds,
+        http2=settings.http2_enabled,
+        timeout=settings.http_timeout_seconds
+    )
+    logger.info(
+        f"HTTP client registry configured: max_connections={settings.http_max_connections}, "
+        f"keepalive={settings.http_max_keepalive_connections}, http2={_client_registry.http2}"
+    )
+    return _client_registry
+
+
+def get_client_registry() -> ClientRegistry:
+    """Get or create the process-wide client registry."""
+    global _client_registry
+
+    if _client_registry is None:
+        from src.settings import load_settings
+        configure_client_registry(load_settings(use_profile=False))
+
+    return _client_registry
+
+
+async def close_client_registry() -> None:
+    """Close the process-wide client registry (application shutdown)."""
+    global _client_registry
+
+    if _client_registry is not None:
+        await _client_registry.aclose()
+        _client_registry = None
@@ -6,8 +6,18 @@ import logging
 from pymongo import AsyncMongoClient
 from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
 import openai
+from src.clients import get_client_registry
+from src.metrics import EMBEDDING_INPUTS, EMBEDDING_REQUESTS, EMBEDDING_SECONDS, observe_call, record_usage
 from src.settings import load_settings
 from src.profile import get_profile_manager
+from src.retrieval.capabilities import detect_hybrid_mode, hybrid_mode_for
+from src.retrieval.candidates import CandidatePlanner
+from src.retrieval.engine import RetrievalEngine
+from src.retrieval.embedding_cache import EMBEDDING_CACHE_COLLECTION, get_embedding_cache
+from src.retrieval.embedding_dimensions import embedding_request_options
+from src.retrieval.local_text import local_text_index_for
+from src.retrieval.local_vector import local_vector_index_for
+from src.retrieval.rescore import rescore_oversample_for
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +31,8 @@ class AgentDependencies:
     db: Optional[Any] = None
     openai_client: Optional[openai.AsyncOpenAI] = None
     settings: Optional[Any] = None
+    candidate_planner: Optional[CandidatePlanner] = None
+    hybrid_mode: Optional[str] = None
 
     # Profile support
     profile_name: Optional[str] = None
@@ -74,16 +86,42 @@ class AgentDependencies:
 
         # Initialize OpenAI client for embeddings
         if not self.openai_client:
-            self.openai_client = openai.AsyncOpenAI(
-                api_key=self.settings.embedding_api_key,
-                base_url=self.settings.embedding_base_url,
-            )
+            self.openai_client = get_client_registry().embedding_client
             logger.info(
                 "openai_client_initialized",
                 model=self.settings.embedding_model,
                 dimension=self.settings.embedding_dimension,
             )
 
+        # Adaptive numCandidates for vector search
+        if not self.candidate_planner:
+            self.candidate_planner = CandidatePlanner(
+                multiplier=self.settings.vector_candidate_multiplier,
+                recall_target=self.settings.vector_recall_target,
+                max_candidates=self.settings.vector_max_candidates,
+                exact_threshold=self.settings.vector_exact_threshold,
+            )
+
+        # Detect server-side hybrid search ($rankFusion / $unionWith) once
+        if not self.hybrid_mode:
+            try:
+                self.hybrid_mode = await detect_hybrid_mode(
+                    self.db[self.settings.mongodb_collection_chunks],
+                    self.settings.hybrid_search_mode,
+                )
+            except Exception as e:
+                logger.warning(f"hybrid_mode_detection_failed: {e}")
+                self.hybrid_mode = "python"
+
+        # Share cached query embeddings through MongoDB if enabled
+        cache = get_embedding_cache()
+        if self.settings.embedding_cache_persist and cache.collection is None:
+            cache.collection = self.db[EMBEDDING_CACHE_COLLECTION]
+            try:
+                await cache.ensure_indexes()
+            except Exception as e:
+                logger.warning(f"embedding_cache_index_failed: {e}")
+
     async def cleanup(self) -> None:
         """Clean up external connections."""
         if self.mongo_client:
@@ -108,12 +146,60 @@ class AgentDependencies:
         if not self.openai_client:
             await self.initialize()
 
-        response = await self.openai_client.embeddings.create(
-            model=self.settings.embedding_model, input=text
+        if not self.settings.embedding_cache_enabled:
+            return await self._create_embedding(text)
+
+        return await get_embedding_cache().get_or_compute(
+            self.settings.embedding_model,
+            self.settings.embedding_dimension,
+            text,
+            self._create_embedding,
         )
+
+    async def _create_embedding(self, text: str) -> list[float]:
+        """Call the embeddings API (cache miss path)."""
+        EMBEDDING_INPUTS.inc(source="query")
+        with observe_call(EMBEDDING_REQUESTS, EMBEDDING_SECONDS, source="query"):
+            response = await self.openai_client.embeddings.create(
+                model=self.settings.embedding_model,
+                input=text,
+                **embedding_request_options(self.settings.embedding_model, self.settings.embedding_dimension)
+            )
+        record_usage(getattr(response, "usage", None), source="query")
         # Return as list of floats - MongoDB stores as native array
         return response.data[0].embedding
 
+    async def get_retrieval_engine(self) -> RetrievalEngine:
+        """
+        Build a retrieval engine bound to the active profile's collections.
+
+        Returns:
+            RetrievalEngine using this instance's embedding function
+        """
+        if self.db is None:
+            await self.initialize()
+
+        chunks_collection = self.db[self.settings.mongodb_collection_chunks]
+        return RetrievalEngine(
+            chunks_collection=chunks_collection,
+            documents_collection=self.db[self.settings.mongodb_collection_documents],
+            embed=self.get_embedding,
+            vector_index=self.settings.mongodb_vector_index,
+            text_index=self.settings.mongodb_text_index,
+            candidate_planner=self.candidate_planner,
+            local_vector_index=local_vector_index_for(
+                self.settings, self.settings.mongodb_database, self.settings.mongodb_collection_chunks
+            ),
+            local_text_index=local_text_index_for(
+                self.settings, self.settings.mongodb_database, self.settings.mongodb_collection_chunks
+            ),
+            embedding_format=self.settings.embedding_storage_format,
+            rescore_oversample=rescore_oversample_for(
+                self.settings.vector_quantization, self.settings.vector_rescore_oversample
+            ),
+            hybrid_mode=hybrid_mode_for(chunks_collection, self.hybrid_mode or "python"),
+        )
+
     def set_user_preference(self, key: str, value: Any) -> None:
         """
         Set a user preference for the session.
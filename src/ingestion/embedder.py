@@ -11,7 +11,10 @@ from datetime import datetime
 from dotenv import load_dotenv
 import openai
 
+from src.clients import get_client_registry
 from src.ingestion.chunker import DocumentChunk
+from src.metrics import EMBEDDING_INPUTS, EMBEDDING_REQUESTS, EMBEDDING_SECONDS, observe_call, record_usage
+from src.retrieval.embedding_dimensions import embedding_request_options
 from src.settings import load_settings
 
 # Load environment variables
@@ -20,26 +23,14 @@ load_dotenv()
 logger = logging.getLogger(__name__)
 
 
-def get_embedding_client():
-    """Get embedding client based on provider configuration."""
-    settings = load_settings(use_profile=False)  # Use base settings for embedding client
-    
-    return openai.AsyncOpenAI(
-        api_key=settings.embedding_api_key,
-        base_url=settings.embedding_base_url
-    )
+def get_embedding_client() -> openai.AsyncOpenAI:
+    """Get the pooled embedding client shared with the rest of the process."""
+    return get_client_registry().embedding_client
 
 
-# Initialize client lazily
-_embedding_client = None
-
-
-def get_client():
-    """Get or create embedding client."""
-    global _embedding_client
-    if _embedding_client is None:
-        _embedding_client = get_embedding_client()
-    return _embedding_client
+def get_client() -> openai.AsyncOpenAI:
+    """Get embedding client (resolved on each call so provider changes apply)."""
+    return get_embedding_client()
 
 
 class EmbeddingGenerator:
@@ -48,7 +39,8 @@ class EmbeddingGenerator:
     def __init__(
         self,
         model: Optional[str] = None,
-        batch_size: int = 100
+        batch_size: int = 100,
+        dimension: Optional[int] = None
     ):
         """
         Initialize embedding generator.
@@ -56,6 +48,8 @@ class EmbeddingGenerator:
         Args:
             model: Embedding model to use (defaults to settings)
             batch_size: Number of texts to process in parallel
+            dimension: Embedding dimension (defaults to settings; below the model's
+                native size it is requested via the `dimensions` parameter)
         """
         settings = load_settings(use_profile=False)
         self.model = model or settings.embedding_model
@@ -79,9 +73,10 @@ class EmbeddingGenerator:
         default_config = {"dimensions": settings.embedding_dimension, "max_tokens": 8191}
         self.config = self.model_configs.get(self.model, default_config)
         
-        # Override with settings if specified
-        if settings.embedding_dimension:
-            self.config["dimensions"] = settings.embedding_dimension
+        # Override with the requested or configured dimension
+        if dimension or settings.embedding_dimension:
+            self.config["dimensions"] = dimension or settings.embedding_dimension
+        self.request_options = embedding_request_options(self.model, self.config["dimensions"])
         
         logger.info(f"Embedding generator initialized: model={self.model}, provider={self.provider}, dimensions={self.config['dimensions']}")
 
@@ -99,10 +94,14 @@ class EmbeddingGenerator:
         if len(text) > self.config["max_tokens"] * 4:
             text = text[:self.config["max_tokens"] * 4]
 
-        response = await get_client().embeddings.create(
-            model=self.model,
-            input=text
-        )
+        EMBEDDING_INPUTS.inc(source="ingestion")
+        with observe_call(EMBEDDING_REQUESTS, EMBEDDING_SECONDS, source="ingestion"):
+            response = await get_client().embeddings.create(
+                model=self.model,
+                input=text,
+                **self.request_options
+            )
+        record_usage(getattr(response, "usage", None), source="ingestion")
 
         return response.data[0].embedding
 
@@ -126,10 +125,14 @@ class EmbeddingGenerator:
                 text = text[:self.config["max_tokens"] * 4]
             processed_texts.append(text)
 
-        response = await get_client().embeddings.create(
-            model=self.model,
-            input=processed_texts
-        )
+        EMBEDDING_INPUTS.inc(len(processed_texts), source="ingestion")
+        with observe_call(EMBEDDING_REQUESTS, EMBEDDING_SECONDS, source="ingestion"):
+            response = await get_client().embeddings.create(
+                model=self.model,
+                input=processed_texts,
+                **self.request_options
+            )
+        record_usage(getattr(response, "usage", None), source="ingestion")
 
         return [data.embedding for data in response.data]
 
@@ -174,6 +177,7 @@ class EmbeddingGenerator:
                     metadata={
                         **chunk.metadata,
                         "embedding_model": self.model,
+                        "embedding_dimension": self.config["dimensions"],
                         "embedding_generated_at": datetime.now().isoformat()
                     },
                     token_count=chunk.token_count
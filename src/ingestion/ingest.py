@@ -9,6 +9,7 @@ import os
 import asyncio
 import logging
 import glob
+import time
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 from datetime import datetime
@@ -26,12 +27,25 @@ from src.ingestion.chunker import ChunkingConfig, create_chunker, DocumentChunk
 from src.ingestion.embedder import create_embedder
 from src.settings import load_settings
 from src.profile import get_profile_manager
+from src.retrieval.chunk_fields import denormalized_fields
+from src.retrieval.document_metadata import get_document_metadata_cache
+from src.retrieval.local_text import local_text_index_for
+from src.metrics import (
+    INGEST_FILE_SECONDS, INGESTED_BYTES, INGESTED_CHUNKS, INGESTED_FILES,
+    InstrumentedThreadPoolExecutor
+)
+from src.retrieval.local_vector import local_vector_index_for
+from src.retrieval.result_cache import bump_corpus_generation
+from src.retrieval.vector_storage import encode_embedding
 
 # Load environment variables
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# The local BM25 index file is rewritten at most this often during a job
+LOCAL_TEXT_SAVE_SECONDS = 30.0
+
 
 @dataclass
 class IngestionConfig:
@@ -64,7 +78,9 @@ class DocumentIngestionPipeline:
         """Get or create thread pool executor."""
         if cls._executor is None:
             # Use only 2 threads to leave CPU for API requests
-            cls._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="ingest_")
+            cls._executor = InstrumentedThreadPoolExecutor(
+                max_workers=2, thread_name_prefix="ingest_", pool_name="ingest"
+            )
         return cls._executor
 
     def __init__(
@@ -119,9 +135,10 @@ class DocumentIngestionPipeline:
         )
 
         self.chunker = create_chunker(self.chunker_config)
-        self.embedder = create_embedder()
+        self.embedder = create_embedder(dimension=self.settings.embedding_dimension)
 
         self._initialized = False
+        self._local_text_saved_at = time.monotonic()
 
     async def initialize(self) -> None:
         """
@@ -809,32 +826,105 @@ class DocumentIngestionPipeline:
             "created_at": datetime.now()
         }
 
+        # Previous versions of this source are replaced once the new one is stored
+        previous_ids = [
+            doc["_id"] async for doc in documents_collection.find({"source": source}, {"_id": 1})
+        ]
+
         document_result = await documents_collection.insert_one(document_dict)
         document_id = document_result.inserted_id
 
         logger.info(f"Inserted document with ID: {document_id}")
 
-        # Insert chunks with embeddings as Python lists
+        # Denormalized storage mode copies title/source onto every chunk
+        chunk_extra = (
+            denormalized_fields(title, source)
+            if self.settings.chunk_denormalize_metadata else {}
+        )
+
+        # Insert chunks with embeddings in the configured storage format
         chunk_dicts = []
         for chunk in chunks:
             chunk_dict = {
                 "document_id": document_id,
                 "content": chunk.content,
-                "embedding": chunk.embedding,  # Python list, NOT string!
+                "embedding": encode_embedding(chunk.embedding, self.settings.embedding_storage_format),
                 "chunk_index": chunk.index,
                 "metadata": chunk.metadata,
                 "token_count": chunk.token_count,
+                **chunk_extra,
                 "created_at": datetime.now()
             }
             chunk_dicts.append(chunk_dict)
 
         # Batch insert with ordered=False for partial success
         if chunk_dicts:
-            await chunks_collection.insert_many(chunk_dicts, ordered=False)
+            insert_result = await chunks_collection.insert_many(chunk_dicts, ordered=False)
             logger.info(f"Inserted {len(chunk_dicts)} chunks")
 
+            local_vector, local_text = self._local_indexes()
+            if local_vector is not None:
+                # Appends (and maps) files: keep it off the event loop
+                await asyncio.to_thread(
+                    local_vector.add,
+                    insert_result.inserted_ids,
+                    [document_id] * len(chunk_dicts),
+                    [chunk.embedding for chunk in chunks]
+                )
+            if local_text is not None:
+                # Saved once per LOCAL_TEXT_SAVE_SECONDS and at the end of the job
+                local_text.add(
+                    insert_result.inserted_ids,
+                    [document_id] * len(chunk_dicts),
+                    [chunk["content"] for chunk in chunk_dicts],
+                    persist=False
+                )
+
+        if previous_ids:
+            await self._remove_documents(previous_ids)
+            logger.info(f"Replaced {len(previous_ids)} previous version(s) of {source}")
+
+        await bump_corpus_generation(self.db, self.settings.mongodb_collection_chunks)
+
         return str(document_id)
 
+    async def _remove_documents(self, document_ids: List[Any]) -> None:
+        """Delete documents and their chunks (re-ingest of an existing source)."""
+        documents_collection = self.db[
+            self.settings.mongodb_collection_documents
+        ]
+        chunks_collection = self.db[self.settings.mongodb_collection_chunks]
+
+        await chunks_collection.delete_many({"document_id": {"$in": document_ids}})
+        await documents_collection.delete_many({"_id": {"$in": document_ids}})
+        get_document_metadata_cache().invalidate(document_ids)
+
+        # Either index may compact, rewriting every row: keep it off the event loop
+        local_vector, local_text = self._local_indexes()
+        if local_vector is not None:
+            await asyncio.to_thread(local_vector.delete_documents, document_ids)
+        if local_text is not None:
+            await asyncio.to_thread(local_text.delete_documents, document_ids, persist=False)
+
+    async def _save_local_text_index(self, force: bool = False) -> None:
+        """Write pending local BM25 changes from a worker thread, at most every LOCAL_TEXT_SAVE_SECONDS."""
+        local_text = self._local_indexes()[1]
+        if local_text is None:
+            return
+        if not force and time.monotonic() - self._local_text_saved_at < LOCAL_TEXT_SAVE_SECONDS:
+            return
+        self._local_text_saved_at = time.monotonic()
+        await asyncio.to_thread(local_text.save_if_dirty)
+
+    def _local_indexes(self):
+        """(vector, text) local indexes to keep in sync; None where Atlas is used."""
+        database = self.settings.mongodb_database
+        chunks = self.settings.mongodb_collection_chunks
+        return (
+            local_vector_index_for(self.settings, database, chunks),
+            local_text_index_for(self.settings, database, chunks)
+        )
+
     async def _clean_databases(self) -> None:
         """Clean existing data from MongoDB collections."""
         logger.warning("Cleaning existing data from MongoDB...")
@@ -853,6 +943,29 @@ class DocumentIngestionPipeline:
         docs_result = await documents_collection.delete_many({})
         logger.info(f"Deleted {docs_result.deleted_count} documents")
 
+        get_document_metadata_cache().invalidate()
+
+        for local_index in self._local_indexes():
+            if local_index is not None:
+                local_index.clear()
+
+        await bump_corpus_generation(self.db, self.settings.mongodb_collection_chunks)
+
+    @staticmethod
+    def _file_format(file_path: str) -> str:
+        return os.path.splitext(file_path)[1].lower().lstrip(".") or "none"
+
+    def _record_file_metrics(self, file_path: str, result: IngestionResult) -> None:
+        """Count an ingested file, its chunks and bytes for throughput metrics."""
+        file_format = self._file_format(file_path)
+        INGESTED_FILES.inc(format=file_format, outcome="error" if result.errors else "success")
+        INGESTED_CHUNKS.inc(result.chunks_created, format=file_format)
+        INGEST_FILE_SECONDS.observe(result.processing_time_ms / 1000, format=file_format)
+        try:
+            INGESTED_BYTES.inc(os.path.getsize(file_path), format=file_format)
+        except OSError:
+            pass
+
     async def _ingest_single_document(self, file_path: str) -> IngestionResult:
         """
         Ingest a single document.
@@ -1048,6 +1161,32 @@ class DocumentIngestionPipeline:
 
         results = []
 
+        try:
+            await self._process_files(document_files, results, progress_callback)
+        finally:
+            try:
+                await self._save_local_text_index(force=True)
+            except Exception as e:
+                logger.error(f"Failed to save local text index: {e}")
+
+        # Log summary
+        total_chunks = sum(r.chunks_created for r in results)
+        total_errors = sum(len(r.errors) for r in results)
+
+        logger.info(
+            f"Ingestion complete: {len(results)} documents, "
+            f"{total_chunks} chunks, {total_errors} errors"
+        )
+
+        return results
+
+    async def _process_files(
+        self,
+        document_files: List[str],
+        results: List[IngestionResult],
+        progress_callback: Optional[callable]
+    ) -> None:
+        """Ingest files one by one, appending to results and reporting progress."""
         for i, file_path in enumerate(document_files):
             # Give API requests priority - small delay between documents
             # This ensures login, status checks, etc. remain responsive
@@ -1065,6 +1204,7 @@ class DocumentIngestionPipeline:
 
                 result = await self._ingest_single_document(file_path)
                 results.append(result)
+                self._record_file_metrics(file_path, result)
 
                 # Call progress callback AFTER processing with result info
                 if progress_callback:
@@ -1078,6 +1218,7 @@ class DocumentIngestionPipeline:
 
             except Exception as e:
                 logger.exception(f"Failed to process {file_path}: {e}")
+                INGESTED_FILES.inc(format=self._file_format(file_path), outcome="error")
                 results.append(IngestionResult(
                     document_id="",
                     title=os.path.basename(file_path),
@@ -1089,16 +1230,7 @@ class DocumentIngestionPipeline:
                 if progress_callback:
                     progress_callback(i + 1, len(document_files), file_path, 0)
 
-        # Log summary
-        total_chunks = sum(r.chunks_created for r in results)
-        total_errors = sum(len(r.errors) for r in results)
-
-        logger.info(
-            f"Ingestion complete: {len(results)} documents, "
-            f"{total_chunks} chunks, {total_errors} errors"
-        )
-
-        return results
+            await self._save_local_text_index()
 
 
 async def main() -> None:
@@ -0,0 +1,136 @@
+"""
+Build and inspect the in-process search indexes used on plain mongod.
+
+Ingestion keeps the indexes up to date once VECTOR_SEARCH_BACKEND=local or
+TEXT_SEARCH_BACKEND=local is set; `build` exports what is already in MongoDB.
+
+Usage:
+    python -m src.local_index build [--profile NAME] [--batch-size N] [--only vector|text]
+    python -m src.local_index stats [--profile NAME]
+"""
+
+import argparse
+import asyncio
+import logging
+from datetime import datetime
+
+from pymongo import AsyncMongoClient
+
+from src.profile import get_profile_manager
+from src.retrieval.local_text import build_local_text_index, get_local_text_index
+from src.retrieval.local_vector import build_local_vector_index, get_local_vector_index
+from src.retrieval.result_cache import bump_corpus_generation, corpus_namespace
+from src.settings import load_settings
+
+logger = logging.getLogger(__name__)
+
+
+def _vector_index(settings):
+    return get_local_vector_index(
+        settings.local_index_path,
+        corpus_namespace(settings.mongodb_database, settings.mongodb_collection_chunks),
+        settings.embedding_dimension,
+        workers=settings.local_vector_workers
+    )
+
+
+def _text_index(settings):
+    return get_local_text_index(
+        settings.local_index_path,
+        corpus_namespace(settings.mongodb_database, settings.mongodb_collection_chunks)
+    )
+
+
+async def build(args: argparse.Namespace) -> None:
+    """Export chunk embeddings and content into the local indexes."""
+    settings = load_settings()
+    client = AsyncMongoClient(settings.mongodb_uri, serverSelectionTimeoutMS=5000)
+    db = client[settings.mongodb_database]
+    chunks = db[settings.mongodb_collection_chunks]
+
+    try:
+        start_time = datetime.now()
+
+        if args.only in (None, "vector"):
+            index = _vector_index(settings)
+            total = await build_local_vector_index(chunks, index, batch_size=args.batch_size)
+            print(f"Vector index: {index.path} ({total} chunks)")
+            if settings.vector_search_backend != "local":
+                print("Note: set VECTOR_SEARCH_BACKEND=local to search with this index.")
+
+        if args.only in (None, "text"):
+            index = _text_index(settings)
+            total = await build_local_text_index(chunks, index, batch_size=args.batch_size)
+            print(f"Text index: {index.path} ({total} chunks)")
+            if settings.text_search_backend != "local":
+                print("Note: set TEXT_SEARCH_BACKEND=local to search with this index.")
+
+        await bump_corpus_generation(db, settings.mongodb_collection_chunks)
+        elapsed = (datetime.now() - start_time).total_seconds()
+        print(f"Time: {elapsed:.2f} seconds")
+    finally:
+        await client.close()
+
+
+async def stats(args: argparse.Namespace) -> None:
+    """Print local index sizes."""
+    settings = load_settings()
+    for name, index in (("vector", _vector_index(settings)), ("text", _text_index(settings))):
+        print(f"[{name}]")
+        for key, value in index.stats().items():
+            print(f"  {key}: {value}")
+
+
+async def main() -> None:
+    """Main function for managing local indexes."""
+    parser = argparse.ArgumentParser(description="Manage local search indexes")
+    parser.add_argument(
+        "--profile", "-p",
+        default=None,
+        help="Profile whose collections are indexed"
+    )
+    parser.add_argument(
+        "--verbose", "-v",
+        action="store_true",
+        help="Enable verbose logging"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Rebuild local indexes from MongoDB")
+    build_parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1000,
+        help="Chunks appended per write"
+    )
+    build_parser.add_argument(
+        "--only",
+        choices=["vector", "text"],
+        default=None,
+        help="Build only one index (default: both)"
+    )
+    build_parser.set_defaults(handler=build)
+
+    stats_parser = subparsers.add_parser("stats", help="Show local index sizes")
+    stats_parser.set_defaults(handler=stats)
+
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+
+    if args.profile:
+        profile_manager = get_profile_manager()
+        if not profile_manager.switch_profile(args.profile):
+            print(f"Error: Profile '{args.profile}' not found")
+            print(f"Available profiles: {list(profile_manager.list_profiles().keys())}")
+            return
+        print(f"Using profile: {args.profile}")
+
+    await args.handler(args)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,486 @@
+"""
+Pre-aggregated Prometheus metrics.
+
+Counters, gauges and fixed-bucket histograms are updated in place where
+work happens (HTTP requests, searches, embedding and LLM calls, ingestion)
+and rendered in the Prometheus text exposition format on scrape. Values
+that already live in memory elsewhere (cache statistics, queue depth) are
+read by collectors at scrape time; nothing on the scrape path touches
+MongoDB.
+
+Each API worker process has its own values. With a multiprocess directory
+enabled, every worker writes a snapshot of its families to its own file
+there, and a scrape served by any worker merges all files: counters and
+histograms are summed (including workers that have exited, so totals stay
+monotonic) and gauges are reported per live worker with a `worker` label.
+"""
+
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Default latency buckets (seconds); LLM calls get a longer tail
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+LabelValues = Tuple[str, ...]
+# (name, type, help, [(sample suffix, labels, value)])
+Family = Tuple[str, str, str, List[Tuple[str, Dict[str, str], float]]]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: LabelValues) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+
+class Counter(_Metric):
+    """Monotonic counter."""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def collect(self) -> Family:
+        with self._lock:
+            items = list(self._values.items())
+        return self.name, self.type_name, self.documentation, [
+            ("", self._labels(key), value) for key, value in items
+        ]
+
+
+class Gauge(Counter):
+    """Value that can go up and down."""
+
+    type_name = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """Fixed-bucket histogram (cumulative buckets, sum and count)."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> ([count per bucket, +Inf last], sum)
+        self._values: Dict[LabelValues, Tuple[List[int], float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    def count(self, **labels: str) -> int:
+        entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def collect(self) -> Family:
+        with self._lock:
+            items = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+
+        samples = []
+        for key, counts, total in items:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, n in zip((*self.buckets, float("inf")), counts):
+                cumulative += n
+                samples.append(("_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+            samples.append(("_sum", labels, total))
+            samples.append(("_count", labels, cumulative))
+        return self.name, self.type_name, self.documentation, samples
+
+
+class MetricsRegistry:
+    """Named metrics plus scrape-time collectors, rendered as Prometheus text."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Family]]] = []
+        self._multiprocess: Optional["MultiprocessDirectory"] = None
+
+    def _register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector: Callable[[], Iterable[Family]]) -> None:
+        """Add a function returning metric families computed at scrape time."""
+        if collector not in self._collectors:
+            self._collectors.append(collector)
+
+    def collect(self) -> List[Family]:
+        """Families of this process: the named metrics, then the collectors."""
+        families = [metric.collect() for metric in self._metrics.values()]
+        for collector in self._collectors:
+            families.extend(collector())
+        return families
+
+    def enable_multiprocess(self, directory: str, write_seconds: float = 5.0) -> "MultiprocessDirectory":
+        """Share this process's metrics through `directory` and render the merge of all workers."""
+        self.disable_multiprocess()
+        self._multiprocess = MultiprocessDirectory(directory, self, write_seconds)
+        self._multiprocess.start()
+        return self._multiprocess
+
+    def disable_multiprocess(self) -> None:
+        """Write a final snapshot and go back to rendering this process only."""
+        multiprocess = self._multiprocess
+        if multiprocess is not None:
+            multiprocess.stop()
+        self._multiprocess = None
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (0.0.4)."""
+        multiprocess = self._multiprocess
+        families = multiprocess.collect() if multiprocess is not None else self.collect()
+
+        lines = []
+        for name, type_name, documentation, samples in families:
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {type_name}")
+            for suffix, labels, value in samples:
+                lines.append(f"{name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# ============== Multiprocess ==============
+
+class MultiprocessDirectory:
+    """Per-worker snapshot files in a shared directory, merged at scrape time."""
+
+    def __init__(self, directory: str, registry: MetricsRegistry, write_seconds: float = 5.0):
+        """
+        Args:
+            directory: Directory shared by all workers (cleared before they start)
+            registry: Registry whose families this worker writes
+            write_seconds: Interval between snapshots; gauges of workers silent
+                for three intervals are treated as exited
+        """
+        self.directory = directory
+        self.registry = registry
+        self.write_seconds = write_seconds
+        self.worker = str(os.getpid())
+        # Start time in the name: a reused pid never overwrites an exited worker's totals
+        self.path = os.path.join(directory, f"worker-{self.worker}-{time.time_ns()}.json")
+        self._write_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def write(self) -> None:
+        """Replace this worker's file with its current families."""
+        snapshot = {"worker": self.worker, "families": self.registry.collect()}
+        with self._write_lock:
+            temporary = self.path + ".tmp"
+            with open(temporary, "w") as f:
+                json.dump(snapshot, f)
+            os.replace(temporary, self.path)
+
+    def _write_periodically(self) -> None:
+        while not self._stopped.wait(self.write_seconds):
+            try:
+                self.write()
+            except Exception as e:
+                logger.warning(f"Failed to write metrics snapshot {self.path}: {e}")
+
+    def start(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        self.write()
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._write_periodically, name="metrics_writer", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        try:
+            self.write()
+        except Exception as e:
+            logger.warning(f"Failed to write final metrics snapshot {self.path}: {e}")
+
+    def collect(self) -> List[Family]:
+        """Families of all workers, with this worker's snapshot refreshed first."""
+        self.write()
+        stale_before = time.time() - 3 * self.write_seconds
+        snapshots = []
+        for path in sorted(glob.glob(os.path.join(self.directory, "worker-*.json"))):
+            try:
+                live = path == self.path or os.path.getmtime(path) >= stale_before
+                with open(path) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping unreadable metrics snapshot {path}: {e}")
+                continue
+            snapshots.append((snapshot["worker"], live, snapshot["families"]))
+        return merge_families(snapshots)
+
+
+def merge_families(snapshots: Iterable[Tuple[str, bool, List[Family]]]) -> List[Family]:
+    """
+    Merge per-worker families into one exposition.
+
+    Args:
+        snapshots: (worker, live, families) per worker
+
+    Returns:
+        Counter and histogram samples summed across all workers; gauge samples
+        of live workers, each with a `worker` label
+    """
+    merged: Dict[str, Tuple[str, str, Dict[Tuple, Tuple[str, Dict[str, str], float]]]] = {}
+    for worker, live, families in snapshots:
+        for name, type_name, documentation, samples in families:
+            _, _, merged_samples = merged.setdefault(name, (type_name, documentation, {}))
+            for suffix, labels, value in samples:
+                if type_name == "gauge":
+                    if not live:
+                        continue
+                    labels = {**labels, "worker": worker}
+                key = (suffix, tuple(sorted(labels.items())))
+                previous = merged_samples.get(key)
+                total = value + previous[2] if previous is not None else value
+                merged_samples[key] = (suffix, labels, total)
+
+    return [
+        (name, type_name, documentation, list(samples.values()))
+        for name, (type_name, documentation, samples) in merged.items()
+    ]
+
+
+def clear_multiprocess_directory(directory: str) -> None:
+    """Remove the snapshots of a previous run; call before the workers start."""
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, "worker-*.json*")):
+        os.remove(path)
+
+
+REGISTRY = MetricsRegistry()
+
+# ============== Metric definitions ==============
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "rag_http_requests_total", "HTTP requests by route and status", ("method", "route", "status")
+)
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "rag_http_request_duration_seconds", "HTTP request latency by route", ("method", "route")
+)
+SEARCH_SECONDS = REGISTRY.histogram(
+    "rag_search_duration_seconds", "Search and chat latency", ("kind", "search_type", "profile"),
+    buckets=LLM_BUCKETS
+)
+SEARCH_STAGE_SECONDS = REGISTRY.histogram(
+    "rag_search_stage_duration_seconds", "Search and chat latency per stage", ("kind", "stage"),
+    buckets=LLM_BUCKETS
+)
+EMBEDDING_REQUESTS = REGISTRY.counter(
+    "rag_embedding_requests_total", "Embedding API calls", ("source", "outcome")
+)
+EMBEDDING_SECONDS = REGISTRY.histogram(
+    "rag_embedding_request_duration_seconds", "Embedding API call latency", ("source",)
+)
+EMBEDDING_INPUTS = REGISTRY.counter(
+    "rag_embedding_inputs_total", "Texts sent to the embedding API", ("source",)
+)
+EMBEDDING_TOKENS = REGISTRY.counter(
+    "rag_embedding_tokens_total", "Tokens billed by the embedding API", ("source",)
+)
+LLM_REQUESTS = REGISTRY.counter(
+    "rag_llm_requests_total", "LLM completion calls", ("model", "outcome")
+)
+LLM_SECONDS = REGISTRY.histogram(
+    "rag_llm_request_duration_seconds", "LLM completion latency", ("model",), buckets=LLM_BUCKETS
+)
+LLM_FIRST_TOKEN_SECONDS = REGISTRY.histogram(
+    "rag_llm_time_to_first_token_seconds", "Time from LLM call to first streamed token", ("model",),
+    buckets=LLM_BUCKETS
+)
+CONTEXT_TOKENS_SAVED = REGISTRY.counter(
+    "rag_context_tokens_saved_total", "Prompt tokens cut by context assembly (chunks, overlap, history)",
+    ("kind", "reason")
+)
+LLM_TOKENS = REGISTRY.counter(
+    "rag_llm_tokens_total", "LLM tokens by type (prompt, completion)", ("model", "type")
+)
+INGESTED_FILES = REGISTRY.counter(
+    "rag_ingested_files_total", "Ingested files by format and outcome", ("format", "outcome")
+)
+INGESTED_CHUNKS = REGISTRY.counter(
+    "rag_ingested_chunks_total", "Chunks written by ingestion", ("format",)
+)
+INGESTED_BYTES = REGISTRY.counter(
+    "rag_ingested_bytes_total", "Source bytes ingested", ("format",)
+)
+INGEST_FILE_SECONDS = REGISTRY.histogram(
+    "rag_ingest_file_duration_seconds", "Time to ingest one file", ("format",), buckets=LLM_BUCKETS
+)
+BACKGROUND_TASKS = REGISTRY.counter(
+    "rag_background_tasks_total", "Background tasks run by kind and outcome", ("kind", "outcome")
+)
+BACKGROUND_TASK_SECONDS = REGISTRY.histogram(
+    "rag_background_task_duration_seconds", "Background task run time", ("kind",), buckets=LLM_BUCKETS
+)
+
+
+@contextmanager
+def observe_call(requests: Counter, seconds: Histogram, **labels: str) -> Iterator[None]:
+    """Time a provider call and count it by outcome (success or error)."""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "success"
+    finally:
+        seconds.observe(time.perf_counter() - start, **labels)
+        requests.inc(outcome=outcome, **labels)
+
+
+def record_usage(usage, model: Optional[str] = None, source: Optional[str] = None) -> None:
+    """Count tokens from an OpenAI-style usage object (LLM when model is set, else embedding)."""
+    if usage is None:
+        return
+    if model is not None:
+        LLM_TOKENS.inc(getattr(usage, "prompt_tokens", 0) or 0, model=model, type="prompt")
+        LLM_TOKENS.inc(getattr(usage, "completion_tokens", 0) or 0, model=model, type="completion")
+    else:
+        EMBEDDING_TOKENS.inc(getattr(usage, "total_tokens", 0) or 0, source=source or "query")
+
+
+# ============== Thread pools ==============
+
+class InstrumentedThreadPoolExecutor(ThreadPoolExecutor):
+    """ThreadPoolExecutor that tracks queued and running tasks for saturation metrics."""
+
+    def __init__(self, max_workers: int, thread_name_prefix: str = "", pool_name: str = ""):
+        super().__init__(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self.pool_name = pool_name or thread_name_prefix.rstrip("_") or "executor"
+        self.pool_size = max_workers
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+        self._counts_lock = threading.Lock()
+        _executors[self.pool_name] = self
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        with self._counts_lock:
+            self.queued += 1
+
+        def run():
+            with self._counts_lock:
+                self.queued -= 1
+                self.active += 1
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._counts_lock:
+                    self.active -= 1
+                    self.completed += 1
+
+        try:
+            return super().submit(run)
+        except BaseException:
+            with self._counts_lock:
+                self.queued -= 1
+            raise
+
+
+_executors: Dict[str, InstrumentedThreadPoolExecutor] = {}
+
+
+def _collect_executors() -> List[Family]:
+    pools = list(_executors.values())
+    return [
+        ("rag_executor_workers", "gauge", "Thread pool size",
+         [("", {"pool": p.pool_name}, p.pool_size) for p in pools]),
+        ("rag_executor_active_tasks", "gauge", "Tasks running in the thread pool",
+         [("", {"pool": p.pool_name}, p.active) for p in pools]),
+        ("rag_executor_queued_tasks", "gauge", "Tasks waiting for a thread",
+         [("", {"pool": p.pool_name}, p.queued) for p in pools]),
+        ("rag_executor_completed_tasks_total", "counter", "Tasks completed by the thread pool",
+         [("", {"pool": p.pool_name}, p.completed) for p in pools]),
+    ]
+
+
+REGISTRY.register_collector(_collect_executors)
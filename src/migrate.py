@@ -0,0 +1,277 @@
+"""
+One-shot data migrations for existing MongoDB collections.
+
+Usage:
+    python -m src.migrate denormalize-chunks [--profile NAME] [--batch-size N] [--all]
+    python -m src.migrate encode-embeddings --format float32|int8|array [--profile NAME] [--batch-size N]
+    python -m src.migrate reembed [--profile NAME] [--dimension N] [--batch-size N]
+    python -m src.migrate session-messages [--profile NAME] [--batch-size N]
+"""
+
+import argparse
+import asyncio
+import logging
+from datetime import datetime
+
+from pymongo import AsyncMongoClient
+
+from src.profile import get_profile_manager
+from src.retrieval.chunk_fields import backfill_chunk_fields
+from src.retrieval.document_metadata import get_document_metadata_cache
+from src.retrieval.embedding_dimensions import reembed_chunks
+from src.retrieval.result_cache import bump_corpus_generation
+from src.retrieval.vector_storage import EMBEDDING_FORMATS, convert_embeddings
+from src.settings import load_settings
+
+logger = logging.getLogger(__name__)
+
+
+async def denormalize_chunks(args: argparse.Namespace) -> None:
+    """Backfill document_title/document_source/file_type onto existing chunks."""
+    settings = load_settings()
+    client = AsyncMongoClient(settings.mongodb_uri, serverSelectionTimeoutMS=5000)
+    db = client[settings.mongodb_database]
+
+    print(f"Database: {settings.mongodb_database}")
+    print(f"Documents: {settings.mongodb_collection_documents}")
+    print(f"Chunks: {settings.mongodb_collection_chunks}")
+
+    try:
+        start_time = datetime.now()
+        stats = await backfill_chunk_fields(
+            db[settings.mongodb_collection_documents],
+            db[settings.mongodb_collection_chunks],
+            batch_size=args.batch_size,
+            only_missing=not args.all,
+            limit=args.limit
+        )
+        get_document_metadata_cache().invalidate()
+        elapsed = (datetime.now() - start_time).total_seconds()
+
+        print(f"Documents processed: {stats['documents']}")
+        print(f"Chunks updated: {stats['chunks_modified']}")
+        print(f"Time: {elapsed:.2f} seconds")
+        if not settings.chunk_denormalize_metadata:
+            print("\nNote: set CHUNK_DENORMALIZE_METADATA=true so new ingests write these fields too.")
+    finally:
+        await client.close()
+
+
+async def encode_embeddings(args: argparse.Namespace) -> None:
+    """Rewrite existing chunk embeddings in another storage format."""
+    settings = load_settings()
+    client = AsyncMongoClient(settings.mongodb_uri, serverSelectionTimeoutMS=5000)
+    db = client[settings.mongodb_database]
+
+    print(f"Database: {settings.mongodb_database}")
+    print(f"Chunks: {settings.mongodb_collection_chunks}")
+    print(f"Target format: {args.format}")
+
+    try:
+        start_time = datetime.now()
+        stats = await convert_embeddings(
+            db[settings.mongodb_collection_chunks],
+            args.format,
+            batch_size=args.batch_size,
+            limit=args.limit
+        )
+        elapsed = (datetime.now() - start_time).total_seconds()
+
+        print(f"Chunks examined: {stats['examined']}")
+        print(f"Chunks converted: {stats['converted']}")
+        print(f"Already in format: {stats['skipped']}")
+        print(f"Time: {elapsed:.2f} seconds")
+        if settings.embedding_storage_format != args.format:
+            print(f"\nNote: set EMBEDDING_STORAGE_FORMAT={args.format} so new ingests and queries use it too.")
+    finally:
+        await client.close()
+
+
+async def reembed(args: argparse.Namespace) -> None:
+    """Re-embed chunks at the profile's (or a given) embedding dimension."""
+    # Imported here: the ingestion stack pulls in docling/transformers
+    from src.ingestion.embedder import create_embedder
+
+    settings = load_settings()
+    dimension = args.dimension or settings.embedding_dimension
+    client = AsyncMongoClient(settings.mongodb_uri, serverSelectionTimeoutMS=5000)
+    db = client[settings.mongodb_database]
+    embedder = create_embedder(model=settings.embedding_model, dimension=dimension)
+
+    print(f"Database: {settings.mongodb_database}")
+    print(f"Chunks: {settings.mongodb_collection_chunks}")
+    print(f"Model: {settings.embedding_model} at {dimension} dimensions")
+
+    try:
+        start_time = datetime.now()
+        stats = await reembed_chunks(
+            db[settings.mongodb_collection_chunks],
+            embedder.generate_embeddings_batch,
+            dimension,
+            storage_format=settings.embedding_storage_format,
+            batch_size=args.batch_size,
+            limit=args.limit
+        )
+        await bump_corpus_generation(db, settings.mongodb_collection_chunks)
+        elapsed = (datetime.now() - start_time).total_seconds()
+
+        print(f"Chunks examined: {stats['examined']}")
+        print(f"Chunks re-embedded: {stats['reembedded']}")
+        print(f"Already at {dimension} dimensions: {stats['skipped']}")
+        print(f"Time: {elapsed:.2f} seconds")
+        print("\nNext: recreate the vector index (python -m src.setup_indexes)"
+              " and, with local backends, python -m src.local_index build.")
+        if dimension != settings.embedding_dimension:
+            print(f"Note: set embedding_dimension: {dimension} on the profile so queries match.")
+    finally:
+        await client.close()
+
+
+async def session_messages(args: argparse.Namespace) -> None:
+    """Move messages embedded in chat session documents into the messages collection."""
+    # Imported here: the message store belongs to the API backend
+    from backend.core.messages import message_store_for
+
+    settings = load_settings()
+    client = AsyncMongoClient(settings.mongodb_uri, serverSelectionTimeoutMS=5000)
+    db = client[settings.mongodb_database]
+
+    print(f"Database: {settings.mongodb_database}")
+
+    try:
+        start_time = datetime.now()
+        store = await message_store_for(db)
+        stats = await store.migrate_all(batch_size=args.batch_size, limit=args.limit)
+        elapsed = (datetime.now() - start_time).total_seconds()
+
+        print(f"Sessions migrated: {stats['sessions']}")
+        print(f"Messages moved: {stats['messages']}")
+        print(f"Time: {elapsed:.2f} seconds")
+    finally:
+        await client.close()
+
+
+async def main() -> None:
+    """Main function for running migrations."""
+    parser = argparse.ArgumentParser(description="Run data migrations")
+    parser.add_argument(
+        "--profile", "-p",
+        default=None,
+        help="Profile whose collections are migrated"
+    )
+    parser.add_argument(
+        "--verbose", "-v",
+        action="store_true",
+        help="Enable verbose logging"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    denormalize = subparsers.add_parser(
+        "denormalize-chunks",
+        help="Copy document title/source/file type onto existing chunks"
+    )
+    denormalize.add_argument(
+        "--batch-size",
+        type=int,
+        default=500,
+        help="Documents per bulk write"
+    )
+    denormalize.add_argument(
+        "--all",
+        action="store_true",
+        help="Rewrite chunks that already have the fields (default: only missing)"
+    )
+    denormalize.add_argument(
+        "--limit",
+        type=int,
+        default=None,
+        help="Maximum number of documents to process"
+    )
+    denormalize.set_defaults(handler=denormalize_chunks)
+
+    encode = subparsers.add_parser(
+        "encode-embeddings",
+        help="Convert stored chunk embeddings to another storage format"
+    )
+    encode.add_argument(
+        "--format",
+        choices=EMBEDDING_FORMATS,
+        required=True,
+        help="Target storage format (int8 is lossy)"
+    )
+    encode.add_argument(
+        "--batch-size",
+        type=int,
+        default=500,
+        help="Chunks per bulk write"
+    )
+    encode.add_argument(
+        "--limit",
+        type=int,
+        default=None,
+        help="Maximum number of chunks to examine"
+    )
+    encode.set_defaults(handler=encode_embeddings)
+
+    reembed_parser = subparsers.add_parser(
+        "reembed",
+        help="Re-embed chunks whose embeddings do not have the target dimension"
+    )
+    reembed_parser.add_argument(
+        "--dimension",
+        type=int,
+        default=None,
+        help="Target dimension (default: the profile's embedding_dimension)"
+    )
+    reembed_parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=100,
+        help="Chunks per embedding request"
+    )
+    reembed_parser.add_argument(
+        "--limit",
+        type=int,
+        default=None,
+        help="Maximum number of chunks to examine"
+    )
+    reembed_parser.set_defaults(handler=reembed)
+
+    messages_parser = subparsers.add_parser(
+        "session-messages",
+        help="Move chat messages out of session documents into their own collection"
+    )
+    messages_parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=100,
+        help="Sessions fetched per cursor batch"
+    )
+    messages_parser.add_argument(
+        "--limit",
+        type=int,
+        default=None,
+        help="Maximum number of sessions to migrate"
+    )
+    messages_parser.set_defaults(handler=session_messages)
+
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+
+    if args.profile:
+        profile_manager = get_profile_manager()
+        if not profile_manager.switch_profile(args.profile):
+            print(f"Error: Profile '{args.profile}' not found")
+            print(f"Available profiles: {list(profile_manager.list_profiles().keys())}")
+            return
+        print(f"Using profile: {args.profile}")
+
+    await args.handler(args)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
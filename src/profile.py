@@ -44,6 +44,9 @@ class ProfileConfig(BaseModel):
     
     # Optional overrides
     embedding_model: Optional[str] = Field(default=None, description="Override embedding model")
+    embedding_dimension: Optional[int] = Field(
+        default=None, gt=0, description="Override embedding dimension (reduced Matryoshka size)"
+    )
     llm_model: Optional[str] = Field(default=None, description="Override LLM model")
 
 
@@ -238,6 +241,7 @@ class ProfileManager:
             vector_index=kwargs.get('vector_index', 'vector_index'),
             text_index=kwargs.get('text_index', 'text_index'),
             embedding_model=kwargs.get('embedding_model'),
+            embedding_dimension=kwargs.get('embedding_dimension'),
             llm_model=kwargs.get('llm_model')
         )
         
@@ -289,7 +293,8 @@ class ProfileManager:
             profile.database = database
         
         # Handle additional kwargs
-        for field in ['collection_documents', 'collection_chunks', 'vector_index', 'text_index', 'embedding_model', 'llm_model']:
+        for field in ['collection_documents', 'collection_chunks', 'vector_index', 'text_index',
+                      'embedding_model', 'embedding_dimension', 'llm_model']:
             if field in kwargs and kwargs[field] is not None:
                 setattr(profile, field, kwargs[field])
         
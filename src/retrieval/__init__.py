@@ -0,0 +1 @@
+"""Shared retrieval layer for MongoDB RAG Agent."""
@@ -0,0 +1,264 @@
+"""
+Adaptive numCandidates for $vectorSearch.
+
+A fixed numCandidates of 100 over-explores small limits and leaves no
+oversampling at large ones. CandidatePlanner derives it from the limit, the
+corpus size (estimated_document_count, cached) and a multiplier, which is
+either calibrated per profile (see src/calibrate.py), derived from a recall
+target, or the configured default.
+"""
+
+import logging
+import math
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Collection (in the profile database) holding calibrated multipliers
+CALIBRATION_COLLECTION = "retrieval_calibration"
+
+# Atlas Vector Search upper bound for numCandidates
+MAX_NUM_CANDIDATES = 10000
+
+DEFAULT_CANDIDATE_MULTIPLIER = 10.0
+
+# Recall target -> multiplier used when no calibration exists
+_RECALL_MULTIPLIERS = ((0.90, 10.0), (0.95, 15.0), (0.98, 20.0), (1.0, 40.0))
+
+
+def multiplier_for_recall(recall_target: float) -> float:
+    """Heuristic multiplier for a recall target (used until calibrated)."""
+    for target, multiplier in _RECALL_MULTIPLIERS:
+        if recall_target <= target:
+            return multiplier
+    return _RECALL_MULTIPLIERS[-1][1]
+
+
+def compute_num_candidates(
+    limit: int,
+    multiplier: float = DEFAULT_CANDIDATE_MULTIPLIER,
+    corpus_size: Optional[int] = None,
+    max_candidates: int = MAX_NUM_CANDIDATES
+) -> int:
+    """
+    numCandidates for a limit: limit × multiplier, bounded by corpus and Atlas limits.
+
+    Never below limit (required by $vectorSearch).
+    """
+    candidates = math.ceil(limit * multiplier)
+    if corpus_size:
+        candidates = min(candidates, corpus_size)
+    candidates = min(candidates, max_candidates)
+    return max(candidates, limit)
+
+
+def _namespace(collection: Any) -> str:
+    return getattr(collection, "full_name", None) or collection.name
+
+
+class CandidatePlanner:
+    """Chooses numCandidates (or exact search) per vector query."""
+
+    def __init__(
+        self,
+        multiplier: float = DEFAULT_CANDIDATE_MULTIPLIER,
+        recall_target: Optional[float] = None,
+        max_candidates: int = MAX_NUM_CANDIDATES,
+        exact_threshold: int = 0,
+        cache_ttl_seconds: float = 300.0
+    ):
+        """
+        Initialize candidate planner.
+
+        Args:
+            multiplier: Default candidates-per-result multiplier
+            recall_target: Optional recall@k target (0-1) when not calibrated
+            max_candidates: Upper bound for numCandidates
+            exact_threshold: Use exact (ENN) search when the corpus has at most this many chunks
+            cache_ttl_seconds: How long corpus sizes and calibrations are cached
+        """
+        self.multiplier = multiplier
+        self.recall_target = recall_target
+        self.max_candidates = max_candidates
+        self.exact_threshold = exact_threshold
+        self.cache_ttl_seconds = cache_ttl_seconds
+
+        # namespace -> (fetched_at, value)
+        self._corpus_sizes: Dict[str, Tuple[float, int]] = {}
+        self._calibrations: Dict[str, Tuple[float, Optional[float]]] = {}
+
+    def _fresh(self, entry: Optional[Tuple[float, Any]]) -> bool:
+        return entry is not None and time.monotonic() - entry[0] < self.cache_ttl_seconds
+
+    async def corpus_size(self, collection: Any) -> Optional[int]:
+        """Cached estimated_document_count of a chunks collection."""
+        namespace = _namespace(collection)
+        entry = self._corpus_sizes.get(namespace)
+        if self._fresh(entry):
+            return entry[1]
+
+        try:
+            size = await collection.estimated_document_count()
+        except Exception as e:
+            logger.warning(f"Corpus size lookup failed for {namespace}: {e}")
+            return entry[1] if entry else None
+
+        self._corpus_sizes[namespace] = (time.monotonic(), size)
+        return size
+
+    async def calibrated_multiplier(self, collection: Any) -> Optional[float]:
+        """Multiplier stored by the calibration command for this corpus, if any."""
+        namespace = _namespace(collection)
+        entry = self._calibrations.get(namespace)
+        if self._fresh(entry):
+            return entry[1]
+
+        multiplier = None
+        try:
+            doc = await collection.database[CALIBRATION_COLLECTION].find_one(
+                {"_id": namespace}, {"multiplier": 1}
+            )
+            if doc:
+                multiplier = doc.get("multiplier")
+        except Exception as e:
+            logger.debug(f"No calibration available for {namespace}: {e}")
+
+        self._calibrations[namespace] = (time.monotonic(), multiplier)
+        return multiplier
+
+    async def plan(self, collection: Any, limit: int) -> Tuple[int, bool]:
+        """
+        Decide how to run a vector query.
+
+        Args:
+            collection: Async chunks collection
+            limit: Number of results requested from $vectorSearch
+
+        Returns:
+            (numCandidates, exact) - exact=True means ENN search without numCandidates
+        """
+        corpus_size = await self.corpus_size(collection)
+        if corpus_size is not None and corpus_size <= self.exact_threshold:
+            return limit, True
+
+        multiplier = await self.calibrated_multiplier(collection)
+        if multiplier is None:
+            multiplier = (
+                multiplier_for_recall(self.recall_target)
+                if self.recall_target else self.multiplier
+            )
+
+        return compute_num_candidates(limit, multiplier, corpus_size, self.max_candidates), False
+
+    def invalidate(self) -> None:
+        """Forget cached corpus sizes and calibrations."""
+        self._corpus_sizes.clear()
+        self._calibrations.clear()
+
+
+# Multipliers tried by calibration, smallest first
+DEFAULT_CALIBRATION_MULTIPLIERS = (1.0, 2.0, 4.0, 6.0, 8.0, 10.0, 15.0, 20.0, 30.0, 50.0)
+
+
+async def calibrate_multiplier(
+    engine: Any,
+    query_vectors: List[List[float]],
+    k: int = 10,
+    recall_target: float = 0.95,
+    multipliers: Sequence[float] = DEFAULT_CALIBRATION_MULTIPLIERS
+) -> Dict[str, Any]:
+    """
+    Measure recall@k of approximate vs exact search and pick a multiplier.
+
+    Args:
+        engine: RetrievalEngine bound to the chunks collection
+        query_vectors: Sample query vectors
+        k: Number of results compared
+        recall_target: Mean recall@k the chosen multiplier must reach
+        multipliers: Candidates-per-result multipliers to try, smallest first
+
+    Returns:
+        Calibration record with the chosen multiplier and recall per multiplier
+    """
+    from src.retrieval.engine import aggregate_to_list
+
+    async def ids(pipeline):
+        return {str(doc["chunk_id"]) for doc in await aggregate_to_list(engine.chunks_collection, pipeline)}
+
+    exact_ids = [await ids(engine.vector_pipeline(vector, k, exact=True)) for vector in query_vectors]
+
+    recall_by_multiplier: Dict[str, float] = {}
+    chosen = None
+    for multiplier in sorted(multipliers):
+        recalls = []
+        for vector, expected in zip(query_vectors, exact_ids):
+            if not expected:
+                continue
+            found = await ids(engine.vector_pipeline(vector, k, compute_num_candidates(k, multiplier)))
+            recalls.append(len(found & expected) / len(expected))
+
+        recall = sum(recalls) / len(recalls) if recalls else 0.0
+        recall_by_multiplier[str(multiplier)] = round(recall, 4)
+        logger.info(f"Calibration: multiplier={multiplier} recall@{k}={recall:.4f}")
+
+        if recall >= recall_target:
+            chosen = multiplier
+            break
+
+    if chosen is None:
+        chosen = max(multipliers)
+
+    return {
+        "multiplier": chosen,
+        "recall": recall_by_multiplier.get(str(chosen)),
+        "recall_target": recall_target,
+        "k": k,
+        "sample_size": len(query_vectors),
+        "recall_by_multiplier": recall_by_multiplier,
+        "calibrated_at": datetime.now(timezone.utc),
+    }
+
+
+# Global planner shared by every retrieval engine in the process
+_candidate_planner: Optional[CandidatePlanner] = None
+
+
+def get_candidate_planner() -> CandidatePlanner:
+    """Get or create the process-wide candidate planner."""
+    global _candidate_planner
+
+    if _candidate_planner is None:
+        _candidate_planner = CandidatePlanner()
+
+    return _candidate_planner
+
+
+def configure_candidate_planner(
+    multiplier: float,
+    recall_target: Optional[float],
+    max_candidates: int,
+    exact_threshold: int
+) -> CandidatePlanner:
+    """
+    Replace the process-wide candidate planner.
+
+    Args:
+        multiplier: Default candidates-per-result multiplier
+        recall_target: Optional recall target used when not calibrated
+        max_candidates: Upper bound for numCandidates
+        exact_threshold: Corpus size at or below which exact search is used
+
+    Returns:
+        The new CandidatePlanner
+    """
+    global _candidate_planner
+
+    _candidate_planner = CandidatePlanner(
+        multiplier=multiplier,
+        recall_target=recall_target,
+        max_candidates=max_candidates,
+        exact_threshold=exact_threshold
+    )
+    return _candidate_planner
@@ -0,0 +1,152 @@
+"""
+Server-side hybrid search capability detection.
+
+Hybrid search can be fused on the server in one aggregation instead of two
+round trips plus Python RRF:
+
+    rankfusion  $rankFusion over a $vectorSearch and a $search pipeline (MongoDB 8.1+)
+    unionwith   $vectorSearch leg $unionWith-ed with the $search leg, RRF scores
+                computed in the pipeline (MongoDB 6.0+)
+    python      two concurrent aggregations fused in Python (always available)
+
+The mode is detected once at startup by probing the stages it needs. If a
+collection's server later rejects a fused pipeline because a stage is not
+available there, that collection alone is switched to python; other errors
+(a missing index, a transient failure) only fall back for the failing query.
+"""
+
+import logging
+from typing import Any, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+HYBRID_MODES = ("rankfusion", "unionwith", "python")
+
+# Minimum server versions per mode
+_MIN_VERSION = {"rankfusion": (8, 1), "unionwith": (6, 0)}
+
+# Server error codes meaning a pipeline stage is not available:
+# unrecognized stage name, malformed stage, $search / $vectorSearch not enabled
+UNSUPPORTED_STAGE_CODES = {40323, 40324, 31082, 6047401}
+
+_hybrid_mode = "python"
+
+# Namespaces (db.collection) whose server rejected a fused pipeline
+_python_only: Set[str] = set()
+
+
+def get_hybrid_mode() -> str:
+    """Hybrid search mode currently in effect for this process."""
+    return _hybrid_mode
+
+
+def set_hybrid_mode(mode: str) -> str:
+    """Force a hybrid search mode (one of HYBRID_MODES)."""
+    global _hybrid_mode
+
+    if mode not in HYBRID_MODES:
+        raise ValueError(f"Unknown hybrid mode '{mode}' (expected one of {', '.join(HYBRID_MODES)})")
+    _hybrid_mode = mode
+    return _hybrid_mode
+
+
+def _namespace(collection: Any) -> str:
+    return getattr(collection, "full_name", None) or collection.name
+
+
+def hybrid_mode_for(collection: Any, mode: Optional[str] = None) -> str:
+    """Hybrid mode for queries on `collection` (python once its server rejected a fused pipeline)."""
+    if _namespace(collection) in _python_only:
+        return "python"
+    return mode or _hybrid_mode
+
+
+def is_unsupported_stage_error(error: Exception) -> bool:
+    """Whether a server error means a pipeline stage is not available there."""
+    return getattr(error, "code", None) in UNSUPPORTED_STAGE_CODES
+
+
+def mark_server_hybrid_unsupported(collection: Any, error: Exception) -> bool:
+    """
+    Use Python fusion for `collection` if `error` says a fused stage is unavailable.
+
+    Returns:
+        True if the collection was switched to python, False for any other error
+    """
+    if not is_unsupported_stage_error(error):
+        return False
+
+    namespace = _namespace(collection)
+    if namespace not in _python_only:
+        logger.warning(f"Server-side hybrid search unavailable for {namespace}, using Python RRF: {error}")
+        _python_only.add(namespace)
+    return True
+
+
+async def _server_version(database: Any) -> Optional[tuple]:
+    try:
+        info = await database.command("buildInfo")
+    except Exception as e:
+        logger.warning(f"buildInfo failed, server-side hybrid search disabled: {e}")
+        return None
+    return tuple(info.get("versionArray", [0, 0])[:2])
+
+
+async def _supports_rank_fusion(collection: Any) -> bool:
+    """Probe $rankFusion with a trivial ranked pipeline."""
+    from src.retrieval.engine import aggregate_to_list
+
+    try:
+        await aggregate_to_list(collection, [
+            {"$rankFusion": {"input": {"pipelines": {"probe": [{"$sort": {"_id": 1}}]}}}},
+            {"$limit": 1}
+        ])
+        return True
+    except Exception as e:
+        logger.debug(f"$rankFusion not available: {e}")
+        return False
+
+
+async def _supports_search_union(collection: Any) -> bool:
+    """Probe $unionWith into a $search pipeline (needs Atlas Search, unlike plain mongod)."""
+    from src.retrieval.engine import aggregate_to_list
+
+    try:
+        await aggregate_to_list(collection, [
+            {"$limit": 1},
+            {"$unionWith": {
+                "coll": collection.name,
+                "pipeline": [{"$search": {"exists": {"path": "_id"}}}, {"$limit": 1}]
+            }},
+            {"$limit": 1}
+        ])
+        return True
+    except Exception as e:
+        logger.debug(f"$search in $unionWith not available: {e}")
+        return False
+
+
+async def detect_hybrid_mode(collection: Any, configured: str = "auto") -> str:
+    """
+    Choose and install the hybrid search mode for this process.
+
+    Args:
+        collection: Async chunks collection (its database is probed)
+        configured: "auto" to detect, or a mode from HYBRID_MODES to force
+
+    Returns:
+        The mode now in effect
+    """
+    if configured != "auto":
+        return set_hybrid_mode(configured)
+
+    version = await _server_version(collection.database)
+    mode = "python"
+    if version is not None and version >= _MIN_VERSION["unionwith"] and await _supports_search_union(collection):
+        if version >= _MIN_VERSION["rankfusion"] and await _supports_rank_fusion(collection):
+            mode = "rankfusion"
+        else:
+            mode = "unionwith"
+
+    logger.info(f"Hybrid search mode: {mode} (server version {version})")
+    return set_hybrid_mode(mode)
@@ -0,0 +1,120 @@
+"""
+Denormalized document fields stored on chunks.
+
+In denormalized storage mode every chunk carries its document's title,
+source and a compact file type, so search results need no join at all and
+the search indexes can filter on them. This module builds those fields,
+keeps them in sync when a document is renamed, and backfills existing
+chunk collections.
+"""
+
+import logging
+import os
+from typing import Any, Dict, Optional
+
+from pymongo import UpdateMany
+
+logger = logging.getLogger(__name__)
+
+DENORMALIZED_FIELDS = ("document_title", "document_source", "file_type")
+
+
+def file_type_for(source: str) -> str:
+    """Compact file type from a source path (lowercase extension, no dot)."""
+    extension = os.path.splitext(source or "")[1]
+    return extension[1:].lower() if extension else "unknown"
+
+
+def denormalized_fields(title: str, source: str) -> Dict[str, str]:
+    """Fields copied from a document onto each of its chunks."""
+    return {
+        "document_title": title,
+        "document_source": source,
+        "file_type": file_type_for(source),
+    }
+
+
+async def propagate_document_fields(
+    chunks_collection: Any,
+    document_id: Any,
+    title: str,
+    source: str
+) -> int:
+    """
+    Rewrite the denormalized fields on the chunks of one document.
+
+    Only chunks that already carry denormalized fields are touched, so this
+    is safe to call regardless of the storage mode.
+
+    Args:
+        chunks_collection: Async chunks collection
+        document_id: Parent document ObjectId
+        title: Current document title
+        source: Current document source
+
+    Returns:
+        Number of chunks modified
+    """
+    result = await chunks_collection.update_many(
+        {"document_id": document_id, "document_title": {"$exists": True}},
+        {"$set": denormalized_fields(title, source)}
+    )
+    return result.modified_count
+
+
+async def backfill_chunk_fields(
+    documents_collection: Any,
+    chunks_collection: Any,
+    batch_size: int = 500,
+    only_missing: bool = True,
+    limit: Optional[int] = None
+) -> Dict[str, int]:
+    """
+    Copy title/source/file type from documents onto their existing chunks.
+
+    Issues one UpdateMany per document, sent in bulk_write batches.
+
+    Args:
+        documents_collection: Async documents collection
+        chunks_collection: Async chunks collection
+        batch_size: Documents per bulk_write
+        only_missing: Skip chunks that already have document_title
+        limit: Optional maximum number of documents to process
+
+    Returns:
+        Counters: documents processed and chunks modified
+    """
+    stats = {"documents": 0, "chunks_modified": 0}
+    operations = []
+
+    async def flush():
+        if not operations:
+            return
+        result = await chunks_collection.bulk_write(operations, ordered=False)
+        stats["chunks_modified"] += result.modified_count
+        operations.clear()
+
+    cursor = documents_collection.find({}, {"title": 1, "source": 1})
+    if limit:
+        cursor = cursor.limit(limit)
+
+    async for doc in cursor:
+        chunk_filter: Dict[str, Any] = {"document_id": doc["_id"]}
+        if only_missing:
+            chunk_filter["document_title"] = {"$exists": False}
+
+        operations.append(UpdateMany(
+            chunk_filter,
+            {"$set": denormalized_fields(doc.get("title", ""), doc.get("source", ""))}
+        ))
+        stats["documents"] += 1
+
+        if len(operations) >= batch_size:
+            await flush()
+            logger.info(
+                f"Backfill progress: {stats['documents']} documents, "
+                f"{stats['chunks_modified']} chunks updated"
+            )
+
+    await flush()
+    return stats
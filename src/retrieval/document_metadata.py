@@ -0,0 +1,149 @@
+"""
+Cached document title/source resolution for search results.
+
+Search pipelines used to $lookup the whole parent document (including its
+full `content`) for every candidate. The engine now fuses on chunk IDs and
+resolves titles and sources afterwards with one `$in` query that projects
+only those two fields. DocumentMetadataCache keeps recently resolved
+documents in memory; ingestion and deletion invalidate it.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+
+logger = logging.getLogger(__name__)
+
+# Fields fetched from the documents collection for result display
+METADATA_PROJECTION = {"title": 1, "source": 1}
+
+
+def _namespace(collection: Any) -> str:
+    """Cache namespace so profiles with different databases never collide."""
+    return getattr(collection, "full_name", None) or collection.name
+
+
+class DocumentMetadataCache:
+    """LRU of document_id -> {title, source}, per documents collection."""
+
+    def __init__(self, max_entries: int = 50000):
+        """
+        Initialize document metadata cache.
+
+        Args:
+            max_entries: Maximum number of documents kept in memory
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], Dict[str, str]]" = OrderedDict()
+        # Ingestion may invalidate from a worker thread
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.queries = 0
+
+    def _get(self, key: Tuple[str, str]) -> Optional[Dict[str, str]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _put(self, key: Tuple[str, str], value: Dict[str, str]) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def resolve(
+        self,
+        collection: Any,
+        document_ids: Iterable[Any]
+    ) -> Dict[str, Dict[str, str]]:
+        """
+        Resolve title/source for the given document IDs.
+
+        Cached entries are served from memory; the rest are fetched with a
+        single `$in` query. Documents that no longer exist are omitted.
+
+        Args:
+            collection: Async documents collection
+            document_ids: Document IDs (ObjectId or str)
+
+        Returns:
+            Mapping of document_id (str) -> {"title": ..., "source": ...}
+        """
+        namespace = _namespace(collection)
+        resolved: Dict[str, Dict[str, str]] = {}
+        missing: List[Any] = []
+
+        for document_id in dict.fromkeys(document_ids):
+            key = (namespace, str(document_id))
+            entry = self._get(key)
+            if entry is not None:
+                self.hits += 1
+                resolved[key[1]] = entry
+            else:
+                self.misses += 1
+                missing.append(document_id)
+
+        if not missing:
+            return resolved
+
+        self.queries += 1
+        query_ids = [ObjectId(d) if isinstance(d, str) and ObjectId.is_valid(d) else d for d in missing]
+        cursor = collection.find({"_id": {"$in": query_ids}}, METADATA_PROJECTION)
+        async for doc in cursor:
+            entry = {"title": doc.get("title", ""), "source": doc.get("source", "")}
+            document_id = str(doc["_id"])
+            self._put((namespace, document_id), entry)
+            resolved[document_id] = entry
+
+        return resolved
+
+    def invalidate(self, document_ids: Optional[Iterable[Any]] = None) -> None:
+        """
+        Drop cached metadata.
+
+        Args:
+            document_ids: Documents to forget; None clears everything
+        """
+        with self._lock:
+            if document_ids is None:
+                self._entries.clear()
+                return
+            targets = {str(d) for d in document_ids}
+            for key in [k for k in self._entries if k[1] in targets]:
+                del self._entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and size."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "queries": self.queries,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Global cache shared by every retrieval engine in the process
+_document_metadata_cache: Optional[DocumentMetadataCache] = None
+
+
+def get_document_metadata_cache() -> DocumentMetadataCache:
+    """Get or create the process-wide document metadata cache."""
+    global _document_metadata_cache
+
+    if _document_metadata_cache is None:
+        _document_metadata_cache = DocumentMetadataCache()
+
+    return _document_metadata_cache
@@ -0,0 +1,178 @@
+"""
+Micro-batching coalescer for query embeddings.
+
+Concurrent searches each used to send a single-input embeddings request.
+EmbeddingBatcher collects query texts arriving within a short window (or
+until a batch fills up), sends them as one batched request and resolves each
+caller's future with its own vector. Fewer, larger requests make better use
+of provider rate limits and per-request overhead.
+"""
+
+import asyncio
+import logging
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+EmbedBatchFn = Callable[[List[str]], Awaitable[List[List[float]]]]
+
+
+class EmbeddingBatcher:
+    """Coalesce concurrent single-text embedding calls into batched requests."""
+
+    def __init__(
+        self,
+        embed_batch: EmbedBatchFn,
+        window_ms: float = 5.0,
+        max_batch: int = 64,
+        timeout_seconds: float = 30.0
+    ):
+        """
+        Initialize embedding batcher.
+
+        Args:
+            embed_batch: Coroutine function embedding a list of texts in order
+            window_ms: How long to wait for more texts after the first arrives
+            max_batch: Flush immediately once this many distinct texts are queued
+            timeout_seconds: Per-caller wait limit for its vector
+        """
+        self.embed_batch = embed_batch
+        self.window_ms = window_ms
+        self.max_batch = max(1, max_batch)
+        self.timeout_seconds = timeout_seconds
+
+        # text -> future shared by every caller waiting on that text
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+        self.requests = 0
+        self.batches = 0
+        self.batched_texts = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.batch_sizes: Counter = Counter()
+
+    async def embed(self, text: str) -> List[float]:
+        """
+        Embed a single text, sharing a provider request with concurrent callers.
+
+        Raises:
+            asyncio.TimeoutError: If the vector is not ready within timeout_seconds
+        """
+        self.requests += 1
+        loop = asyncio.get_running_loop()
+
+        future = self._pending.get(text)
+        if future is None:
+            future = loop.create_future()
+            self._pending[text] = future
+
+            if len(self._pending) >= self.max_batch:
+                self._flush()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.window_ms / 1000.0, self._flush)
+
+        try:
+            return list(await asyncio.wait_for(asyncio.shield(future), self.timeout_seconds))
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+
+    def _flush(self) -> None:
+        """Send everything queued so far as one batch."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        if not self._pending:
+            return
+
+        batch = list(self._pending.items())
+        self._pending = {}
+
+        task = asyncio.get_running_loop().create_task(self._run_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        texts = [text for text, _ in batch]
+        self.batches += 1
+        self.batched_texts += len(texts)
+        self.batch_sizes[len(texts)] += 1
+
+        try:
+            vectors = await self.embed_batch(texts)
+            if len(vectors) != len(texts):
+                raise ValueError(f"Expected {len(texts)} embeddings, got {len(vectors)}")
+        except Exception as e:
+            self.failures += 1
+            logger.warning(f"Batched embedding request failed ({len(texts)} texts): {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+                    # Mark retrieved in case every caller already timed out
+                    future.exception()
+            return
+
+        for (_, future), vector in zip(batch, vectors):
+            if not future.done():
+                future.set_result(vector)
+
+    def stats(self) -> Dict[str, Any]:
+        """Request/batch counters and the batch size distribution."""
+        return {
+            "window_ms": self.window_ms,
+            "max_batch": self.max_batch,
+            "timeout_seconds": self.timeout_seconds,
+            "requests": self.requests,
+            "batches": self.batches,
+            "avg_batch_size": round(self.batched_texts / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size": max(self.batch_sizes) if self.batch_sizes else 0,
+            "batch_sizes": {str(size): count for size, count in sorted(self.batch_sizes.items())},
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+        }
+
+
+# Global batcher; None until configured with a provider batch function
+_embedding_batcher: Optional[EmbeddingBatcher] = None
+
+
+def get_embedding_batcher() -> Optional[EmbeddingBatcher]:
+    """Get the process-wide embedding batcher, if one has been configured."""
+    return _embedding_batcher
+
+
+def configure_embedding_batcher(
+    embed_batch: EmbedBatchFn,
+    window_ms: float,
+    max_batch: int,
+    timeout_seconds: float
+) -> EmbeddingBatcher:
+    """
+    Replace the process-wide embedding batcher.
+
+    Args:
+        embed_batch: Coroutine function embedding a list of texts
+        window_ms: Coalescing window in milliseconds
+        max_batch: Maximum texts per provider request
+        timeout_seconds: Per-caller wait limit
+
+    Returns:
+        The new EmbeddingBatcher
+    """
+    global _embedding_batcher
+
+    _embedding_batcher = EmbeddingBatcher(
+        embed_batch,
+        window_ms=window_ms,
+        max_batch=max_batch,
+        timeout_seconds=timeout_seconds
+    )
+    logger.info(
+        f"Embedding batcher configured: window={window_ms}ms, max_batch={max_batch}, "
+        f"timeout={timeout_seconds}s"
+    )
+    return _embedding_batcher
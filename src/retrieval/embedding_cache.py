@@ -0,0 +1,424 @@
+"""
+Process-wide cache for query embeddings.
+
+Repeated queries (dashboards, retries, chat follow-ups) used to call the
+embeddings API every time. EmbeddingCache keeps recent query vectors in an
+LRU with a TTL and a memory budget, and can optionally read through to a
+MongoDB collection so hits survive restarts and are shared between workers.
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Collection used by the optional MongoDB tier
+EMBEDDING_CACHE_COLLECTION = "embedding_cache"
+
+# Rough per-entry overhead (key string, OrderedDict slot, tuple, array header)
+_ENTRY_OVERHEAD_BYTES = 200
+
+
+def normalize_query(text: str) -> str:
+    """Normalize query text for cache keying (Unicode NFKC, collapsed whitespace)."""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def make_cache_key(model: str, dimension: int, text: str) -> str:
+    """Build a stable cache key for (model, dimension, normalized text)."""
+    raw = f"{model}\x1f{dimension}\x1f{normalize_query(text)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+async def compute_in_batches(
+    texts: List[str],
+    compute_batch: Callable[[List[str]], Awaitable[List[List[float]]]],
+    batch_size: int = 64,
+    max_concurrency: int = 4
+) -> List[List[float]]:
+    """
+    Embed texts in chunks of batch_size with at most max_concurrency calls in flight.
+
+    Returns:
+        One vector per text, in input order
+
+    Raises:
+        ValueError: If a batch returns a different number of vectors than texts
+    """
+    size = max(1, batch_size)
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def compute_chunk(chunk: List[str]) -> List[List[float]]:
+        async with semaphore:
+            vectors = await compute_batch(chunk)
+        if len(vectors) != len(chunk):
+            # A short batch would misalign the vectors of every later text
+            raise ValueError(f"Embedding batch returned {len(vectors)} vectors for {len(chunk)} texts")
+        return vectors
+
+    chunks = await asyncio.gather(*(
+        compute_chunk(texts[i:i + size]) for i in range(0, len(texts), size)
+    ))
+    return [vector for chunk in chunks for vector in chunk]
+
+
+class EmbeddingCache:
+    """LRU + TTL cache of query embeddings with an optional MongoDB tier."""
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl_seconds: float = 3600,
+        collection: Optional[Any] = None,
+        persist_ttl_seconds: int = 7 * 24 * 3600
+    ):
+        """
+        Initialize embedding cache.
+
+        Args:
+            max_entries: Maximum number of vectors kept in memory
+            max_bytes: Memory budget for cached vectors
+            ttl_seconds: Lifetime of an in-memory entry
+            collection: Optional async MongoDB collection used as second tier
+            persist_ttl_seconds: Lifetime of MongoDB entries (TTL index)
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.collection = collection
+        self.persist_ttl_seconds = persist_ttl_seconds
+
+        # key -> (expires_at, vector stored as packed doubles)
+        self._entries: "OrderedDict[str, Tuple[float, array]]" = OrderedDict()
+        self._bytes = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._background: Set[asyncio.Task] = set()
+
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # ============== Memory tier ==============
+
+    @staticmethod
+    def _entry_size(vector: array) -> int:
+        return vector.itemsize * len(vector) + _ENTRY_OVERHEAD_BYTES
+
+    def get(self, key: str) -> Optional[List[float]]:
+        """Return a cached vector or None (expired entries are dropped)."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, vector = entry
+        if expires_at < time.monotonic():
+            self._remove(key)
+            return None
+
+        self._entries.move_to_end(key)
+        return vector.tolist()
+
+    def put(self, key: str, vector: List[float]) -> None:
+        """Store a vector, evicting least-recently-used entries over budget."""
+        packed = array("d", vector)
+        size = self._entry_size(packed)
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+
+        if key in self._entries:
+            self._remove(key)
+
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, packed)
+        self._bytes += size
+
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        _, vector = self._entries.pop(key)
+        self._bytes -= self._entry_size(vector)
+
+    def clear(self) -> None:
+        """Drop every in-memory entry (the MongoDB tier is left untouched)."""
+        self._entries.clear()
+        self._bytes = 0
+
+    # ============== MongoDB tier ==============
+
+    async def ensure_indexes(self) -> None:
+        """Create the TTL index on the MongoDB tier."""
+        if self.collection is None:
+            return
+        await self.collection.create_index(
+            "created_at",
+            expireAfterSeconds=self.persist_ttl_seconds,
+            name="embedding_cache_ttl"
+        )
+
+    async def _load_persistent(self, key: str) -> Optional[List[float]]:
+        if self.collection is None:
+            return None
+        try:
+            doc = await self.collection.find_one({"_id": key}, {"embedding": 1})
+        except Exception as e:
+            logger.warning(f"Embedding cache lookup failed: {e}")
+            return None
+        return doc.get("embedding") if doc else None
+
+    async def _load_persistent_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        if self.collection is None or not keys:
+            return {}
+        try:
+            cursor = self.collection.find({"_id": {"$in": keys}}, {"embedding": 1})
+            return {doc["_id"]: doc["embedding"] async for doc in cursor}
+        except Exception as e:
+            logger.warning(f"Embedding cache lookup failed: {e}")
+            return {}
+
+    async def _store_persistent(self, key: str, model: str, dimension: int, vector: List[float]) -> None:
+        try:
+            await self.collection.update_one(
+                {"_id": key},
+                {
+                    "$set": {
+                        "model": model,
+                        "dimension": dimension,
+                        "embedding": vector,
+                        "created_at": datetime.now(timezone.utc)
+                    }
+                },
+                upsert=True
+            )
+        except Exception as e:
+            logger.warning(f"Embedding cache write failed: {e}")
+
+    def _schedule(self, coro: Awaitable) -> None:
+        """Run a write-behind coroutine without blocking the caller."""
+        task = asyncio.ensure_future(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    # ============== Public API ==============
+
+    async def get_or_compute(
+        self,
+        model: str,
+        dimension: int,
+        text: str,
+        compute: Callable[[str], Awaitable[List[float]]]
+    ) -> List[float]:
+        """
+        Return the embedding for text, calling compute only on a miss.
+
+        Concurrent misses for the same key share a single compute call.
+
+        Args:
+            model: Embedding model name
+            dimension: Embedding dimension
+            text: Query text
+            compute: Coroutine function producing the embedding on a miss
+
+        Returns:
+            Embedding vector as list of floats
+        """
+        key = make_cache_key(model, dimension, text)
+
+        vector = self.get(key)
+        if vector is not None:
+            self.hits += 1
+            return vector
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.hits += 1
+            return list(await asyncio.shield(pending))
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            vector = await self._load_persistent(key)
+            if vector is not None:
+                self.persistent_hits += 1
+            else:
+                self.misses += 1
+                vector = await compute(text)
+                if self.collection is not None:
+                    self._schedule(self._store_persistent(key, model, dimension, vector))
+
+            self.put(key, vector)
+            future.set_result(vector)
+            return vector
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so waiterless failures don't log "never retrieved"
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def get_or_compute_many(
+        self,
+        model: str,
+        dimension: int,
+        texts: List[str],
+        compute_batch: Callable[[List[str]], Awaitable[List[List[float]]]],
+        batch_size: int = 64,
+        max_concurrency: int = 4
+    ) -> Dict[str, List[float]]:
+        """
+        Return embeddings for many texts, computing only the misses.
+
+        Like get_or_compute for each text, but the MongoDB tier is read with
+        one query and the misses are embedded in chunks of batch_size, with at
+        most max_concurrency compute_batch calls in flight.
+
+        Args:
+            model: Embedding model name
+            dimension: Embedding dimension
+            texts: Query texts (duplicates are embedded once)
+            compute_batch: Coroutine function embedding a list of texts
+            batch_size: Texts per compute_batch call
+            max_concurrency: compute_batch calls running at once
+
+        Returns:
+            Mapping of text to embedding vector
+        """
+        vectors: Dict[str, List[float]] = {}
+        shared: Dict[str, asyncio.Future] = {}
+        # key -> texts it is computed for by this call
+        owned: Dict[str, List[str]] = {}
+
+        loop = asyncio.get_running_loop()
+        for text in dict.fromkeys(texts):
+            key = make_cache_key(model, dimension, text)
+            if key in owned:
+                owned[key].append(text)
+                continue
+
+            vector = self.get(key)
+            if vector is not None:
+                self.hits += 1
+                vectors[text] = vector
+                continue
+
+            pending = self._inflight.get(key)
+            if pending is not None:
+                self.hits += 1
+                shared[text] = pending
+                continue
+
+            self._inflight[key] = loop.create_future()
+            owned[key] = [text]
+
+        def resolve(key: str, vector: List[float]) -> None:
+            self.put(key, vector)
+            for text in owned[key]:
+                vectors[text] = vector
+            future = self._inflight.pop(key, None)
+            if future is not None and not future.done():
+                future.set_result(vector)
+
+        try:
+            persisted = await self._load_persistent_many(list(owned))
+            for key, vector in persisted.items():
+                self.persistent_hits += 1
+                resolve(key, vector)
+
+            missing = [key for key in owned if key not in persisted]
+            self.misses += len(missing)
+            embeddings = await compute_in_batches(
+                [owned[key][0] for key in missing], compute_batch, batch_size, max_concurrency
+            )
+            for key, vector in zip(missing, embeddings):
+                if self.collection is not None:
+                    self._schedule(self._store_persistent(key, model, dimension, vector))
+                resolve(key, vector)
+        except BaseException as e:
+            for key in owned:
+                future = self._inflight.pop(key, None)
+                if future is not None and not future.done():
+                    future.set_exception(e)
+                    future.exception()
+            raise
+
+        for text, pending in shared.items():
+            vectors[text] = list(await asyncio.shield(pending))
+        return vectors
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and memory usage."""
+        lookups = self.hits + self.persistent_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round((self.hits + self.persistent_hits) / lookups, 4) if lookups else 0.0,
+            "persistent": self.collection is not None,
+        }
+
+
+# Global cache instance shared by every embedding path in the process
+_embedding_cache: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Get or create the process-wide embedding cache."""
+    global _embedding_cache
+
+    if _embedding_cache is None:
+        _embedding_cache = EmbeddingCache()
+
+    return _embedding_cache
+
+
+def configure_embedding_cache(
+    max_entries: int,
+    max_mb: float,
+    ttl_seconds: float,
+    collection: Optional[Any] = None,
+    persist_ttl_seconds: int = 7 * 24 * 3600
+) -> EmbeddingCache:
+    """
+    Replace the process-wide embedding cache with a configured instance.
+
+    Args:
+        max_entries: Maximum number of in-memory vectors
+        max_mb: Memory budget in megabytes
+        ttl_seconds: In-memory entry lifetime
+        collection: Optional async MongoDB collection for the second tier
+        persist_ttl_seconds: MongoDB entry lifetime
+
+    Returns:
+        The new EmbeddingCache
+    """
+    global _embedding_cache
+
+    _embedding_cache = EmbeddingCache(
+        max_entries=max_entries,
+        max_bytes=int(max_mb * 1024 * 1024),
+        ttl_seconds=ttl_seconds,
+        collection=collection,
+        persist_ttl_seconds=persist_ttl_seconds
+    )
+    logger.info(
+        f"Embedding cache configured: max_entries={max_entries}, max_mb={max_mb}, "
+        f"ttl={ttl_seconds}s, persistent={collection is not None}"
+    )
+    return _embedding_cache
@@ -0,0 +1,114 @@
+"""
+Reduced (Matryoshka) embedding dimensions.
+
+text-embedding-3-* models are trained so that a prefix of the vector is
+itself a usable embedding, and the API returns such a shortened, re-
+normalized vector when asked for `dimensions`. A profile may set a smaller
+embedding_dimension; ingestion, query embedding and index creation all use
+the same value, and re-embedding an existing collection is a migration
+(python -m src.migrate reembed).
+"""
+
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from pymongo import UpdateOne
+
+from src.retrieval.vector_storage import decode_embedding, encode_embedding
+
+logger = logging.getLogger(__name__)
+
+# Models accepting the `dimensions` request parameter, with their native size
+MATRYOSHKA_MODELS = {
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+}
+
+
+def native_dimension(model: str) -> Optional[int]:
+    """Native dimension of a Matryoshka-capable model (provider prefixes ignored)."""
+    return MATRYOSHKA_MODELS.get(model.rsplit("/", 1)[-1])
+
+
+def embedding_request_options(model: str, dimension: Optional[int]) -> Dict[str, Any]:
+    """
+    Extra embeddings.create() arguments for a configured dimension.
+
+    Only models that support shortening get `dimensions`, and only when the
+    configured size is below their native one, so other providers see the
+    same requests as before.
+    """
+    native = native_dimension(model)
+    if native is None or not dimension or dimension >= native:
+        return {}
+    return {"dimensions": dimension}
+
+
+async def reembed_chunks(
+    chunks_collection: Any,
+    embed_batch: Callable[[List[str]], Awaitable[List[List[float]]]],
+    dimension: int,
+    storage_format: str = "array",
+    batch_size: int = 100,
+    limit: Optional[int] = None
+) -> Dict[str, int]:
+    """
+    Re-embed chunks whose stored embedding does not have the target dimension.
+
+    Chunks already at the target size are skipped, so the job can be
+    interrupted and re-run.
+
+    Args:
+        chunks_collection: Async chunks collection
+        embed_batch: Coroutine function embedding a list of texts at the target dimension
+        dimension: Target embedding dimension
+        storage_format: Embedding storage format to write
+        batch_size: Chunks per embedding request and bulk write
+        limit: Maximum number of chunks to examine
+
+    Returns:
+        Counts of examined, re-embedded and skipped chunks
+    """
+    stats = {"examined": 0, "reembedded": 0, "skipped": 0}
+    pending: List[Dict[str, Any]] = []
+
+    async def flush():
+        if not pending:
+            return
+        embeddings = await embed_batch([chunk.get("content", "") for chunk in pending])
+        for embedding in embeddings:
+            if len(embedding) != dimension:
+                raise ValueError(
+                    f"Embedding model returned {len(embedding)} dimensions, expected {dimension}"
+                )
+        result = await chunks_collection.bulk_write([
+            UpdateOne(
+                {"_id": chunk["_id"]},
+                {"$set": {
+                    "embedding": encode_embedding(embedding, storage_format),
+                    "metadata.embedding_dimension": dimension,
+                }}
+            )
+            for chunk, embedding in zip(pending, embeddings)
+        ], ordered=False)
+        stats["reembedded"] += result.modified_count
+        pending.clear()
+        logger.info(f"Re-embedded {stats['reembedded']} chunks at {dimension} dimensions")
+
+    cursor = chunks_collection.find({}, {"content": 1, "embedding": 1})
+    if limit:
+        cursor = cursor.limit(limit)
+
+    async for chunk in cursor:
+        stats["examined"] += 1
+        embedding = chunk.get("embedding")
+        if embedding is not None and len(decode_embedding(embedding)) == dimension:
+            stats["skipped"] += 1
+            continue
+
+        pending.append(chunk)
+        if len(pending) >= batch_size:
+            await flush()
+
+    await flush()
+    return stats
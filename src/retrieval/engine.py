@@ -0,0 +1,632 @@
+"""
+Retrieval engine shared by every search path.
+
+The agent tools (src/tools.py), the /search API and the chat endpoints all
+used to carry their own copy of the $vectorSearch / $search pipelines. They
+now build a RetrievalEngine and call it, so pipeline shape, fusion and any
+retrieval optimisation live in exactly one place.
+"""
+
+import asyncio
+import inspect
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pydantic import BaseModel, Field
+from pymongo.errors import OperationFailure
+
+from src.retrieval.capabilities import mark_server_hybrid_unsupported
+from src.retrieval.candidates import (
+    DEFAULT_CANDIDATE_MULTIPLIER, CandidatePlanner, compute_num_candidates
+)
+from src.retrieval.document_metadata import DocumentMetadataCache, get_document_metadata_cache
+from src.retrieval.rescore import oversampled_limit, rescore_hits
+from src.retrieval.timings import track_stage
+from src.retrieval.vector_storage import query_vector
+
+logger = logging.getLogger(__name__)
+
+# Standard RRF constant (Cormack et al., 2009)
+RRF_K = 60
+
+# Chunk fields returned with every hit
+CHUNK_HIT_PROJECTION = {
+    "document_id": 1,
+    "content": 1,
+    "metadata": 1,
+    "document_title": 1,
+    "document_source": 1
+}
+
+
+class SearchResult(BaseModel):
+    """Model for search results."""
+
+    chunk_id: str = Field(..., description="MongoDB ObjectId of chunk as string")
+    document_id: str = Field(..., description="Parent document ObjectId as string")
+    content: str = Field(..., description="Chunk text content")
+    similarity: float = Field(..., description="Relevance score (0-1)")
+    metadata: Dict[str, Any] = Field(default_factory=dict, description="Chunk metadata")
+    document_title: str = Field(..., description="Title from document lookup")
+    document_source: str = Field(..., description="Source from document lookup")
+
+
+def reciprocal_rank_fusion(
+    search_results_list: List[List[SearchResult]],
+    k: int = RRF_K
+) -> List[SearchResult]:
+    """
+    Merge multiple ranked lists using Reciprocal Rank Fusion.
+
+    RRF is a simple yet effective algorithm for combining results from different
+    search methods. It works by scoring each document based on its rank position
+    in each result list.
+
+    Args:
+        search_results_list: List of ranked result lists from different searches
+        k: RRF constant (default: 60, standard in literature)
+
+    Returns:
+        Unified list of results sorted by combined RRF score
+
+    Algorithm:
+        For each document d appearing in result lists:
+            RRF_score(d) = Σ(1 / (k + rank_i(d)))
+        Where rank_i(d) is the position of document d in result list i.
+
+    References:
+        - Cormack et al. (2009): "Reciprocal Rank Fusion outperforms the best system"
+        - Standard k=60 performs well across various datasets
+    """
+    ranking = _rrf_ranking(
+        [[result.chunk_id for result in results] for results in search_results_list],
+        k
+    )
+
+    chunk_map: Dict[str, SearchResult] = {}
+    for results in search_results_list:
+        for result in results:
+            chunk_map.setdefault(result.chunk_id, result)
+
+    # Build final result list with updated similarity scores
+    merged_results = [
+        chunk_map[chunk_id].model_copy(update={"similarity": rrf_score})
+        for chunk_id, rrf_score in ranking
+    ]
+
+    logger.info(f"RRF merged {len(search_results_list)} result lists into {len(merged_results)} unique results")
+
+    return merged_results
+
+
+def _rrf_ranking(ranked_ids: List[List[str]], k: int = RRF_K) -> List[Tuple[str, float]]:
+    """Fuse ranked ID lists into (id, RRF score) pairs, best first."""
+    # Build score dictionary by chunk_id
+    rrf_scores: Dict[str, float] = {}
+
+    for ids in ranked_ids:
+        for rank, chunk_id in enumerate(ids):
+            # Accumulate 1 / (k + rank) (automatic deduplication)
+            rrf_scores[chunk_id] = rrf_scores.get(chunk_id, 0.0) + 1.0 / (k + rank)
+
+    # Sort by combined RRF score (descending)
+    return sorted(rrf_scores.items(), key=lambda x: x[1], reverse=True)
+
+
+async def aggregate_to_list(collection: Any, pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Run an aggregation and collect the results.
+
+    Works with both Motor collections (aggregate returns a cursor) and PyMongo
+    async collections (aggregate is a coroutine that returns a cursor).
+    """
+    cursor = collection.aggregate(pipeline)
+    if inspect.isawaitable(cursor):
+        cursor = await cursor
+    return [doc async for doc in cursor]
+
+
+class RetrievalEngine:
+    """Runs semantic, text and hybrid search against a chunks collection."""
+
+    def __init__(
+        self,
+        chunks_collection: Any,
+        documents_collection: Any,
+        embed: Callable[[str], Awaitable[List[float]]],
+        vector_index: str = "vector_index",
+        text_index: str = "text_index",
+        num_candidates: Optional[int] = None,
+        candidate_multiplier: float = DEFAULT_CANDIDATE_MULTIPLIER,
+        candidate_planner: Optional[CandidatePlanner] = None,
+        rrf_k: int = RRF_K,
+        metadata_cache: Optional[DocumentMetadataCache] = None,
+        local_vector_index: Optional[Any] = None,
+        local_text_index: Optional[Any] = None,
+        embedding_format: str = "array",
+        rescore_oversample: float = 1.0,
+        hybrid_mode: str = "python"
+    ):
+        """
+        Initialize retrieval engine.
+
+        Args:
+            chunks_collection: Async collection holding chunks and embeddings
+            documents_collection: Async collection holding source documents
+            embed: Coroutine function turning query text into a vector
+            vector_index: Atlas Vector Search index name
+            text_index: Atlas Search index name
+            num_candidates: Fixed HNSW candidates per vector query (overrides adaptive sizing)
+            candidate_multiplier: Candidates per requested result when no planner is given
+            candidate_planner: Adaptive planner using corpus size and calibration
+            rrf_k: RRF constant used for hybrid fusion
+            metadata_cache: Title/source cache (defaults to the process-wide one)
+            local_vector_index: In-process LocalVectorIndex used instead of $vectorSearch
+            local_text_index: In-process LocalBM25Index used instead of $search
+            embedding_format: Chunk embedding storage format (query vectors are encoded to match)
+            rescore_oversample: Above 1, fetch this many times more vector hits and
+                re-rank them by exact cosine (for quantized indexes)
+            hybrid_mode: "rankfusion" or "unionwith" to fuse hybrid search on the
+                server in one aggregation, "python" for two legs fused here
+        """
+        self.chunks_collection = chunks_collection
+        self.documents_collection = documents_collection
+        self.embed = embed
+        self.vector_index = vector_index
+        self.text_index = text_index
+        self.num_candidates = num_candidates
+        self.candidate_multiplier = candidate_multiplier
+        self.candidate_planner = candidate_planner
+        self.rrf_k = rrf_k
+        self.metadata_cache = metadata_cache or get_document_metadata_cache()
+        self.local_vector_index = local_vector_index
+        self.local_text_index = local_text_index
+        self.embedding_format = embedding_format
+        self.rescore_oversample = rescore_oversample
+        self.hybrid_mode = hybrid_mode
+
+    # ============== Pipelines ==============
+
+    @staticmethod
+    def _project_stage(score_meta: str, include_embedding: bool = False) -> Dict[str, Any]:
+        """
+        Shape chunk hits.
+
+        Denormalized chunks carry document_title/document_source themselves;
+        for the rest they are resolved after fusion.
+        """
+        project: Dict[str, Any] = {
+            "chunk_id": "$_id",
+            **CHUNK_HIT_PROJECTION,
+            "similarity": {"$meta": score_meta}
+        }
+        if include_embedding:
+            project["embedding"] = 1
+        return {"$project": project}
+
+    def vector_pipeline(
+        self,
+        query_embedding: List[float],
+        limit: int,
+        num_candidates: Optional[int] = None,
+        exact: bool = False,
+        include_embedding: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Build the $vectorSearch aggregation pipeline.
+
+        Args:
+            query_embedding: Query vector
+            limit: Number of results
+            num_candidates: HNSW candidates (defaults to limit × candidate_multiplier)
+            exact: Run exact (ENN) search instead of approximate
+            include_embedding: Return stored embeddings (for rescoring)
+        """
+        vector_search: Dict[str, Any] = {
+            "index": self.vector_index,
+            "queryVector": query_vector(query_embedding, self.embedding_format),
+            "path": "embedding",
+            "limit": limit
+        }
+        if exact:
+            vector_search["exact"] = True
+        else:
+            if num_candidates is None:
+                num_candidates = compute_num_candidates(limit, self.candidate_multiplier)
+            # numCandidates must never be below limit
+            vector_search["numCandidates"] = max(num_candidates, limit)
+
+        return [
+            {"$vectorSearch": vector_search},
+            self._project_stage("vectorSearchScore", include_embedding)
+        ]
+
+    def rank_fusion_pipeline(
+        self,
+        query: str,
+        query_embedding: List[float],
+        fetch_count: int,
+        match_count: int,
+        num_candidates: Optional[int] = None,
+        exact: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Build a single-aggregation hybrid pipeline using $rankFusion (RRF, k=60)."""
+        return [
+            {
+                "$rankFusion": {
+                    "input": {
+                        "pipelines": {
+                            "vector": self.vector_pipeline(query_embedding, fetch_count, num_candidates, exact)[:1],
+                            "text": self.text_pipeline(query, fetch_count)[:2]
+                        }
+                    }
+                }
+            },
+            {"$limit": match_count},
+            self._project_stage("score")
+        ]
+
+    def _rrf_leg(self, stages: List[Dict[str, Any]], score_field: str) -> List[Dict[str, Any]]:
+        """Rank one leg's hits and score them 1 / (k + rank) inside the pipeline."""
+        return [
+            *stages,
+            {"$project": CHUNK_HIT_PROJECTION},
+            {"$group": {"_id": None, "docs": {"$push": "$$ROOT"}}},
+            {"$unwind": {"path": "$docs", "includeArrayIndex": "rank"}},
+            {
+                "$replaceRoot": {
+                    "newRoot": {
+                        "$mergeObjects": [
+                            "$docs",
+                            {score_field: {"$divide": [1.0, {"$add": ["$rank", self.rrf_k]}]}}
+                        ]
+                    }
+                }
+            }
+        ]
+
+    def union_rrf_pipeline(
+        self,
+        query: str,
+        query_embedding: List[float],
+        fetch_count: int,
+        match_count: int,
+        num_candidates: Optional[int] = None,
+        exact: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Build a single-aggregation hybrid pipeline: the $search leg is
+        $unionWith-ed into the $vectorSearch leg and RRF is computed in the
+        pipeline, with the same 1 / (k + rank) scores as reciprocal_rank_fusion.
+        """
+        return [
+            *self._rrf_leg(
+                self.vector_pipeline(query_embedding, fetch_count, num_candidates, exact)[:1],
+                "vector_score"
+            ),
+            {
+                "$unionWith": {
+                    "coll": self.chunks_collection.name,
+                    "pipeline": self._rrf_leg(self.text_pipeline(query, fetch_count)[:2], "text_score")
+                }
+            },
+            {
+                "$group": {
+                    "_id": "$_id",
+                    "vector_score": {"$max": "$vector_score"},
+                    "text_score": {"$max": "$text_score"},
+                    **{field: {"$first": f"${field}"} for field in CHUNK_HIT_PROJECTION}
+                }
+            },
+            {
+                "$project": {
+                    "chunk_id": "$_id",
+                    **CHUNK_HIT_PROJECTION,
+                    "similarity": {
+                        "$add": [{"$ifNull": ["$vector_score", 0]}, {"$ifNull": ["$text_score", 0]}]
+                    }
+                }
+            },
+            {"$sort": {"similarity": -1, "_id": 1}},
+            {"$limit": match_count}
+        ]
+
+    async def _plan_candidates(self, limit: int) -> Tuple[Optional[int], bool]:
+        """Resolve (numCandidates, exact) for a vector query."""
+        if self.num_candidates is not None:
+            return self.num_candidates, False
+        if self.candidate_planner is not None:
+            return await self.candidate_planner.plan(self.chunks_collection, limit)
+        return None, False
+
+    def text_pipeline(self, query: str, limit: int) -> List[Dict[str, Any]]:
+        """Build the Atlas $search aggregation pipeline."""
+        return [
+            {
+                "$search": {
+                    "index": self.text_index,
+                    "text": {
+                        "query": query,
+                        "path": "content",
+                        "fuzzy": {
+                            "maxEdits": 2,
+                            "prefixLength": 3
+                        }
+                    }
+                }
+            },
+            {"$limit": limit},
+            self._project_stage("searchScore")
+        ]
+
+    async def _resolve(self, hits: List[Dict[str, Any]]) -> List[SearchResult]:
+        """
+        Attach document title/source to final hits (one `$in` query at most).
+
+        Denormalized hits are used as-is. For the others, hits whose parent
+        document no longer exists are dropped, as the old $lookup + $unwind
+        join did.
+        """
+        if not hits:
+            return []
+
+        unresolved = [hit["document_id"] for hit in hits if hit.get("document_title") is None]
+        with track_stage("join"):
+            documents = (
+                await self.metadata_cache.resolve(self.documents_collection, unresolved)
+                if unresolved else {}
+            )
+
+        results = []
+        for hit in hits:
+            if hit.get("document_title") is not None:
+                document = {"title": hit["document_title"], "source": hit.get("document_source") or ""}
+            else:
+                document = documents.get(str(hit["document_id"]))
+            if document is None:
+                continue
+            results.append(SearchResult(
+                chunk_id=str(hit["chunk_id"]),
+                document_id=str(hit["document_id"]),
+                content=hit["content"],
+                similarity=hit["similarity"],
+                metadata=hit.get("metadata", {}),
+                document_title=document["title"],
+                document_source=document["source"]
+            ))
+        return results
+
+    async def _fetch_chunks(self, ranked: List[Tuple[str, float]]) -> List[Dict[str, Any]]:
+        """Load chunk hits for (chunk_id, score) pairs from a local index, keeping rank order."""
+        if not ranked:
+            return []
+
+        cursor = self.chunks_collection.find(
+            {"_id": {"$in": [ObjectId(chunk_id) for chunk_id, _ in ranked]}},
+            CHUNK_HIT_PROJECTION
+        )
+        chunks = {str(chunk["_id"]): chunk async for chunk in cursor}
+
+        hits = []
+        for chunk_id, score in ranked:
+            chunk = chunks.get(chunk_id)
+            if chunk is None:
+                continue  # deleted since the index was written
+            hits.append({**chunk, "chunk_id": chunk["_id"], "similarity": score})
+        return hits
+
+    async def _embed(self, query: str) -> List[float]:
+        with track_stage("embedding"):
+            return await self.embed(query)
+
+    async def _semantic_hits(self, query: str, limit: int) -> List[Dict[str, Any]]:
+        if self.local_vector_index is not None:
+            query_embedding = await self._embed(query)
+            with track_stage("vector_query"):
+                ranked = await asyncio.to_thread(self.local_vector_index.search, query_embedding, limit)
+                return await self._fetch_chunks(ranked)
+
+        # Quantized indexes: oversample, then re-rank by exact similarity
+        rescore = self.rescore_oversample > 1.0
+        fetch = oversampled_limit(limit, self.rescore_oversample) if rescore else limit
+
+        query_embedding, (num_candidates, exact) = await asyncio.gather(
+            self._embed(query),
+            self._plan_candidates(fetch)
+        )
+        with track_stage("vector_query"):
+            docs = await aggregate_to_list(
+                self.chunks_collection,
+                self.vector_pipeline(query_embedding, fetch, num_candidates, exact, include_embedding=rescore)
+            )
+        if rescore:
+            with track_stage("rescore"):
+                return await asyncio.to_thread(rescore_hits, query_embedding, docs, limit)
+        return docs[:limit]
+
+    async def _text_hits(self, query: str, limit: int) -> List[Dict[str, Any]]:
+        with track_stage("text_query"):
+            if self.local_text_index is not None:
+                ranked = await asyncio.to_thread(self.local_text_index.search, query, limit)
+                return await self._fetch_chunks(ranked)
+
+            docs = await aggregate_to_list(
+                self.chunks_collection,
+                self.text_pipeline(query, limit)
+            )
+            return docs[:limit]
+
+    # ============== Search ==============
+
+    async def semantic_search(self, query: str, match_count: int) -> List[SearchResult]:
+        """
+        Perform pure semantic search using MongoDB vector similarity.
+
+        Raises:
+            OperationFailure: If MongoDB operation fails (e.g., missing index)
+        """
+        return await self._resolve(await self._semantic_hits(query, match_count))
+
+    async def text_search(self, query: str, match_count: int) -> List[SearchResult]:
+        """
+        Perform full-text search using MongoDB Atlas Search.
+
+        Raises:
+            OperationFailure: If MongoDB operation fails (e.g., missing index)
+        """
+        return await self._resolve(await self._text_hits(query, match_count))
+
+    async def hybrid_search(self, query: str, match_count: int) -> List[SearchResult]:
+        """
+        Perform hybrid search combining semantic and keyword matching.
+
+        Both legs run concurrently, so latency is max(vector, text) rather than
+        their sum. Fusion works on chunk IDs and only the surviving top
+        match_count hits get their document metadata resolved. If one leg
+        fails the other one's results are returned; only when both fail is
+        the vector error raised.
+        """
+        # Over-fetch for better RRF results (2x requested count)
+        fetch_count = match_count * 2
+
+        if self._server_hybrid_enabled():
+            try:
+                return await self._server_hybrid_search(query, fetch_count, match_count)
+            except OperationFailure as e:
+                if mark_server_hybrid_unsupported(self.chunks_collection, e):
+                    self.hybrid_mode = "python"
+                else:
+                    logger.warning(f"Server-side hybrid search failed, fusing in Python for this query: {e}")
+
+        semantic_hits, text_hits = await asyncio.gather(
+            self._semantic_hits(query, fetch_count),
+            self._text_hits(query, fetch_count),
+            return_exceptions=True  # Don't fail if one search errors
+        )
+
+        semantic_error: Optional[BaseException] = None
+        if isinstance(semantic_hits, BaseException):
+            logger.warning(f"Semantic search failed: {semantic_hits}, using text results only")
+            semantic_error = semantic_hits
+            semantic_hits = []
+        if isinstance(text_hits, BaseException):
+            logger.warning(f"Text search failed: {text_hits}, using semantic results only")
+            if semantic_error is not None:
+                raise semantic_error
+            text_hits = []
+
+        return await self._fuse(query, semantic_hits, text_hits, match_count)
+
+    async def _fuse(
+        self,
+        query: str,
+        semantic_hits: List[Dict[str, Any]],
+        text_hits: List[Dict[str, Any]],
+        match_count: int
+    ) -> List[SearchResult]:
+        """RRF-fuse both legs' hits and resolve the top match_count."""
+        with track_stage("fusion"):
+            hit_map: Dict[str, Dict[str, Any]] = {}
+            for hit in [*semantic_hits, *text_hits]:
+                hit_map.setdefault(str(hit["chunk_id"]), hit)
+
+            ranking = _rrf_ranking(
+                [[str(h["chunk_id"]) for h in semantic_hits], [str(h["chunk_id"]) for h in text_hits]],
+                k=self.rrf_k
+            )
+            fused_hits = [
+                {**hit_map[chunk_id], "similarity": score}
+                for chunk_id, score in ranking[:match_count]
+            ]
+        final_results = await self._resolve(fused_hits)
+
+        logger.info(
+            f"hybrid_search_completed: query='{query}', "
+            f"semantic={len(semantic_hits)}, text={len(text_hits)}, "
+            f"merged={len(ranking)}, returned={len(final_results)}"
+        )
+
+        return final_results
+
+    async def hybrid_search_stream(
+        self, query: str, match_count: int
+    ) -> AsyncIterator[Tuple[str, List[SearchResult]]]:
+        """
+        Hybrid search that yields results progressively.
+
+        Yields ("text", results) and ("semantic", results) as each leg
+        finishes (text usually first, since it needs no embedding), then
+        ("hybrid", results) with the fused ranking. A failed leg is skipped;
+        if both fail the vector error is raised, as in hybrid_search.
+        """
+        fetch_count = match_count * 2
+        legs = {
+            asyncio.ensure_future(self._text_hits(query, fetch_count)): "text",
+            asyncio.ensure_future(self._semantic_hits(query, fetch_count)): "semantic",
+        }
+        hits: Dict[str, List[Dict[str, Any]]] = {"semantic": [], "text": []}
+        errors: Dict[str, BaseException] = {}
+
+        try:
+            pending = set(legs)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    leg = legs[task]
+                    if task.exception() is not None:
+                        logger.warning(f"{leg.capitalize()} search failed: {task.exception()}")
+                        errors[leg] = task.exception()
+                        continue
+                    hits[leg] = task.result()
+                    yield leg, await self._resolve(hits[leg][:match_count])
+        finally:
+            for task in legs:
+                task.cancel()
+
+        if len(errors) == 2:
+            raise errors["semantic"]
+        yield "hybrid", await self._fuse(query, hits["semantic"], hits["text"], match_count)
+
+    def _server_hybrid_enabled(self) -> bool:
+        """Server-side fusion needs both legs in Atlas and no client-side rescoring."""
+        return (
+            self.hybrid_mode in ("rankfusion", "unionwith")
+            and self.local_vector_index is None
+            and self.local_text_index is None
+            and self.rescore_oversample <= 1.0
+        )
+
+    async def _server_hybrid_search(self, query: str, fetch_count: int, match_count: int) -> List[SearchResult]:
+        """Hybrid search fused on the server: one aggregation round trip."""
+        query_embedding, (num_candidates, exact) = await asyncio.gather(
+            self._embed(query),
+            self._plan_candidates(fetch_count)
+        )
+        build = self.rank_fusion_pipeline if self.hybrid_mode == "rankfusion" else self.union_rrf_pipeline
+        with track_stage("hybrid_query"):
+            hits = await aggregate_to_list(
+                self.chunks_collection,
+                build(query, query_embedding, fetch_count, match_count, num_candidates, exact)
+            )
+        results = await self._resolve(hits[:match_count])
+
+        logger.info(
+            f"hybrid_search_completed: query='{query}', mode={self.hybrid_mode}, returned={len(results)}"
+        )
+        return results
+
+    async def search(self, query: str, search_type: str, match_count: int) -> List[SearchResult]:
+        """
+        Dispatch to the requested search type.
+
+        Args:
+            query: Search query text
+            search_type: "semantic", "text" or "hybrid" (str enums accepted)
+            match_count: Number of results to return
+        """
+        if search_type == "semantic":
+            return await self.semantic_search(query, match_count)
+        if search_type == "text":
+            return await self.text_search(query, match_count)
+        return await self.hybrid_search(query, match_count)
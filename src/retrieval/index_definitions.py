@@ -0,0 +1,111 @@
+"""
+Atlas Search index definitions for the chunks collection.
+
+The CLI (src/setup_indexes.py) and both index-creation endpoints build their
+definitions here so the vector and text indexes never drift apart.
+"""
+
+from typing import Any, Dict
+
+from src.retrieval.vector_storage import validate_format
+
+QUANTIZATION_TYPES = ("none", "scalar", "binary")
+
+
+def vector_index_definition(
+    name: str,
+    dimension: int,
+    similarity: str = "cosine",
+    storage_format: str = "array",
+    quantization: str = "none"
+) -> Dict[str, Any]:
+    """
+    Build the $vectorSearch index definition.
+
+    Denormalized chunk fields are indexed as filter fields so searches can be
+    restricted by source or file type without a join. Atlas detects binary
+    float32/int8 vectors from the stored BSON type, so the vector field is the
+    same for every storage format; int8 vectors are scaled per vector and
+    therefore only rank correctly under cosine or euclidean similarity.
+
+    Scalar (int8, ~4x) or binary (1 bit, ~32x) quantization shrinks the HNSW
+    graph held in memory; pair it with rescoring (see src.retrieval.rescore)
+    to keep recall. Atlas only quantizes float vectors, so it cannot be
+    combined with int8 storage.
+
+    Args:
+        name: Index name
+        dimension: Embedding dimension
+        similarity: Vector similarity function
+        storage_format: Chunk embedding storage format (see vector_storage)
+        quantization: Index quantization: "none", "scalar" or "binary"
+
+    Returns:
+        Definition for createSearchIndexes
+
+    Raises:
+        ValueError: If the storage format or quantization is unknown or incompatible
+    """
+    validate_format(storage_format)
+    if storage_format == "int8" and similarity == "dotProduct":
+        raise ValueError("int8 embedding storage requires cosine or euclidean similarity")
+    if quantization not in QUANTIZATION_TYPES:
+        raise ValueError(
+            f"Unknown quantization '{quantization}' (expected one of {', '.join(QUANTIZATION_TYPES)})"
+        )
+    if quantization != "none" and storage_format == "int8":
+        raise ValueError("Quantization requires float embeddings (storage format array or float32)")
+
+    vector_field: Dict[str, Any] = {
+        "type": "vector",
+        "path": "embedding",
+        "numDimensions": dimension,
+        "similarity": similarity
+    }
+    if quantization != "none":
+        vector_field["quantization"] = quantization
+
+    return {
+        "name": name,
+        "type": "vectorSearch",
+        "definition": {
+            "fields": [
+                vector_field,
+                {"type": "filter", "path": "document_id"},
+                {"type": "filter", "path": "document_source"},
+                {"type": "filter", "path": "file_type"}
+            ]
+        }
+    }
+
+
+def text_index_definition(name: str) -> Dict[str, Any]:
+    """
+    Build the Atlas Search (text) index definition.
+
+    Args:
+        name: Index name
+
+    Returns:
+        Definition for createSearchIndexes
+    """
+    return {
+        "name": name,
+        "definition": {
+            "mappings": {
+                "dynamic": False,
+                "fields": {
+                    "content": {
+                        "type": "string",
+                        "analyzer": "lucene.standard"
+                    },
+                    "document_title": {
+                        "type": "string",
+                        "analyzer": "lucene.standard"
+                    },
+                    "document_source": {"type": "token"},
+                    "file_type": {"type": "token"}
+                }
+            }
+        }
+    }
@@ -0,0 +1,589 @@
+"""
+In-process BM25 keyword search over chunk content.
+
+Without an Atlas $search index, text_search fails and hybrid search falls
+back to vector results only. LocalBM25Index keeps an inverted index of chunk
+content with compact array-backed postings (uint32 row ids, uint16 term
+frequencies), persisted to a single .npz file. Chunks are added as ingestion
+stores them and removed per document_id; ingestion updates the index in
+memory and saves it once per batch or job (save_if_dirty, from a worker
+thread), so the file is not rewritten per document. Query terms are expanded with
+prefix and bounded edit-distance matches, mirroring the Atlas fuzzy
+options used by the $search pipeline (maxEdits=2, prefixLength=3).
+"""
+
+import io
+import logging
+import math
+import os
+import re
+import threading
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.retrieval.local_vector import local_index_dir
+from src.retrieval.result_cache import corpus_namespace
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_ID_DTYPE = "S24"
+
+# Compact once this share of rows is tombstoned
+_COMPACT_RATIO = 0.2
+
+# Score weights for expanded query terms
+_PREFIX_WEIGHT = 0.8
+_FUZZY_WEIGHT = 0.6
+
+# Upper bound on vocabulary terms one query term expands to
+_MAX_EXPANSIONS = 50
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _within_edits(a: str, b: str, max_edits: int) -> bool:
+    """Levenshtein distance(a, b) <= max_edits (banded, early exit)."""
+    if abs(len(a) - len(b)) > max_edits:
+        return False
+
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+        if min(current) > max_edits:
+            return False
+        previous = current
+    return previous[-1] <= max_edits
+
+
+class LocalBM25Index:
+    """Inverted BM25 index of chunk content with fuzzy prefix queries."""
+
+    def __init__(
+        self,
+        path: str,
+        k1: float = 1.2,
+        b: float = 0.75,
+        max_edits: int = 2,
+        prefix_length: int = 3
+    ):
+        """
+        Open (or create) a local BM25 index.
+
+        Args:
+            path: Directory holding the index file
+            k1: BM25 term frequency saturation
+            b: BM25 length normalization
+            max_edits: Maximum edit distance for fuzzy term matches
+            prefix_length: Leading characters a fuzzy match must share
+        """
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.max_edits = max_edits
+        self.prefix_length = prefix_length
+
+        self._lock = threading.RLock()
+        # Serializes file writes, which run outside _lock
+        self._save_lock = threading.Lock()
+        # One compaction at a time; it rebuilds outside _lock
+        self._compact_lock = threading.Lock()
+        # Bumped whenever the row layout is replaced (load, clear)
+        self._layout = 0
+        os.makedirs(path, exist_ok=True)
+        self._load()
+
+    # ============== Files ==============
+
+    @property
+    def _file(self) -> str:
+        return os.path.join(self.path, "bm25.npz")
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        # The file is replaced atomically, so a new inode means new content
+        try:
+            stat = os.stat(self._file)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _reset(self) -> None:
+        self._layout += 1
+        self._terms: Dict[str, int] = {}
+        self._rows: List[array] = []   # term id -> chunk rows
+        self._tfs: List[array] = []    # term id -> term frequencies
+        self._lengths = array("I")
+        self._chunk_ids: List[str] = []
+        self._document_ids: List[str] = []
+        self._doc_rows: Dict[str, List[int]] = {}  # document id -> its rows
+        self._deleted = bytearray()
+        self._live_rows = 0
+        self._live_length = 0
+        self._sorted_terms: Optional[List[str]] = None
+        # Changes since the index was last written (or loaded)
+        self._version = 0
+        self._saved_version = 0
+
+    def _index_documents(self) -> None:
+        self._doc_rows = {}
+        for row, document_id in enumerate(self._document_ids):
+            self._doc_rows.setdefault(document_id, []).append(row)
+
+    def _load(self) -> None:
+        self._reset()
+        self._stamp = self._stat()
+        if self._stamp is None:
+            return
+
+        with np.load(self._file) as data:
+            terms = data["terms"].tolist()
+            offsets = data["offsets"]
+            rows, tfs = data["rows"], data["tfs"]
+            self._terms = {term: i for i, term in enumerate(terms)}
+            for i in range(len(terms)):
+                self._rows.append(array("I", rows[offsets[i]:offsets[i + 1]].tobytes()))
+                self._tfs.append(array("H", tfs[offsets[i]:offsets[i + 1]].tobytes()))
+            self._lengths = array("I", data["lengths"].tobytes())
+            self._chunk_ids = [c.decode("ascii") for c in data["chunk_ids"].tolist()]
+            self._document_ids = [d.decode("ascii") for d in data["document_ids"].tolist()]
+            self._deleted = bytearray(data["deleted"].tobytes())
+        self._index_documents()
+
+        live = np.frombuffer(bytes(self._deleted), dtype=np.uint8) == 0
+        self._live_rows = int(live.sum())
+        self._live_length = int(np.frombuffer(self._lengths, dtype=np.uint32)[live].sum()) if self._live_rows else 0
+
+    @property
+    def dirty(self) -> bool:
+        """Whether there are changes not written to the index file yet."""
+        return self._version != self._saved_version
+
+    def save(self) -> None:
+        """
+        Persist the index atomically.
+
+        Only the snapshot of the postings is taken under the index lock;
+        serializing and writing the file do not block searches or updates.
+        """
+        with self._save_lock:
+            with self._lock:
+                version = self._version
+                offsets = np.zeros(len(self._rows) + 1, dtype=np.int64)
+                offsets[1:] = np.cumsum([len(r) for r in self._rows])
+                arrays = dict(
+                    terms=np.array(list(self._terms), dtype=str),
+                    offsets=offsets,
+                    rows=np.frombuffer(b"".join(r.tobytes() for r in self._rows), dtype=np.uint32),
+                    tfs=np.frombuffer(b"".join(t.tobytes() for t in self._tfs), dtype=np.uint16),
+                    lengths=np.frombuffer(bytes(self._lengths), dtype=np.uint32),
+                    chunk_ids=np.array(self._chunk_ids, dtype=_ID_DTYPE),
+                    document_ids=np.array(self._document_ids, dtype=_ID_DTYPE),
+                    deleted=np.frombuffer(bytes(self._deleted), dtype=np.uint8),
+                )
+
+            buffer = io.BytesIO()
+            np.savez(buffer, **arrays)
+            tmp = self._file + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(buffer.getvalue())
+            os.replace(tmp, self._file)
+
+            with self._lock:
+                self._stamp = self._stat()
+                self._saved_version = version
+
+    def save_if_dirty(self) -> bool:
+        """Persist the index if it changed since the last save; returns whether it wrote."""
+        if not self.dirty:
+            return False
+        self.save()
+        return True
+
+    def _refresh(self) -> None:
+        """Pick up changes written by another process (e.g. the CLI ingester)."""
+        stamp = self._stat()
+        if stamp == self._stamp or self.dirty:
+            # Unsaved local changes win until they are written
+            return
+        with self._lock:
+            if stamp != self._stamp and not self.dirty:
+                self._load()
+
+    # ============== Updates ==============
+
+    def add(
+        self,
+        chunk_ids: Sequence[Any],
+        document_ids: Sequence[Any],
+        contents: Sequence[str],
+        persist: bool = True
+    ) -> int:
+        """
+        Index chunks.
+
+        Args:
+            chunk_ids: Chunk ObjectIds (or hex strings)
+            document_ids: Parent document IDs, aligned with chunk_ids
+            contents: Chunk texts, aligned with chunk_ids
+            persist: Write the index file afterwards; ingestion and bulk builds pass
+                False and call save_if_dirty() once per batch instead
+
+        Returns:
+            Number of chunks added
+        """
+        with self._lock:
+            for chunk_id, document_id, content in zip(chunk_ids, document_ids, contents):
+                row = len(self._chunk_ids)
+                tokens = tokenize(content)
+                counts: Dict[str, int] = {}
+                for token in tokens:
+                    counts[token] = counts.get(token, 0) + 1
+
+                for term, tf in counts.items():
+                    term_id = self._terms.get(term)
+                    if term_id is None:
+                        term_id = self._terms[term] = len(self._rows)
+                        self._rows.append(array("I"))
+                        self._tfs.append(array("H"))
+                        self._sorted_terms = None
+                    self._rows[term_id].append(row)
+                    self._tfs[term_id].append(min(tf, 0xFFFF))
+
+                self._chunk_ids.append(str(chunk_id))
+                self._document_ids.append(str(document_id))
+                self._doc_rows.setdefault(str(document_id), []).append(row)
+                self._lengths.append(len(tokens))
+                self._deleted.append(0)
+                self._live_rows += 1
+                self._live_length += len(tokens)
+
+            self._version += 1
+            if persist:
+                self.save()
+
+        return len(chunk_ids)
+
+    def delete_documents(self, document_ids: Iterable[Any], persist: bool = True) -> int:
+        """
+        Remove every chunk belonging to the given documents.
+
+        Args:
+            document_ids: Parent document IDs
+            persist: Write the index file afterwards (see add)
+
+        Returns:
+            Number of chunks removed
+        """
+        removed = 0
+
+        with self._lock:
+            for document_id in {str(d) for d in document_ids}:
+                for row in self._doc_rows.pop(document_id, ()):
+                    if not self._deleted[row]:
+                        self._deleted[row] = 1
+                        self._live_rows -= 1
+                        self._live_length -= self._lengths[row]
+                        removed += 1
+
+            if not removed:
+                return 0
+            self._version += 1
+            compact = len(self._chunk_ids) - self._live_rows > len(self._chunk_ids) * _COMPACT_RATIO
+
+        if compact:
+            self._compact()
+        if persist:
+            self.save()
+        return removed
+
+    def _compact(self) -> None:
+        """
+        Rebuild postings without tombstoned rows.
+
+        The rebuild runs on a snapshot outside the index lock, so searches and
+        updates go on meanwhile; rows added or deleted in the meantime are
+        carried over when the result is swapped in.
+        """
+        if not self._compact_lock.acquire(blocking=False):
+            return
+        try:
+            with self._lock:
+                layout = self._layout
+                count = len(self._chunk_ids)
+                terms = list(self._terms)
+                posting_rows, posting_tfs = list(self._rows), list(self._tfs)
+                sizes = np.array([len(r) for r in posting_rows], dtype=np.int64)
+                deleted = np.frombuffer(bytes(self._deleted), dtype=np.uint8).astype(bool)
+                lengths = np.array(self._lengths, dtype=np.uint32)
+                chunk_ids, document_ids = self._chunk_ids[:count], self._document_ids[:count]
+
+            # Postings only grow at the end, so the first `size` entries are the snapshot
+            live = ~deleted
+            remap = np.cumsum(live, dtype=np.int64) - 1
+            all_rows = np.frombuffer(
+                b"".join(r[:n].tobytes() for r, n in zip(posting_rows, sizes)), dtype=np.uint32
+            )
+            all_tfs = np.frombuffer(
+                b"".join(t[:n].tobytes() for t, n in zip(posting_tfs, sizes)), dtype=np.uint16
+            )
+            keep = live[all_rows]
+            term_of = np.repeat(np.arange(len(terms)), sizes)
+            kept_sizes = np.bincount(term_of[keep], minlength=len(terms))
+            offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+            offsets[1:] = np.cumsum(kept_sizes)
+            kept_rows = remap[all_rows[keep]].astype(np.uint32)
+            kept_tfs = all_tfs[keep]
+
+            new_terms: Dict[str, int] = {}
+            rows: List[array] = []
+            tfs: List[array] = []
+            for term_id in np.flatnonzero(kept_sizes):
+                start, end = offsets[term_id], offsets[term_id + 1]
+                new_terms[terms[term_id]] = len(rows)
+                rows.append(array("I", kept_rows[start:end].tobytes()))
+                tfs.append(array("H", kept_tfs[start:end].tobytes()))
+
+            kept = np.flatnonzero(live)
+            new_lengths = array("I", lengths[kept].tobytes())
+            new_chunk_ids = [chunk_ids[row] for row in kept]
+            new_document_ids = [document_ids[row] for row in kept]
+            doc_rows: Dict[str, List[int]] = {}
+            for row, document_id in enumerate(new_document_ids):
+                doc_rows.setdefault(document_id, []).append(row)
+
+            with self._lock:
+                if self._layout != layout:
+                    # Reloaded or cleared meanwhile
+                    return
+
+                # Rows added meanwhile move down by the number of rows dropped
+                shift = count - len(kept)
+                if len(self._chunk_ids) > count:
+                    for term_id, term in enumerate(self._terms):
+                        start = sizes[term_id] if term_id < len(sizes) else 0
+                        added = self._rows[term_id]
+                        if len(added) <= start:
+                            continue
+                        target = new_terms.get(term)
+                        if target is None:
+                            target = new_terms[term] = len(rows)
+                            rows.append(array("I"))
+                            tfs.append(array("H"))
+                        moved = np.frombuffer(added[start:].tobytes(), dtype=np.uint32) - shift
+                        rows[target].extend(array("I", moved.astype(np.uint32).tobytes()))
+                        tfs[target].extend(self._tfs[term_id][start:])
+                    for row in range(count, len(self._chunk_ids)):
+                        doc_rows.setdefault(self._document_ids[row], []).append(row - shift)
+                    new_lengths.extend(self._lengths[count:])
+                    new_chunk_ids.extend(self._chunk_ids[count:])
+                    new_document_ids.extend(self._document_ids[count:])
+
+                # Rows deleted meanwhile stay tombstoned
+                current = np.frombuffer(bytes(self._deleted), dtype=np.uint8).astype(bool)
+                new_deleted = bytearray(len(new_chunk_ids))
+                for row in np.flatnonzero(current[:count] & live):
+                    new_deleted[remap[row]] = 1
+                    doc_rows.pop(document_ids[row], None)
+                for row in np.flatnonzero(current[count:]):
+                    new_deleted[row + count - shift] = 1
+
+                self._terms, self._rows, self._tfs = new_terms, rows, tfs
+                self._lengths = new_lengths
+                self._chunk_ids, self._document_ids = new_chunk_ids, new_document_ids
+                self._deleted = new_deleted
+                self._doc_rows = doc_rows
+                self._sorted_terms = None
+                self._version += 1
+            logger.info(f"Compacted local BM25 index at {self.path} to {len(kept)} chunks")
+        finally:
+            self._compact_lock.release()
+
+    def clear(self) -> None:
+        """Remove every chunk."""
+        with self._lock:
+            self._reset()
+            self._version = self._saved_version + 1
+            self.save()
+
+    # ============== Search ==============
+
+    def _expand(self, token: str) -> List[Tuple[int, float]]:
+        """Vocabulary terms matching a query token: exact, prefix and fuzzy, with weights."""
+        matches: Dict[int, float] = {}
+        exact = self._terms.get(token)
+        if exact is not None:
+            matches[exact] = 1.0
+
+        if len(token) < self.prefix_length:
+            return list(matches.items())
+
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted(self._terms)
+        sorted_terms = self._sorted_terms
+
+        stem = token[:self.prefix_length]
+        start = bisect_left(sorted_terms, stem)
+        for term in sorted_terms[start:]:
+            if not term.startswith(stem) or len(matches) >= _MAX_EXPANSIONS:
+                break
+            if term == token:
+                continue
+            if term.startswith(token):
+                matches[self._terms[term]] = _PREFIX_WEIGHT
+            elif _within_edits(token, term, self.max_edits):
+                matches[self._terms[term]] = _FUZZY_WEIGHT
+
+        return list(matches.items())
+
+    def _score(self, query: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (rows, BM25 scores) of live rows matching the query; call under the lock.
+
+        Only rows in the matched postings are touched, never the whole corpus.
+        The buffer views end with this call, before the lock is released, so
+        the arrays can grow again.
+        """
+        lengths = np.frombuffer(self._lengths, dtype=np.uint32)
+        length_scale = self.b / max(self._live_length / self._live_rows, 1e-9)
+        candidates: List[np.ndarray] = []
+        contributions: List[np.ndarray] = []
+        for token in set(tokenize(query)):
+            for term_id, weight in self._expand(token):
+                rows = np.frombuffer(self._rows[term_id], dtype=np.uint32)
+                tfs = np.frombuffer(self._tfs[term_id], dtype=np.uint16).astype(np.float32)
+                df = len(rows)
+                idf = math.log(1.0 + (self._live_rows - df + 0.5) / (df + 0.5))
+                norms = self.k1 * (1.0 - self.b + length_scale * lengths[rows])
+                candidates.append(rows)
+                contributions.append(weight * idf * tfs * (self.k1 + 1.0) / (tfs + norms))
+
+        if not candidates:
+            return np.zeros(0, dtype=np.uint32), np.zeros(0)
+        matched, slots = np.unique(np.concatenate(candidates), return_inverse=True)
+        scores = np.bincount(slots, weights=np.concatenate(contributions))
+        scores[np.frombuffer(self._deleted, dtype=np.uint8)[matched] != 0] = 0.0
+        return matched, scores
+
+    def search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        """
+        BM25 top-k for a query.
+
+        Args:
+            query: Query text
+            k: Number of results
+
+        Returns:
+            List of (chunk_id, BM25 score), best first
+        """
+        self._refresh()
+        with self._lock:
+            if not self._live_rows or k <= 0:
+                return []
+
+            matched, scores = self._score(query)
+            positive = np.flatnonzero(scores > 0)
+            if not len(positive):
+                return []
+            if len(positive) > k:
+                positive = positive[np.argpartition(-scores[positive], k - 1)[:k]]
+            order = positive[np.argsort(-scores[positive], kind="stable")]
+            return [(self._chunk_ids[matched[i]], float(scores[i])) for i in order]
+
+    def stats(self) -> Dict[str, Any]:
+        """Vocabulary and posting sizes."""
+        self._refresh()
+        return {
+            "path": self.path,
+            "chunks": len(self._chunk_ids),
+            "live_chunks": self._live_rows,
+            "terms": len(self._terms),
+            "postings": sum(len(r) for r in self._rows),
+        }
+
+
+# Open indexes keyed by directory
+_local_text_indexes: Dict[str, LocalBM25Index] = {}
+_registry_lock = threading.Lock()
+
+
+def get_local_text_index(base_path: str, namespace: str) -> LocalBM25Index:
+    """
+    Get the process-wide local BM25 index for a corpus namespace.
+
+    Args:
+        base_path: Root directory for local indexes
+        namespace: Corpus namespace ("database.chunks")
+
+    Returns:
+        Opened LocalBM25Index
+    """
+    path = local_index_dir(base_path, namespace, "text")
+    with _registry_lock:
+        index = _local_text_indexes.get(path)
+        if index is None:
+            index = _local_text_indexes[path] = LocalBM25Index(path)
+        return index
+
+
+def local_text_index_for(settings: Any, database: str, chunks_collection: str) -> Optional[LocalBM25Index]:
+    """
+    Local BM25 index for a profile, or None when settings select Atlas $search.
+
+    Args:
+        settings: Core or backend settings (text_search_backend, local_index_path)
+        database: Profile database name
+        chunks_collection: Profile chunks collection name
+    """
+    if settings.text_search_backend != "local":
+        return None
+
+    return get_local_text_index(settings.local_index_path, corpus_namespace(database, chunks_collection))
+
+
+async def build_local_text_index(
+    chunks_collection: Any,
+    index: LocalBM25Index,
+    batch_size: int = 1000
+) -> int:
+    """
+    Rebuild a local BM25 index from the chunks collection.
+
+    Args:
+        chunks_collection: Async chunks collection
+        index: Index to (re)fill
+        batch_size: Chunks indexed between progress logs
+
+    Returns:
+        Number of chunks indexed
+    """
+    index.clear()
+    total = 0
+    batch: List[Dict[str, Any]] = []
+
+    async for chunk in chunks_collection.find({}, {"content": 1, "document_id": 1}):
+        batch.append(chunk)
+        if len(batch) >= batch_size:
+            total += index.add(
+                [c["_id"] for c in batch], [c["document_id"] for c in batch],
+                [c.get("content", "") for c in batch], persist=False
+            )
+            batch = []
+            logger.debug(f"Indexed {total} chunks")
+
+    if batch:
+        total += index.add(
+            [c["_id"] for c in batch], [c["document_id"] for c in batch],
+            [c.get("content", "") for c in batch], persist=False
+        )
+
+    index.save()
+    logger.info(f"Built local BM25 index at {index.path} with {total} chunks")
+    return total
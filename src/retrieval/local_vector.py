@@ -0,0 +1,444 @@
+"""
+In-process vector search over a memory-mapped float32 matrix.
+
+Plain mongod (dev/CI boxes, air-gapped deployments) has no Atlas Vector
+Search, so $vectorSearch fails there. LocalVectorIndex keeps L2-normalized
+chunk embeddings in a memory-mapped float32 file with a chunk/document ID
+sidecar, answers top-k queries with batched NumPy dot products (optionally
+sharded across threads) and grows incrementally as ingestion appends chunks.
+
+Files in the index directory:
+    vectors.f32         row-major float32 matrix (count × dimension)
+    chunk_ids.bin       24-byte hex ObjectId per row
+    document_ids.bin    24-byte hex parent document ID per row
+    deleted.bin         one byte per row, 1 = tombstoned
+    meta.json           dimension and committed row count
+
+Mapped files never shrink: searches score a mapping outside the lock (and
+other processes map the same files), and reading a truncated page kills the
+process with SIGBUS. Appends write past the committed rows, while compaction
+and clear write new files and swap them in with os.replace, so existing
+mappings keep the old inode until they are dropped.
+"""
+
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.retrieval.result_cache import corpus_namespace
+from src.retrieval.vector_storage import decode_embedding
+
+logger = logging.getLogger(__name__)
+
+_ID_DTYPE = "S24"
+
+# Compact once this share of rows is tombstoned
+_COMPACT_RATIO = 0.2
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class LocalVectorIndex:
+    """Memory-mapped float32 vector index with exact cosine top-k search."""
+
+    def __init__(
+        self,
+        path: str,
+        dimension: int,
+        shard_rows: int = 65536,
+        workers: int = 1
+    ):
+        """
+        Open (or create) a local vector index.
+
+        Args:
+            path: Directory holding the index files
+            dimension: Embedding dimension
+            shard_rows: Rows scored per NumPy matmul
+            workers: Threads used to score shards in parallel
+        """
+        self.path = path
+        self.dimension = dimension
+        self.shard_rows = shard_rows
+        self.workers = max(1, workers)
+
+        self._lock = threading.RLock()
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="vecidx_") \
+            if self.workers > 1 else None
+
+        os.makedirs(path, exist_ok=True)
+        self._load()
+
+    # ============== Files ==============
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _load(self) -> None:
+        meta_path = self._file("meta.json")
+        count = 0
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta.get("dimension") != self.dimension:
+                logger.warning(
+                    f"Local vector index at {self.path} has dimension {meta.get('dimension')}, "
+                    f"expected {self.dimension}; starting empty"
+                )
+                self._replace_files(b"", b"", b"")
+            else:
+                count = meta.get("count", 0)
+
+        self.count = count
+        self._meta_mtime = self._stat_meta()
+        self._map()
+
+    def _stat_meta(self) -> Optional[Tuple[int, int]]:
+        # meta.json is replaced atomically, so a new inode means new rows
+        try:
+            stat = os.stat(self._file("meta.json"))
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _refresh(self) -> None:
+        """Pick up rows written by another process (e.g. the CLI ingester)."""
+        mtime = self._stat_meta()
+        if mtime == self._meta_mtime:
+            return
+        with self._lock:
+            if mtime != self._meta_mtime:
+                self._load()
+
+    def _map(self) -> None:
+        """(Re)map files for the committed row count."""
+        if self.count == 0:
+            self._matrix = np.zeros((0, self.dimension), dtype=np.float32)
+            self._chunk_ids = np.zeros(0, dtype=_ID_DTYPE)
+            self._document_ids = np.zeros(0, dtype=_ID_DTYPE)
+            self._deleted = np.zeros(0, dtype=bool)
+            return
+
+        self._matrix = np.memmap(
+            self._file("vectors.f32"), dtype=np.float32, mode="r", shape=(self.count, self.dimension)
+        )
+        self._chunk_ids = np.memmap(self._file("chunk_ids.bin"), dtype=_ID_DTYPE, mode="r", shape=(self.count,))
+        self._document_ids = np.memmap(
+            self._file("document_ids.bin"), dtype=_ID_DTYPE, mode="r", shape=(self.count,)
+        )
+
+        deleted = np.zeros(self.count, dtype=bool)
+        deleted_path = self._file("deleted.bin")
+        if os.path.exists(deleted_path):
+            stored = np.fromfile(deleted_path, dtype=np.uint8)[:self.count].astype(bool)
+            deleted[:len(stored)] = stored
+        self._deleted = deleted
+
+    def _write_meta(self) -> None:
+        tmp = self._file("meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump({"dimension": self.dimension, "count": self.count}, f)
+        os.replace(tmp, self._file("meta.json"))
+        self._meta_mtime = self._stat_meta()
+
+    def _replace_files(self, vectors: bytes, chunk_ids: bytes, document_ids: bytes) -> None:
+        """Swap in new row files (no tombstones) without touching mapped ones."""
+        rows = len(chunk_ids) // 24
+        for name, data in (
+            ("vectors.f32", vectors),
+            ("chunk_ids.bin", chunk_ids),
+            ("document_ids.bin", document_ids),
+            ("deleted.bin", bytes(rows)),
+        ):
+            tmp = self._file(name + ".tmp")
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self._file(name))
+
+    def _append_raw(self, name: str, data: bytes, row_bytes: int) -> None:
+        """Write after the committed rows (overwrites, never truncates, any uncommitted tail)."""
+        path = self._file(name)
+        with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+            f.seek(self.count * row_bytes)
+            f.write(data)
+
+    # ============== Updates ==============
+
+    def add(
+        self,
+        chunk_ids: Sequence[Any],
+        document_ids: Sequence[Any],
+        embeddings: Sequence[Sequence[float]]
+    ) -> int:
+        """
+        Append chunks to the index.
+
+        Args:
+            chunk_ids: Chunk ObjectIds (or hex strings)
+            document_ids: Parent document IDs, aligned with chunk_ids
+            embeddings: Embedding vectors, aligned with chunk_ids
+
+        Returns:
+            Number of rows appended
+        """
+        if not len(chunk_ids):
+            return 0
+
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        if matrix.ndim != 2 or matrix.shape[1] != self.dimension:
+            raise ValueError(
+                f"Expected embeddings of dimension {self.dimension}, got shape {matrix.shape}"
+            )
+        matrix = _normalize(matrix)
+        chunk_bytes = np.array([str(c) for c in chunk_ids], dtype=_ID_DTYPE)
+        document_bytes = np.array([str(d) for d in document_ids], dtype=_ID_DTYPE)
+
+        with self._lock:
+            self._append_raw("vectors.f32", matrix.tobytes(), self.dimension * 4)
+            self._append_raw("chunk_ids.bin", chunk_bytes.tobytes(), 24)
+            self._append_raw("document_ids.bin", document_bytes.tobytes(), 24)
+            self._append_raw("deleted.bin", bytes(len(chunk_bytes)), 1)
+            self.count += len(chunk_bytes)
+            self._write_meta()
+            self._map()
+
+        return len(chunk_bytes)
+
+    def delete_documents(self, document_ids: Iterable[Any]) -> int:
+        """
+        Tombstone every row belonging to the given documents.
+
+        Returns:
+            Number of rows removed
+        """
+        targets = np.array([str(d) for d in document_ids], dtype=_ID_DTYPE)
+        if not len(targets) or self.count == 0:
+            return 0
+
+        with self._lock:
+            mask = np.isin(self._document_ids, targets) & ~self._deleted
+            removed = int(mask.sum())
+            if not removed:
+                return 0
+            self._deleted = self._deleted | mask
+            self._deleted.astype(np.uint8).tofile(self._file("deleted.bin"))
+
+            if self._deleted.sum() > self.count * _COMPACT_RATIO:
+                self._compact()
+            else:
+                self._write_meta()
+
+        return removed
+
+    def _compact(self) -> None:
+        """Rewrite the files without tombstoned rows."""
+        keep = ~self._deleted
+        matrix = np.array(self._matrix[keep])
+        chunk_ids = np.array(self._chunk_ids[keep])
+        document_ids = np.array(self._document_ids[keep])
+
+        self._replace_files(matrix.tobytes(), chunk_ids.tobytes(), document_ids.tobytes())
+        self.count = len(chunk_ids)
+        self._write_meta()
+        self._map()
+        logger.info(f"Compacted local vector index at {self.path} to {self.count} rows")
+
+    def clear(self) -> None:
+        """Remove every row."""
+        with self._lock:
+            self._replace_files(b"", b"", b"")
+            self.count = 0
+            self._write_meta()
+            self._map()
+
+    # ============== Search ==============
+
+    def _score_shard(
+        self,
+        matrix: np.ndarray,
+        deleted: np.ndarray,
+        start: int,
+        end: int,
+        queries: np.ndarray,
+        k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k (row index, cosine) per query within rows [start, end)."""
+        scores = np.asarray(matrix[start:end]) @ queries.T  # (rows, n_queries)
+        scores[deleted[start:end]] = -np.inf
+
+        take = min(k, end - start)
+        top = np.argpartition(-scores, take - 1, axis=0)[:take]
+        return top + start, np.take_along_axis(scores, top, axis=0)
+
+    def search_batch(self, query_vectors: Sequence[Sequence[float]], k: int) -> List[List[Tuple[str, float]]]:
+        """
+        Exact cosine top-k for several queries at once.
+
+        Args:
+            query_vectors: Query embeddings
+            k: Results per query
+
+        Returns:
+            Per query, a list of (chunk_id, similarity) with similarity in [0, 1]
+            (Atlas cosine convention: (1 + cos) / 2), best first
+        """
+        queries = _normalize(np.asarray(query_vectors, dtype=np.float32).reshape(-1, self.dimension))
+
+        self._refresh()
+        with self._lock:
+            matrix, deleted, chunk_ids, count = self._matrix, self._deleted, self._chunk_ids, self.count
+
+        if count == 0 or k <= 0:
+            return [[] for _ in range(len(queries))]
+
+        shards = [(s, min(s + self.shard_rows, count)) for s in range(0, count, self.shard_rows)]
+        if self._pool is not None and len(shards) > 1:
+            parts = list(self._pool.map(
+                lambda bounds: self._score_shard(matrix, deleted, bounds[0], bounds[1], queries, k), shards
+            ))
+        else:
+            parts = [self._score_shard(matrix, deleted, s, e, queries, k) for s, e in shards]
+
+        rows = np.concatenate([p[0] for p in parts], axis=0)
+        scores = np.concatenate([p[1] for p in parts], axis=0)
+
+        results = []
+        for q in range(len(queries)):
+            order = np.argsort(-scores[:, q])[:k]
+            hits = []
+            for i in order:
+                score = float(scores[i, q])
+                if score == -np.inf:
+                    break
+                hits.append((chunk_ids[rows[i, q]].decode("ascii"), (1.0 + score) / 2.0))
+            results.append(hits)
+        return results
+
+    def search(self, query_vector: Sequence[float], k: int) -> List[Tuple[str, float]]:
+        """Exact cosine top-k for one query."""
+        return self.search_batch([query_vector], k)[0]
+
+    def stats(self) -> Dict[str, Any]:
+        """Row counts and on-disk size."""
+        self._refresh()
+        live = int(self.count - self._deleted.sum()) if self.count else 0
+        return {
+            "path": self.path,
+            "dimension": self.dimension,
+            "rows": self.count,
+            "live_rows": live,
+            "bytes": self.count * self.dimension * 4,
+        }
+
+
+# Open indexes keyed by directory
+_local_vector_indexes: Dict[str, LocalVectorIndex] = {}
+_registry_lock = threading.Lock()
+
+
+def local_index_dir(base_path: str, namespace: str, kind: str) -> str:
+    """Directory for one profile's local index of a given kind ("vector", "text")."""
+    return os.path.join(base_path, namespace, kind)
+
+
+def get_local_vector_index(
+    base_path: str,
+    namespace: str,
+    dimension: int,
+    workers: int = 1
+) -> LocalVectorIndex:
+    """
+    Get the process-wide local vector index for a corpus namespace.
+
+    Args:
+        base_path: Root directory for local indexes
+        namespace: Corpus namespace ("database.chunks")
+        dimension: Embedding dimension
+        workers: Threads for parallel shard scoring
+
+    Returns:
+        Opened LocalVectorIndex
+    """
+    path = local_index_dir(base_path, namespace, "vector")
+    with _registry_lock:
+        index = _local_vector_indexes.get(path)
+        if index is None or index.dimension != dimension:
+            index = LocalVectorIndex(path, dimension, workers=workers)
+            _local_vector_indexes[path] = index
+        return index
+
+
+def local_vector_index_for(
+    settings: Any,
+    database: str,
+    chunks_collection: str,
+    dimension: Optional[int] = None
+) -> Optional[LocalVectorIndex]:
+    """
+    Local vector index for a profile, or None when settings select Atlas.
+
+    Args:
+        settings: Core or backend settings (vector_search_backend, local_index_path, ...)
+        database: Profile database name
+        chunks_collection: Profile chunks collection name
+        dimension: Profile embedding dimension (defaults to settings.embedding_dimension)
+    """
+    if settings.vector_search_backend != "local":
+        return None
+
+    return get_local_vector_index(
+        settings.local_index_path,
+        corpus_namespace(database, chunks_collection),
+        dimension or settings.embedding_dimension,
+        workers=settings.local_vector_workers
+    )
+
+
+async def build_local_vector_index(
+    chunks_collection: Any,
+    index: LocalVectorIndex,
+    batch_size: int = 1000
+) -> int:
+    """
+    Rebuild a local vector index from the chunks collection.
+
+    Args:
+        chunks_collection: Async chunks collection
+        index: Index to (re)fill
+        batch_size: Chunks appended per write
+
+    Returns:
+        Number of chunks indexed
+    """
+    index.clear()
+    total = 0
+    batch: List[Dict[str, Any]] = []
+
+    cursor = chunks_collection.find(
+        {"embedding": {"$exists": True}},
+        {"embedding": 1, "document_id": 1}
+    )
+    async for chunk in cursor:
+        batch.append(chunk)
+        if len(batch) >= batch_size:
+            total += index.add(
+                [c["_id"] for c in batch], [c["document_id"] for c in batch], [decode_embedding(c["embedding"]) for c in batch]
+            )
+            batch = []
+
+    if batch:
+        total += index.add(
+            [c["_id"] for c in batch], [c["document_id"] for c in batch], [decode_embedding(c["embedding"]) for c in batch]
+        )
+
+    logger.info(f"Built local vector index at {index.path} with {total} chunks")
+    return total
@@ -0,0 +1,83 @@
+"""
+Full-precision rescoring of quantized vector search hits.
+
+A scalar- or binary-quantized HNSW index ranks candidates by approximate
+similarity. The retrieval engine therefore asks it for more hits than
+needed (oversampling), fetches their stored float embeddings and re-ranks
+them here by exact cosine similarity with NumPy before cutting to the limit.
+"""
+
+import math
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+from bson.binary import Binary, BinaryVectorDtype
+
+# Oversampling used when quantization is on and none is configured
+DEFAULT_RESCORE_OVERSAMPLE = {"none": 1.0, "scalar": 2.0, "binary": 4.0}
+
+# binData vector header: dtype byte and padding byte
+_VECTOR_HEADER = 2
+_NUMPY_DTYPES = {
+    BinaryVectorDtype.FLOAT32.value: np.dtype("<f4"),
+    BinaryVectorDtype.INT8.value: np.int8,
+}
+
+
+def embedding_array(value: Any) -> np.ndarray:
+    """Stored embedding (BSON array or float32/int8 binary vector) as float32."""
+    if isinstance(value, Binary) and value.subtype == 9:
+        dtype = _NUMPY_DTYPES.get(bytes(value)[0:1])
+        if dtype is not None:
+            return np.frombuffer(bytes(value), dtype=dtype, offset=_VECTOR_HEADER).astype(np.float32)
+        return np.asarray(value.as_vector().data, dtype=np.float32)
+    return np.asarray(value, dtype=np.float32)
+
+
+def rescore_oversample_for(quantization: str, configured: Any = None) -> float:
+    """Effective oversampling: the configured value, else the default for the quantization."""
+    if configured is not None:
+        return float(configured)
+    return DEFAULT_RESCORE_OVERSAMPLE.get(quantization, 1.0)
+
+
+def oversampled_limit(limit: int, oversample: float) -> int:
+    """Number of hits to fetch from the quantized index for a result limit."""
+    return max(limit, math.ceil(limit * oversample))
+
+
+def rescore_hits(
+    query_embedding: Sequence[float],
+    hits: List[Dict[str, Any]],
+    limit: int
+) -> List[Dict[str, Any]]:
+    """
+    Re-rank hits by exact cosine similarity and keep the best `limit`.
+
+    Args:
+        query_embedding: Full-precision query vector
+        hits: Vector search hits carrying their stored "embedding"
+        limit: Number of hits to return
+
+    Returns:
+        Hits without the embedding field, similarity set to (1 + cos) / 2
+        (the Atlas cosine score convention), best first
+    """
+    if not hits:
+        return []
+
+    query = np.asarray(query_embedding, dtype=np.float32)
+    query /= np.linalg.norm(query) or 1.0
+
+    matrix = np.stack([embedding_array(hit["embedding"]) for hit in hits])
+    norms = np.linalg.norm(matrix, axis=1)
+    norms[norms == 0] = 1.0
+    scores = (matrix @ query) / norms
+
+    order = np.argsort(-scores, kind="stable")[:limit]
+    rescored = []
+    for i in order:
+        hit = {key: value for key, value in hits[i].items() if key != "embedding"}
+        hit["similarity"] = (1.0 + float(scores[i])) / 2.0
+        rescored.append(hit)
+    return rescored
@@ -0,0 +1,370 @@
+"""
+Search result cache keyed by profile and corpus generation.
+
+Dashboards and the frontend re-issue identical searches constantly. Results
+are cached per (database, chunks collection, corpus generation, query,
+search type, match count, filters). Ingestion, document deletion and
+collection cleaning bump the profile's corpus generation, so a search after
+an ingest can never be answered from results computed before it.
+
+Entries past their TTL are still served for a grace period while a single
+background refresh recomputes them (stale-while-revalidate).
+"""
+
+import asyncio
+import json
+import logging
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from src.retrieval.embedding_cache import normalize_query
+
+logger = logging.getLogger(__name__)
+
+# Collection holding the shared corpus generation counters
+CORPUS_GENERATION_COLLECTION = "corpus_generations"
+
+# Rough per-result overhead on top of the text content (model, ids, metadata)
+_RESULT_OVERHEAD_BYTES = 400
+
+
+def corpus_namespace(database: str, chunks_collection: str) -> str:
+    """Identify a profile's corpus by database and chunks collection."""
+    return f"{database}.{chunks_collection}"
+
+
+class CorpusGenerations:
+    """
+    Per-profile corpus generation counters.
+
+    Bumps are applied locally at once and, when a MongoDB collection is
+    given, also $inc'ed there so other workers and the CLI ingester see them.
+    Reads refresh from MongoDB at most every refresh_seconds.
+    """
+
+    def __init__(self, refresh_seconds: float = 2.0):
+        """
+        Initialize generation counters.
+
+        Args:
+            refresh_seconds: Minimum interval between MongoDB reads per namespace
+        """
+        self.refresh_seconds = refresh_seconds
+        self._local: Dict[str, int] = {}
+        self._checked_at: Dict[str, float] = {}
+
+    async def bump(self, namespace: str, collection: Optional[Any] = None) -> int:
+        """
+        Advance a namespace's generation.
+
+        Args:
+            namespace: Corpus namespace (see corpus_namespace)
+            collection: Optional async collection holding shared counters
+
+        Returns:
+            The new generation
+        """
+        generation = self._local.get(namespace, 0) + 1
+
+        if collection is not None:
+            try:
+                doc = await collection.find_one_and_update(
+                    {"_id": namespace},
+                    {"$inc": {"generation": 1}},
+                    upsert=True,
+                    return_document=True
+                )
+                generation = max(generation, doc.get("generation", 0))
+            except Exception as e:
+                logger.warning(f"Corpus generation update failed for {namespace}: {e}")
+
+        self._local[namespace] = generation
+        self._checked_at[namespace] = time.monotonic()
+        return generation
+
+    async def current(self, namespace: str, collection: Optional[Any] = None) -> int:
+        """
+        Current generation for a namespace.
+
+        Args:
+            namespace: Corpus namespace
+            collection: Optional async collection holding shared counters
+
+        Returns:
+            Generation number (0 if never bumped)
+        """
+        generation = self._local.get(namespace, 0)
+        if collection is None:
+            return generation
+
+        now = time.monotonic()
+        if now - self._checked_at.get(namespace, 0.0) < self.refresh_seconds:
+            return generation
+
+        self._checked_at[namespace] = now
+        try:
+            doc = await collection.find_one({"_id": namespace}, {"generation": 1})
+        except Exception as e:
+            logger.warning(f"Corpus generation read failed for {namespace}: {e}")
+            return generation
+
+        if doc and doc.get("generation", 0) > generation:
+            generation = doc["generation"]
+            self._local[namespace] = generation
+        return generation
+
+
+@dataclass
+class _Entry:
+    created_at: float
+    results: List[Any]
+    size: int
+
+
+def _estimate_size(results: List[Any]) -> int:
+    size = sys.getsizeof(results)
+    for result in results:
+        content = getattr(result, "content", "")
+        size += len(content) + _RESULT_OVERHEAD_BYTES
+    return size
+
+
+class SearchResultCache:
+    """LRU of search results with a memory cap and stale-while-revalidate."""
+
+    def __init__(
+        self,
+        max_bytes: int = 32 * 1024 * 1024,
+        ttl_seconds: float = 60.0,
+        stale_seconds: float = 300.0
+    ):
+        """
+        Initialize result cache.
+
+        Args:
+            max_bytes: Memory budget for cached results
+            ttl_seconds: Age after which an entry is refreshed
+            stale_seconds: How long past the TTL a stale entry may still be served
+        """
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+
+        self._entries: "OrderedDict[Tuple, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+        self._refreshing: Set[asyncio.Task] = set()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(
+        namespace: str,
+        generation: int,
+        query: str,
+        search_type: str,
+        match_count: int,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> Tuple:
+        """Build the cache key for one search."""
+        return (
+            namespace,
+            generation,
+            normalize_query(query),
+            str(search_type),
+            match_count,
+            json.dumps(filters, sort_keys=True, default=str) if filters else ""
+        )
+
+    def _store(self, key: Tuple, results: List[Any]) -> None:
+        size = _estimate_size(results)
+        if size > self.max_bytes:
+            return
+
+        self._discard(key)
+        self._entries[key] = _Entry(time.monotonic(), results, size)
+        self._bytes += size
+
+        while self._bytes > self.max_bytes:
+            oldest_key = next(iter(self._entries))
+            self._discard(oldest_key)
+            self.evictions += 1
+
+    def _discard(self, key: Tuple) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    async def _compute(self, key: Tuple, compute: Callable[[], Awaitable[List[Any]]]) -> List[Any]:
+        """Run compute once per key even under concurrent misses."""
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            results = await compute()
+            self._store(key, results)
+            future.set_result(results)
+            return results
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def _revalidate(self, key: Tuple, compute: Callable[[], Awaitable[List[Any]]]) -> None:
+        if key in self._inflight:
+            return
+
+        async def refresh():
+            try:
+                await self._compute(key, compute)
+            except Exception as e:
+                logger.warning(f"Search cache refresh failed: {e}")
+
+        task = asyncio.get_running_loop().create_task(refresh())
+        self._refreshing.add(task)
+        task.add_done_callback(self._refreshing.discard)
+
+    async def get_or_compute(
+        self,
+        key: Tuple,
+        compute: Callable[[], Awaitable[List[Any]]]
+    ) -> Tuple[List[Any], bool]:
+        """
+        Return cached results for key, computing them on a miss.
+
+        Args:
+            key: Key from make_key
+            compute: Coroutine function running the actual search
+
+        Returns:
+            (results, served_from_cache)
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry.created_at
+            if age < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.results, True
+            if age < self.ttl_seconds + self.stale_seconds:
+                self._entries.move_to_end(key)
+                self.stale_hits += 1
+                self._revalidate(key, compute)
+                return entry.results, True
+            self._discard(key)
+
+        self.misses += 1
+        return await self._compute(key, compute), False
+
+    def purge_namespace(self, namespace: str, below_generation: Optional[int] = None) -> None:
+        """Drop entries of a namespace (optionally only older generations)."""
+        for key in [k for k in self._entries if k[0] == namespace]:
+            if below_generation is None or key[1] < below_generation:
+                self._discard(key)
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and memory usage."""
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "stale_seconds": self.stale_seconds,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Global instances shared by the API and in-process ingestion
+_corpus_generations: Optional[CorpusGenerations] = None
+_search_result_cache: Optional[SearchResultCache] = None
+
+
+def get_corpus_generations() -> CorpusGenerations:
+    """Get or create the process-wide corpus generation counters."""
+    global _corpus_generations
+
+    if _corpus_generations is None:
+        _corpus_generations = CorpusGenerations()
+
+    return _corpus_generations
+
+
+def get_search_result_cache() -> SearchResultCache:
+    """Get or create the process-wide search result cache."""
+    global _search_result_cache
+
+    if _search_result_cache is None:
+        _search_result_cache = SearchResultCache()
+
+    return _search_result_cache
+
+
+def configure_search_result_cache(
+    max_mb: float,
+    ttl_seconds: float,
+    stale_seconds: float,
+    generation_refresh_seconds: float = 2.0
+) -> SearchResultCache:
+    """
+    Replace the process-wide search result cache.
+
+    Args:
+        max_mb: Memory budget in megabytes
+        ttl_seconds: Fresh lifetime of an entry
+        stale_seconds: Grace period during which stale entries are served
+        generation_refresh_seconds: Interval between shared generation reads
+
+    Returns:
+        The new SearchResultCache
+    """
+    global _search_result_cache
+
+    get_corpus_generations().refresh_seconds = generation_refresh_seconds
+    _search_result_cache = SearchResultCache(
+        max_bytes=int(max_mb * 1024 * 1024),
+        ttl_seconds=ttl_seconds,
+        stale_seconds=stale_seconds
+    )
+    logger.info(
+        f"Search result cache configured: max_mb={max_mb}, ttl={ttl_seconds}s, "
+        f"stale={stale_seconds}s"
+    )
+    return _search_result_cache
+
+
+async def bump_corpus_generation(db: Any, chunks_collection_name: str) -> int:
+    """
+    Mark a profile's corpus as changed.
+
+    Args:
+        db: Async database holding the chunks collection
+        chunks_collection_name: Name of the chunks collection
+
+    Returns:
+        The new generation
+    """
+    namespace = corpus_namespace(db.name, chunks_collection_name)
+    generation = await get_corpus_generations().bump(namespace, db[CORPUS_GENERATION_COLLECTION])
+    get_search_result_cache().purge_namespace(namespace, below_generation=generation)
+    return generation
@@ -0,0 +1,78 @@
+"""
+Per-stage request timings.
+
+A request handler calls start_timings() and the code below it marks its
+stages with track_stage(); the timer travels in a context variable, so the
+retrieval engine needs no extra parameters and concurrent legs (which run
+in tasks that inherit the context) record into the same timer. Without an
+active timer track_stage() does nothing.
+
+Stages: embedding, vector_query, text_query, hybrid_query (server-side
+fusion), rescore, join (document metadata), fusion, llm_first_token,
+llm_total.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+_current: ContextVar[Optional["StageTimings"]] = ContextVar("stage_timings", default=None)
+
+
+class StageTimings:
+    """Wall-clock milliseconds per named stage (repeated stages accumulate)."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    def record(self, stage: str, elapsed_ms: float) -> None:
+        """Add elapsed_ms to a stage."""
+        self.stages[stage] = self.stages.get(stage, 0.0) + elapsed_ms
+
+    def mark(self, stage: str) -> None:
+        """Record a stage as the time elapsed since the timer started (e.g. first token)."""
+        self.stages.setdefault(stage, self.total_ms())
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the enclosed block as one stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - start) * 1000)
+
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def as_dict(self) -> Dict[str, float]:
+        """Stage timings plus the total so far, rounded to 0.01 ms."""
+        return {
+            **{name: round(ms, 2) for name, ms in self.stages.items()},
+            "total": round(self.total_ms(), 2),
+        }
+
+
+def start_timings() -> StageTimings:
+    """Install a fresh timer for the current request context."""
+    timings = StageTimings()
+    _current.set(timings)
+    return timings
+
+
+def current_timings() -> Optional[StageTimings]:
+    """Timer of the current request, if one was started."""
+    return _current.get()
+
+
+@contextmanager
+def track_stage(name: str) -> Iterator[None]:
+    """Time the enclosed block into the current timer, if any."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    with timings.stage(name):
+        yield
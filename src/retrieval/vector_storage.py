@@ -0,0 +1,146 @@
+"""
+Chunk embedding storage formats.
+
+By default embeddings are stored as BSON arrays of doubles: 9 bytes per
+dimension plus an index key per element, decoded element by element on
+every read. Atlas Vector Search also indexes packed BSON binary vectors
+(binData subtype 9), which take 4 bytes per dimension as float32 or 1 byte
+as int8. The format is chosen with EMBEDDING_STORAGE_FORMAT:
+
+    array     BSON array of doubles (default, original layout)
+    float32   packed float32 binary vector
+    int8      packed int8 binary vector, each vector scaled to [-127, 127]
+
+int8 vectors are scaled per vector, which preserves cosine similarity but
+not raw dot products. Queries against int8 storage are quantized the same
+way, since Atlas requires the query vector to match the stored type.
+"""
+
+import logging
+from typing import Any, Dict, List, Optional, Sequence
+
+from bson.binary import Binary, BinaryVectorDtype
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_FORMATS = ("array", "float32", "int8")
+
+_DTYPES = {
+    "float32": BinaryVectorDtype.FLOAT32,
+    "int8": BinaryVectorDtype.INT8,
+}
+
+
+def validate_format(storage_format: str) -> str:
+    """Return storage_format or raise ValueError for unknown formats."""
+    if storage_format not in EMBEDDING_FORMATS:
+        raise ValueError(
+            f"Unknown embedding storage format '{storage_format}' (expected one of {', '.join(EMBEDDING_FORMATS)})"
+        )
+    return storage_format
+
+
+def quantize_int8(vector: Sequence[float]) -> List[int]:
+    """Scale a vector so its largest magnitude maps to 127 and round to int8."""
+    peak = max((abs(v) for v in vector), default=0.0)
+    if peak == 0:
+        return [0] * len(vector)
+    scale = 127.0 / peak
+    return [max(-127, min(127, round(v * scale))) for v in vector]
+
+
+def encode_embedding(vector: Sequence[float], storage_format: str = "array") -> Any:
+    """
+    Encode an embedding for storage on a chunk.
+
+    Args:
+        vector: Embedding as floats
+        storage_format: One of EMBEDDING_FORMATS
+
+    Returns:
+        List of floats or a BSON binary vector
+    """
+    validate_format(storage_format)
+    if storage_format == "array":
+        return list(vector)
+    if storage_format == "int8":
+        return Binary.from_vector(quantize_int8(vector), BinaryVectorDtype.INT8)
+    return Binary.from_vector([float(v) for v in vector], BinaryVectorDtype.FLOAT32)
+
+
+def query_vector(vector: Sequence[float], storage_format: str = "array") -> Any:
+    """Encode a query vector to match the stored embedding type."""
+    return encode_embedding(vector, storage_format)
+
+
+def decode_embedding(value: Any) -> List[float]:
+    """Decode a stored embedding (array or binary vector) into floats."""
+    if isinstance(value, Binary) and value.subtype == 9:
+        return [float(v) for v in value.as_vector().data]
+    return list(value)
+
+
+def stored_format(value: Any) -> Optional[str]:
+    """Storage format of a stored embedding, or None if unrecognized."""
+    if isinstance(value, list):
+        return "array"
+    if isinstance(value, Binary) and value.subtype == 9:
+        dtype = value.as_vector().dtype
+        for name, candidate in _DTYPES.items():
+            if dtype == candidate:
+                return name
+    return None
+
+
+async def convert_embeddings(
+    chunks_collection: Any,
+    storage_format: str,
+    batch_size: int = 500,
+    limit: Optional[int] = None
+) -> Dict[str, int]:
+    """
+    Rewrite existing chunk embeddings in another storage format.
+
+    Chunks already in the target format are skipped, so the migration can be
+    interrupted and re-run.
+
+    Args:
+        chunks_collection: Async chunks collection
+        storage_format: Target format (one of EMBEDDING_FORMATS)
+        batch_size: Chunks per bulk write
+        limit: Maximum number of chunks to examine
+
+    Returns:
+        Counts of examined, converted and skipped chunks
+    """
+    validate_format(storage_format)
+    stats = {"examined": 0, "converted": 0, "skipped": 0}
+    operations: List[UpdateOne] = []
+
+    async def flush():
+        if operations:
+            result = await chunks_collection.bulk_write(operations, ordered=False)
+            stats["converted"] += result.modified_count
+            operations.clear()
+
+    cursor = chunks_collection.find({"embedding": {"$exists": True}}, {"embedding": 1})
+    if limit:
+        cursor = cursor.limit(limit)
+
+    async for chunk in cursor:
+        stats["examined"] += 1
+        if stored_format(chunk["embedding"]) == storage_format:
+            stats["skipped"] += 1
+            continue
+
+        operations.append(UpdateOne(
+            {"_id": chunk["_id"]},
+            {"$set": {"embedding": encode_embedding(decode_embedding(chunk["embedding"]), storage_format)}}
+        ))
+        if len(operations) >= batch_size:
+            await flush()
+            logger.info(f"Converted {stats['converted']} chunk embeddings to {storage_format}")
+
+    await flush()
+    return stats
@@ -103,6 +103,117 @@ class Settings(BaseSettings):
         default=0.3, description="Default text weight for hybrid search (0-1)"
     )
 
+    # Vector Search Candidates
+    vector_candidate_multiplier: float = Field(
+        default=10.0, description="numCandidates per requested result (when not calibrated)"
+    )
+
+    vector_recall_target: Optional[float] = Field(
+        default=None, ge=0.5, le=1.0, description="Target recall@k used when not calibrated"
+    )
+
+    vector_max_candidates: int = Field(
+        default=10000, description="Upper bound for numCandidates"
+    )
+
+    vector_exact_threshold: int = Field(
+        default=0, description="Use exact vector search for corpora with at most this many chunks"
+    )
+
+    # Vector Index Quantization
+    vector_quantization: str = Field(
+        default="none", description='Vector index quantization: "none", "scalar" or "binary"'
+    )
+
+    vector_rescore_oversample: Optional[float] = Field(
+        default=None,
+        ge=1.0,
+        description="Hits fetched per result for exact rescoring (default: 1 none, 2 scalar, 4 binary)",
+    )
+
+    # Chunk Storage
+    embedding_storage_format: str = Field(
+        default="array",
+        description='Chunk embedding storage: "array" (BSON doubles), "float32" or "int8" (binary vectors)',
+    )
+
+    chunk_denormalize_metadata: bool = Field(
+        default=False,
+        description="Store document title/source/file type on each chunk (no join at query time)",
+    )
+
+    # Local Search Backends
+    vector_search_backend: str = Field(
+        default="atlas",
+        description='Vector search backend: "atlas" ($vectorSearch) or "local" (memory-mapped index)',
+    )
+
+    text_search_backend: str = Field(
+        default="atlas",
+        description='Text search backend: "atlas" ($search) or "local" (BM25 inverted index)',
+    )
+
+    local_index_path: str = Field(
+        default="./data/local_indexes", description="Directory holding local search indexes"
+    )
+
+    local_vector_workers: int = Field(
+        default=1, description="Threads scoring local vector index shards in parallel"
+    )
+
+    # Hybrid Search
+    hybrid_search_mode: str = Field(
+        default="auto",
+        description='Hybrid fusion: "auto" (detect at startup), "rankfusion", "unionwith" or "python"',
+    )
+
+    # Query Embedding Cache
+    embedding_cache_enabled: bool = Field(
+        default=True, description="Cache query embeddings in process memory"
+    )
+
+    embedding_cache_max_entries: int = Field(
+        default=10000, description="Maximum number of cached query embeddings"
+    )
+
+    embedding_cache_max_mb: float = Field(
+        default=64.0, description="Memory budget for cached query embeddings (MB)"
+    )
+
+    embedding_cache_ttl_seconds: int = Field(
+        default=3600, description="Lifetime of an in-memory cached embedding"
+    )
+
+    embedding_cache_persist: bool = Field(
+        default=False,
+        description="Also store query embeddings in MongoDB (survives restarts, shared by workers)",
+    )
+
+    embedding_cache_persist_ttl_seconds: int = Field(
+        default=7 * 24 * 3600, description="Lifetime of MongoDB-cached embeddings"
+    )
+
+    # Provider HTTP Connection Pool
+    http_max_connections: int = Field(
+        default=100, description="Maximum concurrent connections per provider client"
+    )
+
+    http_max_keepalive_connections: int = Field(
+        default=20, description="Idle keep-alive connections kept per provider client"
+    )
+
+    http_keepalive_expiry_seconds: float = Field(
+        default=30.0, description="Seconds an idle provider connection stays open"
+    )
+
+    http2_enabled: bool = Field(
+        default=False, description="Use HTTP/2 for provider calls (requires the h2 package)"
+    )
+
+    http_timeout_seconds: float = Field(
+        default=60.0, description="Timeout for embedding and LLM provider requests"
+    )
+
     def apply_profile(self, profile: "ProfileConfig") -> "Settings":
         """
         Apply profile-specific settings overrides.
@@ -125,6 +236,8 @@ class Settings(BaseSettings):
         # Apply optional overrides if specified in profile
         if profile.embedding_model:
             overrides['embedding_model'] = profile.embedding_model
+        if profile.embedding_dimension:
+            overrides['embedding_dimension'] = profile.embedding_dimension
         if profile.llm_model:
             overrides['llm_model'] = profile.llm_model
         
@@ -144,7 +257,7 @@ class Settings(BaseSettings):
             'embedding_api_key': self.embedding_api_key,
             'embedding_model': overrides.get('embedding_model', self.embedding_model),
             'embedding_base_url': self.embedding_base_url,
-            'embedding_dimension': self.embedding_dimension,
+            'embedding_dimension': overrides.get('embedding_dimension', self.embedding_dimension),
             'default_match_count': self.default_match_count,
             'max_match_count': self.max_match_count,
             'default_text_weight': self.default_text_weight,
@@ -3,6 +3,7 @@
 import asyncio
 from pymongo import MongoClient
 from src.settings import load_settings
+from src.retrieval.index_definitions import text_index_definition, vector_index_definition
 
 
 def create_indexes():
@@ -31,20 +32,11 @@ def create_indexes():
     
     # Create Vector Search Index
     print("\n[1] Creating Vector Search Index...")
-    vector_index_def = {
-        "name": settings.mongodb_vector_index,
-        "type": "vectorSearch",
-        "definition": {
-            "fields": [
-                {
-                    "type": "vector",
-                    "path": "embedding",
-                    "numDimensions": settings.embedding_dimension,
-                    "similarity": "cosine"
-                }
-            ]
-        }
-    }
+    vector_index_def = vector_index_definition(
+        settings.mongodb_vector_index, settings.embedding_dimension,
+        storage_format=settings.embedding_storage_format,
+        quantization=settings.vector_quantization
+    )
     
     try:
         # Drop existing index if exists
@@ -69,20 +61,7 @@ def create_indexes():
     
     # Create Text Search Index
     print("\n[2] Creating Text Search Index...")
-    text_index_def = {
-        "name": settings.mongodb_text_index,
-        "definition": {
-            "mappings": {
-                "dynamic": False,
-                "fields": {
-                    "content": {
-                        "type": "string",
-                        "analyzer": "lucene.standard"
-                    }
-                }
-            }
-        }
-    }
+    text_index_def = text_index_definition(settings.mongodb_text_index)
     
     try:
         # Drop existing index if exists